@@ -1,16 +1,89 @@
-from fastapi import FastAPI, HTTPException, Response
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from app.workers.ingest import ingest_scene
+from app.workers.ingest import ingest_scene, resolve_clip
 from fastapi import UploadFile, File
 import tempfile
 import os
 from app.workers.evaluate import evaluate_line
+from app.workers.evaluate_scene import evaluate_scene
+from app.workers.shadowing import run_shadowing
+from app.services.ai_client import close_ai_client
+from app.services.deadline import Deadline, RequestCancelled, run_cancellable
+from app.services.rate_limit import RateLimitExceeded
+from app.services.scene_store import get_scene
+from app.services.whisper import TranscriptionFailed
+from app.services.scene_content import (
+    get_quiz,
+    get_translations,
+    quiz_for_script,
+    translations_for_script,
+)
+from app.services.pitch_cache import (
+    get_pitch_lines,
+    get_pitch_result,
+    get_pitch_variant,
+    get_scene_track,
+    store_pitch_variant,
+)
+from app.services.compression import CompressionMiddleware
+from app.services.contour import shape_pitch_lines
+from app.services.pitch_events import subscribe, unsubscribe
+from app.services.metrics import PITCH_EVENT_SUBSCRIBERS
+from app.services.metrics import metrics_enabled, render_metrics
+from fastapi.concurrency import run_in_threadpool
 from fastapi import Form
 from fastapi.middleware.cors import CORSMiddleware
 from app.config.config import settings
+from app.models.schema import SceneLine, WordToken
+from app.services.redis_client import get_redis_client
+from app.services.responses import FastJSONResponse
+from app.services.pitch import (
+    HOP_LENGTH,
+    SAMPLE_RATE,
+    is_pitch_engine_warm,
+    resolve_estimator,
+    warm_up_in_background,
+)
+from contextlib import asynccontextmanager
+from typing import List, Optional
+import asyncio
+import json
+import time
+
+
+async def _init_services():
+    """Create clients and probe dependencies concurrently, off the event loop."""
+
+    def check_redis() -> dict:
+        if not settings.REDIS_URL:
+            return {"status": "not_configured", "detail": "REDIS_URL missing."}
+        if get_redis_client() is None:
+            return {"status": "unavailable", "detail": "Connection failed."}
+        return {"status": "ok", "detail": "Connection successful."}
+
+    _, redis_status = await asyncio.gather(
+        asyncio.to_thread(settings.check_services),
+        asyncio.to_thread(check_redis),
+    )
+    settings.service_status["redis"] = redis_status
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Serve immediately — /ready reports when the dependency checks finish
+    app.state.startup = asyncio.create_task(_init_services())
+    # Pay librosa/numba JIT costs now rather than on the first scene
+    if settings.PITCH_WARMUP:
+        warm_up_in_background()
+    yield
+    app.state.startup.cancel()
+    await asyncio.to_thread(close_ai_client)
 
 
-app = FastAPI()
+# Large payloads (scenes, contours) are returned as FastJSONResponse
+# directly, which also skips FastAPI's jsonable_encoder pass
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,11 +92,23 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if settings.COMPRESS_RESPONSES:
+    app.add_middleware(CompressionMiddleware)
 
 
 # 1. Define the expected request shape
 class IngestRequest(BaseModel):
     youtube_url: str
+    pitchMode: Optional[str] = None  # pyin | yin | acf — default: PITCH_ESTIMATOR
+    # Clip mode: ingest only this section (seconds) of a longer video
+    start: Optional[float] = None
+    end: Optional[float] = None
+
+
+# Body for the quiz / translation endpoints when the scene store has no entry
+class SceneScriptRequest(BaseModel):
+    script: List[SceneLine]
+    language: str = "ja"
 
 
 @app.get("/health")
@@ -31,37 +116,119 @@ def health():
     return {"status": "online"}
 
 
+@app.get("/ready")
+def ready(response: Response):
+    """
+    Readiness: 503 until the startup dependency checks have finished, then
+    200 with per-dependency status ("degraded" if any configured
+    dependency is unavailable — the pipeline falls back / mocks).
+    """
+    startup = getattr(app.state, "startup", None)
+    if startup is None or not startup.done():
+        response.status_code = 503
+        return {
+            "status": "starting",
+            "services": settings.service_status,
+            "pitchEngineWarm": is_pitch_engine_warm(),
+        }
+
+    unavailable = [
+        name
+        for name, result in settings.service_status.items()
+        if result["status"] == "unavailable"
+    ]
+    return {
+        "status": "degraded" if unavailable else "ready",
+        "services": settings.service_status,
+        "pitchEngineWarm": is_pitch_engine_warm(),
+    }
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint (requires prometheus_client)."""
+    if not metrics_enabled():
+        raise HTTPException(status_code=503, detail="Metrics are not enabled.")
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 @app.post("/ingest")
-def ingest(request: IngestRequest):  # 2. Use the model here
+async def ingest(request: IngestRequest, http_request: Request):  # 2. Use the model here
+    try:
+        pitch_mode = resolve_estimator(request.pitchMode)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    # Clip checks that need no video length — the rest run on its metadata
+    if request.start is not None and request.start < 0:
+        raise HTTPException(status_code=422, detail="Clip start must be >= 0.")
+    if request.end is not None:
+        try:
+            resolve_clip(None, request.start, request.end)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+    # Stops the pipeline when the client goes away or the budget runs out
+    deadline = Deadline(settings.INGEST_DEADLINE_SECONDS, pipeline="ingest")
     try:
         # FastAPI automatically validates that youtube_url exists now
-        scene = ingest_scene(request.youtube_url)
-        return scene.model_dump()
+        scene = await run_cancellable(
+            run_in_threadpool(
+                ingest_scene,
+                request.youtube_url,
+                pitch_mode=pitch_mode,
+                start=request.start,
+                end=request.end,
+                deadline=deadline,
+            ),
+            http_request,
+            deadline,
+        )
+        return FastJSONResponse(scene)
+    except RequestCancelled as e:
+        raise _cancelled(e)
+    except ValueError as e:
+        # Too-long video / clip, live stream — rejected before any download
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/evaluate")
 async def evaluate(
+    http_request: Request,
     sceneId: str = Form(...),
     lineId: str = Form(...),
     expectedText: str = Form(...),
     audio: UploadFile = File(...),
+    words: Optional[str] = Form(None),  # JSON list of WordToken for the line
 ):
+    line_words = _parse_words(words)
+    deadline = Deadline(settings.EVALUATE_DEADLINE_SECONDS, pipeline="evaluate")
+
     try:
         with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
             tmp.write(await audio.read())
             tmp_path = tmp.name
 
-        result = evaluate_line(
-            scene_id=sceneId,
-            line_id=lineId,
-            expected_text=expectedText,
-            audio_path=tmp_path,
+        result = await run_cancellable(
+            evaluate_line(
+                scene_id=sceneId,
+                line_id=lineId,
+                expected_text=expectedText,
+                audio_path=tmp_path,
+                words=line_words,
+                deadline=deadline,
+            ),
+            http_request,
+            deadline,
         )
 
-        return result.model_dump()
+        return FastJSONResponse(result)
 
+    except RequestCancelled as e:
+        raise _cancelled(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -70,16 +237,240 @@ async def evaluate(
             os.unlink(tmp_path)
 
 
+def _cancelled(e: RequestCancelled) -> HTTPException:
+    # 499 (client closed request) is only ever seen in access logs
+    return HTTPException(status_code=504 if e.reason == "deadline" else 499, detail=str(e))
+
+
+def _rate_limited(e: RateLimitExceeded) -> HTTPException:
+    return HTTPException(
+        status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)}
+    )
+
+
+def _parse_words(words: Optional[str]) -> Optional[List[WordToken]]:
+    if not words:
+        return None
+    try:
+        return [
+            WordToken(word=w) if isinstance(w, str) else WordToken(**w)
+            for w in json.loads(words)
+        ]
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Invalid words field: {e}")
+
+
+@app.websocket("/ws/evaluate/{scene_id}/{line_id}")
+async def shadowing(websocket: WebSocket, scene_id: str, line_id: str, format: str = "pcm"):
+    """
+    Realtime shadowing: stream audio while speaking, receive partial
+    transcripts + running scores, then the final EvaluationResult at
+    end-of-utterance. Protocol: workers/shadowing.py.
+    """
+    await run_shadowing(websocket, scene_id, line_id, audio_format=format)
+
+
+@app.post("/evaluate/scene")
+async def evaluate_scene_batch(
+    sceneId: str = Form(...),
+    lineIds: Optional[str] = Form(None),  # JSON list; default: every line
+    recordingOffset: float = Form(0.0),  # scene time when the recording starts
+    script: Optional[str] = Form(None),  # JSON SceneLine list if scene expired
+    audio: Optional[UploadFile] = File(None),  # one continuous recording
+    clips: Optional[List[UploadFile]] = File(None),  # or one clip per line
+    clipLineIds: Optional[str] = Form(None),  # JSON list, same order as clips
+):
+    """
+    Evaluate a whole roleplay run in one request: one ASR call (clip bundles
+    are concatenated too) and one GPT feedback call, instead of one
+    /evaluate round trip per line.
+
+        429 — ASR rate limit used up (Retry-After set)
+        503 — transcription failed
+    """
+    scene = await run_in_threadpool(get_scene, sceneId)
+    if scene:
+        lines, language = scene.script, scene.language
+    elif script:
+        try:
+            lines = [SceneLine(**l) for l in json.loads(script)]
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=f"Invalid script field: {e}")
+        language = "ja"
+    else:
+        raise HTTPException(status_code=404, detail="Scene not found.")
+
+    if lineIds:
+        try:
+            wanted = set(json.loads(lineIds))
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=f"Invalid lineIds field: {e}")
+        lines = [l for l in lines if l.id in wanted]
+
+    if not audio and not clips:
+        raise HTTPException(
+            status_code=422, detail="Provide either an audio recording or clips."
+        )
+
+    clip_ids: List[str] = []
+    if clips:
+        try:
+            clip_ids = json.loads(clipLineIds or "[]")
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=f"Invalid clipLineIds: {e}")
+        if len(clip_ids) != len(clips):
+            raise HTTPException(
+                status_code=422, detail="clipLineIds must match the number of clips."
+            )
+
+    tmp_paths: List[str] = []
+    try:
+        audio_path = None
+        clip_paths = None
+        if clips:
+            clip_paths = {}
+            for line_id, clip in zip(clip_ids, clips):
+                clip_paths[line_id] = await _save_upload(clip, tmp_paths)
+        else:
+            audio_path = await _save_upload(audio, tmp_paths)
+
+        result = await run_in_threadpool(
+            evaluate_scene,
+            scene_id=sceneId,
+            lines=lines,
+            language=language,
+            audio_path=audio_path,
+            recording_offset=recordingOffset,
+            clips=clip_paths,
+        )
+        return FastJSONResponse(result)
+
+    except RateLimitExceeded as e:
+        raise _rate_limited(e)
+    except TranscriptionFailed as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    finally:
+        for path in tmp_paths:
+            if os.path.exists(path):
+                os.unlink(path)
+
+
+async def _save_upload(upload: UploadFile, tmp_paths: List[str]) -> str:
+    suffix = os.path.splitext(upload.filename or "")[1] or ".wav"
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        tmp.write(await upload.read())
+        tmp_paths.append(tmp.name)
+        return tmp.name
+
+
+@app.api_route("/scenes/{scene_id}/quiz", methods=["GET", "POST"])
+async def scene_quiz(scene_id: str, body: Optional[SceneScriptRequest] = None):
+    """
+    Quiz for a scene. Generated on the first request (not during /ingest)
+    and cached for the scene's lifetime; concurrent first requests share
+    one GPT call. If the scene is no longer stored (no Redis, TTL expired),
+    POST its script ({script: [SceneLine], language}) to generate the quiz
+    uncached, as /evaluate/scene accepts a script.
+
+        200 — {sceneId, quiz: [QuizQuestion]}
+        404 — scene not found and no script sent
+        429 — GPT rate limit used up (Retry-After set)
+    """
+    scene = await run_in_threadpool(get_scene, scene_id)
+    if scene is None and body is None:
+        raise HTTPException(status_code=404, detail="Scene not found.")
+    try:
+        if scene is not None:
+            quiz = await get_quiz(scene)
+        else:
+            quiz = await quiz_for_script(body.script, body.language)
+    except RateLimitExceeded as e:
+        raise _rate_limited(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"sceneId": scene_id, "quiz": [q.model_dump() for q in quiz]}
+
+
+@app.api_route("/scenes/{scene_id}/translations", methods=["GET", "POST"])
+async def scene_translations(scene_id: str, body: Optional[SceneScriptRequest] = None):
+    """
+    English translations of every line ({lineId: text}), generated on the
+    first request for any line of the scene and cached like the quiz.
+    POST the script for a scene that is no longer stored (uncached).
+    """
+    scene = await run_in_threadpool(get_scene, scene_id)
+    if scene is None and body is None:
+        raise HTTPException(status_code=404, detail="Scene not found.")
+    try:
+        translations = await _translations(scene, body)
+    except RateLimitExceeded as e:
+        raise _rate_limited(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"sceneId": scene_id, "translations": translations}
+
+
+@app.api_route("/scenes/{scene_id}/lines/{line_id}/translation", methods=["GET", "POST"])
+async def line_translation(
+    scene_id: str, line_id: str, body: Optional[SceneScriptRequest] = None
+):
+    """One line's translation (the whole scene is translated in one call)."""
+    scene = await run_in_threadpool(get_scene, scene_id)
+    if scene is None and body is None:
+        raise HTTPException(status_code=404, detail="Scene not found.")
+    script = scene.script if scene is not None else body.script
+    if not any(l.id == line_id for l in script):
+        raise HTTPException(status_code=404, detail="Line not found.")
+    try:
+        translations = await _translations(scene, body)
+    except RateLimitExceeded as e:
+        raise _rate_limited(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "sceneId": scene_id,
+        "lineId": line_id,
+        "translation": translations.get(line_id),
+    }
+
+
+async def _translations(scene, body: Optional[SceneScriptRequest]) -> dict:
+    # Stored scene → cached; otherwise the posted script, uncached
+    if scene is not None:
+        return await get_translations(scene)
+    return await translations_for_script(body.script)
+
+
 @app.get("/pitch/{scene_id}")
-def get_pitch(scene_id: str, response: Response):
+def get_pitch(
+    scene_id: str,
+    response: Response,
+    points: Optional[int] = Query(None, ge=8, le=4000),  # max points per line
+    smooth: int = Query(0, ge=0, le=31),  # median window (frames), 0 = off
+    semitones: bool = False,  # relative to each speaker's median F0
+    decimate: str = Query("lttb", pattern="^(lttb|minmax)$"),
+):
     """
     Poll this endpoint after receiving a ScenePackage from /ingest.
 
+    Optional shaping (server-side, cached per scene and parameter set):
+        points     — decimate each line to at most this many points
+                     (LTTB keeps the shape, minmax the envelope); kept
+                     frame indices come back as pitchFrames
+        smooth     — median filter inside voiced runs
+        semitones  — values in semitones; unvoiced frames become null
+
     Returns:
         202 — pitch extraction still running
         200 — pitch data ready, includes per-line pitch contours
         404 — scene not found (invalid ID or TTL expired)
 
+    Prefer GET /pitch/{scene_id}/events (one SSE connection, contours pushed
+    as they finish). Polling remains for clients without EventSource.
+
     Frontend strategy:
         1. Receive ScenePackage from /ingest
         2. Wait ~3 seconds
@@ -98,12 +489,168 @@ def get_pitch(scene_id: str, response: Response):
         response.status_code = 202
         return {"status": "processing", "sceneId": scene_id}
 
-    # Pitch is ready — delete from Redis after serving (TTL would handle it
-    # anyway but this frees memory immediately)
-    delete_pitch_result(scene_id)
+    # Kept until its TTL — clients re-poll with different shaping params
+    lines = result["lines"]  # [{ lineId, pitchPattern: [float] }]
 
-    return {
-        "status": "ready",
-        "sceneId": scene_id,
-        "lines": result["lines"],  # [{ lineId, pitchPattern: [float] }]
-    }
+    if points or smooth > 1 or semitones:
+        variant = f"p{points or 0}-s{smooth}-{'st' if semitones else 'hz'}-{decimate}"
+        shaped = get_pitch_variant(scene_id, variant)
+        if shaped is None:
+            speakers = None
+            if semitones:
+                scene = get_scene(scene_id)
+                if scene:
+                    speakers = {l.id: l.characterName for l in scene.script}
+            shaped = shape_pitch_lines(
+                lines, points, smooth, decimate, semitones, speakers
+            )
+            store_pitch_variant(scene_id, variant, shaped)
+        lines = shaped
+
+    return FastJSONResponse(
+        {
+            "status": "ready",
+            "sceneId": scene_id,
+            "frameSeconds": HOP_LENGTH / SAMPLE_RATE,
+            "lines": lines,
+        }
+    )
+
+
+@app.get("/pitch/{scene_id}/range")
+def get_pitch_range(
+    scene_id: str,
+    response: Response,
+    start: float = Query(..., ge=0),  # seconds, scene time
+    end: float = Query(..., gt=0),
+):
+    """
+    F0 of any time range of the scene, sliced from its full-scene track —
+    for boundaries the script doesn't have (edited lines, practice loops)
+    without another extraction.
+
+    Returns:
+        200 — { sceneId, start, end, frameSeconds, pitchPattern }; start /
+              end are the times of the first / last frame returned
+        202 — pitch extraction still running
+        404 — scene not found (invalid ID or TTL expired)
+        422 — end is not after start
+    """
+    if end <= start:
+        raise HTTPException(status_code=422, detail="end must be after start.")
+
+    track = get_scene_track(scene_id)
+    if track is None:
+        result = get_pitch_result(scene_id)
+        if result is not None and result["status"] == "processing":
+            response.status_code = 202
+            return {"status": "processing", "sceneId": scene_id}
+        raise HTTPException(
+            status_code=404, detail="Pitch data not found for this scene."
+        )
+
+    first, values = track.slice(start, end)
+    return FastJSONResponse(
+        {
+            "status": "ready",
+            "sceneId": scene_id,
+            "start": round(first * track.frame_seconds, 3),
+            "end": round((first + max(len(values) - 1, 0)) * track.frame_seconds, 3),
+            "frameSeconds": track.frame_seconds,
+            "pitchPattern": values,
+        }
+    )
+
+
+SSE_HEARTBEAT_SECONDS = 15
+# A stream still waiting after this long gets an error event and closes
+SSE_MAX_SECONDS = 15 * 60
+
+
+@app.get("/pitch/{scene_id}/events")
+async def pitch_events(scene_id: str, request: Request):
+    """
+    Server-Sent Events stream of pitch progress for one scene.
+
+        event: line   data: { lineId, index, pitchPattern }  — one per line
+        event: ready  data: { sceneId, lines }               — then closes
+        event: error  data: { detail }                       — expired, or
+                                  not ready within SSE_MAX_SECONDS; closes
+
+    Late joiners first receive every line finished so far. Events come
+    through Redis pub/sub, so any worker can serve any scene.
+
+    Returns 404 if the scene has no pitch data (invalid ID or TTL expired).
+    """
+    # Subscribe before reading state so no event falls in between
+    queue = subscribe(scene_id)
+    result = await run_in_threadpool(get_pitch_result, scene_id)
+    if result is None:
+        unsubscribe(scene_id, queue)
+        raise HTTPException(
+            status_code=404, detail="Pitch data not found for this scene."
+        )
+
+    return StreamingResponse(
+        _pitch_event_stream(scene_id, request, queue, result),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _pitch_event_stream(scene_id: str, request: Request, queue, result: dict):
+    sent = set()
+    PITCH_EVENT_SUBSCRIBERS.inc()
+    try:
+        if result["status"] == "processing":
+            # Catch up on lines finished before this viewer connected
+            for line in await run_in_threadpool(get_pitch_lines, scene_id):
+                sent.add(line["lineId"])
+                yield _sse("line", line)
+
+            deadline = time.monotonic() + SSE_MAX_SECONDS
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    yield _sse("error", {"detail": "Pitch data not ready in time."})
+                    return
+                try:
+                    event = await asyncio.wait_for(
+                        queue.get(), min(SSE_HEARTBEAT_SECONDS, remaining)
+                    )
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    # Covers events missed while the listener reconnected
+                    result = await run_in_threadpool(get_pitch_result, scene_id)
+                    if result is None:
+                        yield _sse("error", {"detail": "Pitch data expired."})
+                        return
+                    if result["status"] == "ready":
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+
+                if event.get("event") == "line" and event["lineId"] not in sent:
+                    sent.add(event["lineId"])
+                    yield _sse(
+                        "line",
+                        {k: event[k] for k in ("lineId", "index", "pitchPattern")},
+                    )
+                elif event.get("event") == "ready":
+                    result = await run_in_threadpool(get_pitch_result, scene_id)
+                    break
+
+        lines = result["lines"] if result and result["status"] == "ready" else []
+        for index, line in enumerate(lines):
+            if line["lineId"] not in sent:
+                yield _sse("line", {**line, "index": index})
+        yield _sse("ready", {"sceneId": scene_id, "lines": len(lines)})
+
+    finally:
+        unsubscribe(scene_id, queue)
+        PITCH_EVENT_SUBSCRIBERS.dec()
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -1,17 +1,31 @@
+import importlib
+import importlib.util
 import os
-from openai import OpenAI
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from dotenv import load_dotenv
-from supabase import create_client
 
 env_path = Path(__file__).resolve().parent.parent.parent / ".env"
 load_dotenv(dotenv_path=env_path, override=True)
 
 
 class Settings:
+    """
+    Environment-backed settings. Constructing it does no network I/O and
+    imports no SDKs: the Supabase and OpenAI clients are created on first
+    use, and check_services() (run from the FastAPI lifespan) probes every
+    dependency concurrently.
+    """
+
     PORT = os.getenv("PORT")
-    ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS").split(",")
+    ALLOWED_ORIGINS = [
+        origin.strip()
+        for origin in os.getenv("ALLOWED_ORIGINS", "http://localhost:3000").split(",")
+        if origin.strip()
+    ]
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "").strip().strip('"')
     COLAB_API_SECRET = os.getenv("COLAB_API_SECRET", "").strip().strip('"')
     COLAB_WHISPERX_URL = os.getenv("COLAB_WHISPERX_URL", "").strip().strip('"')
@@ -20,70 +34,187 @@ class Settings:
         os.getenv("SUPABASE_SERVICE_ROLE_KEY", "").strip().strip('"')
     )
     SUPABASE_BUCKET = os.getenv("SUPABASE_BUCKET", "").strip().strip('"')
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase").strip().lower()
+    LOCAL_STORAGE_DIR = os.getenv(
+        "LOCAL_STORAGE_DIR", str(env_path.parent / "data" / "local_storage")
+    ).strip()
+    # Cut and store a small Opus clip per script line at ingest, so a line
+    # replays without fetching or seeking the scene audio
+    LINE_CLIPS = os.getenv("LINE_CLIPS", "true").lower().strip() == "true"
     REDIS_URL = os.getenv("REDIS_URL")
 
     _ai_enabled_raw = str(os.getenv("AI_ENABLED", "false")).lower().strip().strip('"')
     AI_ENABLED = _ai_enabled_raw == "true"
 
-    supabase = None
-    _openai_client = None
-    _whisperX_client = None
+    # Pitch engine: warm librosa/numba up at startup; compiled kernels are
+    # cached on disk here so they survive restarts (mount a volume to keep
+    # them across deploys)
+    PITCH_WARMUP = os.getenv("PITCH_WARMUP", "true").lower().strip() == "true"
+    PITCH_JIT_CACHE_DIR = os.getenv(
+        "PITCH_JIT_CACHE_DIR",
+        os.path.join(tempfile.gettempdir(), "sutorii-numba-cache"),
+    ).strip()
+
+    # Default F0 estimator: pyin (accurate) | yin | acf (fastest)
+    PITCH_ESTIMATOR = os.getenv("PITCH_ESTIMATOR", "pyin").strip().lower()
+    # Full-scene F0 tracks are keyed by audio hash and shared by every scene
+    # of that audio, so they outlive a scene's pitch data (default 7 days)
+    PITCH_TRACK_TTL_SECONDS = int(os.getenv("PITCH_TRACK_TTL_SECONDS", "604800"))
+
+    # Where pitch extraction runs: thread — a daemon thread in the process
+    # that handled /ingest | redis — a task on a Redis Stream, claimed by
+    # task_worker.py processes on any node (services/task_queue.py)
+    TASK_QUEUE = os.getenv("TASK_QUEUE", "thread").strip().lower()
+    TASK_MAX_ATTEMPTS = int(os.getenv("TASK_MAX_ATTEMPTS", "3"))
+    # A task unacknowledged this long belongs to a dead worker and is reclaimed
+    TASK_CLAIM_IDLE_SECONDS = float(os.getenv("TASK_CLAIM_IDLE_SECONDS", "60"))
+    TASK_STREAM_MAXLEN = int(os.getenv("TASK_STREAM_MAXLEN", "10000"))
+
+    # Request budgets (services/deadline.py): past these, or as soon as the
+    # client disconnects, /ingest and /evaluate stop their remaining stages
+    # and abort in-flight calls (0 = no budget, disconnect only)
+    INGEST_DEADLINE_SECONDS = float(os.getenv("INGEST_DEADLINE_SECONDS", "900"))
+    EVALUATE_DEADLINE_SECONDS = float(os.getenv("EVALUATE_DEADLINE_SECONDS", "120"))
+    # How often a running request polls for a client disconnect
+    DISCONNECT_POLL_SECONDS = float(os.getenv("DISCONNECT_POLL_SECONDS", "0.5"))
+    # gzip / brotli for JSON responses above 1 KB (services/compression.py);
+    # turn off when a proxy in front already compresses
+    COMPRESS_RESPONSES = (
+        os.getenv("COMPRESS_RESPONSES", "true").lower().strip() == "true"
+    )
+
+    # OpenAI: one AsyncOpenAI client over one connection pool for every AI
+    # call (services/ai_client.py). Concurrency and timeouts are per endpoint.
+    OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "64"))
+    OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+    OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "10"))
+    OPENAI_CHAT_CONCURRENCY = int(os.getenv("OPENAI_CHAT_CONCURRENCY", "32"))
+    OPENAI_CHAT_TIMEOUT = float(os.getenv("OPENAI_CHAT_TIMEOUT", "60"))
+    OPENAI_TRANSCRIPTION_CONCURRENCY = int(
+        os.getenv("OPENAI_TRANSCRIPTION_CONCURRENCY", "8")
+    )
+    OPENAI_TRANSCRIPTION_TIMEOUT = float(os.getenv("OPENAI_TRANSCRIPTION_TIMEOUT", "300"))
+
+    # Line feedback completions of concurrent evaluations are batched into one
+    # call: flushed after this window or at this many items (window 0 = off)
+    FEEDBACK_BATCH_WINDOW_MS = float(os.getenv("FEEDBACK_BATCH_WINDOW_MS", "50"))
+    FEEDBACK_BATCH_MAX_ITEMS = int(os.getenv("FEEDBACK_BATCH_MAX_ITEMS", "8"))
+
+    # Realtime shadowing (/ws/evaluate): auto | local (faster-whisper) | remote
+    STREAMING_ASR_BACKEND = os.getenv("STREAMING_ASR_BACKEND", "auto").strip().lower()
+    STREAMING_ASR_MODEL = os.getenv("STREAMING_ASR_MODEL", "base").strip()
+
+    # Word breakdowns / readings / furigana: auto | fugashi | sudachi | off
+    # (off, or no analyzer installed → GPT produces them as before)
+    JAPANESE_ANALYZER = os.getenv("JAPANESE_ANALYZER", "auto").strip().lower()
+    JAPANESE_ANALYSIS_CACHE_SIZE = int(os.getenv("JAPANESE_ANALYSIS_CACHE_SIZE", "4096"))
+
+    # Offline word meanings: JMdict index built by build_dictionary.py
+    # (missing file → GPT provides every meaning)
+    DICTIONARY_PATH = os.getenv(
+        "DICTIONARY_PATH", str(env_path.parent / "data" / "jmdict.sqlite")
+    ).strip()
+    DICTIONARY_CACHE_SIZE = int(os.getenv("DICTIONARY_CACHE_SIZE", "8192"))
+
+    # Health check timeout for each dependency probed by check_services()
+    SERVICE_CHECK_TIMEOUT = float(os.getenv("SERVICE_CHECK_TIMEOUT", "5"))
 
     def __init__(self):
+        self._lock = threading.Lock()
+        self._supabase = None
+        self._openai_client = None
+        self._whisperX_client = None
+        # { service: { "status": ok|unavailable|not_configured|disabled, "detail": str } }
+        self.service_status: dict = {}
+
+    @property
+    def is_ai_ready(self) -> bool:
+        return bool(self.OPENAI_API_KEY and "sk-" in self.OPENAI_API_KEY)
+
+    @property
+    def supabase(self):
+        """Supabase client, created on first use. None if not configured."""
+        if self._supabase is None and self.SUPABASE_URL and self.SUPABASE_SERVICE_ROLE_KEY:
+            with self._lock:
+                if self._supabase is None:
+                    try:
+                        from supabase import create_client
+
+                        self._supabase = create_client(
+                            self.SUPABASE_URL, self.SUPABASE_SERVICE_ROLE_KEY
+                        )
+                    except Exception as e:
+                        print(f"❌ [SUPABASE] Initialization failed: {e}")
+        return self._supabase
+
+    @property
+    def openai_client(self):
+        """
+        AsyncOpenAI client, created on first use. None if AI is off / no key.
+        Call it through services/ai_client.py, which owns the event loop the
+        connection pool lives on.
+        """
+        if self._openai_client is None and self.is_ai_ready and self.AI_ENABLED:
+            with self._lock:
+                if self._openai_client is None:
+                    try:
+                        self._openai_client = self._create_openai_client()
+                    except Exception as e:
+                        print(f"❌ [OPENAI] Initialization failed: {e}")
+        return self._openai_client
+
+    def reset_openai_client(self):
+        """Forget the client (its pool is closed); returns it, or None."""
+        with self._lock:
+            client, self._openai_client = self._openai_client, None
+        return client
+
+    def _create_openai_client(self):
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+        # The HTTP library the SDK is built on (httpx, or a fork of it)
+        http = importlib.import_module(
+            DefaultAsyncHttpxClient.__mro__[1].__module__.split(".")[0]
+        )
+        http_client = DefaultAsyncHttpxClient(
+            http2=importlib.util.find_spec("h2") is not None,
+            limits=http.Limits(
+                max_connections=self.OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=self.OPENAI_MAX_CONNECTIONS,
+                keepalive_expiry=60,
+            ),
+            timeout=http.Timeout(
+                self.OPENAI_CHAT_TIMEOUT, connect=self.OPENAI_CONNECT_TIMEOUT
+            ),
+        )
+        return AsyncOpenAI(
+            api_key=self.OPENAI_API_KEY,
+            http_client=http_client,
+            max_retries=self.OPENAI_MAX_RETRIES,
+        )
+
+    def check_services(self) -> dict:
+        """
+        Create the clients and probe every dependency concurrently.
+        Blocking — call it from a worker thread. Returns service_status.
+        """
+        checks = {
+            "supabase": self._check_supabase,
+            "openai": self._check_openai,
+            "whisperx": self._check_whisperx,
+        }
+        with ThreadPoolExecutor(max_workers=len(checks)) as pool:
+            futures = {name: pool.submit(check) for name, check in checks.items()}
+            status = {name: future.result() for name, future in futures.items()}
+
+        self.service_status.update(status)
+
         print("\n" + "=" * 50)
-        print("STARTING SERVICE CHECKS")
+        print("SERVICE CHECKS")
         print("=" * 50)
-
-        # 1. Supabase
-        if self.SUPABASE_URL and self.SUPABASE_SERVICE_ROLE_KEY:
-            try:
-                self.supabase = create_client(
-                    self.SUPABASE_URL, self.SUPABASE_SERVICE_ROLE_KEY
-                )
-                # Test connection
-                self.supabase.storage.list_buckets()
-                print("✅ [SUPABASE] Connection successful.")
-            except Exception as e:
-                print(f"❌ [SUPABASE] Initialization failed: {e}")
-        else:
-            print("⚠️  [SUPABASE] Configuration missing.")
-
-        # 2. OpenAI
-        if self.is_ai_ready and self.AI_ENABLED:
-            try:
-                self._openai_client = OpenAI(api_key=self.OPENAI_API_KEY)
-                # Simple check - technically needs a call to verify key, but sticking to init for now
-                print("✅ [OPENAI] Client initialized.")
-            except Exception as e:
-                print(f"❌ [OPENAI] Initialization failed: {e}")
-        else:
-            status = "MISSING" if not self.OPENAI_API_KEY else "DISABLED"
-            print(f"⚠️  [OPENAI] Service is {status}.")
-
-        # 3. Colab WhisperX
-        if self.COLAB_WHISPERX_URL:
-            try:
-                import httpx
-
-                response = httpx.get(
-                    f"{self.COLAB_WHISPERX_URL.rstrip('/')}/health", timeout=5
-                )
-                if response.status_code == 200:
-                    print(
-                        f"✅ [WHISPERX] Service is ONLINE (status: {response.json().get('status')}, connected to Device: {response.json().get('device')}, GPU: {response.json().get('gpu')}, Model: {response.json().get('model')})"
-                    )
-                    self._whisperX_client = (
-                        self.COLAB_WHISPERX_URL,
-                        self.COLAB_API_SECRET,
-                    )
-                else:
-                    print(
-                        f"⚠️  [WHISPERX] Service down status code: {response.status_code} | OPENAI WHISPER will process the audio."
-                    )
-            except Exception as e:
-                print(f"⚠️  [WHISPERX] Service unreachable: {e}")
-        else:
-            print("⚠️  [WHISPERX] Configuration missing.")
+        for name, result in status.items():
+            icon = "✅" if result["status"] == "ok" else "⚠️ "
+            print(f"{icon} [{name.upper()}] {result['status']}: {result['detail']}")
 
         missing = []
         if not self.OPENAI_API_KEY:
@@ -99,14 +230,57 @@ class Settings:
             print("⚠️  Mock will be returned.")
 
         print("=" * 50 + "\n")
+        return self.service_status
 
-    @property
-    def is_ai_ready(self) -> bool:
-        return bool(self.OPENAI_API_KEY and "sk-" in self.OPENAI_API_KEY)
+    # ── Individual checks ────────────────────────────────────────────────────
 
-    @property
-    def openai_client(self):
-        return self._openai_client
+    def _check_supabase(self) -> dict:
+        if not (self.SUPABASE_URL and self.SUPABASE_SERVICE_ROLE_KEY):
+            return {"status": "not_configured", "detail": "Configuration missing."}
+        client = self.supabase
+        if not client:
+            return {"status": "unavailable", "detail": "Client initialization failed."}
+        try:
+            client.storage.list_buckets()
+            return {"status": "ok", "detail": "Connection successful."}
+        except Exception as e:
+            return {"status": "unavailable", "detail": str(e)}
+
+    def _check_openai(self) -> dict:
+        if not self.OPENAI_API_KEY:
+            return {"status": "not_configured", "detail": "OPENAI_API_KEY missing."}
+        if not (self.is_ai_ready and self.AI_ENABLED):
+            return {"status": "disabled", "detail": "AI_ENABLED is false."}
+        if not self.openai_client:
+            return {"status": "unavailable", "detail": "Client initialization failed."}
+        # Constructing the client doesn't verify the key — no call is made here
+        return {"status": "ok", "detail": "Client initialized."}
+
+    def _check_whisperx(self) -> dict:
+        if not self.COLAB_WHISPERX_URL:
+            return {"status": "not_configured", "detail": "Configuration missing."}
+        try:
+            import httpx
+
+            response = httpx.get(
+                f"{self.COLAB_WHISPERX_URL.rstrip('/')}/health",
+                timeout=self.SERVICE_CHECK_TIMEOUT,
+            )
+            if response.status_code != 200:
+                return {
+                    "status": "unavailable",
+                    "detail": f"Health check returned {response.status_code} "
+                    "— OpenAI Whisper will process the audio.",
+                }
+            health = response.json()
+            self._whisperX_client = (self.COLAB_WHISPERX_URL, self.COLAB_API_SECRET)
+            return {
+                "status": "ok",
+                "detail": f"Device: {health.get('device')}, GPU: {health.get('gpu')}, "
+                f"Model: {health.get('model')}",
+            }
+        except Exception as e:
+            return {"status": "unavailable", "detail": f"Service unreachable: {e}"}
 
 
 settings = Settings()
@@ -1,14 +1,25 @@
-from pydantic import BaseModel
-from typing import List, Optional, Literal
+from pydantic import BaseModel, PlainSerializer
+from typing import Annotated, List, Optional, Literal
 from datetime import datetime
 
 
+def _round_seconds(value: float) -> float:
+    return round(value, 3)
+
+
+# Times are rounded to the millisecond when serialized to JSON (responses,
+# Redis) — GPT returns word times with arbitrary precision
+Seconds = Annotated[
+    float, PlainSerializer(_round_seconds, return_type=float, when_used="json")
+]
+
+
 class WordToken(BaseModel):
     word: str
     reading: Optional[str] = None  # げんき
     meaning: Optional[str] = None  # energy / health
-    startTime: Optional[float] = None
-    endTime: Optional[float] = None
+    startTime: Optional[Seconds] = None
+    endTime: Optional[Seconds] = None
 
 
 class SceneLine(BaseModel):
@@ -18,11 +29,13 @@ class SceneLine(BaseModel):
     phoneticReading: Optional[str] = None
     transliteration: Optional[str] = None
     translation: Optional[str] = None
-    startTime: float
-    endTime: float
+    startTime: Seconds
+    endTime: Seconds
     words: Optional[List[WordToken]] = []
     phonemes: Optional[List[str]] = None
     pitchPattern: Optional[List[float]] = None  # Hz float values, 0.0 = unvoiced
+    audioClipPath: Optional[str] = None  # clips/{hash}.webm — this line's Opus clip
+    audioClipStart: Optional[Seconds] = None  # scene time the clip starts at (padded)
 
 
 class QuizQuestion(BaseModel):
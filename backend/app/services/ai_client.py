@@ -0,0 +1,148 @@
+"""
+services/ai_client.py
+─────────────────────────────────────────────────────────────────────────────
+Every OpenAI call goes through here: one AsyncOpenAI client (settings.
+openai_client — keep-alive pool, HTTP/2 when h2 is installed) driven by
+one event-loop thread.
+
+    # async handlers — no thread is held while the call is in flight
+    completion = await ai_call("chat", lambda c: c.chat.completions.create(...))
+
+    # pipeline threads — sync facade over the same client and pool
+    completion = ai_call_sync("chat", lambda c: c.beta.chat.completions.parse(...))
+
+Endpoints ("chat", "transcription", "models") each have their own
+concurrency bound and timeout (settings.OPENAI_*), so a burst of
+transcriptions can't take every connection from quick feedback calls.
+Calls waiting for a slot are coroutines on the AI loop, not threads.
+
+The pool is bound to the AI loop, which is why async handlers hand their
+calls over to it (asyncio.wrap_future) instead of awaiting the client on
+their own loop. Cancelling the awaiting task (or the deadline passed to
+ai_call_sync) cancels the call on the AI loop, closing its HTTP request.
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.config.config import settings
+from app.services.deadline import Deadline
+from app.services.metrics import OPENAI_IN_FLIGHT, in_flight
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Constants
+# ─────────────────────────────────────────────────────────────────────────────
+
+# endpoint → (max concurrent calls, timeout seconds)
+ENDPOINT_LIMITS = {
+    "chat": (settings.OPENAI_CHAT_CONCURRENCY, settings.OPENAI_CHAT_TIMEOUT),
+    "transcription": (
+        settings.OPENAI_TRANSCRIPTION_CONCURRENCY,
+        settings.OPENAI_TRANSCRIPTION_TIMEOUT,
+    ),
+    "models": (4, settings.OPENAI_CONNECT_TIMEOUT),
+}
+
+_lock = threading.Lock()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+# Created on the AI loop — only touched from it
+_semaphores: Dict[str, asyncio.Semaphore] = {}
+_endpoint_clients: Dict[str, Any] = {}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Public API
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def ai_available() -> bool:
+    """True when real AI calls can be made (AI_ENABLED and a valid key)."""
+    return settings.AI_ENABLED and settings.openai_client is not None
+
+
+async def ai_call(endpoint: str, request: Callable[[Any], Awaitable]) -> Any:
+    """
+    Run request(client) on the AI loop and await its result from any loop.
+    request receives the AsyncOpenAI client (with the endpoint's timeout)
+    and returns the SDK coroutine.
+    """
+    return await asyncio.wrap_future(_submit(endpoint, request))
+
+
+def ai_call_sync(
+    endpoint: str,
+    request: Callable[[Any], Awaitable],
+    deadline: Optional[Deadline] = None,
+) -> Any:
+    """
+    Blocking ai_call() for worker threads. Never call it on an event loop.
+    With a deadline the call is aborted when the request is cancelled or
+    its budget runs out (RequestCancelled).
+    """
+    if deadline is None:
+        return _submit(endpoint, request).result()
+    deadline.check()
+    return deadline.wait(_submit(endpoint, request))
+
+
+def close_ai_client() -> None:
+    """Close the connection pool and stop the AI loop (app shutdown)."""
+    global _loop, _thread
+    with _lock:
+        loop, thread = _loop, _thread
+        _loop = _thread = None
+    if loop is None:
+        return
+    client = settings.reset_openai_client()
+    _semaphores.clear()
+    _endpoint_clients.clear()
+    if client is not None:
+        try:
+            asyncio.run_coroutine_threadsafe(client.close(), loop).result(timeout=5)
+        except Exception:
+            pass
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=5)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Internal
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _submit(endpoint: str, request: Callable[[Any], Awaitable]) -> Future:
+    if endpoint not in ENDPOINT_LIMITS:
+        raise ValueError(f"Unknown OpenAI endpoint: {endpoint}")
+    client = settings.openai_client
+    if client is None:
+        raise RuntimeError("OpenAI client is not available (AI disabled or no key).")
+    return asyncio.run_coroutine_threadsafe(
+        _run(endpoint, client, request), _ensure_loop()
+    )
+
+
+async def _run(endpoint: str, client, request: Callable[[Any], Awaitable]) -> Any:
+    concurrency, timeout = ENDPOINT_LIMITS[endpoint]
+    if endpoint not in _semaphores:
+        _semaphores[endpoint] = asyncio.Semaphore(concurrency)
+        # Same client and pool — only the default timeout differs
+        _endpoint_clients[endpoint] = client.with_options(timeout=timeout)
+    async with _semaphores[endpoint]:
+        with in_flight(OPENAI_IN_FLIGHT.labels(endpoint=endpoint)):
+            return await request(_endpoint_clients[endpoint])
+
+
+def _ensure_loop() -> asyncio.AbstractEventLoop:
+    global _loop, _thread
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _thread = threading.Thread(
+                target=_loop.run_forever, name="ai-client", daemon=True
+            )
+            _thread.start()
+        return _loop
@@ -0,0 +1,417 @@
+"""
+services/audio.py
+─────────────────────────────────────────────────────────────────────────────
+One-pass audio preparation shared by ASR, pitch extraction and storage.
+
+    0. fetch_video_info() — one metadata request (duration, formats,
+                           captions), so too-long videos are rejected before
+                           anything is downloaded.
+    1. download_audio()  — yt-dlp fetches a small native audio-only stream
+                           (Opus / AAC). No FFmpegExtractAudio re-encode.
+                           With a section, only that time range is fetched.
+    2. prepare_audio()   — a single ffmpeg run decodes it once and writes:
+         • <base>.pcm.wav   16 kHz mono s16le — pitch + local ASR.
+                            Memory-mapped by load_pcm(), never re-decoded.
+         • <base>.m4a/.webm compact artifact — storage, playback, remote ASR.
+                            Stream-copied when the source is already AAC/Opus.
+    3. cut_line_clips()  — once the script is final, one ffmpeg run cuts a
+                           small Opus clip per line for line replay.
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import copy
+import logging
+import os
+import glob
+import struct
+import subprocess
+from typing import List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Constants
+# ─────────────────────────────────────────────────────────────────────────────
+
+PCM_SAMPLE_RATE = 16000
+PCM_BYTES_PER_SECOND = PCM_SAMPLE_RATE * 2  # mono s16le
+
+# Smallest speech-adequate native stream first (YouTube itag 250/249 Opus,
+# 140 AAC). Anything goes as a last resort — prepare_audio() re-encodes it.
+AUDIO_FORMAT_SELECTOR = (
+    "bestaudio[acodec=opus][abr<=96]"
+    "/bestaudio[ext=m4a][abr<=128]"
+    "/bestaudio[abr<=128]"
+    "/bestaudio/best"
+)
+
+# Compact artifact encoding when the source codec can't be stream-copied
+COMPACT_FALLBACK_BITRATE = "64k"
+
+# Per-line playback clips: padding either side of a line (less where the
+# next line is closer), and the encoding used when the compact artifact
+# isn't Opus already. Level 5 is ~2x faster than libopus' default 10 and
+# indistinguishable on 32 kbps speech.
+CLIP_PADDING_SECONDS = 0.15
+CLIP_BITRATE = "32k"
+CLIP_COMPRESSION_LEVEL = "5"
+
+
+class PreparedAudio(BaseModel):
+    pcm_path: str  # 16 kHz mono s16le WAV
+    compact_path: str  # Opus (.webm) or AAC (.m4a)
+    duration: float  # seconds, exact (from PCM length)
+    transcoded: bool  # False when the compact artifact is a stream copy
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Public API
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def fetch_video_info(youtube_url: str) -> dict:
+    """
+    Video metadata without downloading anything. Pass the result to
+    download_audio() / fetch_subtitle_segments() so they skip their own
+    metadata request.
+    """
+    import yt_dlp
+
+    from app.services.metrics import external_call
+
+    ydl_opts = {
+        "noplaylist": True,
+        "quiet": True,
+        "no_warnings": True,
+        "nocheckcertificate": True,
+    }
+
+    try:
+        with external_call("youtube", "yt-dlp"), yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(youtube_url, download=False)
+            return ydl.sanitize_info(info)
+    except Exception as e:
+        print(f"❌ yt-dlp failed: {e}")
+        raise RuntimeError(f"Failed to fetch video info: {str(e)}")
+
+
+def download_audio(
+    youtube_url: str,
+    base_path: str,
+    info: Optional[dict] = None,
+    section: Optional[Tuple[float, float]] = None,
+    deadline=None,
+) -> dict:
+    """
+    Download the smallest suitable native audio stream — no transcoding.
+
+    info:     result of fetch_video_info() — reused instead of re-extracting.
+    section:  (start, end) seconds — only that range is downloaded (yt-dlp
+              hands ranged downloads to ffmpeg, which stream-copies them).
+    deadline: services/deadline.Deadline — checked on every progress
+              update, so a cancelled request stops the download.
+
+    Returns:
+        { "path": str, "acodec": str, "bytes": int, "duration": float }
+    """
+    import yt_dlp
+    from yt_dlp.utils import download_range_func
+
+    from app.services.deadline import RequestCancelled
+    from app.services.metrics import external_call
+
+    ydl_opts = {
+        "format": AUDIO_FORMAT_SELECTOR,
+        "noplaylist": True,
+        "outtmpl": f"{base_path}.%(ext)s",
+        "quiet": True,
+        "no_warnings": True,
+        "nocheckcertificate": True,
+    }
+    if section:
+        ydl_opts["download_ranges"] = download_range_func(None, [section])
+    if deadline is not None:
+        ydl_opts["progress_hooks"] = [lambda _: deadline.check()]
+
+    try:
+        with external_call("youtube", "yt-dlp"), yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            if info is not None:
+                info = ydl.process_ie_result(copy.deepcopy(info), download=True)
+            else:
+                info = ydl.extract_info(youtube_url, download=True)
+            path = _downloaded_path(ydl, info)
+    except RequestCancelled:
+        raise
+    except Exception as e:
+        print(f"❌ yt-dlp failed: {e}")
+        raise RuntimeError(f"Failed to download video: {str(e)}")
+
+    if not path or not os.path.exists(path):
+        raise FileNotFoundError("Could not find downloaded audio file.")
+
+    duration = info.get("duration") or 0.0
+    if section:
+        duration = min(section[1], duration or section[1]) - section[0]
+
+    return {
+        "path": path,
+        "acodec": info.get("acodec") or "",
+        "bytes": os.path.getsize(path),
+        "duration": duration,
+    }
+
+
+def prepare_audio(source_path: str, base_path: str, acodec: str = "") -> PreparedAudio:
+    """
+    Decode the source once with ffmpeg and write both artifacts in the same
+    pass. The compact artifact is a stream copy when the source codec is
+    already Opus or AAC.
+    """
+    copy_ext = _stream_copy_extension(acodec)
+    pcm_path = f"{base_path}.pcm.wav"
+    compact_path = f"{base_path}{copy_ext or '.m4a'}"
+
+    if os.path.abspath(compact_path) == os.path.abspath(source_path):
+        compact_path = f"{base_path}.compact{copy_ext or '.m4a'}"
+
+    if copy_ext:
+        compact_opts = ["-c:a", "copy"]
+    else:
+        compact_opts = ["-ac", "1", "-c:a", "aac", "-b:a", COMPACT_FALLBACK_BITRATE]
+    if compact_path.endswith(".m4a"):
+        compact_opts += ["-movflags", "+faststart"]
+
+    # fmt: off
+    cmd = [
+        "ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error", "-y",
+        "-i", source_path,
+        # Output 1: 16 kHz mono PCM
+        "-map", "0:a:0", "-vn", "-ac", "1", "-ar", str(PCM_SAMPLE_RATE),
+        "-c:a", "pcm_s16le", "-bitexact", "-map_metadata", "-1", pcm_path,
+        # Output 2: compact artifact
+        "-map", "0:a:0", "-vn", *compact_opts, "-map_metadata", "-1", compact_path,
+    ]
+    # fmt: on
+
+    _run_ffmpeg(cmd)
+
+    duration = pcm_duration(pcm_path)
+
+    logger.info(
+        "Prepared audio: %.1fs | pcm %.1f MB | compact %.1f MB (%s)",
+        duration,
+        os.path.getsize(pcm_path) / 1_000_000,
+        os.path.getsize(compact_path) / 1_000_000,
+        "copy" if copy_ext else "aac",
+    )
+
+    return PreparedAudio(
+        pcm_path=pcm_path,
+        compact_path=compact_path,
+        duration=duration,
+        transcoded=not copy_ext,
+    )
+
+
+def cut_line_clips(
+    source_path: str,
+    spans: List[Tuple[float, float]],
+    base_path: str,
+    duration: Optional[float] = None,
+    padding: float = CLIP_PADDING_SECONDS,
+) -> List[Tuple[str, float]]:
+    """
+    Cut one Opus clip per (start, end) span — in order, non-overlapping, as
+    normalize_scene_lines() produces them — in a single ffmpeg pass.
+
+    The segment muxer splits the stream at every clip boundary, so the
+    audio is read (and, for an AAC source, encoded) once however many
+    lines there are. An Opus source is stream-copied: clips then start on
+    a 20 ms packet boundary. Output is bit-exact, so clips of the same
+    audio hash the same (storage.upload_clips dedupes on that).
+
+    Returns [(clip path, clip start in seconds)] in span order.
+    """
+    if not spans:
+        return []
+
+    # Padded windows; where two lines are closer than 2 × padding they
+    # meet halfway between them
+    windows = []
+    for i, (start, end) in enumerate(spans):
+        lo = max(start - padding, 0.0)
+        if i > 0:
+            lo = max(lo, (spans[i - 1][1] + start) / 2)
+        hi = end + padding
+        if i + 1 < len(spans):
+            hi = min(hi, (end + spans[i + 1][0]) / 2)
+        if duration:
+            hi = min(hi, duration)
+        windows.append((round(lo, 3), round(max(hi, lo + 0.001), 3)))
+
+    # Cut times for the segment muxer; gaps between lines become segments
+    # of their own and are discarded
+    cuts: List[float] = []
+    segments: List[int] = []
+    for lo, hi in windows:
+        if lo > (cuts[-1] if cuts else 0.0):
+            cuts.append(lo)
+        segments.append(len(cuts))
+        cuts.append(hi)
+
+    stream_copy = source_path.endswith(".webm")
+    if stream_copy:
+        codec_opts = ["-c:a", "copy"]
+    else:
+        codec_opts = ["-ac", "1", "-c:a", "libopus", "-b:a", CLIP_BITRATE]
+        codec_opts += ["-compression_level", CLIP_COMPRESSION_LEVEL]
+
+    pattern = f"{base_path}.clip%05d.webm"
+    # fmt: off
+    cmd = [
+        "ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error", "-y",
+        "-i", source_path,
+        "-map", "0:a:0", "-vn", *codec_opts, "-map_metadata", "-1",
+        "-fflags", "+bitexact", "-flags:a", "+bitexact",
+        "-f", "segment", "-segment_format", "webm", "-reset_timestamps", "1",
+        "-segment_times", ",".join(f"{t:.3f}" for t in cuts),
+        pattern,
+    ]
+    # fmt: on
+
+    clips = [(pattern % index, lo) for index, (lo, _) in zip(segments, windows)]
+    keep = {path for path, _ in clips}
+    try:
+        _run_ffmpeg(cmd)
+        missing = [path for path in keep if not os.path.exists(path)]
+        if missing:
+            raise RuntimeError(f"ffmpeg produced no clip for {len(missing)} line(s)")
+    except Exception:
+        keep = set()
+        raise
+    finally:
+        # Gap segments always go; line clips too if the cut failed
+        for path in glob.glob(f"{glob.escape(base_path)}.clip*.webm"):
+            if path not in keep:
+                os.unlink(path)
+
+    logger.info(
+        "Cut %d line clips (%s) | %.1f KB",
+        len(clips),
+        "copy" if stream_copy else "opus",
+        sum(os.path.getsize(path) for path in keep) / 1000,
+    )
+    return clips
+
+
+def decode_to_pcm(source_path: str, pcm_path: str) -> str:
+    """
+    Decode any audio/video file (e.g. a browser recording) to the 16 kHz
+    mono PCM WAV format load_pcm() expects. Returns pcm_path.
+    """
+    # fmt: off
+    cmd = [
+        "ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error", "-y",
+        "-i", source_path,
+        "-map", "0:a:0", "-vn", "-ac", "1", "-ar", str(PCM_SAMPLE_RATE),
+        "-c:a", "pcm_s16le", "-bitexact", "-map_metadata", "-1", pcm_path,
+    ]
+    # fmt: on
+    _run_ffmpeg(cmd)
+    return pcm_path
+
+
+def load_pcm(pcm_path: str) -> np.ndarray:
+    """
+    Memory-map a 16 kHz mono s16le WAV written by prepare_audio().
+    Returns an int16 view — slice it, then convert with pcm_to_float().
+    """
+    offset, size = _wav_data_chunk(pcm_path)
+    return np.memmap(
+        pcm_path, dtype="<i2", mode="r", offset=offset, shape=(size // 2,)
+    )
+
+
+def pcm_slice(
+    samples: np.ndarray, start: float, end: float, sr: int = PCM_SAMPLE_RATE
+) -> np.ndarray:
+    """Slice [start, end) seconds out of PCM samples as float32 in [-1, 1]."""
+    i0 = max(int(start * sr), 0)
+    i1 = min(int(end * sr), len(samples))
+    return pcm_to_float(samples[i0:i1])
+
+
+def pcm_to_float(samples: np.ndarray) -> np.ndarray:
+    return np.asarray(samples, dtype=np.float32) / 32768.0
+
+
+def pcm_duration(pcm_path: str) -> float:
+    _, size = _wav_data_chunk(pcm_path)
+    return round(size / PCM_BYTES_PER_SECOND, 3)
+
+
+def is_pcm_wav(path: str) -> bool:
+    """True if path is a PCM artifact produced by prepare_audio()."""
+    return path.endswith(".pcm.wav")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Internal
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _run_ffmpeg(cmd: list) -> None:
+    try:
+        subprocess.run(cmd, check=True, capture_output=True)
+    except FileNotFoundError:
+        raise RuntimeError("ffmpeg not found — it is required for audio preparation.")
+    except subprocess.CalledProcessError as e:
+        stderr = e.stderr.decode(errors="replace").strip()
+        raise RuntimeError(f"Audio preparation failed: {stderr}") from e
+
+
+def _downloaded_path(ydl, info: dict) -> Optional[str]:
+    downloads = info.get("requested_downloads") or []
+    if downloads and downloads[0].get("filepath"):
+        return downloads[0]["filepath"]
+    return ydl.prepare_filename(info)
+
+
+def _stream_copy_extension(acodec: str) -> Optional[str]:
+    """Container that can hold the source codec without re-encoding."""
+    acodec = (acodec or "").lower()
+    if acodec.startswith("opus"):
+        return ".webm"
+    if acodec.startswith("mp4a") or acodec == "aac":
+        return ".m4a"
+    return None
+
+
+def _wav_data_chunk(path: str):
+    """
+    Walk the RIFF chunks and return (offset, size) of the 'data' chunk.
+    """
+    with open(path, "rb") as f:
+        header = f.read(12)
+        if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            raise ValueError(f"Not a WAV file: {path}")
+
+        offset = 12
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                raise ValueError(f"WAV file has no data chunk: {path}")
+            chunk_id, chunk_size = struct.unpack("<4sI", chunk)
+            offset += 8
+            if chunk_id == b"data":
+                # ffmpeg may leave size 0 / 0xFFFFFFFF when it couldn't seek back
+                file_size = os.path.getsize(path)
+                if chunk_size == 0 or offset + chunk_size > file_size:
+                    chunk_size = file_size - offset
+                return offset, chunk_size - (chunk_size % 2)
+            skip = chunk_size + (chunk_size % 2)
+            f.seek(skip, os.SEEK_CUR)
+            offset += skip
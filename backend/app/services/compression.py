@@ -0,0 +1,140 @@
+"""
+services/compression.py
+─────────────────────────────────────────────────────────────────────────────
+Response compression: brotli when the client accepts it and the brotli
+package is installed, gzip otherwise.
+
+- Only complete bodies are compressed — what a JSONResponse sends in one
+  message. Streaming responses (the SSE feed at /pitch/{id}/events, any
+  StreamingResponse) pass through untouched, so events are never held in
+  a compressor buffer.
+- Only text and JSON bodies of at least MIN_BYTES; audio and anything
+  already Content-Encoded are left alone.
+- Bodies above THREAD_MIN_BYTES are compressed on a worker thread, off the
+  event loop.
+
+    app.add_middleware(CompressionMiddleware)
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import asyncio
+import gzip
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # optional — gzip only
+    brotli = None
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Constants
+# ─────────────────────────────────────────────────────────────────────────────
+
+MIN_BYTES = 1024  # below this the headers outweigh the saving
+THREAD_MIN_BYTES = 64 * 1024
+
+# Fast settings: JSON compresses well at any level, and a large pitch
+# payload at gzip 9 / brotli 11 costs more time than it saves on the wire
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+class CompressionMiddleware:
+    """ASGI middleware — see the module docstring."""
+
+    def __init__(self, app, minimum_size: int = MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        start_message = None
+
+        async def send_compressed(message) -> None:
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message  # held until the body shows its size
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)  # rest of a streamed body
+                return
+
+            start, start_message = start_message, None
+            headers = MutableHeaders(scope=start)
+            if message.get("more_body", False) or not _compressible(headers):
+                await send(start)
+                await send(message)
+                return
+
+            headers.add_vary_header("Accept-Encoding")
+            body = message.get("body", b"")
+            if encoding and len(body) >= self.minimum_size:
+                if len(body) >= THREAD_MIN_BYTES:
+                    body = await asyncio.to_thread(compress, body, encoding)
+                else:
+                    body = compress(body, encoding)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+                message = {**message, "body": body}
+            await send(start)
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Public API
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    "br" or "gzip" from an Accept-Encoding header (q=0 refuses), or None.
+    brotli is preferred whenever it's available and accepted.
+    """
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+
+    for encoding in ("br", "gzip") if brotli else ("gzip",):
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Internal
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _compressible(headers: MutableHeaders) -> bool:
+    if "content-encoding" in headers:
+        return False
+    media_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+    if media_type == "text/event-stream":
+        return False
+    return (
+        media_type.startswith("text/")
+        or media_type == "application/json"
+        or media_type.endswith("+json")
+    )
@@ -0,0 +1,255 @@
+"""
+services/contour.py
+─────────────────────────────────────────────────────────────────────────────
+Server-side shaping of pitch contours for the /pitch endpoint (NumPy only).
+
+    median_smooth()  — median filter inside voiced runs; never bridges a gap
+    decimate_lttb()  — Largest-Triangle-Three-Buckets per voiced run: keeps
+                       the shape, and the gaps stay gaps
+    decimate_minmax()— min + max per bucket: keeps the pitch envelope
+    to_semitones()   — 12·log2(f / reference), e.g. the speaker's median
+
+Contours use the pitch.py convention: Hz per frame, 0.0 = unvoiced.
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Constants
+# ─────────────────────────────────────────────────────────────────────────────
+
+DECIMATION_METHODS = ("lttb", "minmax")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Public API
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def shape_contour(
+    contour: List[float],
+    points: Optional[int] = None,
+    smooth: int = 0,
+    method: str = "lttb",
+    reference_hz: Optional[float] = None,
+) -> Tuple[List[Optional[float]], Optional[List[int]]]:
+    """
+    smooth → decimate → semitones, in that order.
+
+    Returns (values, frame_indices). frame_indices is None when the contour
+    was not decimated (every frame kept). With reference_hz, values are
+    semitones and unvoiced frames are None instead of 0.0.
+    """
+    y = np.asarray(contour, dtype=np.float64)
+    if smooth > 1:
+        y = median_smooth(y, smooth)
+
+    indices = None
+    if points and len(y) > points:
+        if method == "minmax":
+            indices = decimate_minmax(y, points)
+        else:
+            indices = decimate_lttb(y, points)
+        y = y[indices]
+
+    if reference_hz:
+        semitones = to_semitones(y, reference_hz)
+        values = [None if np.isnan(v) else round(float(v), 2) for v in semitones]
+    else:
+        values = np.round(y, 2).tolist()
+
+    return values, None if indices is None else indices.tolist()
+
+
+def shape_pitch_lines(
+    lines: List[dict],
+    points: Optional[int] = None,
+    smooth: int = 0,
+    method: str = "lttb",
+    semitones: bool = False,
+    speakers: Optional[Dict[str, str]] = None,
+) -> List[dict]:
+    """
+    Shape every { lineId, pitchPattern } of a scene.
+
+    semitones are relative to the speaker's median F0 over all of their
+    lines (speakers: lineId → characterName); lines without a known speaker
+    use their own median. Decimated lines also carry pitchFrames, the kept
+    frame indices, so the chart can place points on the time axis.
+    """
+    speakers = speakers or {}
+    references: Dict[str, Optional[float]] = {}
+    if semitones:
+        groups: Dict[str, list] = {}
+        for line in lines:
+            key = speakers.get(line["lineId"], line["lineId"])
+            groups.setdefault(key, []).append(line["pitchPattern"])
+        references = {key: voiced_median(c) for key, c in groups.items()}
+
+    shaped = []
+    for line in lines:
+        reference = references.get(speakers.get(line["lineId"], line["lineId"]))
+        values, frames = shape_contour(
+            line["pitchPattern"], points, smooth, method, reference
+        )
+        item = {"lineId": line["lineId"], "pitchPattern": values}
+        if frames is not None:
+            item["pitchFrames"] = frames
+        if semitones:
+            if reference is None:  # nothing voiced — nothing to convert
+                item["pitchPattern"] = [None] * len(values)
+            item["referenceHz"] = round(reference, 2) if reference else None
+        shaped.append(item)
+    return shaped
+
+
+def median_smooth(contour: np.ndarray, window: int) -> np.ndarray:
+    """
+    Median filter of odd `window` frames, applied inside voiced runs only:
+    each frame's window is restricted to its own run, so values never leak
+    across unvoiced gaps and 0.0 frames stay 0.0.
+    """
+    y = np.asarray(contour, dtype=np.float64)
+    voiced = y > 0
+    if not voiced.any() or window < 2:
+        return y.copy()
+
+    half = window // 2
+    # Run id per frame: increments at every unvoiced → voiced transition
+    run_id = np.cumsum(np.diff(np.concatenate(([False], voiced))) & voiced)
+
+    pad_values = np.pad(np.where(voiced, y, np.nan), half, constant_values=np.nan)
+    pad_ids = np.pad(np.where(voiced, run_id, -1), half, constant_values=-1)
+
+    windows = np.lib.stride_tricks.sliding_window_view(pad_values, 2 * half + 1)
+    window_ids = np.lib.stride_tricks.sliding_window_view(pad_ids, 2 * half + 1)
+
+    rows = np.flatnonzero(voiced)
+    same_run = window_ids[rows] == run_id[rows, None]
+    masked = np.where(same_run, windows[rows], np.nan)
+
+    out = np.zeros_like(y)
+    out[rows] = np.nanmedian(masked, axis=1)
+    return out
+
+
+def decimate_lttb(contour: np.ndarray, points: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling to at most `points` frames.
+    Returns the kept frame indices (first and last always included).
+
+    Each voiced run is decimated on its own, with a share of the budget
+    proportional to its length, and every run keeps its first and last
+    frame — a bucket straddling an unvoiced gap would otherwise alternate
+    between 0.0 and the peak. When the run boundaries alone exceed the
+    budget, falls back to decimate_minmax().
+    """
+    y = np.asarray(contour, dtype=np.float64)
+    n = len(y)
+    if points >= n or points < 3:
+        return np.arange(n)
+
+    voiced = y > 0
+    edges = np.flatnonzero(np.diff(voiced)) + 1
+    starts = np.concatenate(([0], edges))
+    ends = np.concatenate((edges, [n]))
+    if len(starts) == 1:
+        return _lttb(y, points)
+
+    boundaries = np.unique(np.concatenate((starts, ends - 1)))
+    if len(boundaries) >= points:
+        return decimate_minmax(y, points)
+
+    # Interior frames of the voiced runs share what is left of the budget
+    interior = np.where(voiced[starts], np.maximum(ends - starts - 2, 0), 0)
+    budget = np.floor((points - len(boundaries)) * interior / max(interior.sum(), 1))
+
+    kept = [boundaries]
+    for start, end, extra in zip(starts, ends, budget.astype(np.int64)):
+        if extra:
+            kept.append(start + _lttb(y[start:end], int(extra) + 2))
+    return np.unique(np.concatenate(kept))
+
+
+def decimate_minmax(contour: np.ndarray, points: int) -> np.ndarray:
+    """
+    Min/max envelope: split into (points - 2) // 2 equal buckets and keep each
+    bucket's lowest and highest voiced frame (fully vectorized). Returns the
+    kept frame indices in order; first and last always included.
+    """
+    y = np.asarray(contour, dtype=np.float64)
+    n = len(y)
+    buckets = max((points - 2) // 2, 1)  # + first and last frame ≤ points
+    if points >= n:
+        return np.arange(n)
+
+    size = -(-n // buckets)  # ceil
+    voiced = y > 0
+    total = buckets * size
+    hi = np.pad(np.where(voiced, y, -np.inf), (0, total - n), constant_values=-np.inf)
+    lo = np.pad(np.where(voiced, y, np.inf), (0, total - n), constant_values=np.inf)
+
+    base = np.arange(buckets) * size
+    top = base + np.argmax(hi.reshape(buckets, size), axis=1)
+    bottom = base + np.argmin(lo.reshape(buckets, size), axis=1)
+
+    kept = np.concatenate(([0, n - 1], top, bottom))
+    return np.unique(np.clip(kept, 0, n - 1))
+
+
+def to_semitones(contour: np.ndarray, reference_hz: float) -> np.ndarray:
+    """12·log2(f / reference_hz) for voiced frames; NaN for unvoiced."""
+    y = np.asarray(contour, dtype=np.float64)
+    out = np.full_like(y, np.nan)
+    voiced = y > 0
+    out[voiced] = 12.0 * np.log2(y[voiced] / reference_hz)
+    return out
+
+
+def voiced_median(contours: List[List[float]]) -> Optional[float]:
+    """Median F0 over the voiced frames of several contours (a speaker)."""
+    values = np.concatenate([np.asarray(c, dtype=np.float64) for c in contours] or [[]])
+    values = values[values > 0]
+    return float(np.median(values)) if len(values) else None
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Internal
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _lttb(y: np.ndarray, points: int) -> np.ndarray:
+    """
+    LTTB over one stretch of frames. The bucket loop is inherent to LTTB
+    (each pick depends on the previous one); the area computation inside a
+    bucket is vectorized.
+    """
+    n = len(y)
+    if points >= n:
+        return np.arange(n)
+
+    # Buckets between the fixed first and last frames
+    every = (n - 2) / (points - 2)
+    bounds = (np.arange(points - 1) * every).astype(np.int64) + 1
+    x = np.arange(n, dtype=np.float64)
+
+    kept = np.empty(points, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for b in range(points - 2):
+        lo, hi = bounds[b], bounds[b + 1]
+        nxt_lo = hi
+        nxt_hi = bounds[b + 2] if b + 2 < len(bounds) else n
+        avg_x = x[nxt_lo:nxt_hi].mean()
+        avg_y = y[nxt_lo:nxt_hi].mean()
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        kept[b + 1] = a
+
+    return np.unique(kept)
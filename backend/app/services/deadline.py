@@ -0,0 +1,215 @@
+"""
+services/deadline.py
+─────────────────────────────────────────────────────────────────────────────
+Request-scoped deadline and cancellation for /ingest and /evaluate.
+
+A Deadline is created per request and passed down the pipeline. Each stage
+calls check() before it starts, and blocking calls take their timeout from
+the remaining budget. When the client disconnects (or the budget runs
+out) the request's watcher cancels it. Then:
+
+- the next check() raises RequestCancelled instead of starting a stage
+- in-flight calls registered with on_cancel() are aborted: OpenAI futures
+  are cancelled (the SDK request is torn down on the AI loop), the WhisperX
+  request task is cancelled on its event loop, and yt-dlp downloads /
+  storage uploads stop at their next progress update or chunk
+
+    deadline = Deadline(settings.INGEST_DEADLINE_SECONDS, pipeline="ingest")
+    deadline.check("gpt")
+    completion = deadline.wait(future)          # concurrent.futures.Future
+    with deadline.on_cancel(lambda: loop.call_soon_threadsafe(task.cancel)):
+        loop.run_until_complete(task)
+
+Abandoned requests are counted once, by the stage they were in
+(sutorii_cancelled_total / sutorii_cancelled_seconds_total).
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, List, Optional
+
+from app.config.config import settings
+from app.services.metrics import CANCELLED, CANCELLED_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Constants
+# ─────────────────────────────────────────────────────────────────────────────
+
+# Floor for a derived timeout — an expired budget is caught by check()
+MIN_TIMEOUT_SECONDS = 0.05
+
+
+class RequestCancelled(RuntimeError):
+    """The request was abandoned: reason is "disconnect" or "deadline"."""
+
+    def __init__(self, reason: str, stage: Optional[str]):
+        self.reason = reason
+        self.stage = stage
+        where = f" during {stage}" if stage else ""
+        if reason == "deadline":
+            super().__init__(f"Request deadline exceeded{where}")
+        else:
+            super().__init__(f"Request cancelled ({reason}){where}")
+
+
+class Deadline:
+    """
+    Budget + cancellation flag for one request. seconds=None or 0 means no
+    budget — the request can still be cancelled.
+    """
+
+    def __init__(self, seconds: Optional[float] = None, pipeline: str = "ingest"):
+        self.pipeline = pipeline
+        self.started = time.monotonic()
+        self.expires_at = self.started + seconds if seconds else None
+        self.stage: Optional[str] = None
+        self.reason: Optional[str] = None
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], Any]] = []
+        self._reported = False
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left in the budget (None = unbounded)."""
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def timeout(self, default: float) -> float:
+        """default, capped by the remaining budget."""
+        remaining = self.remaining()
+        if remaining is None:
+            return default
+        return max(MIN_TIMEOUT_SECONDS, min(default, remaining))
+
+    def cancel(self, reason: str = "disconnect") -> None:
+        """Mark the request abandoned and abort its in-flight calls."""
+        with self._lock:
+            if self.reason is not None:
+                return
+            self.reason = reason
+            callbacks, self._callbacks = self._callbacks, []
+        logger.info(
+            "%s request cancelled (%s) during %s", self.pipeline, reason, self.stage
+        )
+        for callback in callbacks:
+            _call_quietly(callback)
+
+    def check(self, stage: Optional[str] = None) -> None:
+        """
+        Raise RequestCancelled if the request is cancelled or out of budget.
+        stage (optional) names the stage about to start, for the metrics.
+        """
+        if self.reason is None and self.expired():
+            self.cancel("deadline")
+        if self.reason is not None:
+            raise self._abandon()
+        if stage is not None:
+            self.stage = stage
+
+    @contextmanager
+    def on_cancel(self, callback: Callable[[], Any]):
+        """Run callback if the request is cancelled while the block runs."""
+        with self._lock:
+            run_now = self.reason is not None
+            if not run_now:
+                self._callbacks.append(callback)
+        if run_now:
+            _call_quietly(callback)
+        try:
+            yield
+        finally:
+            with self._lock:
+                if callback in self._callbacks:
+                    self._callbacks.remove(callback)
+
+    def wait(self, future: Future, abort: bool = True) -> Any:
+        """
+        future.result() within the budget. On cancellation / expiry the
+        future is cancelled too (abort=False: left running — e.g. work
+        shared with other requests) and RequestCancelled is raised.
+        """
+        self.check()
+        done = threading.Event()
+        future.add_done_callback(lambda _: done.set())
+        with self.on_cancel(done.set):
+            done.wait(self.remaining())
+        if not future.done():
+            if abort:
+                future.cancel()
+            self.check()  # cancelled or out of budget — raises
+        return future.result()
+
+    def _abandon(self) -> RequestCancelled:
+        with self._lock:
+            report, self._reported = not self._reported, True
+        if report:
+            stage = self.stage or "start"
+            labels = dict(pipeline=self.pipeline, stage=stage, reason=self.reason)
+            CANCELLED.labels(**labels).inc()
+            CANCELLED_SECONDS.labels(**labels).inc(time.monotonic() - self.started)
+        return RequestCancelled(self.reason, self.stage)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Public API
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+async def run_cancellable(work: Awaitable, request, deadline: Deadline) -> Any:
+    """
+    Await work for an HTTP request, cancelling it (and the deadline) when
+    the client disconnects or the budget runs out. Raises RequestCancelled.
+    request is the Starlette Request (anything with is_disconnected()).
+    """
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.create_task(_watch(request, deadline, task))
+    try:
+        return await task
+    except asyncio.CancelledError:
+        if not deadline.cancelled:
+            raise  # the server is cancelling us, not the watcher
+        deadline.check()
+        raise
+    finally:
+        watcher.cancel()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Internal
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+async def _watch(request, deadline: Deadline, task: asyncio.Future) -> None:
+    while not task.done():
+        if deadline.expired():
+            deadline.cancel("deadline")
+        elif await request.is_disconnected():
+            deadline.cancel("disconnect")
+        if deadline.cancelled:
+            task.cancel()
+            return
+        remaining = deadline.remaining()
+        poll = settings.DISCONNECT_POLL_SECONDS
+        await asyncio.sleep(poll if remaining is None else max(0, min(poll, remaining)))
+
+
+def _call_quietly(callback: Callable[[], Any]) -> None:
+    try:
+        callback()
+    except Exception as e:
+        logger.debug("Cancel callback failed: %s", e)
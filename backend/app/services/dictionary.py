@@ -0,0 +1,223 @@
+"""
+services/dictionary.py
+─────────────────────────────────────────────────────────────────────────────
+Offline word meanings from a JMdict-derived SQLite index.
+
+The index is built once from the JMdict XML (JMdict_e.gz from EDRDG) with
+build_dictionary.py into settings.DICTIONARY_PATH:
+
+    entries (id, gloss)                         first sense, ≤ 3 English glosses
+    forms   (form, reading, rank, entry_id)     WITHOUT ROWID, clustered on
+                                                (form, reading) — one B-tree
+                                                seek per lookup
+
+Every kanji spelling is stored with each of its readings, and kana
+spellings with themselves. rank 0 marks common words (news1 / ichi1 /
+spec / gai1 priority tags), so a lookup returns the everyday sense of
+homographs first.
+
+The file is opened read-only and memory-mapped, one connection per thread.
+Hot words (は, です, 元気 …) are answered from an LRU
+(settings.DICTIONARY_CACHE_SIZE) without touching SQLite.
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import gzip
+import logging
+import os
+import sqlite3
+import threading
+import time
+import xml.etree.ElementTree as ET
+from functools import lru_cache
+from typing import Optional
+
+from app.config.config import settings
+
+logger = logging.getLogger(__name__)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Constants
+# ─────────────────────────────────────────────────────────────────────────────
+
+MAX_GLOSSES = 3
+COMMON_PRIORITIES = {"news1", "ichi1", "spec1", "spec2", "gai1"}
+MMAP_BYTES = 256 * 1024 * 1024
+XML_LANG = "{http://www.w3.org/XML/1998/namespace}lang"
+
+SCHEMA = """
+CREATE TABLE entries (id INTEGER PRIMARY KEY, gloss TEXT NOT NULL);
+CREATE TABLE forms (
+    form TEXT NOT NULL,
+    reading TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    entry_id INTEGER NOT NULL,
+    PRIMARY KEY (form, reading, rank, entry_id)
+) WITHOUT ROWID;
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+_local = threading.local()
+_missing_logged = False
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Public API
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def dictionary_available() -> bool:
+    """True when the index file exists (build it with build_dictionary.py)."""
+    global _missing_logged
+    if os.path.exists(settings.DICTIONARY_PATH):
+        return True
+    if not _missing_logged:
+        _missing_logged = True
+        logger.warning(
+            "Dictionary index %s not found — GPT provides word meanings",
+            settings.DICTIONARY_PATH,
+        )
+    return False
+
+
+@lru_cache(maxsize=settings.DICTIONARY_CACHE_SIZE)
+def lookup_meaning(word: str, reading: Optional[str] = None) -> Optional[str]:
+    """
+    English gloss for a word in dictionary form (食べる, not 食べた), or None.
+    reading (kana) picks between homographs (今日 きょう / こんにち); when no
+    entry has that reading the best entry for the spelling is returned.
+    """
+    connection = _connection()
+    if connection is None or not word:
+        return None
+    if reading and reading != word:
+        row = connection.execute(
+            "SELECT gloss FROM forms JOIN entries ON entries.id = forms.entry_id"
+            " WHERE form = ? AND reading = ? ORDER BY rank, entry_id LIMIT 1",
+            (word, reading),
+        ).fetchone()
+        if row:
+            return row[0]
+    row = connection.execute(
+        "SELECT gloss FROM forms JOIN entries ON entries.id = forms.entry_id"
+        " WHERE form = ? ORDER BY rank, entry_id LIMIT 1",
+        (word,),
+    ).fetchone()
+    return row[0] if row else None
+
+
+def build_index(source: str, output: str) -> dict:
+    """
+    JMdict XML (plain or .gz) → SQLite index at output, replaced atomically.
+    Returns {"entries", "forms", "seconds", "bytes"}.
+    """
+    t0 = time.perf_counter()
+    tmp_path = f"{output}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+
+    connection = sqlite3.connect(tmp_path)
+    try:
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+        connection.executescript(SCHEMA)
+        entries = forms = 0
+        with connection:
+            for entry_id, gloss, entry_forms in _parse_jmdict(source):
+                connection.execute(
+                    "INSERT INTO entries VALUES (?, ?)", (entry_id, gloss)
+                )
+                connection.executemany(
+                    "INSERT OR IGNORE INTO forms VALUES (?, ?, ?, ?)",
+                    [(form, reading, rank, entry_id) for form, reading, rank in entry_forms],
+                )
+                entries += 1
+                forms += len(entry_forms)
+            connection.executemany(
+                "INSERT INTO meta VALUES (?, ?)",
+                [("source", os.path.basename(source)), ("entries", str(entries))],
+            )
+        connection.execute("VACUUM")
+    finally:
+        connection.close()
+
+    os.replace(tmp_path, output)
+    lookup_meaning.cache_clear()
+    return {
+        "entries": entries,
+        "forms": forms,
+        "seconds": time.perf_counter() - t0,
+        "bytes": os.path.getsize(output),
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Internal
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _connection() -> Optional[sqlite3.Connection]:
+    """This thread's read-only connection (a rebuilt file is picked up on reopen)."""
+    connection = getattr(_local, "connection", None)
+    if connection is None and dictionary_available():
+        connection = sqlite3.connect(
+            f"file:{settings.DICTIONARY_PATH}?mode=ro&immutable=1",
+            uri=True,
+            check_same_thread=False,
+        )
+        connection.execute(f"PRAGMA mmap_size = {MMAP_BYTES}")
+        _local.connection = connection
+    return connection
+
+
+def _parse_jmdict(source: str):
+    """Yield (ent_seq, gloss, [(form, reading, rank)]) per JMdict entry."""
+    opener = gzip.open if source.endswith(".gz") else open
+    with opener(source, "rb") as f:
+        for _, element in ET.iterparse(f):
+            if element.tag != "entry":
+                continue
+            parsed = _parse_entry(element)
+            element.clear()
+            if parsed:
+                yield parsed
+
+
+def _parse_entry(entry: ET.Element):
+    glosses = []
+    for sense in entry.iter("sense"):
+        glosses = [
+            g.text
+            for g in sense.iter("gloss")
+            if g.text and g.get(XML_LANG, "eng") == "eng"
+        ]
+        if glosses:
+            break
+    if not glosses:
+        return None
+
+    kanji = [
+        (k.findtext("keb"), _rank(k, "ke_pri")) for k in entry.iter("k_ele")
+    ]
+    forms = []
+    for r in entry.iter("r_ele"):
+        reading = r.findtext("reb")
+        rank = _rank(r, "re_pri")
+        forms.append((reading, reading, rank))
+        if r.find("re_nokanji") is not None:
+            continue
+        restricted = {e.text for e in r.iter("re_restr")}
+        for keb, keb_rank in kanji:
+            if not restricted or keb in restricted:
+                # Common only when both the spelling and the reading are
+                forms.append((keb, reading, max(rank, keb_rank)))
+
+    entry_id = int(entry.findtext("ent_seq"))
+    return entry_id, "; ".join(glosses[:MAX_GLOSSES]), forms
+
+
+def _rank(element: ET.Element, tag: str) -> int:
+    """0 for common words, 1 otherwise."""
+    priorities = {p.text for p in element.iter(tag)}
+    return 0 if priorities & COMMON_PRIORITIES else 1
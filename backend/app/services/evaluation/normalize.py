@@ -4,6 +4,17 @@ import unicodedata
 
 KANJI_READING_PATTERN = re.compile(r"\((.*?)\)")  # removes (げんき)
 
+# Katakana ァ..ヶ → hiragana ぁ..ゖ (same offset for the whole block)
+KATAKANA_TO_HIRAGANA = {cp: cp - 0x60 for cp in range(0x30A1, 0x30F7)}
+
+
+def fold_kana(text: str) -> str:
+    """
+    Fold katakana to hiragana so ゲンキ and げんき compare equal.
+    The long-vowel mark ー is left as is.
+    """
+    return text.translate(KATAKANA_TO_HIRAGANA)
+
 
 def normalize_text(text: str) -> str:
     """
@@ -14,7 +25,7 @@ def normalize_text(text: str) -> str:
     if not text:
         return ""
 
-    # 1. Unicode normalization
+    # 1. Unicode normalization (also widens half-width katakana)
     text = unicodedata.normalize("NFKC", text)
 
     # 2. Remove kana readings in parentheses
@@ -26,7 +37,10 @@ def normalize_text(text: str) -> str:
     # 4. Normalize whitespace
     text = re.sub(r"\s+", " ", text)
 
-    # 5. Lowercase (safe even for JP)
+    # 5. Fold katakana → hiragana
+    text = fold_kana(text)
+
+    # 6. Lowercase (safe even for JP)
     text = text.lower().strip()
 
     return text
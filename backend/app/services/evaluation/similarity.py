@@ -1,60 +1,301 @@
-from typing import List, Dict
-from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Sequence
 
+import numpy as np
 
-def similarity_ratio(a: str, b: str) -> float:
-    """
-    Returns a similarity score between 0.0 and 1.0
-    """
-    if not a or not b:
-        return 0.0
-    return SequenceMatcher(None, a, b).ratio()
+try:
+    from rapidfuzz.distance import Levenshtein as _rf_levenshtein
+except ImportError:  # optional — the NumPy DP below is used instead
+    _rf_levenshtein = None
 
+from app.services.evaluation.normalize import normalize_text
 
-def tokenize(text: str) -> List[str]:
+
+def align(expected: Sequence, actual: Sequence) -> List[tuple]:
     """
-    MVP tokenization.
-    For Japanese, fallback is character-level tokens.
+    Minimum edit-distance alignment of two token sequences in one pass.
+
+    Returns difflib-style opcodes (tag, i1, i2, j1, j2) with tag in
+    "equal" | "replace" | "delete" | "insert". Uses rapidfuzz's native
+    implementation when installed, otherwise a row-vectorized NumPy DP.
     """
-    if " " in text:
-        return text.split()
-    return list(text)
+    if _rf_levenshtein is not None:
+        return [
+            (op.tag, op.src_start, op.src_end, op.dest_start, op.dest_end)
+            for op in _rf_levenshtein.opcodes(expected, actual)
+        ]
+    return _numpy_opcodes(expected, actual)
 
 
 def compute_scores(
     expected: str,
     actual: str,
+    words: Optional[Sequence] = None,
 ) -> Dict:
     """
-    Returns overall score and per-word scores.
+    Returns overall score, aligned per-word scores, substitutions and
+    insertions.
+
+    expected / actual are normalize_text() output. words are the scene's
+    WordToken list (or plain strings) and set the word boundaries; without
+    them, whitespace-separated text scores per word and Japanese per
+    character. A word with a reading is compared on both forms and scored
+    on the better one, so 喫茶店 heard as キッサテン counts as correct;
+    positions still index the expected units.
+
+        {
+            "overall": 0.92,
+            "wordScores": [{ "word": "元気", "score": 1.0, "status": "correct" }],
+            "substitutions": [{ "expected": "す", "actual": "し", "position": 5 }],
+            "insertions": [{ "actual": "ね", "position": 7 }],
+            "distance": 2,
+        }
     """
+    spaced = " " in expected
+    expected_units = _units(expected, spaced)
+    actual_units = _units(actual, spaced)
+    joiner = " " if spaced else ""
 
-    expected_tokens = tokenize(expected)
-    actual_tokens = tokenize(actual)
+    spans = _word_spans(expected_units, words, spaced) if words else []
+    if not spans:
+        spans = [(unit, i, i + 1, None) for i, unit in enumerate(expected_units)]
+    origin = None  # unit index → expected_units index, once readings are spliced in
+    if any(reading for *_, reading in spans):
+        expected_units, spans, origin = _prefer_readings(
+            expected_units, actual_units, spans
+        )
 
-    matched = 0
-    word_scores = []
+    # ── 1. Single alignment pass ─────────────────────────────────────────────
+    status = ["missing"] * len(expected_units)
+    substitutions = []
+    insertions = []
+    distance = 0
 
-    for token in expected_tokens:
-        if token in actual_tokens:
-            matched += 1
-            score = 1.0
-        else:
-            score = 0.0
+    for tag, i1, i2, j1, j2 in align(expected_units, actual_units):
+        if tag == "equal":
+            status[i1:i2] = ["correct"] * (i2 - i1)
+        elif tag == "replace":
+            distance += max(i2 - i1, j2 - j1)
+            status[i1:i2] = ["substituted"] * (i2 - i1)
+            substitutions.append(
+                {
+                    "expected": joiner.join(expected_units[i1:i2]),
+                    "actual": joiner.join(actual_units[j1:j2]),
+                    "position": origin[i1] if origin else i1,
+                }
+            )
+        elif tag == "delete":
+            distance += i2 - i1
+        elif tag == "insert":
+            distance += j2 - j1
+            insertions.append(
+                {
+                    "actual": joiner.join(actual_units[j1:j2]),
+                    "position": origin[i1] if origin else i1,
+                }
+            )
 
+    # ── 2. Per-word scores over the aligned units ────────────────────────────
+    word_scores = []
+    for word, start, end, _ in spans:
+        unit_status = status[start:end]
+        correct = unit_status.count("correct")
         word_scores.append(
             {
-                "word": token,
-                "score": score,
+                "word": word,
+                "score": round(correct / (end - start), 3),
+                "status": _word_status(unit_status, correct),
             }
         )
 
-    coverage = matched / max(len(expected_tokens), 1)
-    edit_similarity = similarity_ratio(expected, actual)
+    # ── 3. Overall: coverage of expected units + edit similarity ─────────────
+    matched = status.count("correct")
+    coverage = matched / max(len(expected_units), 1)
+    longest = max(len(expected_units), len(actual_units))
+    edit_similarity = 1.0 - distance / longest if longest and actual_units else 0.0
 
     overall = round(0.7 * coverage + 0.3 * edit_similarity, 3)
 
     return {
         "overall": overall,
         "wordScores": word_scores,
+        "substitutions": substitutions,
+        "insertions": insertions,
+        "distance": distance,
     }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Internal
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _units(text: str, spaced: bool) -> List[str]:
+    """Alignment units: words for spaced languages, characters otherwise."""
+    if spaced:
+        return text.split()
+    return list(text.replace(" ", ""))
+
+
+def _word_status(unit_status: List[str], correct: int) -> str:
+    if correct == len(unit_status):
+        return "correct"
+    if correct:
+        return "partial"
+    if unit_status.count("missing") == len(unit_status):
+        return "missing"
+    return "substituted"
+
+
+def _unit_status(expected_units: List[str], actual_units: List[str]) -> List[bool]:
+    """Per expected unit: matched ("equal") in the alignment with actual."""
+    matched = [False] * len(expected_units)
+    for tag, i1, i2, _, _ in align(expected_units, actual_units):
+        if tag == "equal":
+            matched[i1:i2] = [True] * (i2 - i1)
+    return matched
+
+
+def _prefer_readings(
+    expected_units: List[str], actual_units: List[str], spans: list
+) -> tuple:
+    """
+    Choose each word's surface or reading form — whichever more of its
+    units match actual (one alignment per form) — and splice the readings
+    chosen into the expected units. Returns (units, spans, origin) like
+    _splice_readings, or the inputs unchanged if no reading wins.
+    """
+    every = [reading is not None for *_, reading in spans]
+    reading_units, reading_spans, _ = _splice_readings(expected_units, spans, every)
+    surface = _unit_status(expected_units, actual_units)
+    heard = _unit_status(reading_units, actual_units)
+
+    chosen = [
+        reading is not None
+        and sum(heard[r_start:r_end]) / (r_end - r_start)
+        > sum(surface[start:end]) / (end - start)
+        for (_, start, end, reading), (_, r_start, r_end, _) in zip(spans, reading_spans)
+    ]
+    if not any(chosen):
+        return expected_units, spans, None
+    return _splice_readings(expected_units, spans, chosen)
+
+
+def _splice_readings(units: List[str], spans: list, chosen: List[bool]) -> tuple:
+    """
+    units with the chosen words replaced by their reading units.
+    Returns (units, spans, origin): spans re-indexed into the new units,
+    origin[i] = index in the original units of new unit i (a reading maps
+    to its word's first unit), plus one entry for the end.
+    """
+    spliced, new_spans, origin = [], [], []
+    cursor = 0
+    for (word, start, end, reading), use_reading in zip(spans, chosen):
+        spliced.extend(units[cursor:start])
+        origin.extend(range(cursor, start))
+        form = reading if use_reading else units[start:end]
+        new_spans.append((word, len(spliced), len(spliced) + len(form), reading))
+        spliced.extend(form)
+        origin.extend([start] * len(form) if use_reading else range(start, end))
+        cursor = end
+    spliced.extend(units[cursor:])
+    origin.extend(range(cursor, len(units) + 1))
+    return spliced, new_spans, origin
+
+
+def _word_spans(expected_units: List[str], words: Sequence, spaced: bool) -> list:
+    """
+    Locate each scene word, in order, inside the expected units.
+    Returns [(display_word, start, end, reading_units)]; reading_units is
+    None when the word has no reading or it matches the surface. Words
+    that can't be found (e.g. GPT listed a dictionary form) are skipped.
+    """
+    spans = []
+    cursor = 0
+    n = len(expected_units)
+
+    for word in words:
+        display = word if isinstance(word, str) else getattr(word, "word", None)
+        reading = None if isinstance(word, str) else getattr(word, "reading", None)
+        if isinstance(word, dict):
+            display, reading = word.get("word"), word.get("reading")
+        if not display:
+            continue
+
+        target = _units(normalize_text(display), spaced)
+        size = len(target)
+        if not size:
+            continue
+
+        # normalize_text folds katakana, like the transcript it's compared to
+        reading_units = _units(normalize_text(reading), spaced) if reading else None
+        if not reading_units or reading_units == target:
+            reading_units = None
+
+        for start in range(cursor, n - size + 1):
+            if expected_units[start : start + size] == target:
+                spans.append((display, start, start + size, reading_units))
+                cursor = start + size
+                break
+
+    return spans
+
+
+def _numpy_opcodes(a: Sequence, b: Sequence) -> List[tuple]:
+    """
+    Levenshtein DP, one NumPy vector op per row, then a backtrace.
+
+    The in-row insertion dependency D[i][j] = min(D[i][j], D[i][j-1] + 1)
+    is a running minimum: D[i] = cummin(tmp - j) + j.
+    """
+    n, m = len(a), len(b)
+    if n == 0 or m == 0:
+        if n:
+            return [("delete", 0, n, 0, 0)]
+        return [("insert", 0, 0, 0, m)] if m else []
+
+    vocab: dict = {}
+    a_ids = np.fromiter((vocab.setdefault(t, len(vocab)) for t in a), np.int32, n)
+    b_ids = np.fromiter((vocab.setdefault(t, len(vocab)) for t in b), np.int32, m)
+
+    cols = np.arange(m + 1, dtype=np.int32)
+    D = np.empty((n + 1, m + 1), dtype=np.int32)
+    D[0] = cols
+    tmp = np.empty(m + 1, dtype=np.int32)
+
+    for i in range(1, n + 1):
+        prev = D[i - 1]
+        tmp[0] = i
+        np.minimum(prev[:-1] + (b_ids != a_ids[i - 1]), prev[1:] + 1, out=tmp[1:])
+        D[i] = np.minimum.accumulate(tmp - cols) + cols
+
+    # ── Backtrace into single steps, then merge into opcodes ─────────────────
+    d = D.tolist()
+    steps = []
+    i, j = n, m
+    while i or j:
+        if i and j and d[i][j] == d[i - 1][j - 1] and a[i - 1] == b[j - 1]:
+            steps.append("equal")
+            i, j = i - 1, j - 1
+        elif i and j and d[i][j] == d[i - 1][j - 1] + 1:
+            steps.append("replace")
+            i, j = i - 1, j - 1
+        elif i and d[i][j] == d[i - 1][j] + 1:
+            steps.append("delete")
+            i -= 1
+        else:
+            steps.append("insert")
+            j -= 1
+
+    opcodes = []
+    i = j = 0
+    for tag in reversed(steps):
+        di = tag != "insert"
+        dj = tag != "delete"
+        if opcodes and opcodes[-1][0] == tag:
+            _, i1, _, j1, _ = opcodes[-1]
+            opcodes[-1] = (tag, i1, i + di, j1, j + dj)
+        else:
+            opcodes.append((tag, i, i + di, j, j + dj))
+        i += di
+        j += dj
+    return opcodes
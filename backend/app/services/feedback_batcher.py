@@ -0,0 +1,120 @@
+"""
+services/feedback_batcher.py
+─────────────────────────────────────────────────────────────────────────────
+Micro-batching of line feedback across concurrent evaluations.
+
+Under classroom load dozens of /evaluate (and shadowing) requests want a
+feedback completion at about the same moment. Instead of one call each,
+requests arriving within FEEDBACK_BATCH_WINDOW_MS are collected (or up to
+FEEDBACK_BATCH_MAX_ITEMS, whichever comes first) and answered by one
+structured completion, then the result is split back to each waiter.
+
+    feedback = await request_feedback(expected, said, score)  # None → default
+
+A batch of one uses the plain single-attempt call. When the batch call
+fails, or the reply misses an attempt, those waiters get None and fall
+back to the default feedback — one bad batch never fails an evaluation.
+A window of 0 turns batching off.
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import asyncio
+import logging
+import weakref
+from typing import List, Optional, Tuple
+
+from app.config.config import settings
+from app.services.gpt import generate_feedback_batch, generate_line_feedback
+from app.services.metrics import FEEDBACK_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Constants
+# ─────────────────────────────────────────────────────────────────────────────
+
+# One batcher per event loop (uvicorn runs one per worker process)
+_batchers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _Batcher]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Public API
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+async def request_feedback(
+    expected_text: str, said: str, overall_score: float
+) -> Optional[str]:
+    """Feedback for one attempt, or None when it could not be generated."""
+    attempt = {"expected": expected_text, "said": said, "score": overall_score}
+    if settings.FEEDBACK_BATCH_WINDOW_MS <= 0:
+        return (await _send_batch([(attempt, None)]))[0]
+
+    loop = asyncio.get_running_loop()
+    batcher = _batchers.get(loop)
+    if batcher is None:
+        batcher = _batchers[loop] = _Batcher(loop)
+    return await batcher.submit(attempt)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Internal
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+class _Batcher:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.pending: List[Tuple[dict, asyncio.Future]] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.tasks: set = set()  # keeps in-flight batches referenced
+
+    def submit(self, attempt: dict) -> asyncio.Future:
+        future = self.loop.create_future()
+        self.pending.append((attempt, future))
+        if len(self.pending) >= settings.FEEDBACK_BATCH_MAX_ITEMS:
+            self.flush()
+        elif self.timer is None:
+            self.timer = self.loop.call_later(
+                settings.FEEDBACK_BATCH_WINDOW_MS / 1000, self.flush
+            )
+        return future
+
+    def flush(self) -> None:
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending, []
+        if batch:
+            task = self.loop.create_task(_send_batch(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+
+async def _send_batch(
+    batch: List[Tuple[dict, Optional[asyncio.Future]]],
+) -> List[Optional[str]]:
+    """One completion for the batch; resolves each waiter's future."""
+    FEEDBACK_BATCH_SIZE.observe(len(batch))
+    results = {}
+    try:
+        if len(batch) == 1:
+            attempt = batch[0][0]
+            results["0"] = await generate_line_feedback(
+                attempt["expected"], attempt["said"], attempt["score"]
+            )
+        else:
+            results = await generate_feedback_batch(
+                [{"id": str(i), **attempt} for i, (attempt, _) in enumerate(batch)]
+            )
+    except Exception as e:
+        logger.warning("Feedback batch of %d failed: %s", len(batch), e)
+
+    feedback = [results.get(str(i)) for i in range(len(batch))]
+    for (_, future), text in zip(batch, feedback):
+        # A waiter may be gone (client disconnected → cancelled)
+        if future is not None and not future.done():
+            future.set_result(text)
+    return feedback
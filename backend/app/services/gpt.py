@@ -1,9 +1,14 @@
-from app.config.config import settings
 from pydantic import BaseModel
-from typing import List, Literal, Optional
+from typing import Dict, List, Literal, Optional, Union
 import json
-from app.services.rate_limit import check_rate_limit
-from app.models.schema import WordToken, QuizQuestion
+from app.services.ai_client import ai_available, ai_call, ai_call_sync
+from app.services.deadline import Deadline
+from app.services.dictionary import dictionary_available, lookup_meaning
+from app.services.japanese import FUNCTION_POS, analyze_line, analyzer_available
+from app.services.metrics import external_call
+from app.services.rate_limit import check_content_rate_limit, check_rate_limit
+from app.services.evaluation.normalize import KANJI_READING_PATTERN
+from app.models.schema import SceneLine, WordToken
 
 # ─────────────────────────────────────────────────────────────────────────────
 # GPT response models
@@ -14,7 +19,6 @@ class GPTSceneLine(BaseModel):
     characterName: str
     text: str
     phoneticReading: Optional[str] = None
-    translation: Optional[str] = None
     startTime: float
     endTime: float
     words: List[WordToken] = []
@@ -30,9 +34,143 @@ class GPTQuizQuestion(BaseModel):
 class ScriptResponse(BaseModel):
     characters: List[str]
     lines: List[GPTSceneLine]
+
+
+class GPTDraftLine(BaseModel):
+    characterName: str
+    text: str
+    startTime: float
+    endTime: float
+
+
+class GPTVocabularyEntry(BaseModel):
+    word: str  # dictionary form
+    meaning: str
+
+
+class ScriptDraftResponse(BaseModel):
+    """Slim schema when words / readings are analyzed locally (services/japanese)."""
+
+    characters: List[str]
+    lines: List[GPTDraftLine]
+    vocabulary: List[GPTVocabularyEntry]
+
+
+class QuizResponse(BaseModel):
     quiz: List[GPTQuizQuestion]
 
 
+class GPTLineTranslation(BaseModel):
+    lineId: str
+    translation: str
+
+
+class TranslationResponse(BaseModel):
+    lines: List[GPTLineTranslation]
+
+
+class GPTLineFeedback(BaseModel):
+    lineId: str
+    feedback: str
+
+
+class SceneFeedbackResponse(BaseModel):
+    summary: str
+    lines: List[GPTLineFeedback]
+
+
+class GPTAttemptFeedback(BaseModel):
+    id: str
+    feedback: str
+
+
+class FeedbackBatchResponse(BaseModel):
+    attempts: List[GPTAttemptFeedback]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Prompts
+# ─────────────────────────────────────────────────────────────────────────────
+
+_TASKS = (
+    "You are a language learning content editor.\n"
+    "You are given speech segments with timestamps from a video.\n\n"
+    "YOUR TASKS:\n"
+    "1. Split segments into short, natural dialogue lines.\n"
+    "2. Identify unique characters (use descriptive names like 'Teacher', 'Student', or 'Character 1').\n"
+)
+
+_OUTPUT_RULES = (
+    "Return ONLY structured data matching the required schema.\n"
+    "Do not include explanations or markdown."
+)
+
+# Full schema: GPT produces readings and word breakdowns itself
+SCRIPT_PROMPT = (
+    _TASKS
+    + "3. For each line provide word-level breakdown.\n\n"
+    "TEXT RULES:\n"
+    "- Preserve the original sentence structure.\n"
+    "- Keep kanji. For every kanji word add its reading in parentheses: 元気(げんき).\n"
+    "- Do NOT romanize.\n\n"
+    "WORD RULES:\n"
+    "- For each line, return every meaningful word.\n"
+    "- Treat compound words and common word pairs as single tokens (e.g. 感じ not 感+じ).\n"
+    "- Do NOT split words at the character level.\n"
+    "- Include: word (original), reading (hiragana/katakana), meaning (English).\n\n"
+    + _OUTPUT_RULES
+)
+
+# Slim schema: readings and word breakdowns come from services/japanese
+SCRIPT_DRAFT_PROMPT = (
+    _TASKS
+    + "3. List the scene's vocabulary once, with English meanings.\n\n"
+    "TEXT RULES:\n"
+    "- Preserve the original sentence structure.\n"
+    "- Keep kanji exactly as written. Do NOT add readings, furigana or romanization.\n\n"
+    "VOCABULARY RULES:\n"
+    "{vocabulary_rules}"
+    "- meaning: a short English gloss.\n\n"
+    + _OUTPUT_RULES
+)
+
+_VOCABULARY_ALL = (
+    "- Every distinct content word of the scene, once, in dictionary form (食べる, not 食べた).\n"
+    "- Skip particles and auxiliaries (は, が, です, ます).\n"
+)
+
+# The offline dictionary (services/dictionary) already covers the rest
+_VOCABULARY_MISSES = (
+    "- Only these words, in this dictionary form, if they appear: {words}.\n"
+)
+_VOCABULARY_NONE = "- Return an empty vocabulary list.\n"
+
+# Generated on first access (services/scene_content), not during ingest
+QUIZ_PROMPT = (
+    "You are a language learning content editor.\n"
+    "You are given the dialogue lines of a video scene, with their IDs.\n"
+    "Generate exactly {quiz_count} quiz questions from the scene.\n\n"
+    "QUIZ RULES:\n"
+    "- Mix types: vocabulary, comprehension, grammar.\n"
+    "- Questions must be asked in English.\n"
+    "- expectedAnswer must be the correct answer in the language being studied.\n"
+    "- relatedLineId should be the ID of the line the question is about, if any.\n\n"
+    + _OUTPUT_RULES
+)
+
+TRANSLATION_PROMPT = (
+    "You are a subtitle translator.\n"
+    "Translate every dialogue line into natural English, keeping each line's ID.\n"
+    "Use the surrounding lines for context; keep speaker names out of the text.\n\n"
+    + _OUTPUT_RULES
+)
+
+MOCK_TRANSLATIONS = {
+    "こんにちは、元気ですか？": "Hello, how are you?",
+    "はい、元気です！": "Yes, I am fine!",
+}
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Quiz count helper
 # ─────────────────────────────────────────────────────────────────────────────
@@ -52,18 +190,30 @@ def _quiz_count_for_scene(line_count: int) -> int:
 # ─────────────────────────────────────────────────────────────────────────────
 
 
-def refine_script_from_whisper(whisper_result: dict) -> ScriptResponse:
-    client = settings.openai_client
+def refine_script_from_whisper(
+    whisper_result: dict,
+    local_analysis: Optional[bool] = None,
+    deadline: Optional[Deadline] = None,
+) -> Union[ScriptResponse, ScriptDraftResponse]:
+    """
+    GPT pass over the transcript. With a local Japanese analyzer
+    (local_analysis, default: when one is installed) GPT returns the slim
+    ScriptDraftResponse and complete_script() adds the word breakdowns;
+    otherwise GPT returns the full ScriptResponse as before.
 
-    if client:
+    deadline: the completion is aborted when the request is cancelled.
+    """
+    ai = ai_available()
+    if local_analysis is None:
+        local_analysis = analyzer_available()
+
+    if ai:
         check_rate_limit("gpt")
 
-    # Estimate line count from segments to determine quiz size
     segments = whisper_result.get("segments", [])
-    quiz_count = _quiz_count_for_scene(len(segments))
 
     # ── MOCK ─────────────────────────────────────────────────────────────────
-    if not settings.AI_ENABLED or not client:
+    if not ai:
         print("🛠️  MOCK GPT: Returning structured dummy dialogue lines...")
         return ScriptResponse(
             characters=["Character 1", "Character 2"],
@@ -72,7 +222,6 @@ def refine_script_from_whisper(whisper_result: dict) -> ScriptResponse:
                     characterName="Character 1",
                     text="こんにちは、元気(げんき)ですか？",
                     phoneticReading="こんにちは、げんきですか？",
-                    translation="Hello, how are you?",
                     startTime=0.0,
                     endTime=2.5,
                     words=[
@@ -88,7 +237,6 @@ def refine_script_from_whisper(whisper_result: dict) -> ScriptResponse:
                     characterName="Character 2",
                     text="はい、元気(げんき)です！",
                     phoneticReading="はい、げんきです！",
-                    translation="Yes, I am fine!",
                     startTime=2.6,
                     endTime=4.5,
                     words=[
@@ -99,65 +247,346 @@ def refine_script_from_whisper(whisper_result: dict) -> ScriptResponse:
                     ],
                 ),
             ],
-            quiz=[
-                GPTQuizQuestion(
-                    type="vocabulary",
-                    question="What does 元気 mean?",
-                    expectedAnswer="energy / health",
-                    relatedLineId=None,
-                ),
-                GPTQuizQuestion(
-                    type="comprehension",
-                    question="What did Character 1 ask Character 2?",
-                    expectedAnswer="How are you",
-                    relatedLineId=None,
-                ),
-            ],
         )
 
     # ── REAL GPT CALL ─────────────────────────────────────────────────────────
     if not segments:
         raise ValueError("Whisper result missing segments; cannot build script")
 
-    completion = client.beta.chat.completions.parse(
-        model="gpt-4o-mini",
-        messages=[
-            {
-                "role": "system",
-                "content": (
-                    "You are a language learning content editor.\n"
-                    "You are given speech segments with timestamps from a video.\n\n"
-                    "YOUR TASKS:\n"
-                    "1. Split segments into short, natural dialogue lines.\n"
-                    "2. Identify unique characters (use descriptive names like 'Teacher', 'Student', or 'Character 1').\n"
-                    "3. For each line provide word-level breakdown.\n"
-                    f"4. Generate exactly {quiz_count} quiz questions from the scene.\n\n"
-                    "TEXT RULES:\n"
-                    "- Preserve the original sentence structure.\n"
-                    "- Keep kanji. For every kanji word add its reading in parentheses: 元気(げんき).\n"
-                    "- Do NOT romanize.\n\n"
-                    "WORD RULES:\n"
-                    "- For each line, return every meaningful word.\n"
-                    "- Treat compound words and common word pairs as single tokens (e.g. 感じ not 感+じ).\n"
-                    "- Do NOT split words at the character level.\n"
-                    "- Include: word (original), reading (hiragana/katakana), meaning (English).\n\n"
-                    "QUIZ RULES:\n"
-                    f"- Generate exactly {quiz_count} questions.\n"
-                    "- Mix types: vocabulary, comprehension, grammar.\n"
-                    "- Questions must be asked in English.\n"
-                    "- expectedAnswer must be the correct answer in the language being studied.\n"
-                    "- relatedLineId should reference the line index (e.g. 'line-1') if applicable.\n\n"
-                    "Return ONLY structured data matching the required schema.\n"
-                    "Do not include explanations or markdown."
-                ),
-            },
-            {
-                "role": "user",
-                "content": json.dumps(segments, ensure_ascii=False),
-            },
+    if local_analysis:
+        return _parse_script(
+            SCRIPT_DRAFT_PROMPT.format(vocabulary_rules=_vocabulary_rules(segments)),
+            segments,
+            ScriptDraftResponse,
+            deadline,
+        )
+    return _parse_script(SCRIPT_PROMPT, segments, ScriptResponse, deadline)
+
+
+def complete_script(
+    response: Union[ScriptResponse, ScriptDraftResponse],
+) -> ScriptResponse:
+    """
+    Fill in text with furigana, phoneticReading and words for every line of
+    a draft, from the local analyzer. Meanings come from the offline
+    dictionary, then the draft's vocabulary for the words it misses.
+    A full ScriptResponse (GPT breakdowns, or the mock) is returned as is.
+    """
+    if isinstance(response, ScriptResponse):
+        return response
+
+    meanings = {entry.word: entry.meaning for entry in response.vocabulary}
+
+    def meaning(word: str, reading: str, base: str) -> Optional[str]:
+        # The reading is the surface's (飲み → のみ) — only valid for the base
+        # form when the word is already in it
+        return (
+            lookup_meaning(base, reading if word == base else None)
+            or meanings.get(base)
+            or meanings.get(word)
+        )
+
+    lines = []
+    for line in response.lines:
+        analysis = analyze_line(line.text)
+        lines.append(
+            GPTSceneLine(
+                characterName=line.characterName,
+                text=analysis.text,
+                phoneticReading=analysis.reading,
+                startTime=line.startTime,
+                endTime=line.endTime,
+                words=[
+                    WordToken(
+                        word=word, reading=reading, meaning=meaning(word, reading, base)
+                    )
+                    for word, reading, base, _ in analysis.words
+                ],
+            )
+        )
+    return ScriptResponse(characters=response.characters, lines=lines)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Script GPT call
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _vocabulary_rules(segments: list) -> str:
+    """Ask GPT only for the content words the offline dictionary misses."""
+    if not dictionary_available():
+        return _VOCABULARY_ALL
+    missing = {
+        base
+        for segment in segments
+        for _, _, base, pos in analyze_line(segment.get("text", "")).words
+        if pos not in FUNCTION_POS and lookup_meaning(base) is None
+    }
+    if not missing:
+        return _VOCABULARY_NONE
+    return _VOCABULARY_MISSES.format(words=", ".join(sorted(missing)))
+
+
+def _parse_script(
+    system_prompt: str,
+    segments: list,
+    response_format,
+    deadline: Optional[Deadline] = None,
+):
+    with external_call("llm", "openai") as trace:
+        completion = ai_call_sync(
+            "chat",
+            lambda client: client.beta.chat.completions.parse(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {
+                        "role": "user",
+                        "content": json.dumps(segments, ensure_ascii=False),
+                    },
+                ],
+                response_format=response_format,
+                extra_headers=trace,
+            ),
+            deadline=deadline,
+        )
+
+    if not completion.choices or not completion.choices[0].message.parsed:
+        raise ValueError("Empty or invalid structured response from GPT API")
+
+    return completion.choices[0].message.parsed
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Line evaluation feedback (services/feedback_batcher groups these)
+# ─────────────────────────────────────────────────────────────────────────────
+
+FEEDBACK_MAX_TOKENS = 60  # per attempt
+
+
+async def generate_line_feedback(
+    expected_text: str, said: str, overall_score: float
+) -> str:
+    """One attempt: encouragement + one improvement tip. Raises on failure."""
+    with external_call("llm", "openai") as trace:
+        completion = await ai_call(
+            "chat",
+            lambda client: client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {
+                        "role": "system",
+                        "content": (
+                            "You are a Japanese language tutor.\n"
+                            "Give one sentence of encouragement and one concrete improvement tip."
+                        ),
+                    },
+                    {
+                        "role": "user",
+                        "content": (
+                            f"Expected: {expected_text}\n"
+                            f"User said: {said}\n"
+                            f"Score: {overall_score}"
+                        ),
+                    },
+                ],
+                max_tokens=FEEDBACK_MAX_TOKENS,
+                extra_headers=trace,
+            ),
+        )
+    return completion.choices[0].message.content.strip()
+
+
+async def generate_feedback_batch(attempts: List[dict]) -> Dict[str, str]:
+    """
+    Feedback for several attempts (from different learners) in one call.
+
+    attempts: [{ id, expected, said, score }] → { id: feedback }
+    Attempts the reply leaves out are missing from the result.
+    """
+    with external_call("llm", "openai") as trace:
+        completion = await ai_call(
+            "chat",
+            lambda client: client.beta.chat.completions.parse(
+                model="gpt-4o-mini",
+                messages=[
+                    {
+                        "role": "system",
+                        "content": (
+                            "You are a Japanese language tutor.\n"
+                            "You are given independent attempts at reading a line aloud.\n"
+                            "For each attempt give one sentence of encouragement and one "
+                            "concrete improvement tip, under its id.\n"
+                            "Return ONLY structured data matching the required schema."
+                        ),
+                    },
+                    {
+                        "role": "user",
+                        "content": json.dumps(attempts, ensure_ascii=False),
+                    },
+                ],
+                response_format=FeedbackBatchResponse,
+                max_tokens=FEEDBACK_MAX_TOKENS * len(attempts) + 50,
+                extra_headers=trace,
+            ),
+        )
+
+    if not completion.choices or not completion.choices[0].message.parsed:
+        raise ValueError("Empty or invalid structured response from GPT API")
+
+    return {
+        a.id: a.feedback.strip()
+        for a in completion.choices[0].message.parsed.attempts
+        if a.feedback.strip()
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Whole-scene evaluation feedback
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def generate_scene_feedback(line_results: List[dict]) -> SceneFeedbackResponse:
+    """
+    One feedback call for a whole roleplay run instead of one per line.
+
+    line_results: [{ lineId, expected, said, score }]
+    """
+    if not ai_available():
+        return SceneFeedbackResponse(
+            summary="Good attempt! Keep practicing.",
+            lines=[
+                GPTLineFeedback(lineId=r["lineId"], feedback="Good attempt!")
+                for r in line_results
+            ],
+        )
+
+    check_rate_limit("gpt")
+
+    with external_call("llm", "openai") as trace:
+        completion = ai_call_sync(
+            "chat",
+            lambda client: client.beta.chat.completions.parse(
+                model="gpt-4o-mini",
+                messages=[
+                    {
+                        "role": "system",
+                        "content": (
+                            "You are a Japanese language tutor reviewing a learner's roleplay.\n"
+                            "For each line give one short sentence: encouragement or one "
+                            "concrete improvement tip.\n"
+                            "Then give a two-sentence summary of the whole run.\n"
+                            "Return ONLY structured data matching the required schema."
+                        ),
+                    },
+                    {
+                        "role": "user",
+                        "content": json.dumps(line_results, ensure_ascii=False),
+                    },
+                ],
+                response_format=SceneFeedbackResponse,
+                extra_headers=trace,
+            ),
+        )
+
+    if not completion.choices or not completion.choices[0].message.parsed:
+        raise ValueError("Empty or invalid structured response from GPT API")
+
+    return completion.choices[0].message.parsed
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Lazily generated scene content (quiz, translations)
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+async def generate_quiz(
+    lines: List[SceneLine], scene_id: Optional[str] = None
+) -> List[GPTQuizQuestion]:
+    """
+    Quiz questions for a scene's script; relatedLineId refers to line IDs.
+    scene_id: a stored scene's content is rate-limited per scene
+    (check_content_rate_limit); without one, like any other call.
+    """
+    quiz_count = _quiz_count_for_scene(len(lines))
+
+    if not ai_available():
+        return [
+            GPTQuizQuestion(
+                type="vocabulary",
+                question="What does 元気 mean?",
+                expectedAnswer="energy / health",
+                relatedLineId=None,
+            ),
+            GPTQuizQuestion(
+                type="comprehension",
+                question="What did Character 1 ask Character 2?",
+                expectedAnswer="How are you",
+                relatedLineId=None,
+            ),
+        ]
+
+    response = await _parse_scene_content(
+        QUIZ_PROMPT.format(quiz_count=quiz_count),
+        [
+            {"id": l.id, "characterName": l.characterName, "text": _plain(l.text)}
+            for l in lines
         ],
-        response_format=ScriptResponse,
+        QuizResponse,
+        scene_id,
+    )
+    return response.quiz
+
+
+async def translate_lines(
+    lines: List[SceneLine], scene_id: Optional[str] = None
+) -> Dict[str, str]:
+    """English translation of every line, keyed by line ID (scene_id as for the quiz)."""
+    if not ai_available():
+        return {
+            l.id: MOCK_TRANSLATIONS.get(_plain(l.text), "(translation unavailable)")
+            for l in lines
+        }
+
+    response = await _parse_scene_content(
+        TRANSLATION_PROMPT,
+        [{"id": l.id, "text": _plain(l.text)} for l in lines],
+        TranslationResponse,
+        scene_id,
     )
+    wanted = {l.id for l in lines}
+    return {t.lineId: t.translation for t in response.lines if t.lineId in wanted}
+
+
+def _plain(text: str) -> str:
+    """Line text without furigana: 元気(げんき) → 元気."""
+    return KANJI_READING_PATTERN.sub("", text)
+
+
+async def _parse_scene_content(
+    system_prompt: str, payload: list, response_format, scene_id: Optional[str]
+):
+    if scene_id:
+        check_content_rate_limit("gpt", scene_id)
+    else:
+        check_rate_limit("gpt")
+
+    with external_call("llm", "openai") as trace:
+        completion = await ai_call(
+            "chat",
+            lambda client: client.beta.chat.completions.parse(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {
+                        "role": "user",
+                        "content": json.dumps(payload, ensure_ascii=False),
+                    },
+                ],
+                response_format=response_format,
+                extra_headers=trace,
+            ),
+        )
 
     if not completion.choices or not completion.choices[0].message.parsed:
         raise ValueError("Empty or invalid structured response from GPT API")
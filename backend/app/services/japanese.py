@@ -0,0 +1,305 @@
+"""
+services/japanese.py
+─────────────────────────────────────────────────────────────────────────────
+Local Japanese analysis: word breakdown, readings and furigana for a line.
+
+GPT used to produce all three, token by token, in its structured output —
+most of the scene's output tokens. A morphological analyzer gives the same
+data deterministically in well under a millisecond per line, so GPT only
+returns lines, speakers and a per-scene vocabulary list.
+
+Analyzers (settings.JAPANESE_ANALYZER, optional dependencies):
+    fugashi — MeCab + UniDic (pip install fugashi unidic-lite); UniDic's
+              short units are joined back into compounds (喫茶 + 店)
+    sudachi — SudachiPy, split mode C (pip install sudachipy sudachidict_core)
+    auto    — the first one installed
+    off     — none; GPT produces the breakdown as before
+
+The analyzer is loaded once per process; analyzed lines are kept in an LRU
+(settings.JAPANESE_ANALYSIS_CACHE_SIZE) since the same lines come back on
+re-ingest and across scenes of one show.
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import logging
+import re
+import threading
+from functools import lru_cache
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+from app.config.config import settings
+from app.services.evaluation.normalize import fold_kana
+
+try:
+    import fugashi
+except ImportError:  # optional — sudachi or GPT breakdowns are used instead
+    fugashi = None
+
+try:
+    from sudachipy import dictionary as sudachi_dictionary
+    from sudachipy import tokenizer as sudachi_tokenizer
+except ImportError:  # optional
+    sudachi_dictionary = None
+
+logger = logging.getLogger(__name__)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Constants
+# ─────────────────────────────────────────────────────────────────────────────
+
+ANALYZERS = ("auto", "fugashi", "sudachi", "off")
+
+# Punctuation / symbols / whitespace — kept in the text, not listed as words
+SKIPPED_POS = {"補助記号", "記号", "空白"}
+# Particles / auxiliaries / prefixes (お, ご) — grammar, not vocabulary
+FUNCTION_POS = {"助詞", "助動詞", "接頭辞"}
+
+# Compound readings UniDic's split units get wrong (母 + さん → ははさん),
+# keyed by the compound without its prefix; katakana like UniDic readings
+COMPOUND_READINGS = {
+    "母さん": "カアサン",
+    "父さん": "トウサン",
+    "兄さん": "ニイサン",
+    "姉さん": "ネエサン",
+    "祖母さん": "バアサン",
+    "祖父さん": "ジイサン",
+}
+
+KANJI_PATTERN = re.compile(r"[㐀-䶿一-鿿豈-﫿々〆ヵヶ]")
+KATAKANA_PATTERN = re.compile(r"^[゠-ヿー・]+$")
+
+_lock = threading.Lock()
+_analyzer: Optional[Callable[[str], List["Token"]]] = None
+_analyzer_name: Optional[str] = None
+
+
+class Token(NamedTuple):
+    surface: str
+    reading: Optional[str]  # katakana, as the dictionary gives it
+    base: str  # dictionary form (食べた → 食べる)
+    pos: str  # top-level part of speech
+    space: str = ""  # whitespace before the token
+
+
+class LineAnalysis(NamedTuple):
+    text: str  # furigana-annotated: 元気(げんき)ですか
+    reading: str  # whole line in kana: げんきですか
+    words: Tuple[Tuple[str, str, str, str], ...]  # (word, reading, base, pos)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Public API
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def analyzer_available() -> bool:
+    """True when a local analyzer is installed and enabled."""
+    return _load() is not None
+
+
+def analyzer_name() -> Optional[str]:
+    """"fugashi" | "sudachi", or None when no analyzer is available."""
+    _load()
+    return _analyzer_name
+
+
+@lru_cache(maxsize=settings.JAPANESE_ANALYSIS_CACHE_SIZE)
+def analyze_line(text: str) -> LineAnalysis:
+    """
+    Analyze one line of plain Japanese text (no readings in it).
+    Raises RuntimeError when no analyzer is available.
+    """
+    analyzer = _load()
+    if analyzer is None:
+        raise RuntimeError("No Japanese analyzer installed (fugashi or sudachipy)")
+    with _lock:  # neither MeCab nor Sudachi taggers are thread-safe
+        tokens = analyzer(text)
+
+    annotated, reading, words = [], [], []
+    for token in tokens:
+        token_reading = _kana_reading(token)
+        annotated.append(token.space + _furigana(token.surface, token_reading))
+        reading.append(token.space + token_reading)
+        if token.pos not in SKIPPED_POS and token.surface.strip():
+            words.append(
+                (token.surface, token_reading, token.base or token.surface, token.pos)
+            )
+
+    return LineAnalysis("".join(annotated), "".join(reading), tuple(words))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Internal
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _load() -> Optional[Callable[[str], List[Token]]]:
+    global _analyzer, _analyzer_name
+    if _analyzer is not None or _analyzer_name == "off":
+        return _analyzer
+    with _lock:
+        if _analyzer is None and _analyzer_name != "off":
+            _analyzer_name, _analyzer = _create(settings.JAPANESE_ANALYZER)
+    return _analyzer
+
+
+def _create(name: str):
+    if name not in ANALYZERS:
+        raise ValueError(f"Unknown Japanese analyzer: {name}")
+    try:
+        if name in ("auto", "fugashi") and fugashi is not None:
+            return "fugashi", _fugashi_analyzer()
+        if name in ("auto", "sudachi") and sudachi_dictionary is not None:
+            return "sudachi", _sudachi_analyzer()
+    except Exception as e:  # installed but no dictionary
+        logger.warning("Japanese analyzer failed to load (%s) — using GPT breakdowns", e)
+        return "off", None
+    if name not in ("auto", "off"):
+        logger.warning("Japanese analyzer %s is not installed — using GPT breakdowns", name)
+    return "off", None
+
+
+def _fugashi_analyzer():
+    tagger = fugashi.Tagger()
+    logger.info("Japanese analyzer: fugashi (%s)", tagger.dictionary_info[0]["filename"])
+
+    def analyze(text: str) -> List[Token]:
+        return _join_compounds(
+            [
+                (
+                    Token(
+                        surface=word.surface,
+                        reading=None if word.is_unk else word.feature.kana,
+                        base=None if word.is_unk else word.feature.orthBase,
+                        pos=word.feature.pos1,
+                        space=word.white_space,
+                    ),
+                    _compound_role(word),
+                )
+                for word in tagger(text)
+            ]
+        )
+
+    return analyze
+
+
+def _compound_role(word) -> Optional[str]:
+    """"prefix" | "noun" | "suffix" for UniDic units that form compounds."""
+    feature = word.feature
+    if feature.pos1 == "接頭辞":
+        return "prefix"
+    if feature.pos1 == "接尾辞":
+        return "suffix"
+    # Time words (今日, 明日 — 副詞可能) stand alone: 今日天気いいね
+    if feature.pos1 == "名詞" and feature.pos3 != "副詞可能" and not word.is_unk:
+        return "noun"
+    return None
+
+
+def _join_compounds(units: List[Tuple[Token, Optional[str]]]) -> List[Token]:
+    """
+    Join UniDic short units into the words GPT listed (compounds as single
+    tokens): prefix + noun (お茶), noun + suffix (喫茶店, お母さん) and
+    noun + noun (取り扱い説明書). A run needs a noun; the compound is read
+    from COMPOUND_READINGS when UniDic's units read it wrong.
+    """
+    tokens: List[Token] = []
+    i = 0
+    while i < len(units):
+        end = i
+        while end < len(units) and units[end][1] == "prefix":
+            end += 1
+        has_noun = False
+        while end < len(units) and units[end][1] in ("noun", "suffix"):
+            if units[end][0].space or (units[end][1] == "suffix" and not has_noun):
+                break
+            has_noun = has_noun or units[end][1] == "noun"
+            end += 1
+        run = [token for token, _ in units[i:end]]
+        if not has_noun or len(run) < 2 or any(t.reading is None for t in run):
+            tokens.append(units[i][0])
+            i += 1
+            continue
+        surface = "".join(t.surface for t in run)
+        tokens.append(
+            Token(
+                surface=surface,
+                reading=_compound_reading(run),
+                base=surface,
+                pos="名詞",
+                space=run[0].space,
+            )
+        )
+        i = end
+    return tokens
+
+
+def _compound_reading(run: List[Token]) -> str:
+    for start in range(len(run)):
+        reading = COMPOUND_READINGS.get("".join(t.surface for t in run[start:]))
+        if reading:
+            return "".join(t.reading for t in run[:start]) + reading
+    return "".join(t.reading for t in run)
+
+
+def _sudachi_analyzer():
+    tokenizer = sudachi_dictionary.Dictionary().create()
+    mode = sudachi_tokenizer.Tokenizer.SplitMode.C  # longest units: 取り扱い説明書
+    logger.info("Japanese analyzer: sudachi (split mode C)")
+
+    def analyze(text: str) -> List[Token]:
+        tokens = []
+        for m in tokenizer.tokenize(text, mode):
+            pos = m.part_of_speech()[0]
+            if pos == "空白":  # Sudachi returns whitespace as tokens
+                tokens.append(Token(m.surface(), None, m.surface(), pos))
+                continue
+            tokens.append(
+                Token(
+                    surface=m.surface(),
+                    reading=None if m.is_oov() else m.reading_form(),
+                    base=m.dictionary_form(),
+                    pos=pos,
+                )
+            )
+        return tokens
+
+    return analyze
+
+
+def _kana_reading(token: Token) -> str:
+    """Hiragana reading; katakana words stay katakana, unknown words as written."""
+    if not token.reading or token.pos in SKIPPED_POS:
+        return token.surface
+    if KATAKANA_PATTERN.match(token.surface):
+        return token.surface
+    return fold_kana(token.reading)
+
+
+def _furigana(surface: str, reading: str) -> str:
+    """
+    元気 / げんき → 元気(げんき); okurigana stays outside the parentheses:
+    食べる / たべる → 食(た)べる, お茶 / おちゃ → お茶(ちゃ).
+    """
+    if not KANJI_PATTERN.search(surface) or reading == surface:
+        return surface
+    folded = fold_kana(surface)
+    head = 0
+    while (
+        head < min(len(surface), len(reading))
+        and folded[head] == reading[head]
+        and not KANJI_PATTERN.match(surface[head])
+    ):
+        head += 1
+    tail = 0
+    while (
+        tail < min(len(surface), len(reading)) - head
+        and folded[-1 - tail] == reading[-1 - tail]
+        and not KANJI_PATTERN.match(surface[-1 - tail])
+    ):
+        tail += 1
+    core = surface[head : len(surface) - tail]
+    core_reading = reading[head : len(reading) - tail]
+    if not core or not core_reading:
+        return surface
+    return f"{surface[:head]}{core}({core_reading}){surface[len(surface) - tail:]}"
@@ -0,0 +1,242 @@
+"""
+services/metrics.py
+─────────────────────────────────────────────────────────────────────────────
+Prometheus metrics and (optional) OpenTelemetry spans.
+
+    sutorii_stage_seconds{pipeline,stage}                 histogram
+        ingest: metadata, subtitles, download, prepare, transcription, gpt,
+                analysis, upload, uploadWait, pitch — evaluate: transcription,
+                scoring, feedback, asr — shadowing: partialAsr, asr, scoring,
+                feedback — content: quiz, translations — fed by
+                stages.track_stage()
+    sutorii_external_call_seconds{service,backend,outcome} histogram
+        asr (whisperx / openai_whisper), llm (openai), storage, youtube
+    sutorii_redis_op_seconds{op,outcome}                  histogram
+    sutorii_ingests_in_flight                             gauge
+    sutorii_pitch_threads                                 gauge
+    sutorii_pitch_event_subscribers                       gauge
+    sutorii_openai_in_flight{endpoint}                    gauge
+    sutorii_feedback_batch_size                           histogram
+    sutorii_rate_limit_tokens{window}                     gauge
+    sutorii_tasks_total{kind,outcome}                     counter
+        Redis Streams tasks: ok, retried, reclaimed, dead (task_queue.py)
+    sutorii_cancelled_total{pipeline,stage,reason}        counter
+    sutorii_cancelled_seconds_total{pipeline,stage,reason} counter
+        Requests abandoned on client disconnect / deadline, and the wall time
+        already spent on them (deadline.py)
+
+Both libraries are optional: without prometheus_client every metric is a
+no-op and /metrics answers 503; without opentelemetry no spans are made.
+With an OpenTelemetry SDK configured, external_call() yields W3C trace
+headers (traceparent) to forward to WhisperX / OpenAI.
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Tuple
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        Counter,
+        Gauge,
+        Histogram,
+        generate_latest,
+    )
+except ImportError:  # optional — metrics become no-ops
+    Counter = Gauge = Histogram = None
+
+try:
+    from opentelemetry import propagate as _otel_propagate
+    from opentelemetry import trace as _otel_trace
+except ImportError:  # optional — no spans
+    _otel_trace = _otel_propagate = None
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Constants
+# ─────────────────────────────────────────────────────────────────────────────
+
+# Ingest stages run from sub-second (subtitles) to minutes (ASR on 10 min)
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+EXTERNAL_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+REDIS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+class _NoopMetric:
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, *args, **kwargs):
+        pass
+
+    def set(self, *args, **kwargs):
+        pass
+
+    def inc(self, *args, **kwargs):
+        pass
+
+    def dec(self, *args, **kwargs):
+        pass
+
+
+def _histogram(name, doc, labels, buckets):
+    if Histogram is None:
+        return _NoopMetric()
+    return Histogram(name, doc, labels, buckets=buckets)
+
+
+def _gauge(name, doc, labels=()):
+    if Gauge is None:
+        return _NoopMetric()
+    return Gauge(name, doc, labels)
+
+
+def _counter(name, doc, labels=()):
+    if Counter is None:
+        return _NoopMetric()
+    return Counter(name, doc, labels)
+
+
+STAGE_SECONDS = _histogram(
+    "sutorii_stage_seconds",
+    "Wall time of pipeline stages",
+    ["pipeline", "stage"],
+    STAGE_BUCKETS,
+)
+EXTERNAL_CALL_SECONDS = _histogram(
+    "sutorii_external_call_seconds",
+    "Latency of calls to external services",
+    ["service", "backend", "outcome"],
+    EXTERNAL_BUCKETS,
+)
+REDIS_OP_SECONDS = _histogram(
+    "sutorii_redis_op_seconds",
+    "Latency of Redis operations",
+    ["op", "outcome"],
+    REDIS_BUCKETS,
+)
+INGESTS_IN_FLIGHT = _gauge("sutorii_ingests_in_flight", "Ingests currently running")
+PITCH_THREADS = _gauge(
+    "sutorii_pitch_threads", "Background pitch extraction threads running"
+)
+PITCH_EVENT_SUBSCRIBERS = _gauge(
+    "sutorii_pitch_event_subscribers", "Open /pitch/{id}/events streams"
+)
+OPENAI_IN_FLIGHT = _gauge(
+    "sutorii_openai_in_flight", "OpenAI calls holding an endpoint slot", ["endpoint"]
+)
+FEEDBACK_BATCH_SIZE = _histogram(
+    "sutorii_feedback_batch_size",
+    "Evaluations covered by one feedback completion",
+    [],
+    BATCH_SIZE_BUCKETS,
+)
+RATE_LIMIT_TOKENS = _gauge(
+    "sutorii_rate_limit_tokens", "AI calls left in the rate-limit window", ["window"]
+)
+TASKS = _counter(
+    "sutorii_tasks", "Queued tasks by kind and outcome", ["kind", "outcome"]
+)
+CANCELLED = _counter(
+    "sutorii_cancelled",
+    "Requests abandoned on client disconnect or deadline",
+    ["pipeline", "stage", "reason"],
+)
+CANCELLED_SECONDS = _counter(
+    "sutorii_cancelled_seconds",
+    "Wall time spent on requests before they were abandoned",
+    ["pipeline", "stage", "reason"],
+)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Public API
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def metrics_enabled() -> bool:
+    return Histogram is not None
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Prometheus text exposition: (body, content_type)."""
+    if not metrics_enabled():
+        raise RuntimeError("prometheus_client is not installed")
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def observe_stage(pipeline: str, stage: str, seconds: float) -> None:
+    STAGE_SECONDS.labels(pipeline=pipeline, stage=stage).observe(seconds)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """OpenTelemetry span when available, otherwise nothing."""
+    if _otel_trace is None:
+        yield None
+        return
+    tracer = _otel_trace.get_tracer("sutorii")
+    with tracer.start_as_current_span(name, attributes=attributes) as current:
+        yield current
+
+
+def trace_headers() -> Dict[str, str]:
+    """W3C trace context for the current span ({} without OpenTelemetry)."""
+    carrier: Dict[str, str] = {}
+    if _otel_propagate is not None:
+        _otel_propagate.inject(carrier)
+    return carrier
+
+
+@contextmanager
+def external_call(service: str, backend: str):
+    """
+    Time a call to an external service and wrap it in a span.
+    Yields the trace headers to forward with the request.
+
+        with external_call("asr", "whisperx") as headers:
+            client.post(url, headers={**auth, **headers})
+    """
+    outcome = "ok"
+    start = time.perf_counter()
+    with span(f"{service}.{backend}", service=service, backend=backend):
+        try:
+            yield trace_headers()
+        except BaseException:
+            outcome = "error"
+            raise
+        finally:
+            EXTERNAL_CALL_SECONDS.labels(
+                service=service, backend=backend, outcome=outcome
+            ).observe(time.perf_counter() - start)
+
+
+@contextmanager
+def redis_op(op: str):
+    outcome = "ok"
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        REDIS_OP_SECONDS.labels(op=op, outcome=outcome).observe(
+            time.perf_counter() - start
+        )
+
+
+@contextmanager
+def in_flight(gauge):
+    """Increment a gauge for the duration of the block."""
+    gauge.inc()
+    try:
+        yield
+    finally:
+        gauge.dec()
+
+
+def set_rate_limit_tokens(window: str, remaining: int) -> None:
+    RATE_LIMIT_TOKENS.labels(window=window).set(remaining)
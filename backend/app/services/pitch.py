@@ -1,31 +1,73 @@
 """
 services/pitch.py
 ─────────────────────────────────────────────────────────────────────────────
-Extracts pitch contour (F0) from audio slices using librosa.pyin().
-
-- Runs per SceneLine using startTime / endTime to slice the full audio.
+Extracts pitch contour (F0) from audio slices.
+
+Estimators (settings.PITCH_ESTIMATOR, or per request):
+    pyin — librosa.pyin: HMM-smoothed, most accurate, slowest (default)
+    yin  — librosa.yin + energy voicing gate: several times faster
+    acf  — vectorized NumPy FFT autocorrelation tracker: fastest
+All share the 70–400 Hz bounds, the 512-sample hop (same frame count
+for a given slice) and the unvoiced → 0.0 convention.
+
+- Estimates one full-scene F0 track (services/pitch_track.py) in
+  TRACK_CHUNK_SECONDS chunks; each SceneLine's contour is a slice of it,
+  pushed as soon as the chunk covering the line is done. The track is
+  stored by audio hash, so re-ingesting the same audio skips extraction
+  and any time range can be sliced later (GET /pitch/{id}/range).
+- Reads the 16 kHz PCM artifact from audio.prepare_audio() via memmap, so
+  the scene is decoded once.
 - Stores Hz float values. Unvoiced frames → 0.0.
 - Designed to run as a background thread — never raises, always returns [].
+  With TASK_QUEUE=redis the scene is a "pitch" task on a Redis Stream
+  instead (services/task_queue.py); task_worker.py processes on any node
+  fetch its audio from storage and run run_pitch_task().
 - Stores results in Redis via pitch_cache.py.
 - Cleans up the audio file after extraction is complete.
+- warm_up_pitch_engine() pays librosa's lazy imports and numba's JIT
+  compilation once at startup instead of on the first scene. Compiled
+  kernels go to numba's on-disk cache (settings.PITCH_JIT_CACHE_DIR).
 ─────────────────────────────────────────────────────────────────────────────
 """
 
 import logging
 import os
+import tempfile
 import threading
-from typing import List
+import time
+from typing import Callable, List, Optional
 
 import numpy as np
 
+from app.config.config import settings
 from app.models.schema import SceneLine
+from app.services.audio import (
+    decode_to_pcm,
+    is_pcm_wav,
+    load_pcm,
+    pcm_slice,
+    pcm_to_float,
+)
+from app.services.metrics import PITCH_THREADS
+from app.services.stages import track_stage
 from app.services.pitch_cache import (
+    get_pitch_track,
+    link_scene_track,
     mark_pitch_processing,
+    store_pitch_line,
     store_pitch_result,
+    store_pitch_track,
 )
+from app.services.pitch_track import PitchTrack, track_key
+from app.services.storage import content_key, download_object
+from app.services.task_queue import publish_task, queue_enabled, register_task
 
 logger = logging.getLogger(__name__)
 
+# Must be set before numba is first imported (librosa imports it lazily)
+if settings.PITCH_JIT_CACHE_DIR:
+    os.environ.setdefault("NUMBA_CACHE_DIR", settings.PITCH_JIT_CACHE_DIR)
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Constants
 # ─────────────────────────────────────────────────────────────────────────────
@@ -34,13 +76,32 @@ F0_MIN_HZ = 70  # low male voice
 F0_MAX_HZ = 400  # high female / child voice
 SAMPLE_RATE = 16000
 
+FRAME_LENGTH = 2048  # pyin / yin analysis window
+HOP_LENGTH = 512  # 32 ms at 16 kHz — shared by every estimator
+ACF_FRAME_LENGTH = 1024  # ≥ 2 periods at F0_MIN_HZ
+ACF_VOICING_THRESHOLD = 0.5  # normalized autocorrelation peak
+ACF_OCTAVE_TOLERANCE = 0.9  # shortest lag within 90% of the best peak wins
+SILENCE_DB = -50.0  # frames quieter than this are unvoiced
+DYNAMIC_RANGE_DB = 40.0  # ... or this far below the loudest frame
+
+WARMUP_SECONDS = 0.5  # synthetic signal length — long enough for every kernel
+
+# Full-scene tracks are estimated in chunks: pyin's working memory grows
+# with the chunk (~1 MB per second of audio), and finished lines are pushed
+# to viewers after every chunk. The margin frames either side give each
+# chunk the context it would have in one long pass.
+TRACK_CHUNK_SECONDS = 10
+TRACK_CHUNK_MARGIN_FRAMES = 16  # ~0.5 s
+
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Public API
 # ─────────────────────────────────────────────────────────────────────────────
 
 
-def extract_pitch_for_line(audio_path: str, start: float, end: float) -> List[float]:
+def extract_pitch_for_line(
+    audio_path: str, start: float, end: float, estimator: Optional[str] = None
+) -> List[float]:
     """
     Extract pitch contour for a single audio segment.
 
@@ -48,33 +109,22 @@ def extract_pitch_for_line(audio_path: str, start: float, end: float) -> List[fl
     Returns [] on any failure.
     """
     try:
-        import librosa
-
         duration = max(end - start, 0.1)
-        y, sr = librosa.load(
-            audio_path,
-            sr=SAMPLE_RATE,
-            offset=start,
-            duration=duration,
-            mono=True,
-        )
 
-        if len(y) == 0:
-            return []
-
-        f0, voiced_flag, _ = librosa.pyin(
-            y,
-            fmin=F0_MIN_HZ,
-            fmax=F0_MAX_HZ,
-            sr=sr,
-        )
-
-        contour = [
-            round(float(v), 2) if (voiced_flag[i] and not np.isnan(v)) else 0.0
-            for i, v in enumerate(f0)
-        ]
+        if is_pcm_wav(audio_path):
+            y = pcm_slice(load_pcm(audio_path), start, start + duration)
+        else:
+            import librosa
+
+            y, _ = librosa.load(
+                audio_path,
+                sr=SAMPLE_RATE,
+                offset=start,
+                duration=duration,
+                mono=True,
+            )
 
-        return contour
+        return extract_pitch_from_samples(y, estimator=estimator)
 
     except Exception as e:
         logger.warning(
@@ -83,10 +133,72 @@ def extract_pitch_for_line(audio_path: str, start: float, end: float) -> List[fl
         return []
 
 
+def extract_pitch_from_samples(
+    y: np.ndarray, sr: int = SAMPLE_RATE, estimator: Optional[str] = None
+) -> List[float]:
+    """
+    Extract a pitch contour from already-decoded mono float samples.
+    Raises on failure — callers decide how to degrade.
+    """
+    estimate = PITCH_ESTIMATORS[resolve_estimator(estimator)]
+
+    if len(y) == 0:
+        return []
+
+    f0, voiced = estimate(np.asarray(y, dtype=np.float32), sr)
+    return np.where(voiced & np.isfinite(f0), np.round(f0, 2), 0.0).tolist()
+
+
+def resolve_estimator(name: Optional[str] = None) -> str:
+    """Validated estimator name; None → settings.PITCH_ESTIMATOR."""
+    resolved = (name or settings.PITCH_ESTIMATOR).strip().lower()
+    if resolved not in PITCH_ESTIMATORS:
+        raise ValueError(
+            f"Unknown pitch estimator '{resolved}'. "
+            f"Choose one of: {', '.join(PITCH_ESTIMATORS)}"
+        )
+    return resolved
+
+
+def extract_pitch_track(
+    samples: np.ndarray,
+    estimator: Optional[str] = None,
+    on_chunk: Optional[Callable[[PitchTrack, int], None]] = None,
+) -> PitchTrack:
+    """
+    F0 of the whole scene from 16 kHz PCM (load_pcm()). on_chunk(track,
+    frames_done) runs after every chunk, with frames [0, frames_done)
+    final. A chunk that fails is left unvoiced — never raises.
+    """
+    name = resolve_estimator(estimator)
+    total = 1 + len(samples) // HOP_LENGTH
+    track = PitchTrack(np.zeros(total, dtype=np.float32), SAMPLE_RATE, HOP_LENGTH, name)
+    step = int(TRACK_CHUNK_SECONDS * SAMPLE_RATE) // HOP_LENGTH
+
+    for first in range(0, total, step):
+        stop = min(first + step, total)
+        # Frames [lo, hi) are estimated; only [first, stop) are kept
+        lo = max(first - TRACK_CHUNK_MARGIN_FRAMES, 0)
+        hi = min(stop + TRACK_CHUNK_MARGIN_FRAMES, total)
+        try:
+            y = pcm_to_float(samples[lo * HOP_LENGTH : hi * HOP_LENGTH])
+            f0 = extract_pitch_from_samples(y, estimator=name)
+            track.f0[first:stop] = f0[first - lo : stop - lo]
+        except Exception as e:
+            logger.warning(
+                "Pitch extraction failed for frames [%d-%d]: %s", first, stop, e
+            )
+        if on_chunk is not None:
+            on_chunk(track, stop)
+    return track
+
+
 def run_pitch_extraction_background(
     audio_path: str,
     script: List[SceneLine],
     scene_id: str,
+    estimator: Optional[str] = None,
+    storage_path: Optional[str] = None,
 ) -> None:
     """
     Spawn a background thread to extract pitch for all lines.
@@ -94,20 +206,143 @@ def run_pitch_extraction_background(
     - Stores completed results in Redis when done.
     - Cleans up audio file after extraction.
     Non-blocking — caller returns immediately.
+
+    With the task queue enabled and the scene audio in storage
+    (storage_path), a "pitch" task is published instead and the local
+    audio file is deleted right away — a worker fetches it from storage.
     """
     # Mark as processing BEFORE spawning thread
     # so the frontend can poll immediately and get 202
     mark_pitch_processing(scene_id)
 
+    if storage_path and queue_enabled():
+        try:
+            publish_task(
+                "pitch",
+                {
+                    "sceneId": scene_id,
+                    "storagePath": storage_path,
+                    "estimator": estimator,
+                    "lines": [
+                        {"id": l.id, "startTime": l.startTime, "endTime": l.endTime}
+                        for l in script
+                    ],
+                },
+            )
+            _remove_audio(audio_path)
+            print(f"🎵 Pitch extraction queued for {len(script)} lines.")
+            return
+        except Exception as e:
+            logger.warning("Pitch task not queued (%s) — extracting in this process", e)
+
     thread = threading.Thread(
         target=_extract_all_lines,
-        args=(audio_path, script, scene_id),
+        args=(audio_path, script, scene_id, estimator, storage_path),
         daemon=True,
     )
+    with _threads_lock:
+        _threads.add(thread)
     thread.start()
     print(f"🎵 Pitch extraction started in background for {len(script)} lines.")
 
 
+_threads_lock = threading.Lock()
+_threads: set = set()
+
+
+def run_pitch_task(task: dict) -> None:
+    """
+    "pitch" task handler (task_worker.py): fetch the scene audio from
+    storage, decode it once and extract every line. Raises on failure so
+    the queue retries it; a line that fails alone still gets [].
+    """
+    script = [SceneLine.model_construct(**line) for line in task["lines"]]
+    ext = os.path.splitext(task["storagePath"])[1]
+    with tempfile.TemporaryDirectory(prefix="pitch-") as tmp:
+        source = download_object(task["storagePath"], os.path.join(tmp, f"source{ext}"))
+        pcm_path = decode_to_pcm(source, os.path.join(tmp, "audio.pcm.wav"))
+        _extract_scene(
+            pcm_path, script, task["sceneId"], task.get("estimator"), task["storagePath"]
+        )
+
+
+def give_up_pitch_task(task: dict, error: str) -> None:
+    """Dead-lettered: store empty contours so clients stop waiting for them."""
+    store_pitch_result(
+        task["sceneId"],
+        [{"lineId": line["id"], "pitchPattern": []} for line in task["lines"]],
+    )
+
+
+register_task("pitch", run_pitch_task, on_dead=give_up_pitch_task)
+
+
+def wait_for_pitch_extraction(timeout: Optional[float] = None) -> int:
+    """
+    Block until the background extractions started so far have finished.
+    The threads are daemons — a CLI (bulk_ingest.py) must call this before
+    exiting or the pitch results are lost. Returns how many are still
+    running when the timeout expires.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    with _threads_lock:
+        pending = list(_threads)
+    for thread in pending:
+        remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+        thread.join(remaining)
+    with _threads_lock:
+        return sum(1 for t in _threads if t.is_alive())
+
+
+_warmup_lock = threading.Lock()
+_warmup_done = threading.Event()
+_warmup_seconds: Optional[float] = None
+
+
+def warm_up_pitch_engine() -> float:
+    """
+    Run the pitch path once on a synthetic voiced signal so librosa's lazy
+    imports and numba's JIT compilation happen now, not on the first scene.
+    Idempotent; returns the seconds the warm-up took (0.0 once warm).
+    """
+    global _warmup_seconds
+    with _warmup_lock:
+        if _warmup_done.is_set():
+            return 0.0
+
+        start = time.perf_counter()
+        try:
+            t = np.arange(int(WARMUP_SECONDS * SAMPLE_RATE)) / SAMPLE_RATE
+            # 150 Hz with a gentle glide, silence in the last quarter —
+            # exercises both the voiced and unvoiced paths
+            y = 0.5 * np.sin(2 * np.pi * (150 * t + 20 * t * t))
+            y[int(len(y) * 0.75) :] = 0.0
+            for name in PITCH_ESTIMATORS:
+                extract_pitch_from_samples(y.astype(np.float32), estimator=name)
+        except Exception as e:
+            logger.warning("Pitch engine warm-up failed: %s", e)
+            return 0.0
+
+        _warmup_seconds = round(time.perf_counter() - start, 3)
+        _warmup_done.set()
+
+    print(f"🔥 Pitch engine warmed up in {_warmup_seconds}s.")
+    return _warmup_seconds
+
+
+def warm_up_in_background() -> None:
+    """Non-blocking warm_up_pitch_engine() in a daemon thread."""
+    if _warmup_done.is_set():
+        return
+    threading.Thread(
+        target=warm_up_pitch_engine, name="pitch-warmup", daemon=True
+    ).start()
+
+
+def is_pitch_engine_warm() -> bool:
+    return _warmup_done.is_set()
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Internal
 # ─────────────────────────────────────────────────────────────────────────────
@@ -117,43 +352,201 @@ def _extract_all_lines(
     audio_path: str,
     script: List[SceneLine],
     scene_id: str,
+    estimator: Optional[str] = None,
+    storage_path: Optional[str] = None,
 ) -> None:
     """
     Extract pitch for every line, store in Redis, clean up audio.
-    Silently stores [] on per-line failure — never raises.
+    Silently stores [] on failure (per line, or every line if the whole
+    extraction fails, as give_up_pitch_task does) — never raises.
     """
     print(f"🎵 Background pitch extraction running for {len(script)} lines...")
 
-    pitch_data = []
-
+    PITCH_THREADS.inc()
     try:
-        for line in script:
-            contour = extract_pitch_for_line(audio_path, line.startTime, line.endTime)
-            result = contour if contour else []
+        _extract_scene(audio_path, script, scene_id, estimator, storage_path)
 
-            # Update SceneLine in-place (for any in-memory references)
-            line.pitchPattern = result
+    except Exception as e:
+        logger.warning("Unexpected error during pitch extraction: %s", e)
+        # Final empty result, or the scene stays "processing" until its TTL
+        store_pitch_result(
+            scene_id, [{"lineId": line.id, "pitchPattern": []} for line in script]
+        )
 
-            # Build payload for Redis
-            pitch_data.append(
-                {
-                    "lineId": line.id,
-                    "pitchPattern": result,
-                }
+    finally:
+        PITCH_THREADS.dec()
+        with _threads_lock:
+            _threads.discard(threading.current_thread())
+        _remove_audio(audio_path)
+
+
+def _extract_scene(
+    audio_path: str,
+    script: List[SceneLine],
+    scene_id: str,
+    estimator: Optional[str] = None,
+    storage_path: Optional[str] = None,
+) -> None:
+    """
+    The scene's F0 track (reused when this audio was tracked before) and
+    every line's contour sliced from it → Redis, per line as the track
+    covers it, then all. storage_path keys the track by the stored audio's
+    hash; without one the PCM itself is hashed.
+    """
+    name = resolve_estimator(estimator)
+    key = track_key(storage_path or content_key(audio_path, prefix="pcm"), name)
+    stats: dict = {}
+    pending = dict(enumerate(script))  # index → line not pushed yet
+
+    def publish_lines(track: PitchTrack, frames_done: int) -> None:
+        # Lines whose frames are all final go out now (the rest after the last chunk)
+        for index, line in list(pending.items()):
+            _, stop = track.line_frames(line.startTime, line.endTime)
+            if stop > frames_done and frames_done < len(track):
+                continue
+            del pending[index]
+            # Push to live viewers (SSE) as soon as the line is done
+            store_pitch_line(
+                scene_id, line.id, index, track.line_contour(line.startTime, line.endTime)
             )
 
-        # Store completed results in Redis
-        store_pitch_result(scene_id, pitch_data)
-        print("✅ Background pitch extraction complete.")
+    with track_stage(stats, "pitch"):
+        track = get_pitch_track(key)
+        if track is not None:
+            print(f"♻️  Reusing the stored pitch track for this audio: {key}")
+        else:
+            # Map the PCM once; chunks are slices of it (the map is released
+            # when this returns — Windows can't delete a mapped file)
+            if is_pcm_wav(audio_path):
+                track = extract_pitch_track(load_pcm(audio_path), name, publish_lines)
+            else:
+                with tempfile.TemporaryDirectory(prefix="pitch-") as tmp:
+                    pcm_path = decode_to_pcm(audio_path, os.path.join(tmp, "audio.pcm.wav"))
+                    track = extract_pitch_track(load_pcm(pcm_path), name, publish_lines)
+            store_pitch_track(key, track)
+
+    pitch_data = []
+    for line in script:
+        # Update SceneLine in-place (for any in-memory references)
+        line.pitchPattern = track.line_contour(line.startTime, line.endTime)
+        pitch_data.append({"lineId": line.id, "pitchPattern": line.pitchPattern})
+
+    # Store completed results in Redis — the track link first, so the
+    # scene's time ranges can be sliced as soon as it reports ready
+    link_scene_track(scene_id, key)
+    store_pitch_result(scene_id, pitch_data)
+    print(
+        f"✅ Background pitch extraction complete "
+        f"({stats['pitch']['wallSeconds']}s wall, {stats['pitch']['cpuSeconds']}s CPU)."
+    )
 
+
+def _remove_audio(audio_path: str) -> None:
+    try:
+        if os.path.exists(audio_path):
+            os.unlink(audio_path)
+            print(f"🗑️  Audio file cleaned up: {audio_path}")
     except Exception as e:
-        logger.warning("Unexpected error during pitch extraction: %s", e)
+        logger.warning("Failed to clean up audio file %s: %s", audio_path, e)
 
-    finally:
-        # Always clean up audio file
-        try:
-            if os.path.exists(audio_path):
-                os.unlink(audio_path)
-                print(f"🗑️  Audio file cleaned up: {audio_path}")
-        except Exception as e:
-            logger.warning("Failed to clean up audio file %s: %s", audio_path, e)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# F0 estimators — (y, sr) -> (f0 Hz per frame, voiced mask per frame)
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _estimate_pyin(y: np.ndarray, sr: int):
+    import librosa
+
+    f0, voiced_flag, _ = librosa.pyin(
+        y,
+        fmin=F0_MIN_HZ,
+        fmax=F0_MAX_HZ,
+        sr=sr,
+        frame_length=FRAME_LENGTH,
+        hop_length=HOP_LENGTH,
+    )
+    return f0, voiced_flag
+
+
+def _estimate_yin(y: np.ndarray, sr: int):
+    import librosa
+
+    f0 = librosa.yin(
+        y,
+        fmin=F0_MIN_HZ,
+        fmax=F0_MAX_HZ,
+        sr=sr,
+        frame_length=FRAME_LENGTH,
+        hop_length=HOP_LENGTH,
+    )
+    # yin has no voicing decision: gate on energy, and drop frames pinned to
+    # the search bounds (no trough found)
+    voiced = _energy_voiced(_frames(y, FRAME_LENGTH)) & (f0 > F0_MIN_HZ) & (f0 < F0_MAX_HZ)
+    return f0, voiced
+
+
+def _estimate_acf(y: np.ndarray, sr: int):
+    """
+    Normalized autocorrelation of every frame at once (FFT, no Python loop
+    over frames), octave-guarded peak pick and parabolic refinement.
+    """
+    frames = _frames(y, ACF_FRAME_LENGTH)
+    frames = frames - frames.mean(axis=1, keepdims=True)
+    n = ACF_FRAME_LENGTH
+
+    spectrum = np.fft.rfft(frames, n=2 * n, axis=1)
+    acf = np.fft.irfft(spectrum.real**2 + spectrum.imag**2, axis=1)[:, :n]
+
+    lag_min = int(sr // F0_MAX_HZ)
+    lag_max = min(int(np.ceil(sr / F0_MIN_HZ)), n - 2)
+
+    # Unbiased, energy-normalized: a perfectly periodic frame peaks at 1.0
+    lags = np.arange(lag_max + 2)
+    nccf = acf[:, : lag_max + 2] / np.maximum(acf[:, :1], 1e-12) * (n / (n - lags))
+
+    search = nccf[:, lag_min : lag_max + 1]
+    inner = search[:, 1:-1]
+    is_peak = (inner > search[:, :-2]) & (inner >= search[:, 2:])
+    best = np.where(is_peak, inner, -np.inf).max(axis=1, keepdims=True)
+
+    # Shortest lag whose peak is close to the best one — avoids halving F0
+    candidates = is_peak & (inner >= ACF_OCTAVE_TOLERANCE * best)
+    has_peak = candidates.any(axis=1)
+    idx = np.argmax(candidates, axis=1) + lag_min + 1
+
+    rows = np.arange(len(idx))
+    left, mid, right = nccf[rows, idx - 1], nccf[rows, idx], nccf[rows, idx + 1]
+    denom = left - 2 * mid + right
+    shift = np.divide(
+        0.5 * (left - right), denom, out=np.zeros_like(denom), where=np.abs(denom) > 1e-12
+    )
+    f0 = sr / (idx + np.clip(shift, -0.5, 0.5))
+
+    voiced = has_peak & (mid >= ACF_VOICING_THRESHOLD) & _energy_voiced(frames)
+    voiced &= (f0 >= F0_MIN_HZ) & (f0 <= F0_MAX_HZ)
+    return f0, voiced
+
+
+PITCH_ESTIMATORS = {
+    "pyin": _estimate_pyin,
+    "yin": _estimate_yin,
+    "acf": _estimate_acf,
+}
+
+
+def _frames(y: np.ndarray, frame_length: int) -> np.ndarray:
+    """
+    Centered frames at HOP_LENGTH — the same framing as librosa's
+    center=True, so every estimator yields 1 + len(y) // HOP_LENGTH frames.
+    """
+    half = frame_length // 2
+    padded = np.pad(y, (half, half))
+    view = np.lib.stride_tricks.sliding_window_view(padded, frame_length)
+    return view[::HOP_LENGTH][: 1 + len(y) // HOP_LENGTH]
+
+
+def _energy_voiced(frames: np.ndarray) -> np.ndarray:
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+    db = 20 * np.log10(np.maximum(rms, 1e-10))
+    return db > max(SILENCE_DB, float(db.max()) - DYNAMIC_RANGE_DB)
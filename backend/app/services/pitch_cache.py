@@ -4,7 +4,14 @@ services/pitch_cache.py
 Handles storing and retrieving pitch extraction results via Redis.
 
 Key format : pitch:{sceneId}
-TTL        : 1 hour (pitch data is temporary — once frontend has it, done)
+             pitch:{sceneId}:lines        — hash of lines finished so far
+             pitch:{sceneId}:v:{variant}  — decimated / smoothed variants
+             pitch:{sceneId}:track        — key of the scene's F0 track
+             pitch-track:{audioHash}:{estimator}
+                                          — full-scene F0 track (pitch_track.py)
+Channel    : pitch-events:{sceneId}       — "line" / "ready" events (pub/sub)
+TTL        : 1 hour (pitch data is temporary — once frontend has it, done);
+             tracks PITCH_TRACK_TTL_SECONDS, refreshed on every reuse
 ─────────────────────────────────────────────────────────────────────────────
 """
 
@@ -15,6 +22,9 @@ from typing import Optional
 import redis
 
 from app.config.config import settings
+from app.services.metrics import redis_op
+from app.services.pitch_track import PitchTrack
+from app.services.redis_client import get_redis_client
 
 logger = logging.getLogger(__name__)
 
@@ -24,21 +34,14 @@ PITCH_TTL_SECONDS = 3600
 # Sentinel value stored while extraction is still running
 STATUS_PROCESSING = "__processing__"
 
+PITCH_EVENTS_PREFIX = "pitch-events:"
+
 
 def _get_client() -> Optional[redis.Redis]:
     """
     Returns a Redis client or None if Redis is not configured.
     """
-    if not settings.REDIS_URL:
-        logger.warning("REDIS_URL not configured — pitch caching unavailable.")
-        return None
-    try:
-        client = redis.from_url(settings.REDIS_URL, decode_responses=True)
-        client.ping()
-        return client
-    except Exception as e:
-        logger.warning("Redis connection failed: %s", e)
-        return None
+    return get_redis_client()
 
 
 def mark_pitch_processing(scene_id: str) -> None:
@@ -51,7 +54,8 @@ def mark_pitch_processing(scene_id: str) -> None:
         return
     try:
         key = f"pitch:{scene_id}"
-        client.set(key, STATUS_PROCESSING, ex=PITCH_TTL_SECONDS)
+        with redis_op("set"):
+            client.set(key, STATUS_PROCESSING, ex=PITCH_TTL_SECONDS)
         print(f"📌 Pitch status marked as processing for scene: {scene_id}")
     except Exception as e:
         logger.warning("Failed to mark pitch as processing: %s", e)
@@ -71,12 +75,54 @@ def store_pitch_result(scene_id: str, pitch_data: list) -> None:
     try:
         key = f"pitch:{scene_id}"
         payload = json.dumps(pitch_data)
-        client.set(key, payload, ex=PITCH_TTL_SECONDS)
+        with redis_op("set"):
+            client.set(key, payload, ex=PITCH_TTL_SECONDS)
+        with redis_op("delete"):
+            client.delete(f"pitch:{scene_id}:lines")  # superseded by the result
+        _publish(client, scene_id, {"event": "ready", "lines": len(pitch_data)})
         print(f"✅ Pitch result stored in Redis for scene: {scene_id}")
     except Exception as e:
         logger.warning("Failed to store pitch result: %s", e)
 
 
+def store_pitch_line(
+    scene_id: str, line_id: str, index: int, pitch_pattern: list
+) -> None:
+    """
+    Record one finished line and push it to live subscribers, so viewers
+    see contours as they complete and late joiners can catch up.
+    """
+    client = _get_client()
+    if not client:
+        return
+    try:
+        line = {"lineId": line_id, "index": index, "pitchPattern": pitch_pattern}
+        key = f"pitch:{scene_id}:lines"
+        with redis_op("hset"):
+            pipe = client.pipeline()
+            pipe.hset(key, line_id, json.dumps(line))
+            pipe.expire(key, PITCH_TTL_SECONDS)
+            pipe.execute()
+        _publish(client, scene_id, {"event": "line", **line})
+    except Exception as e:
+        logger.warning("Failed to store pitch line: %s", e)
+
+
+def get_pitch_lines(scene_id: str) -> list:
+    """Lines finished so far for a scene still processing, in script order."""
+    client = _get_client()
+    if not client:
+        return []
+    try:
+        with redis_op("hgetall"):
+            values = client.hgetall(f"pitch:{scene_id}:lines")
+        lines = [json.loads(v) for v in values.values()]
+        return sorted(lines, key=lambda l: l["index"])
+    except Exception as e:
+        logger.warning("Failed to get pitch lines: %s", e)
+        return []
+
+
 def get_pitch_result(scene_id: str) -> Optional[dict]:
     """
     Retrieve pitch result from Redis.
@@ -91,7 +137,8 @@ def get_pitch_result(scene_id: str) -> Optional[dict]:
         return None
     try:
         key = f"pitch:{scene_id}"
-        value = client.get(key)
+        with redis_op("get"):
+            value = client.get(key)
 
         if value is None:
             return None
@@ -117,7 +164,96 @@ def delete_pitch_result(scene_id: str) -> None:
     if not client:
         return
     try:
-        client.delete(f"pitch:{scene_id}")
+        with redis_op("delete"):
+            client.delete(f"pitch:{scene_id}")
         print(f"🗑️  Pitch data deleted from Redis for scene: {scene_id}")
     except Exception as e:
         logger.warning("Failed to delete pitch result: %s", e)
+
+
+def get_pitch_variant(scene_id: str, variant: str) -> Optional[list]:
+    """
+    Cached shaped contours for one /pitch query-parameter combination,
+    or None on a miss.
+    """
+    client = _get_client()
+    if not client:
+        return None
+    try:
+        with redis_op("get"):
+            value = client.get(f"pitch:{scene_id}:v:{variant}")
+        return json.loads(value) if value is not None else None
+    except Exception as e:
+        logger.warning("Failed to get pitch variant: %s", e)
+        return None
+
+
+def store_pitch_variant(scene_id: str, variant: str, lines: list) -> None:
+    client = _get_client()
+    if not client:
+        return
+    try:
+        with redis_op("set"):
+            client.set(
+                f"pitch:{scene_id}:v:{variant}",
+                json.dumps(lines),
+                ex=PITCH_TTL_SECONDS,
+            )
+    except Exception as e:
+        logger.warning("Failed to store pitch variant: %s", e)
+
+
+def store_pitch_track(key: str, track: PitchTrack) -> None:
+    client = _get_client()
+    if not client:
+        return
+    try:
+        with redis_op("set"):
+            client.set(key, track.to_json(), ex=settings.PITCH_TRACK_TTL_SECONDS)
+    except Exception as e:
+        logger.warning("Failed to store pitch track: %s", e)
+
+
+def get_pitch_track(key: str) -> Optional[PitchTrack]:
+    """The track stored under key (TTL refreshed), or None on a miss."""
+    client = _get_client()
+    if not client:
+        return None
+    try:
+        with redis_op("getex"):
+            value = client.getex(key, ex=settings.PITCH_TRACK_TTL_SECONDS)
+        return PitchTrack.from_json(value) if value is not None else None
+    except Exception as e:
+        logger.warning("Failed to get pitch track: %s", e)
+        return None
+
+
+def link_scene_track(scene_id: str, key: str) -> None:
+    """Point a scene at its track — call before store_pitch_result()."""
+    client = _get_client()
+    if not client:
+        return
+    try:
+        with redis_op("set"):
+            client.set(f"pitch:{scene_id}:track", key, ex=PITCH_TTL_SECONDS)
+    except Exception as e:
+        logger.warning("Failed to link pitch track: %s", e)
+
+
+def get_scene_track(scene_id: str) -> Optional[PitchTrack]:
+    """A scene's full F0 track, or None (unknown scene / expired / no Redis)."""
+    client = _get_client()
+    if not client:
+        return None
+    try:
+        with redis_op("get"):
+            key = client.get(f"pitch:{scene_id}:track")
+    except Exception as e:
+        logger.warning("Failed to get pitch track link: %s", e)
+        return None
+    return get_pitch_track(key) if key else None
+
+
+def _publish(client, scene_id: str, event: dict) -> None:
+    with redis_op("publish"):
+        client.publish(f"{PITCH_EVENTS_PREFIX}{scene_id}", json.dumps(event))
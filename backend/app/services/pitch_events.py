@@ -0,0 +1,118 @@
+"""
+services/pitch_events.py
+─────────────────────────────────────────────────────────────────────────────
+Fan-out of pitch progress events (pitch_cache publishes them) to the
+/pitch/{sceneId}/events streams of this process.
+
+One Redis connection per worker process, not per viewer: a single
+listener thread PSUBSCRIBEs to pitch-events:* and hands each message to
+the asyncio queues of the streams watching that scene. Any worker can
+serve a viewer no matter which worker runs the extraction.
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.services.pitch_cache import PITCH_EVENTS_PREFIX
+from app.services.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Constants
+# ─────────────────────────────────────────────────────────────────────────────
+
+RECONNECT_BACKOFF_SECONDS = 1.0
+RECONNECT_BACKOFF_MAX_SECONDS = 30.0
+
+# sceneId → [(event loop, queue)] of open streams
+_subscribers: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+_lock = threading.Lock()
+_listener: Optional[threading.Thread] = None
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Public API
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def subscribe(scene_id: str) -> asyncio.Queue:
+    """
+    Register the calling coroutine's stream for a scene. Events arrive in
+    the returned queue as dicts ({"event": "line" | "ready", ...}).
+    Must be called from a running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    with _lock:
+        _subscribers.setdefault(scene_id, []).append((loop, queue))
+    _ensure_listener()
+    return queue
+
+
+def unsubscribe(scene_id: str, queue: asyncio.Queue) -> None:
+    with _lock:
+        streams = [s for s in _subscribers.get(scene_id, []) if s[1] is not queue]
+        if streams:
+            _subscribers[scene_id] = streams
+        else:
+            _subscribers.pop(scene_id, None)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Internal
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _ensure_listener() -> None:
+    global _listener
+    with _lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = threading.Thread(
+                target=_listen, name="pitch-events", daemon=True
+            )
+            _listener.start()
+
+
+def _listen() -> None:
+    """PSUBSCRIBE loop; reconnects with backoff and never raises."""
+    backoff = RECONNECT_BACKOFF_SECONDS
+    while True:
+        client = get_redis_client()
+        if client is None:
+            time.sleep(backoff)
+            backoff = min(backoff * 2, RECONNECT_BACKOFF_MAX_SECONDS)
+            continue
+        try:
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.psubscribe(f"{PITCH_EVENTS_PREFIX}*")
+            backoff = RECONNECT_BACKOFF_SECONDS
+            for message in pubsub.listen():
+                if message.get("type") == "pmessage":
+                    _dispatch(message["channel"], message["data"])
+        except Exception as e:
+            logger.warning("Pitch event listener lost Redis (%s) — reconnecting", e)
+            time.sleep(backoff)
+            backoff = min(backoff * 2, RECONNECT_BACKOFF_MAX_SECONDS)
+
+
+def _dispatch(channel: str, data: str) -> None:
+    scene_id = channel[len(PITCH_EVENTS_PREFIX) :]
+    with _lock:
+        streams = list(_subscribers.get(scene_id, ()))
+    if not streams:
+        return
+    try:
+        event = json.loads(data)
+    except ValueError:
+        return
+    for loop, queue in streams:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+        except RuntimeError:  # loop closed — stream is gone
+            unsubscribe(scene_id, queue)
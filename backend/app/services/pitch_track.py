@@ -0,0 +1,125 @@
+"""
+services/pitch_track.py
+─────────────────────────────────────────────────────────────────────────────
+Full-scene F0 track: pitch is estimated once over the whole scene audio
+(pitch.extract_pitch_track) and every contour is a slice of it — a line's
+pattern, or any time range (GET /pitch/{scene_id}/range). Changing line
+boundaries never needs another extraction.
+
+    track.slice(12.4, 15.0)       → (first frame, [Hz per frame])
+    track.line_contour(start, end) → what per-line extraction returned
+
+Frame i is centred at i × hop / sample rate (the estimators' framing), so
+the frame-time index is the hop itself: a time maps to its frame by one
+division and a range is sliced in O(1) — no per-frame timestamps are
+stored or searched.
+
+Stored (pitch_cache.store_pitch_track) under pitch-track:{audio hash}:
+{estimator}, the hash being the stored audio object's content hash, so
+every scene cut from the same audio shares one track:
+
+    { sampleRate, hopLength, estimator, frames, f0 }
+    f0 = base64 of little-endian uint16 centi-Hz per frame, 0 = unvoiced
+
+2 bytes per 32 ms frame (~37 KB for 10 minutes). Centi-Hz is exactly the
+0.01 Hz rounding contours always had.
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import base64
+import json
+import os
+from typing import List, Tuple
+
+import numpy as np
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Constants
+# ─────────────────────────────────────────────────────────────────────────────
+
+TRACK_KEY_PREFIX = "pitch-track:"
+CENTI_HZ = 100  # storage resolution: 0.01 Hz
+MIN_LINE_SECONDS = 0.1  # per-line extraction never sliced less than this
+
+
+class PitchTrack:
+    """F0 per frame (Hz, float32, 0.0 = unvoiced) for a whole scene."""
+
+    def __init__(self, f0: np.ndarray, sample_rate: int, hop_length: int, estimator: str):
+        self.f0 = np.asarray(f0, dtype=np.float32)
+        self.sample_rate = sample_rate
+        self.hop_length = hop_length
+        self.estimator = estimator
+
+    @property
+    def frame_seconds(self) -> float:
+        return self.hop_length / self.sample_rate
+
+    def __len__(self) -> int:
+        return len(self.f0)
+
+    def slice(self, start: float, end: float) -> Tuple[int, List[float]]:
+        """Frames centred in [start, end] seconds: (first frame, values)."""
+        first = max(int(np.ceil(start / self.frame_seconds - 1e-9)), 0)
+        last = min(int(np.floor(end / self.frame_seconds + 1e-9)) + 1, len(self.f0))
+        return first, _values(self.f0[first:max(first, last)])
+
+    def line_contour(self, start: float, end: float) -> List[float]:
+        """
+        A line's pitchPattern — the frames extracting [start, end) on its
+        own produced (same count; at most half a hop off in time).
+        """
+        first, stop = self.line_frames(start, end)
+        return _values(self.f0[first:stop])
+
+    def line_frames(self, start: float, end: float) -> Tuple[int, int]:
+        """[first, stop) frame indices of a line's contour."""
+        end = start + max(end - start, MIN_LINE_SECONDS)
+        first_sample = int(start * self.sample_rate)
+        count = 1 + (int(end * self.sample_rate) - first_sample) // self.hop_length
+        first = min(int(round(first_sample / self.hop_length)), len(self.f0))
+        return first, min(first + count, len(self.f0))
+
+    def to_json(self) -> str:
+        centi = np.clip(np.round(self.f0 * CENTI_HZ), 0, np.iinfo(np.uint16).max)
+        return json.dumps(
+            {
+                "sampleRate": self.sample_rate,
+                "hopLength": self.hop_length,
+                "estimator": self.estimator,
+                "frames": len(self.f0),
+                "f0": base64.b64encode(centi.astype("<u2").tobytes()).decode("ascii"),
+            }
+        )
+
+    @classmethod
+    def from_json(cls, payload: str) -> "PitchTrack":
+        data = json.loads(payload)
+        centi = np.frombuffer(base64.b64decode(data["f0"]), dtype="<u2")
+        return cls(
+            centi.astype(np.float32) / CENTI_HZ,
+            data["sampleRate"],
+            data["hopLength"],
+            data["estimator"],
+        )
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Public API
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def track_key(storage_path: str, estimator: str) -> str:
+    """pitch-track:{hash}:{estimator} for a content-keyed object (audio/{hash}.webm)."""
+    digest = os.path.splitext(os.path.basename(storage_path))[0]
+    return f"{TRACK_KEY_PREFIX}{digest}:{estimator}"
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Internal
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _values(f0: np.ndarray) -> List[float]:
+    # Round trip through centi-Hz, so a fresh track and a stored one agree
+    return (np.round(f0.astype(np.float64) * CENTI_HZ) / CENTI_HZ).tolist()
@@ -1,41 +1,95 @@
 from datetime import datetime, timedelta
 
+from app.services.metrics import set_rate_limit_tokens
+
 # ===== CONFIG =====
 MAX_DAILY_CALLS = 10
 MAX_PER_MINUTE = 3
 
+# ===== ERRORS =====
+class RateLimitExceeded(RuntimeError):
+    """A limit is used up; retry_after is seconds until its window resets."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
 # ===== STATE =====
 calls_today = 0
 minute_calls = 0
 minute_window_start = datetime.utcnow()
 day_window_start = datetime.utcnow()
+content_scenes_today = set()  # scenes whose lazy content took its daily token
 
 
 def check_rate_limit(service_name: str):
     global calls_today, minute_calls
-    global minute_window_start, day_window_start
 
     now = datetime.utcnow()
+    _reset_windows(now)
+    _check_daily(service_name, now)
+
+    if minute_calls >= MAX_PER_MINUTE:
+        raise RateLimitExceeded(
+            f"Rate limit hit for {service_name}. Slow down.",
+            _seconds_until(minute_window_start + timedelta(minutes=1), now),
+        )
+
+    # Increment counters
+    calls_today += 1
+    minute_calls += 1
+
+    set_rate_limit_tokens("minute", MAX_PER_MINUTE - minute_calls)
+    set_rate_limit_tokens("day", MAX_DAILY_CALLS - calls_today)
+
+
+def check_content_rate_limit(service_name: str, scene_id: str):
+    """
+    Lazy scene content (quiz, translations — generated on first view, not
+    at ingest): one daily token per scene for all its kinds, and outside
+    the per-minute window. Single-flight and the scene store already keep
+    it to one call per kind, so opening a fresh scene can't trip the limit.
+    """
+    global calls_today
+
+    now = datetime.utcnow()
+    _reset_windows(now)
+    if scene_id in content_scenes_today:
+        return
+    _check_daily(service_name, now)
+
+    calls_today += 1
+    content_scenes_today.add(scene_id)
+    set_rate_limit_tokens("day", MAX_DAILY_CALLS - calls_today)
+
+
+def _reset_windows(now: datetime):
+    global calls_today, minute_calls
+    global minute_window_start, day_window_start
 
     # Reset daily window
     if now - day_window_start > timedelta(days=1):
         calls_today = 0
         day_window_start = now
+        content_scenes_today.clear()
 
     # Reset minute window
     if now - minute_window_start > timedelta(minutes=1):
         minute_calls = 0
         minute_window_start = now
 
-    # Check limits
+    set_rate_limit_tokens("minute", MAX_PER_MINUTE - minute_calls)
+    set_rate_limit_tokens("day", MAX_DAILY_CALLS - calls_today)
+
+
+def _check_daily(service_name: str, now: datetime):
     if calls_today >= MAX_DAILY_CALLS:
-        raise RuntimeError(
-            f"Daily AI limit reached for {service_name}. Try again tomorrow."
+        raise RateLimitExceeded(
+            f"Daily AI limit reached for {service_name}. Try again tomorrow.",
+            _seconds_until(day_window_start + timedelta(days=1), now),
         )
 
-    if minute_calls >= MAX_PER_MINUTE:
-        raise RuntimeError(f"Rate limit hit for {service_name}. Slow down.")
 
-    # Increment counters
-    calls_today += 1
-    minute_calls += 1
+def _seconds_until(reset: datetime, now: datetime) -> int:
+    return max(1, int((reset - now).total_seconds()) + 1)
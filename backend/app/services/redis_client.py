@@ -0,0 +1,46 @@
+"""
+services/redis_client.py
+─────────────────────────────────────────────────────────────────────────────
+Shared Redis connection for every Redis-backed service (pitch cache,
+scene store, ...). One connection pool per process instead of a new
+connection + PING per operation.
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import logging
+import threading
+from typing import Optional
+
+import redis
+
+from app.config.config import settings
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[redis.Redis] = None
+_lock = threading.Lock()
+
+
+def get_redis_client() -> Optional[redis.Redis]:
+    """
+    Returns a pooled Redis client (str responses) or None if Redis is not
+    configured / unreachable. Retries the connection on the next call.
+    """
+    global _client
+    if _client is not None:
+        return _client
+
+    if not settings.REDIS_URL:
+        logger.warning("REDIS_URL not configured — Redis features unavailable.")
+        return None
+
+    with _lock:
+        if _client is None:
+            try:
+                client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+                client.ping()
+                _client = client
+            except Exception as e:
+                logger.warning("Redis connection failed: %s", e)
+                return None
+    return _client
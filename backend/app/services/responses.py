@@ -0,0 +1,110 @@
+"""
+services/responses.py
+─────────────────────────────────────────────────────────────────────────────
+JSON responses encoded with orjson, floats rounded at encode time.
+
+FastAPI passes every dict a handler returns through jsonable_encoder (a
+recursive walk in Python) before json.dumps — most of the cost of a large
+ScenePackage or pitch payload. Handlers return those as a FastJSONResponse
+instead, which FastAPI sends as-is:
+
+    return FastJSONResponse(scene)                  # pydantic model
+    return FastJSONResponse({"lines": lines, ...})  # plain data / numpy
+
+- a pydantic model is serialized by pydantic-core in one call
+  (model_dump_json); its float fields round through their schema types
+  (models/schema.py Seconds) — walking a dumped scene in Python to round
+  would cost more than encoding it
+- anything else is encoded by orjson with floats rounded to FLOAT_DIGITS;
+  float lists (contours) are rounded in one numpy call, not value by value
+- numpy arrays / scalars are accepted; NaN and ±inf become null
+
+It is also the app's default_response_class, so small dict returns use
+the same encoder. Compression is separate (services/compression.py).
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+from typing import Any, Optional
+
+import numpy as np
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Constants
+# ─────────────────────────────────────────────────────────────────────────────
+
+# 1 ms for times, finer than any contour (0.01 Hz / semitone)
+FLOAT_DIGITS = 3
+
+# Float lists at least this long are rounded through numpy
+VECTOR_MIN_LENGTH = 8
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by orjson; float_digits=None keeps floats as-is."""
+
+    def __init__(
+        self, content: Any, *args, float_digits: Optional[int] = FLOAT_DIGITS, **kwargs
+    ):
+        self.float_digits = float_digits
+        super().__init__(content, *args, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        return encode_json(content, self.float_digits)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Public API
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def encode_json(content: Any, float_digits: Optional[int] = FLOAT_DIGITS) -> bytes:
+    """JSON bytes of content (see module docstring)."""
+    if isinstance(content, BaseModel):
+        return content.model_dump_json().encode()
+    if float_digits is not None:
+        content = round_floats(content, float_digits)
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+def round_floats(value: Any, digits: int = FLOAT_DIGITS) -> Any:
+    """Copy of value with every float rounded; models are left to _default."""
+    kind = type(value)
+    if kind is float:
+        return round(value, digits)
+    if kind is dict:
+        return {k: round_floats(v, digits) for k, v in value.items()}
+    if kind is list or kind is tuple:
+        if len(value) >= VECTOR_MIN_LENGTH and type(value[0]) is float:
+            vector = np.array(value)
+            if vector.dtype == np.float64:  # only floats / ints — else None, str…
+                return _round_vector(vector, digits)
+        return [round_floats(v, digits) for v in value]
+    if isinstance(value, np.ndarray) and value.dtype.kind == "f":
+        return _round_vector(value, digits)
+    return value
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Internal
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _round_vector(vector: np.ndarray, digits: int) -> list:
+    # float64 first: float32 values would not print as their rounded decimal
+    return np.round(vector.astype(np.float64), digits).tolist()
+
+
+def _default(value: Any) -> Any:
+    # Types orjson can't encode natively
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")  # JSON-mode schema rounding
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
@@ -0,0 +1,183 @@
+"""
+services/scene_content.py
+─────────────────────────────────────────────────────────────────────────────
+Scene content generated on first access instead of during ingest — many
+learners never open the quiz, and /ingest returns the script sooner
+without it:
+
+    quiz          GET /scenes/{sceneId}/quiz
+    translations  GET /scenes/{sceneId}/translations
+                  GET /scenes/{sceneId}/lines/{lineId}/translation
+
+Each kind is generated once per scene (one GPT call for the whole scene)
+and kept in the scene store (scene:{sceneId}:{kind}) as long as the scene.
+All kinds of a stored scene share one daily rate-limit token and skip the
+per-minute window (rate_limit.check_content_rate_limit), so opening them
+right after /ingest never fails on the limiter.
+A scene the store doesn't have (no Redis, or past its TTL) can still get
+both from its script, uncached — quiz_for_script / translations_for_script.
+
+Single-flight — concurrent first requests cost one LLM call:
+    in-process    requests in this worker await the same task
+    cross-worker  the generating worker holds scene:{sceneId}:{kind}:lock
+                  (SET NX, expires after LOCK_TTL_SECONDS if it dies);
+                  the others poll the store until the content appears,
+                  and take over if the lock is released without it
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.models.schema import QuizQuestion, SceneLine, ScenePackage
+from app.services.gpt import generate_quiz, translate_lines
+from app.services.metrics import redis_op
+from app.services.redis_client import get_redis_client
+from app.services.scene_store import get_scene_content, save_scene_content
+from app.services.stages import track_stage
+
+logger = logging.getLogger(__name__)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Constants
+# ─────────────────────────────────────────────────────────────────────────────
+
+LOCK_TTL_SECONDS = 120  # > one chat call (settings.OPENAI_CHAT_TIMEOUT)
+POLL_SECONDS = 0.25
+
+# (sceneId, kind) → generation task shared by this worker's requests
+_inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Public API
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+async def get_quiz(scene: ScenePackage) -> List[QuizQuestion]:
+    content = await _single_flight(
+        scene.sceneId,
+        "quiz",
+        lambda: _build_quiz(scene.script, scene.language, scene.sceneId),
+    )
+    return [QuizQuestion(**q) for q in content]
+
+
+async def get_translations(scene: ScenePackage) -> Dict[str, str]:
+    """lineId → English translation for every line of the scene."""
+    return await _single_flight(
+        scene.sceneId,
+        "translations",
+        lambda: translate_lines(scene.script, scene.sceneId),
+    )
+
+
+async def quiz_for_script(script: List[SceneLine], language: str = "ja") -> List[QuizQuestion]:
+    """Quiz for a scene the store doesn't have — generated every call."""
+    with track_stage({}, "quiz", pipeline="content"):
+        content = await _build_quiz(script, language)
+    return [QuizQuestion(**q) for q in content]
+
+
+async def translations_for_script(script: List[SceneLine]) -> Dict[str, str]:
+    """Translations for a scene the store doesn't have — generated every call."""
+    with track_stage({}, "translations", pipeline="content"):
+        return await translate_lines(script)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Internal
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+async def _build_quiz(
+    script: List[SceneLine], language: str, scene_id: Optional[str] = None
+) -> list:
+    questions = await generate_quiz(script, scene_id)
+    return [
+        QuizQuestion(
+            questionId=f"quiz-{i+1}",
+            type=q.type,
+            question=q.question,
+            expectedAnswer=q.expectedAnswer,
+            targetLanguage=language,
+            relatedLineId=q.relatedLineId,
+        ).model_dump()
+        for i, q in enumerate(questions)
+    ]
+
+
+async def _single_flight(
+    scene_id: str, kind: str, generate: Callable[[], Awaitable[Any]]
+) -> Any:
+    cached = await asyncio.to_thread(get_scene_content, scene_id, kind)
+    if cached is not None:
+        return cached
+
+    key = (scene_id, kind)
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_generate_once(scene_id, kind, generate))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # A client going away must not cancel the call the others are waiting on
+    return await asyncio.shield(task)
+
+
+async def _generate_once(
+    scene_id: str, kind: str, generate: Callable[[], Awaitable[Any]]
+) -> Any:
+    client = await asyncio.to_thread(get_redis_client)
+    lock_key = f"scene:{scene_id}:{kind}:lock"
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + LOCK_TTL_SECONDS
+
+    while True:
+        if await asyncio.to_thread(_acquire, client, lock_key, token):
+            try:
+                # Another worker may have finished between our miss and the lock
+                cached = await asyncio.to_thread(get_scene_content, scene_id, kind)
+                if cached is not None:
+                    return cached
+                with track_stage({}, kind, pipeline="content"):
+                    content = await generate()
+                await asyncio.to_thread(save_scene_content, scene_id, kind, content)
+                return content
+            finally:
+                await asyncio.to_thread(_release, client, lock_key, token)
+
+        await asyncio.sleep(POLL_SECONDS)
+        cached = await asyncio.to_thread(get_scene_content, scene_id, kind)
+        if cached is not None:
+            return cached
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"Timed out waiting for the scene {kind} to be generated")
+
+
+def _acquire(client, lock_key: str, token: str) -> bool:
+    """True when this worker should generate (lock taken, or no Redis)."""
+    if client is None:
+        return True
+    try:
+        with redis_op("set"):
+            return bool(client.set(lock_key, token, nx=True, ex=LOCK_TTL_SECONDS))
+    except Exception as e:
+        logger.warning("Content lock %s unavailable (%s) — generating anyway", lock_key, e)
+        return True
+
+
+def _release(client, lock_key: str, token: str) -> None:
+    """Delete the lock if it is still ours (best effort; it expires anyway)."""
+    if client is None:
+        return
+    try:
+        with redis_op("get"):
+            owner = client.get(lock_key)
+        if owner == token:
+            with redis_op("delete"):
+                client.delete(lock_key)
+    except Exception:
+        pass
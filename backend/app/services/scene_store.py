@@ -0,0 +1,84 @@
+"""
+services/scene_store.py
+─────────────────────────────────────────────────────────────────────────────
+Keeps ingested ScenePackages in Redis so later requests (batch evaluation,
+lazily generated content, ...) can refer to a scene by ID.
+
+Key format : scene:{sceneId}
+             scene:{sceneId}:{kind}     lazily generated content (JSON),
+                                        e.g. quiz, translations
+TTL        : 7 days
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import json
+import logging
+from typing import Any, Optional
+
+from app.models.schema import ScenePackage
+from app.services.metrics import redis_op
+from app.services.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+SCENE_TTL_SECONDS = 7 * 24 * 3600
+
+
+def save_scene(scene: ScenePackage) -> None:
+    """Store a scene. Silently skipped when Redis is unavailable."""
+    client = get_redis_client()
+    if not client:
+        return
+    try:
+        with redis_op("set"):
+            client.set(
+                f"scene:{scene.sceneId}", scene.model_dump_json(), ex=SCENE_TTL_SECONDS
+            )
+    except Exception as e:
+        logger.warning("Failed to store scene %s: %s", scene.sceneId, e)
+
+
+def get_scene(scene_id: str) -> Optional[ScenePackage]:
+    """Returns the stored scene, or None if unknown / expired / no Redis."""
+    client = get_redis_client()
+    if not client:
+        return None
+    try:
+        with redis_op("get"):
+            value = client.get(f"scene:{scene_id}")
+        if value is None:
+            return None
+        return ScenePackage.model_validate_json(value)
+    except Exception as e:
+        logger.warning("Failed to load scene %s: %s", scene_id, e)
+        return None
+
+
+def get_scene_content(scene_id: str, kind: str) -> Optional[Any]:
+    """Cached generated content for a scene, or None if not generated yet."""
+    client = get_redis_client()
+    if not client:
+        return None
+    try:
+        with redis_op("get"):
+            value = client.get(f"scene:{scene_id}:{kind}")
+        return None if value is None else json.loads(value)
+    except Exception as e:
+        logger.warning("Failed to load %s for scene %s: %s", kind, scene_id, e)
+        return None
+
+
+def save_scene_content(scene_id: str, kind: str, content: Any) -> None:
+    """Store generated content (JSON-serializable) for as long as scenes live."""
+    client = get_redis_client()
+    if not client:
+        return
+    try:
+        with redis_op("set"):
+            client.set(
+                f"scene:{scene_id}:{kind}",
+                json.dumps(content, ensure_ascii=False),
+                ex=SCENE_TTL_SECONDS,
+            )
+    except Exception as e:
+        logger.warning("Failed to store %s for scene %s: %s", kind, scene_id, e)
@@ -0,0 +1,53 @@
+"""
+services/stages.py
+─────────────────────────────────────────────────────────────────────────────
+Per-stage cost accounting for the ingest pipeline.
+
+    stats = {}
+    with track_stage(stats, "download") as stage:
+        ...
+        stage["bytes"] = os.path.getsize(path)
+
+    stats == {"download": {"bytes": ..., "wallSeconds": ..., "cpuSeconds": ...}}
+
+cpuSeconds = CPU of the calling thread + CPU of child processes (ffmpeg)
+reaped while the stage ran. Wall time is also exported to Prometheus as
+sutorii_stage_seconds{pipeline, stage} (see services/metrics.py).
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import time
+from contextlib import contextmanager
+
+from app.services.metrics import observe_stage, span
+
+try:
+    import resource
+except ImportError:  # Windows — child process CPU is not reported
+    resource = None
+
+
+def _children_cpu() -> float:
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+@contextmanager
+def track_stage(stats: dict, name: str, pipeline: str = "ingest"):
+    """Record wall time and CPU time of a pipeline stage into stats[name]."""
+    entry: dict = {}
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    children_start = _children_cpu()
+    try:
+        with span(f"{pipeline}.{name}"):
+            yield entry
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = (time.thread_time() - cpu_start) + (_children_cpu() - children_start)
+        entry["wallSeconds"] = round(wall, 3)
+        entry["cpuSeconds"] = round(cpu, 3)
+        stats[name] = entry
+        observe_stage(pipeline, name, wall)
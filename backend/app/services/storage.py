@@ -1,25 +1,548 @@
-from app.config.config import settings
-import uuid
+"""
+services/storage.py
+─────────────────────────────────────────────────────────────────────────────
+Audio upload to Supabase Storage — or a local directory for offline runs.
+
+- Objects are keyed by content hash: audio/{sha256[:32]}{ext}. Audio that
+  was uploaded before is skipped after an existence check.
+- upload_audio_async() returns the final storage path immediately and
+  transfers in a background pool, so the upload overlaps transcription/GPT.
+- Files above RESUMABLE_THRESHOLD_BYTES go through Supabase's TUS endpoint
+  in 6 MB chunks; a failed chunk resumes from the server's offset.
+- Every network operation retries with exponential backoff.
+- With a request deadline an upload stops between chunks once the request
+  is cancelled — unless another ingest has joined it and still needs it.
+- download_object() fetches a stored object back (pitch workers on other
+  nodes, services/task_queue.py).
+- upload_clips() stores a scene's per-line clips (clips/{hash}.webm) in
+  parallel — one upsert each, no existence round trip, since checking a
+  few-KB object costs as much as sending it.
+
+Backend selection (settings.STORAGE_BACKEND):
+    "supabase"  — default
+    "local"     — files under settings.LOCAL_STORAGE_DIR (benchmarks, offline)
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import base64
+import hashlib
+import logging
 import os
+import random
+import shutil
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+from app.config.config import settings
+from app.services.deadline import Deadline, RequestCancelled
+from app.services.metrics import external_call
+from app.services.stages import track_stage
+
+logger = logging.getLogger(__name__)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Constants
+# ─────────────────────────────────────────────────────────────────────────────
+
+# Content types for the artifacts audio.prepare_audio() can produce
+AUDIO_CONTENT_TYPES = {
+    ".m4a": "audio/mp4",
+    ".webm": "audio/webm",
+    ".ogg": "audio/ogg",
+    ".mp3": "audio/mpeg",
+    ".wav": "audio/wav",
+}
+
+HASH_CHUNK_BYTES = 1024 * 1024
+RESUMABLE_THRESHOLD_BYTES = 6 * 1024 * 1024
+RESUMABLE_CHUNK_BYTES = 6 * 1024 * 1024  # Supabase requires exactly 6 MB chunks
+
+UPLOAD_WORKERS = 4
+CLIP_UPLOAD_WORKERS = 8  # small objects — latency-bound, not bandwidth-bound
+CLIP_PREFIX = "clips"
+UPLOAD_MAX_ATTEMPTS = 4
+UPLOAD_BACKOFF_SECONDS = 0.5
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Backends
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+class SupabaseStorageBackend:
+    name = "supabase"
+
+    def __init__(self, client, bucket: str, url: str, key: str):
+        self._client = client
+        self._bucket = bucket
+        self._url = url.rstrip("/")
+        self._key = key
+
+    def exists(self, object_path: str) -> bool:
+        folder, _, name = object_path.rpartition("/")
+        entries = self._client.storage.from_(self._bucket).list(
+            folder, {"search": name, "limit": 1}
+        )
+        return any(e.get("name") == name for e in entries or [])
+
+    def upload(
+        self,
+        object_path: str,
+        file_path: str,
+        content_type: str,
+        checkpoint: Optional[Callable[[], None]] = None,
+    ) -> None:
+        if os.path.getsize(file_path) > RESUMABLE_THRESHOLD_BYTES:
+            self._upload_resumable(object_path, file_path, content_type, checkpoint)
+            return
+        with open(file_path, "rb") as f:
+            self._client.storage.from_(self._bucket).upload(
+                object_path, f, {"content-type": content_type, "upsert": "true"}
+            )
+
+    def download(self, object_path: str, file_path: str) -> None:
+        data = self._client.storage.from_(self._bucket).download(object_path)
+        with open(file_path, "wb") as f:
+            f.write(data)
+
+    def _upload_resumable(
+        self,
+        object_path: str,
+        file_path: str,
+        content_type: str,
+        checkpoint: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """
+        TUS upload: create once, PATCH 6 MB chunks. When a chunk fails the
+        server's Upload-Offset (HEAD) tells us where to resume.
+        checkpoint() runs before each chunk and raises to stop the upload.
+        """
+        import httpx
+
+        size = os.path.getsize(file_path)
+        headers = {
+            "Authorization": f"Bearer {self._key}",
+            "apikey": self._key,
+            "Tus-Resumable": "1.0.0",
+            "x-upsert": "true",
+        }
+        metadata = ",".join(
+            f"{k} {base64.b64encode(v.encode()).decode()}"
+            for k, v in {
+                "bucketName": self._bucket,
+                "objectName": object_path,
+                "contentType": content_type,
+            }.items()
+        )
+
+        with httpx.Client(timeout=60) as http:
+            create = _with_retries(
+                lambda: _raise_for_status(
+                    http.post(
+                        f"{self._url}/storage/v1/upload/resumable",
+                        headers={
+                            **headers,
+                            "Upload-Length": str(size),
+                            "Upload-Metadata": metadata,
+                        },
+                    )
+                ),
+                f"create resumable upload {object_path}",
+            )
+            location = create.headers["Location"]
+
+            def current_offset() -> int:
+                r = _raise_for_status(http.head(location, headers=headers))
+                return int(r.headers["Upload-Offset"])
+
+            offset = 0
+            failures = 0
+            with open(file_path, "rb") as f:
+                while offset < size:
+                    if checkpoint:
+                        checkpoint()
+                    f.seek(offset)
+                    chunk = f.read(RESUMABLE_CHUNK_BYTES)
+                    try:
+                        r = http.patch(
+                            location,
+                            headers={
+                                **headers,
+                                "Upload-Offset": str(offset),
+                                "Content-Type": "application/offset+octet-stream",
+                            },
+                            content=chunk,
+                        )
+                        # 409: offset mismatch, or another PATCH holds the
+                        # upload — back off and resume from the server's
+                        # offset like any other failed chunk
+                        _raise_for_status(r)
+                        offset = int(r.headers["Upload-Offset"])
+                        failures = 0
+                    except Exception as e:
+                        failures += 1
+                        if failures >= UPLOAD_MAX_ATTEMPTS:
+                            raise
+                        delay = _backoff_delay(failures)
+                        logger.warning(
+                            "Chunk @%d of %s failed: %s — resuming in %.1fs",
+                            offset,
+                            object_path,
+                            e,
+                            delay,
+                        )
+                        time.sleep(delay)
+                        # Resume from whatever the server has persisted
+                        offset = _with_retries(current_offset, "resume offset")
+
+
+class LocalStorageBackend:
+    """
+    Directory-backed stand-in with the same interface as the Supabase
+    backend. Optional latency / bandwidth make offline benchmarks realistic.
+    Partial uploads live in *.part files and are resumed, like TUS.
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        root: str,
+        latency_seconds: float = 0.0,
+        bandwidth_bytes_per_second: Optional[float] = None,
+    ):
+        self.root = root
+        self.latency_seconds = latency_seconds
+        self.bandwidth = bandwidth_bytes_per_second
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, object_path: str) -> str:
+        return os.path.join(self.root, *object_path.split("/"))
+
+    def exists(self, object_path: str) -> bool:
+        time.sleep(self.latency_seconds)
+        return os.path.exists(self._path(object_path))
+
+    def upload(
+        self,
+        object_path: str,
+        file_path: str,
+        content_type: str,
+        checkpoint: Optional[Callable[[], None]] = None,
+    ) -> None:
+        time.sleep(self.latency_seconds)
+        dest = self._path(object_path)
+        part = f"{dest}.part"
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        with open(file_path, "rb") as src, open(part, "ab") as out:
+            src.seek(offset)
+            while True:
+                if checkpoint:
+                    checkpoint()
+                chunk = src.read(RESUMABLE_CHUNK_BYTES)
+                if not chunk:
+                    break
+                if self.bandwidth:
+                    time.sleep(len(chunk) / self.bandwidth)
+                out.write(chunk)
+        os.replace(part, dest)
+
+    def download(self, object_path: str, file_path: str) -> None:
+        time.sleep(self.latency_seconds)
+        src = self._path(object_path)
+        if not os.path.exists(src):
+            raise FileNotFoundError(f"No object at {object_path}")
+        if self.bandwidth:
+            time.sleep(os.path.getsize(src) / self.bandwidth)
+        shutil.copyfile(src, file_path)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if settings.STORAGE_BACKEND == "local":
+                _backend = LocalStorageBackend(settings.LOCAL_STORAGE_DIR)
+            else:
+                supabase = settings.supabase
+                if not supabase:
+                    raise RuntimeError(
+                        "Supabase client not initialized. Check your config."
+                    )
+                _backend = SupabaseStorageBackend(
+                    supabase,
+                    settings.SUPABASE_BUCKET,
+                    settings.SUPABASE_URL,
+                    settings.SUPABASE_SERVICE_ROLE_KEY,
+                )
+        return _backend
+
+
+def set_backend(backend) -> None:
+    """Swap the storage backend (benchmarks / offline runs)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+    _known_objects.clear()
+
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Public API
+# ─────────────────────────────────────────────────────────────────────────────
 
-def upload_audio(file_path: str) -> str:
-    supabase = settings.supabase
-    if not supabase:
-        raise RuntimeError("Supabase client not initialized. Check your config.")
+_executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="upload")
+_clip_executor = ThreadPoolExecutor(
+    max_workers=CLIP_UPLOAD_WORKERS, thread_name_prefix="clip-upload"
+)
 
+# Objects known to exist — skips the existence round trip on repeats
+_known_objects: set = set()
+
+# Uploads in progress, so concurrent ingests of the same audio share one
+_inflight: dict = {}
+# ...and those another ingest has joined: no longer cancelled with their starter
+_shared_uploads: set = set()
+_inflight_lock = threading.Lock()
+
+
+def content_key(file_path: str, prefix: str = "audio") -> str:
+    """Storage path derived from the file's SHA-256: audio/{hash}{ext}."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    ext = os.path.splitext(file_path)[1].lower()
+    return f"{prefix}/{digest.hexdigest()[:32]}{ext}"
+
+
+def upload_audio(file_path: str, deadline: Optional[Deadline] = None) -> str:
+    """Upload (or skip, if already stored) and block until done."""
+    storage_path, future = upload_audio_async(file_path, deadline=deadline)
+    if deadline is None:
+        future.result()
+    else:
+        deadline.wait(future, abort=False)
+    return storage_path
+
+
+def upload_audio_async(
+    file_path: str,
+    stats: Optional[dict] = None,
+    deadline: Optional[Deadline] = None,
+) -> Tuple[str, Future]:
+    """
+    Start an upload in the background and return (storage_path, future)
+    right away. The future resolves to
+        { "storagePath": str, "bytes": int, "skipped": bool }
+    and raises RuntimeError on failure.
+
+    stats — if given, stats["upload"] receives the stage timings (for a
+    caller that joins an upload already running: skipped, shared, 0 s).
+    deadline — once the request is cancelled the upload stops before its
+    next chunk and the future raises RequestCancelled.
+    file_path must stay on disk until the future is done.
+    """
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"Audio file not found: {file_path}")
 
-    file_name = f"audio/{uuid.uuid4()}.mp3"
+    storage_path = content_key(file_path)
 
-    try:
-        with open(file_path, "rb") as f:
-            supabase.storage.from_(settings.SUPABASE_BUCKET).upload(
-                file_name, f, {"content-type": "audio/mpeg"}
+    with _inflight_lock:
+        future = _inflight.get(storage_path)
+        started = future is None
+        if started:
+            future = _executor.submit(
+                _upload, file_path, storage_path, stats, deadline or Deadline()
             )
-        print("✅ Audio uploaded to Supabase successfully.")
+            _inflight[storage_path] = future
+        else:
+            _shared_uploads.add(storage_path)
+
+    if started:
+        # Outside the lock: an already finished future runs the callback
+        # right here, and _forget_inflight takes the lock itself
+        future.add_done_callback(lambda done: _forget_inflight(storage_path, done))
+    elif stats is not None:
+        # Joined another ingest's upload — nothing transferred by this one
+        stats["upload"] = {
+            "bytes": 0,
+            "skipped": True,
+            "shared": True,
+            "wallSeconds": 0.0,
+            "cpuSeconds": 0.0,
+        }
+
+    return storage_path, future
+
+
+def upload_clips(
+    file_paths: List[str],
+    stats: Optional[dict] = None,
+    deadline: Optional[Deadline] = None,
+) -> List[str]:
+    """
+    Upload per-line clips in parallel and block until all are stored.
+    Returns their storage paths (clips/{hash}.webm), in order; clips stored
+    before by this process are skipped. Raises RuntimeError if any fails
+    (the rest are cancelled) and RequestCancelled once the request is.
+
+    stats — if given, stats["clipUpload"] receives the stage timings.
+    """
+    deadline = deadline or Deadline()
+    storage_paths = [content_key(path, prefix=CLIP_PREFIX) for path in file_paths]
+
+    with track_stage(stats if stats is not None else {}, "clipUpload") as stage:
+        stage["clips"] = len(file_paths)
+        stage["bytes"] = sum(os.path.getsize(path) for path in file_paths)
+        futures = [
+            _clip_executor.submit(_upload_clip, file_path, storage_path, deadline)
+            for file_path, storage_path in zip(file_paths, storage_paths)
+        ]
+        try:
+            for future in futures:
+                deadline.wait(future)
+        finally:
+            for future in futures:
+                future.cancel()
+
+    return storage_paths
+
+
+def download_object(storage_path: str, file_path: str) -> str:
+    """Fetch a stored object (e.g. audio/{hash}.webm) to file_path; returns it."""
+    backend = get_backend()
+    try:
+        _with_retries(
+            lambda: _call_backend(backend, "download", storage_path, file_path),
+            f"download {storage_path}",
+        )
+    except Exception as e:
+        raise RuntimeError(f"Failed to download {storage_path}: {str(e)}") from e
+    return file_path
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Internal
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _upload(
+    file_path: str, storage_path: str, stats: Optional[dict], deadline: Deadline
+) -> dict:
+    stage_stats = stats if stats is not None else {}
+    backend = get_backend()
+    size = os.path.getsize(file_path)
+
+    def checkpoint() -> None:
+        if storage_path not in _shared_uploads:
+            deadline.check()
+
+    checkpoint()  # cancelled while queued for an upload worker
+
+    with track_stage(stage_stats, "upload") as stage:
+        stage["bytes"] = size
+        stage["skipped"] = False
+        try:
+            if storage_path in _known_objects or _with_retries(
+                lambda: _call_backend(backend, "exists", storage_path),
+                f"exists {storage_path}",
+            ):
+                stage["skipped"] = True
+                stage["bytes"] = 0
+                print(f"♻️  Audio already in storage — skipped upload: {storage_path}")
+            else:
+                ext = os.path.splitext(file_path)[1].lower()
+                content_type = AUDIO_CONTENT_TYPES.get(ext, "application/octet-stream")
+                _with_retries(
+                    lambda: _call_backend(
+                        backend,
+                        "upload",
+                        storage_path,
+                        file_path,
+                        content_type,
+                        checkpoint,
+                    ),
+                    f"upload {storage_path}",
+                )
+                print(f"✅ Audio uploaded to {backend.name} storage successfully.")
+        except RequestCancelled:
+            print(f"🛑 Upload of {storage_path} stopped — request cancelled.")
+            raise
+        except Exception as e:
+            raise RuntimeError(f"Failed to upload audio to storage: {str(e)}") from e
+
+    _known_objects.add(storage_path)
+    return {"storagePath": storage_path, "bytes": size, "skipped": stage["skipped"]}
+
+
+def _upload_clip(file_path: str, storage_path: str, deadline: Deadline) -> None:
+    deadline.check()
+    if storage_path in _known_objects:
+        return
+    backend = get_backend()
+    content_type = AUDIO_CONTENT_TYPES.get(
+        os.path.splitext(file_path)[1].lower(), "application/octet-stream"
+    )
+    try:
+        _with_retries(
+            lambda: _call_backend(
+                backend, "upload", storage_path, file_path, content_type, deadline.check
+            ),
+            f"upload {storage_path}",
+        )
+    except RequestCancelled:
+        raise
     except Exception as e:
-        raise RuntimeError(f"Failed to upload audio to Supabase: {str(e)}") from e
+        raise RuntimeError(f"Failed to upload clip to storage: {str(e)}") from e
+    _known_objects.add(storage_path)
+
+
+def _call_backend(backend, method: str, *args):
+    with external_call("storage", backend.name):
+        return getattr(backend, method)(*args)
+
+
+def _with_retries(fn, what: str):
+    """Call fn(), retrying with exponential backoff + jitter."""
+    for attempt in range(1, UPLOAD_MAX_ATTEMPTS + 1):
+        try:
+            return fn()
+        except RequestCancelled:
+            raise
+        except Exception as e:
+            if attempt == UPLOAD_MAX_ATTEMPTS:
+                raise
+            delay = _backoff_delay(attempt)
+            logger.warning(
+                "Storage %s failed (attempt %d/%d): %s — retrying in %.1fs",
+                what,
+                attempt,
+                UPLOAD_MAX_ATTEMPTS,
+                e,
+                delay,
+            )
+            time.sleep(delay)
+
+
+def _backoff_delay(attempt: int) -> float:
+    return UPLOAD_BACKOFF_SECONDS * (2 ** (attempt - 1)) * (0.5 + random.random())
+
+
+def _raise_for_status(response):
+    response.raise_for_status()
+    return response
+
 
-    return file_name
+def _forget_inflight(storage_path: str, future: Future) -> None:
+    with _inflight_lock:
+        if _inflight.get(storage_path) is future:
+            _inflight.pop(storage_path)
+            _shared_uploads.discard(storage_path)
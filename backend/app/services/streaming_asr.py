@@ -0,0 +1,137 @@
+"""
+services/streaming_asr.py
+─────────────────────────────────────────────────────────────────────────────
+Speech recognition for live audio (realtime shadowing, /ws/evaluate).
+
+A recognizer is asked for the transcript of the utterance so far, again
+and again while the learner speaks (partials, when its `partials` flag is
+set), then once more at the end. Lines are a few seconds long, so
+re-decoding the whole utterance keeps every partial consistent with the
+final result.
+
+Backends (settings.STREAMING_ASR_BACKEND):
+    local  — faster-whisper on CPU (optional dependency; whisperx brings it).
+             No network, so partials are cheap; model STREAMING_ASR_MODEL.
+    remote — services/whisper.transcribe_async() (WhisperX / OpenAI Whisper,
+             mock when AI is off). Final transcript only: each partial
+             would be a full ASR request against the Whisper rate limit.
+    auto   — local when faster-whisper is installed, otherwise remote.
+
+Tests and benchmarks can pass any object with the same async transcribe()
+to the shadowing session instead.
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import asyncio
+import logging
+import os
+import tempfile
+import threading
+import wave
+
+import numpy as np
+
+from app.config.config import settings
+from app.services.audio import PCM_SAMPLE_RATE
+from app.services.whisper import transcribe_async
+
+try:
+    from faster_whisper import WhisperModel
+except ImportError:  # optional — remote backend is used instead
+    WhisperModel = None
+
+logger = logging.getLogger(__name__)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Constants
+# ─────────────────────────────────────────────────────────────────────────────
+
+STREAMING_BACKENDS = ("auto", "local", "remote")
+
+_model_lock = threading.Lock()
+_model = None
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Public API
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+class LocalRecognizer:
+    """faster-whisper on CPU; decoding runs in a worker thread."""
+
+    name = "local"
+    partials = True
+
+    def __init__(self, language: str = "ja"):
+        self.language = language
+
+    async def transcribe(self, samples: np.ndarray, final: bool = False) -> str:
+        return await asyncio.to_thread(self._decode, samples, final)
+
+    def _decode(self, samples: np.ndarray, final: bool) -> str:
+        segments, _ = _local_model().transcribe(
+            np.asarray(samples, dtype=np.float32),
+            language=self.language,
+            beam_size=5 if final else 1,  # partials favour latency
+            vad_filter=False,  # the session's VAD already trimmed it
+            condition_on_previous_text=False,
+        )
+        return "".join(segment.text for segment in segments).strip()
+
+
+class RemoteRecognizer:
+    """The batch ASR path (transcribe_async) on a WAV of the utterance."""
+
+    name = "remote"
+    # A partial every PARTIAL_INTERVAL_SECONDS would use up the per-minute
+    # Whisper limit before the final transcript is requested
+    partials = False
+
+    async def transcribe(self, samples: np.ndarray, final: bool = False) -> str:
+        fd, path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            write_wav(path, samples)
+            result = await transcribe_async(path)
+            return result["text"]
+        finally:
+            os.unlink(path)
+
+
+def create_recognizer(backend: str = None, language: str = "ja"):
+    backend = (backend or settings.STREAMING_ASR_BACKEND).lower()
+    if backend not in STREAMING_BACKENDS:
+        raise ValueError(f"Unknown streaming ASR backend: {backend}")
+    if backend == "local" and WhisperModel is None:
+        raise RuntimeError("faster-whisper is not installed — local ASR unavailable")
+    if backend == "local" or (backend == "auto" and WhisperModel is not None):
+        return LocalRecognizer(language)
+    return RemoteRecognizer()
+
+
+def write_wav(path: str, samples: np.ndarray, sr: int = PCM_SAMPLE_RATE) -> None:
+    """Float samples in [-1, 1] → 16-bit mono WAV."""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sr)
+        f.writeframes(pcm.tobytes())
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Internal
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _local_model():
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                logger.info("Loading faster-whisper %s (CPU)", settings.STREAMING_ASR_MODEL)
+                _model = WhisperModel(
+                    settings.STREAMING_ASR_MODEL, device="cpu", compute_type="int8"
+                )
+    return _model
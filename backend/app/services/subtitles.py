@@ -5,36 +5,57 @@ Attempts to fetch subtitles from a YouTube URL using yt-dlp.
 Returns parsed segments compatible with the Whisper segment format,
 so the rest of the pipeline (GPT refinement) works unchanged.
 
+Parses json3 (preferred — real word timings), VTT and SRT in a single
+streaming pass. Auto-generated captions are de-duplicated: YouTube's
+rolling two-line windows repeat every phrase 2-3 times.
+
 Priority order:
     1. Manual subtitles  (most accurate)
     2. Auto-generated    (YouTube ASR — faster than Whisper, noisier)
     3. None              (caller falls back to Whisper)
+
+For clip ingests, cues are cut to the clip window and re-timed so 0.0 is
+the clip start — the same timeline as the clipped audio.
 ─────────────────────────────────────────────────────────────────────────────
 """
 
+import copy
+import json
 import logging
 import os
 import re
 import tempfile
-from typing import Optional
+from typing import Optional, Tuple
 
-import yt_dlp
 
 logger = logging.getLogger(__name__)
 
 # Languages to look for, in priority order
 PREFERRED_LANGS = ["ja", "en"]
 
+# Formats requested from yt-dlp, in preference order. json3 carries per-word
+# offsets for YouTube auto captions; vtt carries inline word timestamps.
+SUBTITLE_FORMATS = ["json3", "vtt", "srt"]
+SUBTITLE_EXTENSIONS = tuple(f".{fmt}" for fmt in SUBTITLE_FORMATS)
+
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Public API
 # ─────────────────────────────────────────────────────────────────────────────
 
 
-def fetch_subtitle_segments(youtube_url: str) -> Optional[dict]:
+def fetch_subtitle_segments(
+    youtube_url: str,
+    info: Optional[dict] = None,
+    window: Optional[Tuple[float, float]] = None,
+) -> Optional[dict]:
     """
     Try to fetch subtitles for a YouTube URL.
 
+    info:   result of audio.fetch_video_info() — skips the metadata request.
+    window: (start, end) seconds of a clip — only cues inside it are kept,
+            shifted so the clip starts at 0.0.
+
     Returns a Whisper-compatible dict:
         {
             "text": "...",
@@ -53,6 +74,8 @@ def fetch_subtitle_segments(youtube_url: str) -> Optional[dict]:
             youtube_url=youtube_url,
             tmp_dir=tmp_dir,
             auto=False,
+            info=info,
+            window=window,
         )
         if result:
             logger.info("✅ [SUBTITLES] Manual subtitles found.")
@@ -63,6 +86,8 @@ def fetch_subtitle_segments(youtube_url: str) -> Optional[dict]:
             youtube_url=youtube_url,
             tmp_dir=tmp_dir,
             auto=True,
+            info=info,
+            window=window,
         )
         if result:
             logger.info("✅ [SUBTITLES] Auto-generated subtitles found.")
@@ -87,7 +112,13 @@ def fetch_subtitle_segments(youtube_url: str) -> Optional[dict]:
 # ─────────────────────────────────────────────────────────────────────────────
 
 
-def _try_fetch(youtube_url: str, tmp_dir: str, auto: bool) -> Optional[dict]:
+def _try_fetch(
+    youtube_url: str,
+    tmp_dir: str,
+    auto: bool,
+    info: Optional[dict] = None,
+    window: Optional[Tuple[float, float]] = None,
+) -> Optional[dict]:
     """
     Attempt to download subtitles (manual or auto) using yt-dlp.
     Returns parsed segment dict or None.
@@ -97,15 +128,20 @@ def _try_fetch(youtube_url: str, tmp_dir: str, auto: bool) -> Optional[dict]:
         "writesubtitles": not auto,
         "writeautomaticsub": auto,
         "subtitleslangs": PREFERRED_LANGS,
-        "subtitlesformat": "srt",
+        "subtitlesformat": "/".join(SUBTITLE_FORMATS + ["best"]),
         "outtmpl": os.path.join(tmp_dir, "subtitle.%(ext)s"),
         "quiet": True,
         "no_warnings": True,
     }
 
+    import yt_dlp
+
     try:
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(youtube_url, download=True)
+            if info is not None:
+                ydl.process_ie_result(copy.deepcopy(info), download=True)
+            else:
+                ydl.extract_info(youtube_url, download=True)
     except Exception as e:
         if "429" in str(e):
             logger.warning(
@@ -115,16 +151,18 @@ def _try_fetch(youtube_url: str, tmp_dir: str, auto: bool) -> Optional[dict]:
             logger.warning("yt-dlp subtitle fetch failed: %s", e)
         return None
 
-    # Find the downloaded .srt file
-    srt_path = _find_srt(tmp_dir)
-    if not srt_path:
+    # Find the downloaded subtitle file (json3 / vtt / srt)
+    subtitle_path = _find_subtitle_file(tmp_dir)
+    if not subtitle_path:
         return None
 
-    # Detect language from filename (e.g. subtitle.ja.srt)
-    detected_lang = _detect_lang_from_filename(srt_path)
+    # Detect language from filename (e.g. subtitle.ja.json3)
+    detected_lang = _detect_lang_from_filename(subtitle_path)
 
-    # Parse the SRT into segments
-    segments = _parse_srt(srt_path)
+    # Auto captions roll: every phrase is repeated across 2-3 cues.
+    segments = parse_subtitle_file(subtitle_path, merge_rolling=auto)
+    if window:
+        segments = clip_segments(segments, *window)
     if not segments:
         return None
 
@@ -141,34 +179,135 @@ def _try_fetch(youtube_url: str, tmp_dir: str, auto: bool) -> Optional[dict]:
     }
 
 
-def _find_srt(directory: str) -> Optional[str]:
-    """Find the first .srt file in the directory, preferring 'ja'."""
-    files = os.listdir(directory)
-    srt_files = [f for f in files if f.endswith(".srt")]
+def _find_subtitle_file(directory: str) -> Optional[str]:
+    """
+    Find the best subtitle file in the directory.
+    Prefers 'ja' over other languages, then json3 > vtt > srt.
+    """
+    files = [f for f in os.listdir(directory) if f.endswith(SUBTITLE_EXTENSIONS)]
 
-    if not srt_files:
+    if not files:
         return None
 
-    # Prefer Japanese subtitle file
-    for lang in PREFERRED_LANGS:
-        for f in srt_files:
-            if f".{lang}." in f:
-                return os.path.join(directory, f)
+    def rank(name: str):
+        lang = _detect_lang_from_filename(name)
+        lang_rank = (
+            PREFERRED_LANGS.index(lang)
+            if lang in PREFERRED_LANGS
+            else len(PREFERRED_LANGS)
+        )
+        ext = os.path.splitext(name)[1]
+        return lang_rank, SUBTITLE_EXTENSIONS.index(ext), name
 
-    # Return first available
-    return os.path.join(directory, srt_files[0])
+    return os.path.join(directory, min(files, key=rank))
 
 
 def _detect_lang_from_filename(path: str) -> Optional[str]:
     """
-    Extract language code from filename like 'subtitle.ja.srt'.
-    Returns e.g. 'ja', 'en', or None.
+    Extract language code from filename like 'subtitle.ja.srt' or
+    'subtitle.en-US.vtt'. Returns e.g. 'ja', 'en', or None.
     """
     basename = os.path.basename(path)
-    match = re.search(r"\.([a-z]{2})\.srt$", basename)
+    match = _LANG_FILENAME_RE.search(basename)
     return match.group(1) if match else None
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Parsing
+# ─────────────────────────────────────────────────────────────────────────────
+
+_LANG_FILENAME_RE = re.compile(r"\.([a-z]{2})(?:-[\w-]+)?\.(?:json3|vtt|srt)$")
+
+# '00:00:02,000 --> 00:00:04,000' (SRT) or '00:02.000 --> 00:04.000 align:start'
+# (VTT — hours optional, cue settings allowed after the end time)
+_TIMESTAMP_RE = re.compile(
+    r"(?:(\d+):)?(\d{2}):(\d{2})[,.](\d{3})\s*-->\s*(?:(\d+):)?(\d{2}):(\d{2})[,.](\d{3})"
+)
+
+# One cue: a timing line, then its text — every line up to a truly empty
+# one (YouTube VTT uses " " as a placeholder for the empty top line of its
+# rolling window)
+_CUE_RE = re.compile(
+    r"(?:^|\n)[ \t]*" + _TIMESTAMP_RE.pattern + r"[^\n]*\n?((?:[^\n]+\n?)*)"
+)
+# The same for timing lines in the fixed 'HH:MM:SS,mmm --> HH:MM:SS,mmm'
+# form (SRT, YouTube VTT) — no optional parts, so the regex engine scans
+# for it much faster
+_SRT_CUE_RE = re.compile(
+    r"(\d\d):(\d\d):(\d\d)[,.](\d\d\d) --> (\d\d):(\d\d):(\d\d)[,.](\d\d\d)[^\n]*\n"
+    r"((?:[^\n]+\n?)*)"
+)
+
+# Inline VTT word timestamp: <00:00:01.500>
+_INLINE_TIMESTAMP_RE = re.compile(r"<(?:(\d+):)?(\d{2}):(\d{2})[.,](\d{3})>")
+
+_TAG_RE = re.compile(r"<[^>]+>")
+
+# SRT / VTT text read per chunk (characters)
+READ_CHUNK_CHARS = 1 << 20
+
+
+def parse_subtitle_file(file_path: str, merge_rolling: bool = False) -> list:
+    """
+    Parse an SRT, VTT or YouTube json3 file into Whisper-compatible segments:
+        { speaker, text, start, end, words: [{ word, start, end }] }
+
+    Word timings are filled where the format provides them (json3 segs,
+    VTT inline timestamps); SRT segments have words=[].
+
+    merge_rolling=True collapses the overlapping "rolling" cues YouTube
+    emits for auto captions into clean, non-repeating segments.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == ".json3":
+        return _collect(_iter_json3_cues(file_path), merge_rolling)
+
+    # SRT and VTT share one streaming parser: both are blank-line separated
+    # blocks keyed on a '-->' timestamp line.
+    try:
+        return _collect(_iter_text_cues(file_path), merge_rolling)
+    except UnicodeDecodeError:
+        # Some SRT files use different encoding
+        return _collect(_iter_text_cues(file_path, "latin-1"), merge_rolling)
+
+
+def clip_segments(segments: list, start: float, end: float) -> list:
+    """
+    Keep the segments overlapping [start, end) and re-time them (and their
+    words) relative to start, clamped to the clip. A cue straddling the
+    edge keeps its full text; only its words outside the clip are dropped.
+    """
+    length = end - start
+    clipped = []
+    for segment in segments:
+        if segment["end"] <= start or segment["start"] >= end:
+            continue
+        words = [
+            {
+                **w,
+                "start": round(max(w["start"] - start, 0.0), 3),
+                "end": round(min(w["end"] - start, length), 3),
+            }
+            for w in segment.get("words", [])
+            if w["end"] > start and w["start"] < end
+        ]
+        clipped.append(
+            {
+                **segment,
+                "start": round(max(segment["start"] - start, 0.0), 3),
+                "end": round(min(segment["end"] - start, length), 3),
+                "words": words,
+            }
+        )
+    return clipped
+
+
+def _collect(cues, merge_rolling: bool) -> list:
+    if merge_rolling:
+        cues = _merge_rolling_cues(cues)
+    return [_to_segment(cue) for cue in cues]
+
+
 def _parse_srt(file_path: str) -> list:
     """
     Parse an SRT file into Whisper-compatible segment dicts.
@@ -179,53 +318,373 @@ def _parse_srt(file_path: str) -> list:
         00:00:02,000 --> 00:00:04,000
         元気ですか？
     """
-    segments = []
+    return parse_subtitle_file(file_path)
 
-    try:
-        with open(file_path, "r", encoding="utf-8-sig") as f:
-            content = f.read()
-    except UnicodeDecodeError:
-        # Some SRT files use different encoding
-        with open(file_path, "r", encoding="latin-1") as f:
-            content = f.read()
 
-    # Split into blocks by double newline
-    blocks = re.split(r"\n\n+", content.strip())
+def _iter_text_cues(file_path: str, encoding: str = "utf-8-sig"):
+    """
+    Single pass over SRT / VTT cues, streamed from disk.
 
-    for block in blocks:
-        lines = block.strip().splitlines()
-        if len(lines) < 3:
+    Text is read READ_CHUNK_CHARS at a time, cut back to its last blank
+    line, and one findall() picks out every cue of the chunk in C — SRT
+    indices, the WEBVTT header, cue identifiers and NOTE / STYLE blocks
+    never reach Python. A cue whose text runs into another timing line
+    (no blank line between them) is split by _split_cues.
+    """
+    with open(file_path, "r", encoding=encoding) as f:
+        rest = ""
+        while True:
+            chunk = f.read(READ_CHUNK_CHARS)
+            if not chunk:
+                break
+            text = rest + chunk
+            cut = text.rfind("\n\n") + 1  # a cue may continue in the next chunk
+            if not cut:
+                rest = text
+                continue
+            rest = text[cut:]
+            yield from _chunk_cues(text[:cut])
+        if rest:
+            yield from _chunk_cues(rest)
+
+
+def _chunk_cues(text: str):
+    cues = _SRT_CUE_RE.findall(text)
+    if len(cues) != text.count("-->"):
+        # Not every timing line is in the fixed form (or one is missing its
+        # blank line) — the general pattern is ~2x slower
+        for h1, m1, s1, ms1, h2, m2, s2, ms2, body in _CUE_RE.findall(text):
+            start = _to_seconds(h1, m1, s1, ms1)
+            end = _to_seconds(h2, m2, s2, ms2)
+            if "-->" in body:
+                yield from _split_cues(start, end, body.split("\n"))
+                continue
+            cue = _build_text_cue(start, end, _text_lines(body))
+            if cue:
+                yield cue
+        return
+
+    # Fixed form: every field is present, so convert inline — per cue,
+    # Python-level calls cost more than the regex does
+    for h1, m1, s1, ms1, h2, m2, s2, ms2, body in cues:
+        start = ((int(h1) * 3600 + int(m1) * 60 + int(s1)) * 1000 + int(ms1)) / 1000
+        end = ((int(h2) * 3600 + int(m2) * 60 + int(s2)) * 1000 + int(ms2)) / 1000
+        text = body.strip()
+        if "\n" in text:
+            if "-->" in text:
+                yield from _split_cues(start, end, body.split("\n"))
+                continue
+            text = " ".join(_text_lines(text))
+        if "<" in text:
+            if _INLINE_TIMESTAMP_RE.search(text):
+                cue = _build_stamped_cue(start, end, _text_lines(body))
+                if cue:
+                    yield cue
+                continue
+            text = _TAG_RE.sub("", text).strip()
+        if text:
+            yield _text_cue(start, end, text)
+
+
+def _text_lines(body: str) -> list:
+    return [line for line in map(str.strip, body.split("\n")) if line]
+
+
+def _split_cues(start: float, end: float, lines: list):
+    """
+    Cue text that runs into further timing lines (a blank line is missing).
+    An all-digit line right before a timing line is the next cue's SRT
+    index, not text.
+    """
+    text_lines: list = []
+    for i, line in enumerate(lines):
+        line = line.strip()
+        match = _TIMESTAMP_RE.match(line) if "-->" in line else None
+        if match is None:
+            if line:
+                text_lines.append(line)
             continue
+        index = lines[i - 1].strip() if i else ""
+        if index.isdigit() and text_lines and text_lines[-1] == index:
+            text_lines.pop()
+        cue = _build_text_cue(start, end, text_lines)
+        if cue:
+            yield cue
+        h1, m1, s1, ms1, h2, m2, s2, ms2 = match.groups()
+        start = _to_seconds(h1, m1, s1, ms1)
+        end = _to_seconds(h2, m2, s2, ms2)
+        text_lines = []
+
+    cue = _build_text_cue(start, end, text_lines)
+    if cue:
+        yield cue
+
+
+def _build_text_cue(start: float, end: float, text_lines: list) -> Optional[dict]:
+    """
+    Join a cue's lines and strip markup (<i>, <c>, ...). Cues carrying VTT
+    inline timestamps go through _build_stamped_cue for word timings.
+    """
+    text = " ".join(text_lines)
+    if "<" in text:
+        if _INLINE_TIMESTAMP_RE.search(text):
+            return _build_stamped_cue(start, end, text_lines)
+        text = _TAG_RE.sub("", text).strip()
+    if not text:
+        return None
+    return _text_cue(start, end, text)
 
-        # Line 0: index (ignore)
-        # Line 1: timestamps
-        # Line 2+: text
 
-        timestamp_line = lines[1]
-        text_lines = lines[2:]
+def _text_cue(start: float, end: float, text: str) -> dict:
+    # Cues are built in segment shape: one without word timings passes
+    # through _to_segment as-is
+    return {
+        "speaker": "SPEAKER_00",  # unknown at this stage
+        "text": text,
+        "start": start,
+        "end": end,
+        "words": [],
+    }
+
 
-        start, end = _parse_timestamp_line(timestamp_line)
-        if start is None:
+def _build_stamped_cue(start: float, end: float, text_lines: list) -> Optional[dict]:
+    """
+    Turn VTT inline timestamps into word timings. Each word keeps its
+    character offset in the cue text so rolling-caption merging can drop
+    repeated words.
+    """
+    parts: list = []
+    words: list = []
+    pos = 0
+
+    for line in text_lines:
+        if parts:
+            parts.append(" ")
+            pos += 1
+
+        if "<" not in line:
+            parts.append(line)
+            pos += len(line)
             continue
 
-        # Join multi-line subtitles, strip HTML tags (e.g. <i>...</i>)
-        raw_text = " ".join(text_lines)
-        clean_text = re.sub(r"<[^>]+>", "", raw_text).strip()
+        # pieces = [text, h, m, s, ms, text, h, m, s, ms, text, ...]
+        pieces = _INLINE_TIMESTAMP_RE.split(line)
+        stamped = len(pieces) > 1
+        word_start = start
+        for i in range(0, len(pieces), 5):
+            if i:
+                word_start = _to_seconds(*pieces[i - 4 : i])
+            piece = _TAG_RE.sub("", pieces[i])
+            if stamped:
+                word = piece.strip()
+                if word:
+                    lead = len(piece) - len(piece.lstrip())
+                    words.append(
+                        {"word": word, "start": word_start, "offset": pos + lead}
+                    )
+            parts.append(piece)
+            pos += len(piece)
+
+    raw_text = "".join(parts)
+    text = raw_text.strip()
+    if not text:
+        return None
+
+    lead = len(raw_text) - len(raw_text.lstrip())
+    if lead:
+        for w in words:
+            w["offset"] -= lead
+
+    _fill_word_ends(words, end)
+    return dict(_text_cue(start, end, text), words=words)
+
+
+def _iter_json3_cues(file_path: str):
+    """
+    Parse YouTube's json3 timed-text format.
+
+        { "events": [ { "tStartMs": 0, "dDurationMs": 2000,
+                        "segs": [ { "utf8": "元気", "tOffsetMs": 0 },
+                                  { "utf8": "ですか", "tOffsetMs": 640 } ] } ] }
+
+    Auto captions carry one seg per word with its own offset; manual
+    captions carry a single seg per event (no word timings).
+    """
+    with open(file_path, "r", encoding="utf-8-sig") as f:
+        data = json.load(f)
+
+    for event in data.get("events", []):
+        segs = event.get("segs")
+        if not segs:
+            continue  # window / style definitions
+
+        start_ms = event.get("tStartMs", 0)
+        start = round(start_ms / 1000, 3)
+        end = round((start_ms + event.get("dDurationMs", 0)) / 1000, 3)
+
+        parts: list = []
+        words: list = []
+        pos = 0
+        stamped = len(segs) > 1 or "tOffsetMs" in segs[0]
+
+        for seg in segs:
+            piece = seg.get("utf8", "").replace("\n", " ")
+            if stamped:
+                word = piece.strip()
+                if word:
+                    lead = len(piece) - len(piece.lstrip())
+                    words.append(
+                        {
+                            "word": word,
+                            "start": round(
+                                (start_ms + seg.get("tOffsetMs", 0)) / 1000, 3
+                            ),
+                            "offset": pos + lead,
+                        }
+                    )
+            parts.append(piece)
+            pos += len(piece)
+
+        raw_text = _TAG_RE.sub("", "".join(parts)) if not words else "".join(parts)
+        text = raw_text.strip()
+        if not text:
+            continue  # '\n' append events
+
+        lead = len(raw_text) - len(raw_text.lstrip())
+        if lead:
+            for w in words:
+                w["offset"] -= lead
+
+        _fill_word_ends(words, end)
+        yield dict(_text_cue(start, end, text), words=words)
+
+
+def _merge_rolling_cues(cues):
+    """
+    Collapse YouTube auto-caption rolling windows.
+
+    Auto captions display two lines at a time and scroll: each cue repeats
+    the tail of the previous one (and VTT adds ~10ms snapshot cues that
+    repeat it verbatim). For each cue we find the longest prefix that
+    repeats the end of the previous cue and keep only the new remainder:
+
+        prev: "こんにちは 元気ですか"
+        cue:  "元気ですか はい元気です"   →  emits "はい元気です"
 
-        if not clean_text:
+    Overlaps must land on a word/line boundary so a single shared character
+    is never treated as a repeat.
+    """
+    last = None  # segment being built (remainder text only)
+    prev_text = ""  # full text of the previous raw cue
+
+    for cue in cues:
+        text = cue["text"]
+
+        if last is None:
+            last = cue
+            prev_text = text
             continue
 
-        segments.append(
-            {
-                "speaker": "SPEAKER_00",  # unknown at this stage
-                "text": clean_text,
-                "start": start,
-                "end": end,
-                "words": [],  # no word-level timing from SRT
-            }
+        # Repeat (VTT snapshot cue, or only the last line still shown)
+        # → just extend the current segment
+        if text == prev_text or (
+            prev_text.endswith(text) and prev_text[-len(text) - 1] == " "
+        ):
+            last["end"] = max(last["end"], cue["end"])
+            continue
+
+        if text.startswith(prev_text):
+            k = len(prev_text)
+            if text[k] != " ":
+                # Growing line: the cue extends the previous text mid-word
+                _append_remainder(last, cue, k)
+                prev_text = text
+                continue
+        else:
+            k = _rolling_overlap(prev_text, text)
+
+        # Rolling captions overlap in time; the next phrase starts the cut
+        if last["start"] < cue["start"] < last["end"]:
+            last["end"] = cue["start"]
+            for w in last["words"]:
+                if w["end"] > last["end"]:
+                    w["end"] = max(w["start"], last["end"])
+        yield last
+
+        if k and cue["words"]:
+            last = _text_cue(cue["start"], cue["end"], "")
+            _append_remainder(last, cue, k)
+        elif k:
+            last = _text_cue(cue["start"], cue["end"], text[k:].lstrip())
+        else:
+            last = cue
+        prev_text = text
+
+    if last is not None:
+        yield last
+
+
+def _append_remainder(segment: dict, cue: dict, k: int) -> None:
+    """Append the cue's text (and words) after character offset k to segment."""
+    segment["end"] = max(segment["end"], cue["end"])
+    remainder = cue["text"][k:]
+    if not remainder.strip():
+        return
+
+    shift = len(segment["text"]) - k
+    if not segment["text"]:
+        stripped = len(remainder) - len(remainder.lstrip())
+        remainder = remainder[stripped:]
+        shift -= stripped
+
+    segment["text"] += remainder
+    if cue["words"]:
+        segment["words"].extend(
+            dict(w, offset=w["offset"] + shift)
+            for w in cue["words"]
+            if w["offset"] >= k
         )
 
-    return segments
+
+def _rolling_overlap(prev: str, text: str) -> int:
+    """
+    Length of the longest prefix of `text` that repeats the end of `prev`
+    and ends on a word/line boundary. Only positions of spaces in `text`
+    are candidates, so this is a handful of C-level endswith() calls.
+    """
+    k = text.rfind(" ", 0, len(prev))
+    while k > 0:
+        if prev[-k - 1] == " " and prev.endswith(text[:k]):
+            return k
+        k = text.rfind(" ", 0, k)
+    return 0
+
+
+def _fill_word_ends(words: list, cue_end: float) -> None:
+    """Each word ends where the next one starts; the last ends with the cue."""
+    for i, w in enumerate(words):
+        nxt = words[i + 1]["start"] if i + 1 < len(words) else cue_end
+        w["end"] = max(w["start"], nxt)
+
+
+def _to_segment(cue: dict) -> dict:
+    if not cue["words"]:
+        return cue
+    return {
+        "speaker": "SPEAKER_00",  # unknown at this stage
+        "text": cue["text"],
+        "start": cue["start"],
+        "end": cue["end"],
+        "words": [
+            {"word": w["word"], "start": w["start"], "end": w["end"]}
+            for w in cue["words"]
+        ],
+    }
+
+
+def _to_seconds(h, m, s, ms) -> float:
+    # Integer milliseconds first, so the single division rounds exactly
+    return (((int(h) * 3600 if h else 0) + int(m) * 60 + int(s)) * 1000 + int(ms)) / 1000
 
 
 def _parse_timestamp_line(line: str):
@@ -233,16 +692,9 @@ def _parse_timestamp_line(line: str):
     Parse '00:00:02,000 --> 00:00:04,000' into (start_seconds, end_seconds).
     Returns (None, None) on failure.
     """
-    pattern = (
-        r"(\d{2}):(\d{2}):(\d{2})[,.](\d{3})\s*-->\s*(\d{2}):(\d{2}):(\d{2})[,.](\d{3})"
-    )
-    match = re.match(pattern, line.strip())
+    match = _TIMESTAMP_RE.match(line.strip())
     if not match:
         return None, None
 
-    h1, m1, s1, ms1, h2, m2, s2, ms2 = match.groups()
-
-    start = int(h1) * 3600 + int(m1) * 60 + int(s1) + int(ms1) / 1000
-    end = int(h2) * 3600 + int(m2) * 60 + int(s2) + int(ms2) / 1000
-
-    return round(start, 3), round(end, 3)
+    g = match.groups()
+    return _to_seconds(*g[0:4]), _to_seconds(*g[4:8])
@@ -0,0 +1,300 @@
+"""
+services/task_queue.py
+─────────────────────────────────────────────────────────────────────────────
+Background tasks on Redis Streams, run by worker processes on any node
+(task_worker.py) instead of a thread in the process that accepted them.
+
+Stream      : tasks:{kind}            entries { payload: JSON, attempt: n }
+Group       : workers                 each entry goes to one consumer
+Dead letter : tasks:{kind}:dead       + error, failedAt, sourceId
+
+    register_task("pitch", run_pitch_task, on_dead=give_up)  # worker side
+    publish_task("pitch", {...})                              # API side
+
+Delivery:
+- A task is acknowledged once its handler returns.
+- A handler that raises is re-published with attempt + 1. After
+  TASK_MAX_ATTEMPTS attempts it is dead-lettered and on_dead(payload,
+  error) runs, so callers stop waiting on it.
+- A consumer that dies mid-task leaves the entry pending. When the entry
+  has been idle for TASK_CLAIM_IDLE_SECONDS, another worker reclaims it
+  with XAUTOCLAIM. Each such delivery counts as an attempt, so a poison
+  task that kills its worker is dead-lettered too.
+- While a handler runs, a heartbeat re-claims its own entry (XCLAIM
+  JUSTID) to reset the idle time, so long tasks are not stolen.
+
+Handlers must be idempotent — a reclaimed task may have partly run.
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import redis
+
+from app.config.config import settings
+from app.services.metrics import TASKS, redis_op
+from app.services.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Constants
+# ─────────────────────────────────────────────────────────────────────────────
+
+STREAM_PREFIX = "tasks:"
+DEAD_LETTER_SUFFIX = ":dead"
+GROUP = "workers"
+
+READ_BLOCK_MS = 2000  # also bounds how long a stop request waits
+RECLAIM_BATCH = 10
+
+# kind → (handler, on_dead)
+_handlers: Dict[str, Tuple[Callable[[dict], None], Optional[Callable[[dict, str], None]]]] = {}
+_groups: set = set()  # streams whose consumer group exists
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Public API
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def register_task(
+    kind: str,
+    handler: Callable[[dict], None],
+    on_dead: Optional[Callable[[dict, str], None]] = None,
+) -> None:
+    """Handler for tasks of this kind; on_dead runs when one is dead-lettered."""
+    _handlers[kind] = (handler, on_dead)
+
+
+def queue_enabled() -> bool:
+    """True when TASK_QUEUE=redis and Redis is reachable."""
+    return settings.TASK_QUEUE == "redis" and get_redis_client() is not None
+
+
+def publish_task(kind: str, payload: dict) -> str:
+    """Add a task to tasks:{kind}; returns its entry ID."""
+    client = _require_client()
+    _ensure_group(client, kind)
+    with redis_op("xadd"):
+        return client.xadd(
+            _stream(kind),
+            {"payload": json.dumps(payload, ensure_ascii=False), "attempt": 1},
+            maxlen=settings.TASK_STREAM_MAXLEN,
+            approximate=True,
+        )
+
+
+def run_worker(
+    kinds: List[str],
+    consumer: Optional[str] = None,
+    stop: Optional[threading.Event] = None,
+) -> None:
+    """
+    Claim and run tasks of the given (registered) kinds until stop is set.
+    One task at a time — run one worker process per core for CPU-bound work.
+    """
+    missing = [kind for kind in kinds if kind not in _handlers]
+    if missing:
+        raise ValueError(f"No handler registered for: {', '.join(missing)}")
+
+    client = _require_client()
+    consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+    stop = stop or threading.Event()
+    for kind in kinds:
+        _ensure_group(client, kind)
+    streams = {_stream(kind): ">" for kind in kinds}
+    logger.info("Task worker %s consuming %s", consumer, ", ".join(kinds))
+
+    next_reclaim = 0.0
+    while not stop.is_set():
+        if time.monotonic() >= next_reclaim:
+            for kind in kinds:
+                for message_id, fields in _reclaim(client, kind, consumer):
+                    _run(client, kind, message_id, fields, consumer)
+            next_reclaim = time.monotonic() + settings.TASK_CLAIM_IDLE_SECONDS / 2
+
+        try:
+            with redis_op("xreadgroup"):
+                reply = client.xreadgroup(
+                    GROUP, consumer, streams, count=1, block=READ_BLOCK_MS
+                )
+        except redis.ConnectionError as e:
+            logger.warning("Task stream read failed: %s — retrying", e)
+            stop.wait(1)
+            continue
+
+        for stream, messages in reply or []:
+            kind = stream[len(STREAM_PREFIX) :]
+            for message_id, fields in messages:
+                _run(client, kind, message_id, fields, consumer)
+
+
+def queue_status(kind: str) -> dict:
+    """{ length, pending, deadLettered } for tasks:{kind}."""
+    client = _require_client()
+    _ensure_group(client, kind)
+    stream = _stream(kind)
+    return {
+        "length": client.xlen(stream),
+        "pending": client.xpending(stream, GROUP)["pending"],
+        "deadLettered": client.xlen(stream + DEAD_LETTER_SUFFIX),
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Internal
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _stream(kind: str) -> str:
+    return f"{STREAM_PREFIX}{kind}"
+
+
+def _require_client() -> redis.Redis:
+    client = get_redis_client()
+    if client is None:
+        raise RuntimeError("Redis is unavailable — the task queue needs REDIS_URL")
+    return client
+
+
+def _ensure_group(client: redis.Redis, kind: str) -> None:
+    stream = _stream(kind)
+    if stream in _groups:
+        return
+    try:
+        # From the start of the stream: tasks published before any worker
+        # existed are still delivered
+        client.xgroup_create(stream, GROUP, id="0", mkstream=True)
+    except redis.ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+    _groups.add(stream)
+
+
+def _reclaim(client: redis.Redis, kind: str, consumer: str) -> List[tuple]:
+    """Entries left pending by dead consumers, dead-lettering exhausted ones."""
+    stream = _stream(kind)
+    with redis_op("xautoclaim"):
+        reply = client.xautoclaim(
+            stream,
+            GROUP,
+            consumer,
+            min_idle_time=int(settings.TASK_CLAIM_IDLE_SECONDS * 1000),
+            start_id="0-0",
+            count=RECLAIM_BATCH,
+        )
+
+    reclaimed = []
+    for message_id, fields in reply[1]:
+        if not fields:  # trimmed from the stream while pending
+            client.xack(stream, GROUP, message_id)
+            continue
+        TASKS.labels(kind=kind, outcome="reclaimed").inc()
+        pending = client.xpending_range(stream, GROUP, message_id, message_id, 1)
+        delivered = pending[0]["times_delivered"] if pending else 2
+        attempt = int(fields.get("attempt", 1)) + delivered - 1
+        logger.warning(
+            "Reclaimed %s task %s from a dead consumer (attempt %d)", kind, message_id, attempt
+        )
+        if attempt > settings.TASK_MAX_ATTEMPTS:
+            _dead_letter(
+                client, kind, message_id, fields, "Consumer died while running it"
+            )
+            continue
+        reclaimed.append((message_id, {**fields, "attempt": attempt}))
+    return reclaimed
+
+
+def _run(client: redis.Redis, kind: str, message_id: str, fields: dict, consumer: str) -> None:
+    stream = _stream(kind)
+    handler, _ = _handlers[kind]
+    attempt = int(fields.get("attempt", 1))
+
+    try:
+        with _heartbeat(client, stream, message_id, consumer):
+            handler(json.loads(fields["payload"]))
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        if attempt >= settings.TASK_MAX_ATTEMPTS:
+            _dead_letter(client, kind, message_id, fields, error)
+            return
+        logger.warning(
+            "%s task %s failed (attempt %d/%d): %s — retrying",
+            kind, message_id, attempt, settings.TASK_MAX_ATTEMPTS, error,
+        )
+        with redis_op("xadd"):
+            pipe = client.pipeline()
+            pipe.xadd(
+                stream,
+                {"payload": fields["payload"], "attempt": attempt + 1},
+                maxlen=settings.TASK_STREAM_MAXLEN,
+                approximate=True,
+            )
+            pipe.xack(stream, GROUP, message_id)
+            pipe.execute()
+        TASKS.labels(kind=kind, outcome="retried").inc()
+        return
+
+    with redis_op("xack"):
+        client.xack(stream, GROUP, message_id)
+    TASKS.labels(kind=kind, outcome="ok").inc()
+
+
+def _dead_letter(
+    client: redis.Redis, kind: str, message_id: str, fields: dict, error: str
+) -> None:
+    stream = _stream(kind)
+    logger.error("%s task %s dead-lettered: %s", kind, message_id, error)
+    with redis_op("xadd"):
+        pipe = client.pipeline()
+        pipe.xadd(
+            stream + DEAD_LETTER_SUFFIX,
+            {
+                **fields,
+                "error": error,
+                "sourceId": message_id,
+                "failedAt": datetime.utcnow().isoformat(),
+            },
+            maxlen=settings.TASK_STREAM_MAXLEN,
+            approximate=True,
+        )
+        pipe.xack(stream, GROUP, message_id)
+        pipe.execute()
+    TASKS.labels(kind=kind, outcome="dead").inc()
+
+    _, on_dead = _handlers.get(kind, (None, None))
+    if on_dead is not None:
+        try:
+            on_dead(json.loads(fields["payload"]), error)
+        except Exception as e:
+            logger.warning("on_dead for %s task %s failed: %s", kind, message_id, e)
+
+
+@contextmanager
+def _heartbeat(client: redis.Redis, stream: str, message_id: str, consumer: str):
+    """Keep re-claiming our own entry so it never looks abandoned."""
+    done = threading.Event()
+
+    def beat():
+        while not done.wait(settings.TASK_CLAIM_IDLE_SECONDS / 3):
+            try:
+                client.xclaim(stream, GROUP, consumer, 0, [message_id], justid=True)
+            except Exception as e:
+                logger.warning("Heartbeat for task %s failed: %s", message_id, e)
+
+    thread = threading.Thread(target=beat, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        done.set()
+        thread.join()
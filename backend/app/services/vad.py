@@ -0,0 +1,181 @@
+"""
+services/vad.py
+─────────────────────────────────────────────────────────────────────────────
+Energy-based voice activity detection on 16 kHz mono PCM (NumPy only).
+
+Used to cut a continuous roleplay recording into per-line clips: the
+learner only speaks during their own lines, so speech regions are matched
+against each SceneLine's [startTime, endTime] window.
+
+StreamingVAD is the incremental form for live audio (/ws/evaluate): it
+reports speech start and end-of-utterance as frames arrive.
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.services.audio import PCM_SAMPLE_RATE
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Constants
+# ─────────────────────────────────────────────────────────────────────────────
+
+FRAME_MS = 30
+MIN_THRESHOLD_DB = -50.0  # absolute floor — anything quieter is silence
+NOISE_MARGIN_DB = 10.0  # speech must be this far above the noise floor
+MIN_SPEECH_SECONDS = 0.15
+MERGE_GAP_SECONDS = 0.35
+LINE_PADDING_SECONDS = 0.75  # learners start / finish a little off-cue
+END_SILENCE_SECONDS = 0.8  # live audio: this much silence ends an utterance
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Public API
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def frame_energy_db(samples: np.ndarray, sr: int = PCM_SAMPLE_RATE) -> np.ndarray:
+    """RMS energy per FRAME_MS frame, in dBFS. samples are float in [-1, 1]."""
+    frame = int(sr * FRAME_MS / 1000)
+    n = len(samples) // frame
+    if n == 0:
+        return np.empty(0, dtype=np.float32)
+    frames = np.asarray(samples[: n * frame], dtype=np.float32).reshape(n, frame)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def speech_threshold_db(energy_db: np.ndarray) -> float:
+    """Adaptive threshold: noise floor (20th percentile) + margin."""
+    if len(energy_db) == 0:
+        return MIN_THRESHOLD_DB
+    return max(float(np.percentile(energy_db, 20)) + NOISE_MARGIN_DB, MIN_THRESHOLD_DB)
+
+
+def detect_speech(
+    samples: np.ndarray, sr: int = PCM_SAMPLE_RATE
+) -> List[Tuple[float, float]]:
+    """
+    Returns speech regions as [(start_seconds, end_seconds)], with short
+    gaps merged and blips shorter than MIN_SPEECH_SECONDS dropped.
+    """
+    energy = frame_energy_db(samples, sr)
+    voiced = energy > speech_threshold_db(energy)
+    if not voiced.any():
+        return []
+
+    # Run boundaries via diff on the padded boolean mask
+    edges = np.diff(np.concatenate(([0], voiced.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    frame_s = FRAME_MS / 1000
+    regions: List[Tuple[float, float]] = []
+    for s, e in zip(starts * frame_s, ends * frame_s):
+        if regions and s - regions[-1][1] <= MERGE_GAP_SECONDS:
+            regions[-1] = (regions[-1][0], e)
+        else:
+            regions.append((s, e))
+
+    return [
+        (round(s, 3), round(e, 3)) for s, e in regions if e - s >= MIN_SPEECH_SECONDS
+    ]
+
+
+def segment_by_lines(
+    regions: List[Tuple[float, float]],
+    windows: List[Tuple[float, float]],
+    padding: float = LINE_PADDING_SECONDS,
+) -> List[Optional[Tuple[float, float]]]:
+    """
+    Match speech regions to expected line windows (recording time).
+
+    For each window, the clip spans every speech region overlapping the
+    padded window, clamped to it. None when the learner said nothing.
+    """
+    clips: List[Optional[Tuple[float, float]]] = []
+    for w_start, w_end in windows:
+        lo, hi = w_start - padding, w_end + padding
+        hits = [(s, e) for s, e in regions if s < hi and e > lo]
+        if not hits:
+            clips.append(None)
+            continue
+        clips.append((max(hits[0][0], lo, 0.0), min(hits[-1][1], hi)))
+    return clips
+
+
+class StreamingVAD:
+    """
+    detect_speech() for audio that is still arriving. feed() float samples
+    as they come; it returns the events they caused:
+
+        "start" — MIN_SPEECH_SECONDS of consecutive speech (speech_start set)
+        "end"   — END_SILENCE_SECONDS of silence after speech (speech_end set)
+
+    The threshold adapts like speech_threshold_db(), over every frame seen
+    so far, recomputed once per feed() call.
+    """
+
+    def __init__(
+        self, sr: int = PCM_SAMPLE_RATE, end_silence: float = END_SILENCE_SECONDS
+    ):
+        self.sr = sr
+        self.end_silence = end_silence
+        self.speech_start: Optional[float] = None
+        self.speech_end: Optional[float] = None
+        self._frame_s = FRAME_MS / 1000
+        self._frame = int(sr * self._frame_s)
+        self._pending = np.empty(0, dtype=np.float32)
+        self._energy: List[float] = []
+        self._voiced_run = 0
+        self._silent_run = 0
+
+    @property
+    def speaking(self) -> bool:
+        return self.speech_start is not None and self.speech_end is None
+
+    @property
+    def ended(self) -> bool:
+        return self.speech_end is not None
+
+    def feed(self, samples: np.ndarray) -> List[str]:
+        buffer = np.concatenate((self._pending, np.asarray(samples, dtype=np.float32)))
+        n = len(buffer) // self._frame
+        self._pending = buffer[n * self._frame :]
+        if n == 0 or self.ended:
+            return []
+
+        energy = frame_energy_db(buffer[: n * self._frame], self.sr)
+        first = len(self._energy)
+        self._energy.extend(energy.tolist())
+        threshold = speech_threshold_db(np.asarray(self._energy))
+
+        events: List[str] = []
+        for offset, voiced in enumerate(energy > threshold):
+            index = first + offset
+            if voiced:
+                self._voiced_run += 1
+                self._silent_run = 0
+                if (
+                    self.speech_start is None
+                    and self._voiced_run * self._frame_s >= MIN_SPEECH_SECONDS
+                ):
+                    self.speech_start = round(
+                        (index - self._voiced_run + 1) * self._frame_s, 3
+                    )
+                    events.append("start")
+            else:
+                self._silent_run += 1
+                self._voiced_run = 0
+                if (
+                    self.speech_start is not None
+                    and self._silent_run * self._frame_s >= self.end_silence
+                ):
+                    self.speech_end = round(
+                        (index - self._silent_run + 1) * self._frame_s, 3
+                    )
+                    events.append("end")
+                    break
+        return events
@@ -1,8 +1,11 @@
+import asyncio
 import logging
 import os
 from typing import Optional
 
-from app.config.config import settings
+from app.services.ai_client import ai_available, ai_call, ai_call_sync
+from app.services.deadline import Deadline, RequestCancelled
+from app.services.metrics import external_call
 from app.services.rate_limit import check_rate_limit
 from app.services.whisperX_client import (
     is_colab_service_configured,
@@ -12,10 +15,15 @@ from app.services.whisperX_client import (
 logger = logging.getLogger(__name__)
 
 
+class TranscriptionFailed(RuntimeError):
+    """Every configured ASR provider failed for this audio."""
+
+
 def transcribe(
     audio_path: str,
     min_speakers: Optional[int] = None,
     max_speakers: Optional[int] = None,
+    deadline: Optional[Deadline] = None,
 ) -> dict:
     """
     Transcribe audio. Returns a dict compatible with previous implementation:
@@ -26,28 +34,96 @@ def transcribe(
             "duration": 0.0,
             "source": "whisperx" | "openai_whisper" | "mock"
         }
+
+    deadline: the call in flight is aborted when the request is cancelled
+    (RequestCancelled — no fallback to the next provider).
     """
     # ── 1. Colab WhisperX path ────────────────────────────────────────────────
     if is_colab_service_configured():
-        logger.info("Using Colab WhisperX service for transcription")
-        try:
+        result = _transcribe_whisperx(audio_path, min_speakers, max_speakers, deadline)
+        if result is not None:
+            return result
+        # Fall through to OpenAI path
+
+    # ── 2. OpenAI Whisper API path (existing logic) ───────────────────────────
+    if not _check_openai_whisper(audio_path):
+        return _mock_result()
+
+    try:
+        with external_call("asr", "openai_whisper") as trace, open(audio_path, "rb") as f:
+            response = ai_call_sync(
+                "transcription", _whisper_request(f, trace), deadline=deadline
+            )
+        return _normalize_result(response.model_dump(), source="openai_whisper")
+    except RequestCancelled:
+        raise
+    except Exception as e:
+        logger.error(f"⚠️ OpenAI Whisper failed: {e}")
+        raise TranscriptionFailed(f"⚠️ Failed to transcribe audio: {str(e)}") from e
+
+
+async def transcribe_async(
+    audio_path: str,
+    min_speakers: Optional[int] = None,
+    max_speakers: Optional[int] = None,
+    deadline: Optional[Deadline] = None,
+) -> dict:
+    """
+    transcribe() for async handlers. The OpenAI path awaits the shared
+    async client (no thread held) and is aborted by cancelling the task;
+    WhisperX's client is blocking, so that path runs in a worker thread
+    and is aborted through the deadline.
+    """
+    if is_colab_service_configured():
+        result = await asyncio.to_thread(
+            _transcribe_whisperx, audio_path, min_speakers, max_speakers, deadline
+        )
+        if result is not None:
+            return result
+
+    if not _check_openai_whisper(audio_path):
+        return _mock_result()
+
+    try:
+        with external_call("asr", "openai_whisper") as trace, open(audio_path, "rb") as f:
+            response = await ai_call("transcription", _whisper_request(f, trace))
+        return _normalize_result(response.model_dump(), source="openai_whisper")
+    except Exception as e:
+        logger.error(f"⚠️ OpenAI Whisper failed: {e}")
+        raise TranscriptionFailed(f"⚠️ Failed to transcribe audio: {str(e)}") from e
+
+
+def _transcribe_whisperx(
+    audio_path: str,
+    min_speakers: Optional[int],
+    max_speakers: Optional[int],
+    deadline: Optional[Deadline] = None,
+) -> Optional[dict]:
+    """WhisperX result, or None when the service failed (caller falls back)."""
+    logger.info("Using Colab WhisperX service for transcription")
+    try:
+        with external_call("asr", "whisperx"):
             result = transcribe_with_diarization(
                 audio_path=audio_path,
                 min_speakers=min_speakers,
                 max_speakers=max_speakers,
+                deadline=deadline,
             )
-            return _normalize_result(result, source="whisperx")
-        except Exception as e:
-            logger.warning(
-                "Colab WhisperX failed (%s) — falling back to OpenAI Whisper", e
-            )
-            # Fall through to OpenAI path
+        return _normalize_result(result, source="whisperx")
+    except RequestCancelled:
+        raise
+    except Exception as e:
+        logger.warning(
+            "Colab WhisperX failed (%s) — falling back to OpenAI Whisper", e
+        )
+        return None
 
-    # ── 2. OpenAI Whisper API path (existing logic) ───────────────────────────
-    client = settings.openai_client
-    if not settings.AI_ENABLED or not client:
+
+def _check_openai_whisper(audio_path: str) -> bool:
+    """False → AI is off and the caller returns the mock transcription."""
+    if not ai_available():
         logger.info("AI disabled — returning mock transcription")
-        return _mock_result()
+        return False
 
     check_rate_limit("whisper")
 
@@ -55,16 +131,17 @@ def transcribe(
         raise FileNotFoundError(f"Audio file not found: {audio_path}")
 
     logger.info("Using OpenAI Whisper API for transcription")
-    try:
-        with open(audio_path, "rb") as f:
-            response = client.audio.transcriptions.create(
-                model="whisper-1", file=f, response_format="verbose_json", language="ja"
-            )
-        raw = response.model_dump()
-        return _normalize_result(raw, source="openai_whisper")
-    except Exception as e:
-        logger.error(f"⚠️ OpenAI Whisper failed: {e}")
-        raise RuntimeError(f"⚠️ Failed to transcribe audio: {str(e)}") from e
+    return True
+
+
+def _whisper_request(f, trace: dict):
+    return lambda client: client.audio.transcriptions.create(
+        model="whisper-1",
+        file=f,
+        response_format="verbose_json",
+        language="ja",
+        extra_headers=trace,
+    )
 
 
 def _normalize_result(raw: dict, source: str) -> dict:
@@ -18,12 +18,14 @@ Usage:
 ─────────────────────────────────────────────────────────────────────────────
 """
 
+import asyncio
 import logging
 from pathlib import Path
 from typing import Optional
 
-import httpx
 from app.config.config import settings
+from app.services.deadline import Deadline
+from app.services.metrics import trace_headers
 
 logger = logging.getLogger(__name__)
 
@@ -39,9 +41,12 @@ def transcribe_with_diarization(
     min_speakers: Optional[int] = None,
     max_speakers: Optional[int] = None,
     timeout_seconds: int = 300,  # 5 min — large files can be slow
+    deadline: Optional[Deadline] = None,
 ) -> dict:
     """
     Send an audio file to the Colab WhisperX service and return diarized segments.
+    With a deadline the timeout is capped by the remaining budget and the
+    upload is aborted (RequestCancelled) when the request is cancelled.
     """
     base_url = settings.COLAB_WHISPERX_URL.rstrip("/")
     if not base_url:
@@ -55,7 +60,7 @@ def transcribe_with_diarization(
         raise FileNotFoundError(f"Audio file not found: {audio_path}")
 
     endpoint = f"{base_url}/transcribe"
-    headers = {"X-Api-Secret": settings.COLAB_API_SECRET}
+    headers = {"X-Api-Secret": settings.COLAB_API_SECRET, **trace_headers()}
 
     # Build multipart form data
     form_data: dict = {}
@@ -74,14 +79,33 @@ def transcribe_with_diarization(
         base_url,
     )
 
-    with httpx.Client(timeout=timeout_seconds) as client:
-        with open(audio_path, "rb") as f:
-            response = client.post(
-                endpoint,
-                headers=headers,
-                files={"audio": (audio_file.name, f, _mime_type(audio_file))},
-                data=form_data,
-            )
+    import httpx
+
+    deadline = deadline or Deadline()
+    deadline.check()
+
+    async def post():
+        async with httpx.AsyncClient(timeout=deadline.timeout(timeout_seconds)) as client:
+            with open(audio_path, "rb") as f:
+                return await client.post(
+                    endpoint,
+                    headers=headers,
+                    files={"audio": (audio_file.name, f, _mime_type(audio_file))},
+                    data=form_data,
+                )
+
+    # On a private loop, so a cancel from another thread can abort the
+    # request mid-flight (a blocking socket read can't be interrupted)
+    loop = asyncio.new_event_loop()
+    try:
+        task = loop.create_task(post())
+        with deadline.on_cancel(lambda: loop.call_soon_threadsafe(task.cancel)):
+            response = loop.run_until_complete(task)
+    except (asyncio.CancelledError, httpx.TimeoutException):
+        deadline.check()  # raises RequestCancelled if that is what happened
+        raise
+    finally:
+        loop.close()
 
     if response.status_code == 401:
         raise RuntimeError(
@@ -116,6 +140,8 @@ def check_colab_health() -> dict:
     if not base_url:
         raise RuntimeError("COLAB_WHISPERX_URL is not set.")
 
+    import httpx
+
     with httpx.Client(timeout=10) as client:
         response = client.get(f"{base_url}/health")
 
@@ -1,72 +1,124 @@
 import uuid
 from datetime import datetime
-from app.services.whisper import transcribe
+from typing import List, Optional
+from app.services.whisper import transcribe_async
 from app.models.schema import EvaluationResult
 from app.services.evaluation.normalize import normalize_text
 from app.services.evaluation.similarity import compute_scores
-from app.config.config import settings
+from app.services.ai_client import ai_available
+from app.services.deadline import Deadline
+from app.services.feedback_batcher import request_feedback
+from app.services.stages import track_stage
 
 
-def evaluate_line(
+DEFAULT_FEEDBACK = "Good attempt! Keep practicing."
+
+
+async def evaluate_line(
     scene_id: str,
     line_id: str,
     expected_text: str,
     audio_path: str,
+    words: Optional[List] = None,
+    deadline: Optional[Deadline] = None,
 ) -> EvaluationResult:
-    transcript = transcribe(audio_path)
+    """
+    Async end to end: ASR and feedback are awaited on the shared OpenAI
+    client, so a request waiting on AI holds no thread.
 
-    # 1️⃣ Normalize texts
-    expected_norm = normalize_text(expected_text)
-    actual_norm = normalize_text(transcript["text"])
+    deadline: checked before each stage. Cancelling the awaiting task
+    aborts the OpenAI calls; the deadline also aborts WhisperX, whose
+    blocking client runs in a thread.
+    """
+    stages: dict = {}
+    deadline = deadline or Deadline(pipeline="evaluate")
 
-    # 2️⃣ Similarity + word scoring
-    scoring = compute_scores(expected_norm, actual_norm)
+    deadline.check("transcription")
+    with track_stage(stages, "transcription", pipeline="evaluate"):
+        transcript = await transcribe_async(audio_path, deadline=deadline)
+
+    deadline.check("scoring")
+
+    return await evaluate_transcript(
+        scene_id, line_id, expected_text, transcript["text"], words, stages
+    )
+
+
+async def evaluate_transcript(
+    scene_id: str,
+    line_id: str,
+    expected_text: str,
+    transcript_text: str,
+    words: Optional[List] = None,
+    stages: Optional[dict] = None,
+    pipeline: str = "evaluate",
+) -> EvaluationResult:
+    """Score an already transcribed attempt and add GPT feedback."""
+    stages = stages if stages is not None else {}
 
-    overall_score = scoring["overall"]
-    word_scores = scoring["wordScores"]
+    # 1️⃣ + 2️⃣ Normalize, align and score locally
+    with track_stage(stages, "scoring", pipeline=pipeline):
+        result = score_line(
+            scene_id=scene_id,
+            line_id=line_id,
+            expected_text=expected_text,
+            transcript_text=transcript_text,
+            words=words,
+        )
 
     # 3️⃣ GPT feedback (real AI preferred)
-    feedback_summary = "Good attempt! Keep practicing."
-
-    gpt_client = settings.openai_client
-
-    if gpt_client:
-        try:
-            completion = gpt_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are a Japanese language tutor.\n"
-                            "Give one sentence of encouragement and one concrete improvement tip."
-                        ),
-                    },
-                    {
-                        "role": "user",
-                        "content": (
-                            f"Expected: {expected_text}\n"
-                            f"User said: {transcript['text']}\n"
-                            f"Score: {overall_score}"
-                        ),
-                    },
-                ],
-                max_tokens=60,
+    with track_stage(stages, "feedback", pipeline=pipeline):
+        result.feedback = {
+            "summary": await _line_feedback(
+                expected_text, transcript_text, result.scores["overall"]
             )
-            feedback_summary = completion.choices[0].message.content.strip()
-        except Exception:
-            pass  # fallback stays
+        }
+
+    result.metadata["stages"] = stages
+    return result
+
+
+def score_line(
+    scene_id: str,
+    line_id: str,
+    expected_text: str,
+    transcript_text: str,
+    words: Optional[List] = None,
+) -> EvaluationResult:
+    """
+    Local scoring only — no ASR, no GPT. Feedback is the default message
+    until the caller fills it in.
+    """
+    # 1️⃣ Normalize texts
+    expected_norm = normalize_text(expected_text)
+    actual_norm = normalize_text(transcript_text)
+
+    # 2️⃣ Alignment + word scoring (scene WordTokens set word boundaries)
+    scoring = compute_scores(expected_norm, actual_norm, words=words)
 
     return EvaluationResult(
         evaluationId=str(uuid.uuid4()),
         sceneId=scene_id,
         lineId=line_id,
-        transcript=transcript["text"],
-        scores={"overall": overall_score},
-        wordScores=word_scores,
-        feedback={"summary": feedback_summary},
+        transcript=transcript_text,
+        scores={"overall": scoring["overall"]},
+        wordScores=scoring["wordScores"],
+        feedback={"summary": DEFAULT_FEEDBACK},
+        alignmentMap={
+            "substitutions": scoring["substitutions"],
+            "insertions": scoring["insertions"],
+            "distance": scoring["distance"],
+        },
         metadata={
             "createdAt": datetime.utcnow().isoformat(),
             "version": "v1",
         },
     )
+
+
+async def _line_feedback(expected_text: str, said: str, overall_score: float) -> str:
+    if not ai_available():
+        return DEFAULT_FEEDBACK
+    # Batched with other evaluations' feedback; None → fallback stays
+    feedback = await request_feedback(expected_text, said, overall_score)
+    return feedback or DEFAULT_FEEDBACK
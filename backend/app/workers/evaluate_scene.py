@@ -0,0 +1,326 @@
+"""
+workers/evaluate_scene.py
+─────────────────────────────────────────────────────────────────────────────
+Whole-scene batch evaluation: one request for a full roleplay run instead of
+one /evaluate call per line.
+
+Two input modes:
+    continuous — a single recording of the whole scene. VAD finds the
+                 learner's speech, each region is matched to a line window,
+                 and only the speech clips (concatenated with short silence
+                 gaps) go to ASR in ONE transcribe() call.
+    clips      — one clip per line. Decoded in parallel, then concatenated
+                 the same way into ONE transcribe() call.
+
+Either way the run takes one ASR rate-limit token. A failed transcription
+fails the whole evaluation (rate limit → RateLimitExceeded, provider down
+→ TranscriptionFailed) rather than scoring its lines 0.
+
+Every line is scored locally (normalize + align), then ONE GPT call writes
+per-line feedback and a summary for the whole run.
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import logging
+import os
+import tempfile
+import uuid
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.models.schema import EvaluationResult, SceneLine
+from app.services.audio import PCM_SAMPLE_RATE, decode_to_pcm, load_pcm, pcm_to_float
+from app.services.gpt import generate_scene_feedback
+from app.services.stages import track_stage
+from app.services.vad import detect_speech, segment_by_lines
+from app.services.whisper import transcribe
+from app.workers.evaluate import score_line
+
+logger = logging.getLogger(__name__)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Constants
+# ─────────────────────────────────────────────────────────────────────────────
+
+CLIP_DECODE_CONCURRENCY = 4  # parallel ffmpeg decodes in clip mode
+CLIP_GAP_SECONDS = 0.5  # silence between concatenated clips (keeps ASR segments apart)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Public API
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def evaluate_scene(
+    scene_id: str,
+    lines: List[SceneLine],
+    language: str = "ja",
+    audio_path: Optional[str] = None,
+    recording_offset: float = 0.0,
+    clips: Optional[Dict[str, str]] = None,
+) -> dict:
+    """
+    Evaluate every given line of a scene in one pass.
+
+    audio_path       — continuous recording; recording_offset is the scene
+                       time (seconds) at which the recording started.
+    clips            — {lineId: clip_path}; used instead of audio_path.
+
+    Returns:
+        {
+            "sceneId", "evaluationId", "overall",
+            "results":  [EvaluationResult, ...]  (one per line, in order),
+            "feedback": { "summary": str },
+            "metadata": { "mode", "lines", "asrCalls", "gptCalls", ... },
+        }
+    """
+    if not lines:
+        raise ValueError("No lines to evaluate")
+    if not audio_path and not clips:
+        raise ValueError("Either a recording or line clips are required")
+
+    stages: dict = {}
+    joiner = "" if language == "ja" else " "
+
+    # ── 1. Transcripts per line ──────────────────────────────────────────────
+    with track_stage(stages, "asr", pipeline="evaluate"):
+        if clips:
+            mode = "clips"
+            transcripts, asr_calls, asr_seconds = _transcribe_clips(
+                lines, clips, joiner
+            )
+        else:
+            mode = "continuous"
+            transcripts, asr_calls, asr_seconds = _transcribe_recording(
+                lines, audio_path, recording_offset, joiner
+            )
+
+    # ── 2. Local scoring ─────────────────────────────────────────────────────
+    with track_stage(stages, "scoring", pipeline="evaluate"):
+        results: List[EvaluationResult] = [
+            score_line(
+                scene_id=scene_id,
+                line_id=line.id,
+                expected_text=line.text,
+                transcript_text=transcripts.get(line.id, ""),
+                words=line.words or None,
+            )
+            for line in lines
+        ]
+
+    # ── 3. One feedback call for the whole run ───────────────────────────────
+    summary = "Good attempt! Keep practicing."
+    gpt_calls = 0
+    with track_stage(stages, "feedback", pipeline="evaluate"):
+        try:
+            feedback = generate_scene_feedback(
+                [
+                    {
+                        "lineId": r.lineId,
+                        "expected": line.text,
+                        "said": r.transcript,
+                        "score": r.scores["overall"],
+                    }
+                    for line, r in zip(lines, results)
+                ]
+            )
+            gpt_calls = 1
+            summary = feedback.summary
+            by_line = {f.lineId: f.feedback for f in feedback.lines}
+            for r in results:
+                if by_line.get(r.lineId):
+                    r.feedback = {"summary": by_line[r.lineId]}
+        except Exception as e:
+            logger.warning("Scene feedback failed (%s) — using default feedback", e)
+
+    overall = round(sum(r.scores["overall"] for r in results) / len(results), 3)
+
+    print(
+        f"🎯 Scene evaluation {scene_id}: {len(results)} lines | "
+        f"{asr_calls} ASR + {gpt_calls} GPT calls | overall {overall}"
+    )
+
+    return {
+        "sceneId": scene_id,
+        "evaluationId": str(uuid.uuid4()),
+        "overall": overall,
+        "results": [r.model_dump() for r in results],
+        "feedback": {"summary": summary},
+        "metadata": {
+            "createdAt": datetime.utcnow().isoformat(),
+            "version": "v1",
+            "mode": mode,
+            "lines": len(results),
+            "asrCalls": asr_calls,
+            "asrAudioSeconds": round(asr_seconds, 3),
+            "gptCalls": gpt_calls,
+            # What the same run costs through per-line /evaluate
+            "individualEquivalent": {
+                "asrCalls": len(results),
+                "gptCalls": len(results),
+            },
+            "stages": stages,
+        },
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Internal
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _transcribe_clips(
+    lines: List[SceneLine], clips: Dict[str, str], joiner: str
+) -> Tuple[Dict[str, str], int, float]:
+    """
+    Decode the per-line clips (bounded parallel) and transcribe them back
+    to back in one call, like the speech clips of a continuous recording.
+    """
+    jobs = [(line.id, clips[line.id]) for line in lines if line.id in clips]
+    if not jobs:
+        return {}, 0, 0.0
+
+    with tempfile.TemporaryDirectory(prefix="clips-") as tmp:
+
+        def decode(index: int) -> np.ndarray:
+            pcm_path = os.path.join(tmp, f"{index}.pcm.wav")
+            decode_to_pcm(jobs[index][1], pcm_path)
+            return np.array(load_pcm(pcm_path))  # copy — the file goes with tmp
+
+        with ThreadPoolExecutor(max_workers=CLIP_DECODE_CONCURRENCY) as pool:
+            chunks = list(pool.map(decode, range(len(jobs))))
+
+        transcripts, seconds = _transcribe_batch(
+            [line_id for line_id, _ in jobs],
+            chunks,
+            os.path.join(tmp, "batch.wav"),
+            joiner,
+        )
+    return transcripts, 1, seconds
+
+
+def _transcribe_recording(
+    lines: List[SceneLine],
+    audio_path: str,
+    recording_offset: float,
+    joiner: str,
+) -> Tuple[Dict[str, str], int, float]:
+    """
+    VAD-segment a continuous recording against the line windows, send only
+    the speech clips to ASR in one call, and map the result back to lines.
+    """
+    fd, pcm_path = tempfile.mkstemp(suffix=".pcm.wav")
+    os.close(fd)
+    fd, batch_path = tempfile.mkstemp(suffix=".wav")
+    os.close(fd)
+    samples = None
+
+    try:
+        decode_to_pcm(audio_path, pcm_path)
+        samples = load_pcm(pcm_path)
+
+        windows = [
+            (line.startTime - recording_offset, line.endTime - recording_offset)
+            for line in lines
+        ]
+        regions = detect_speech(pcm_to_float(samples))
+        line_clips = segment_by_lines(regions, windows)
+
+        spoken = [(line, clip) for line, clip in zip(lines, line_clips) if clip]
+        if not spoken:
+            return {}, 0, 0.0
+
+        transcripts, seconds = _transcribe_batch(
+            [line.id for line, _ in spoken],
+            [
+                samples[int(start * PCM_SAMPLE_RATE) : int(end * PCM_SAMPLE_RATE)]
+                for _, (start, end) in spoken
+            ],
+            batch_path,
+            joiner,
+        )
+        return transcripts, 1, seconds
+    finally:
+        samples = None  # release the memmap before unlinking (Windows)
+        for path in (pcm_path, batch_path):
+            if os.path.exists(path):
+                os.unlink(path)
+
+
+def _transcribe_batch(
+    line_ids: List[str], chunks: List[np.ndarray], batch_path: str, joiner: str
+) -> Tuple[Dict[str, str], float]:
+    """
+    Concatenate the lines' PCM chunks, transcribe them in ONE call and map
+    the timed pieces back to lines. Returns (transcripts, batch seconds).
+    """
+    # Remember where each chunk lands in batch time
+    placed = _write_clip_batch(chunks, batch_path)
+    result = transcribe(batch_path)
+
+    pieces: Dict[str, List[str]] = {line_id: [] for line_id in line_ids}
+    for seg in result.get("segments", []):
+        for start, end, text in _timed_pieces(seg):
+            index = _clip_at((start + end) / 2, placed)
+            if index is not None:
+                pieces[line_ids[index]].append(text.strip())
+
+    transcripts = {
+        line_id: joiner.join(p for p in parts if p) for line_id, parts in pieces.items()
+    }
+    return transcripts, placed[-1][1] if placed else 0.0
+
+
+def _write_clip_batch(
+    chunks: List[np.ndarray], out_path: str
+) -> List[Tuple[float, float]]:
+    """
+    Write the PCM chunks back to back, CLIP_GAP_SECONDS of silence apart,
+    as one 16 kHz mono WAV. Returns each chunk's [start, end) in batch time.
+    """
+    gap = np.zeros(int(CLIP_GAP_SECONDS * PCM_SAMPLE_RATE), dtype="<i2")
+    placed = []
+    cursor = 0
+
+    with wave.open(out_path, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(PCM_SAMPLE_RATE)
+        for chunk in chunks:
+            out.writeframes(np.ascontiguousarray(chunk, dtype="<i2").tobytes())
+            placed.append(
+                (cursor / PCM_SAMPLE_RATE, (cursor + len(chunk)) / PCM_SAMPLE_RATE)
+            )
+            cursor += len(chunk)
+            out.writeframes(gap.tobytes())
+            cursor += len(gap)
+
+    return placed
+
+
+def _timed_pieces(segment: dict) -> List[Tuple[float, float, str]]:
+    """Word-level timings when the ASR returned them, else the segment."""
+    words = [
+        (w["start"], w["end"], w.get("word", ""))
+        for w in segment.get("words") or []
+        if w.get("start") is not None and w.get("end") is not None
+    ]
+    if words:
+        return words
+    return [(segment.get("start", 0.0), segment.get("end", 0.0), segment.get("text", ""))]
+
+
+def _clip_at(t: float, placed: List[Tuple[float, float]]) -> Optional[int]:
+    """Index of the clip containing t, or the nearest one within the gap."""
+    best, best_distance = None, CLIP_GAP_SECONDS
+    for i, (start, end) in enumerate(placed):
+        if start <= t < end:
+            return i
+        distance = start - t if t < start else t - end
+        if distance <= best_distance:
+            best, best_distance = i, distance
+    return best
@@ -1,18 +1,31 @@
-import yt_dlp
 import tempfile
 import uuid
 import os
+from app.config.config import settings
+from app.services.audio import (
+    PCM_SAMPLE_RATE,
+    cut_line_clips,
+    download_audio,
+    fetch_video_info,
+    prepare_audio,
+)
+from app.services.deadline import Deadline, RequestCancelled
+from app.services.metrics import INGESTS_IN_FLIGHT
+from app.services.stages import track_stage
 from app.services.whisper import transcribe
 from app.services.subtitles import fetch_subtitle_segments
-from app.services.gpt import refine_script_from_whisper, GPTSceneLine
-from app.services.storage import upload_audio
-from app.services.pitch import run_pitch_extraction_background
-from app.models.schema import ScenePackage, SceneLine, QuizQuestion
+from app.services.gpt import complete_script, refine_script_from_whisper, GPTSceneLine
+from app.services.storage import upload_audio_async, upload_clips
+from app.services.pitch import resolve_estimator, run_pitch_extraction_background
+from app.services.scene_store import save_scene
+from app.models.schema import ScenePackage, SceneLine
+from contextlib import nullcontext
 from datetime import datetime
-from typing import List
+from typing import ContextManager, Dict, List, Optional, Tuple
 
 
 MIN_LINE_DURATION = 0.3  # seconds
+MAX_SCENE_DURATION = 600  # seconds — MVP limit
 
 
 def normalize_scene_lines(gpt_lines: List[GPTSceneLine]) -> List[SceneLine]:
@@ -42,7 +55,6 @@ def normalize_scene_lines(gpt_lines: List[GPTSceneLine]) -> List[SceneLine]:
                 characterName=line.characterName,
                 text=line.text,
                 phoneticReading=line.phoneticReading,
-                translation=line.translation,
                 words=line.words,
                 startTime=round(start, 3),
                 endTime=round(end, 3),
@@ -53,68 +65,99 @@ def normalize_scene_lines(gpt_lines: List[GPTSceneLine]) -> List[SceneLine]:
     return normalized
 
 
-def ingest_scene(youtube_url: str) -> ScenePackage:
+def ingest_scene(
+    youtube_url: str,
+    pitch_mode: Optional[str] = None,
+    limits: Optional[Dict[str, ContextManager]] = None,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    deadline: Optional[Deadline] = None,
+) -> ScenePackage:
+    """
+    start / end: ingest only that section of the video (clip mode). Only
+    the range is downloaded, transcribed and pitch-extracted, subtitles are
+    cut to it, and every timestamp is relative to the clip start.
+
+    limits: optional concurrency gates entered around the pipeline's
+    expensive stages — "download" (metadata, subtitles, download, prepare),
+    "asr" and "gpt". Shared semaphores let a batch of concurrent ingests
+    keep every stage busy without overloading any one service
+    (bulk_ingest.py).
+
+    deadline: request budget / cancellation (services/deadline.py). Every
+    stage checks it before starting and in-flight downloads, ASR, GPT and
+    storage calls are aborted once it is cancelled — the pipeline then
+    raises RequestCancelled and nothing is saved.
+    """
     print(f"🚀 Starting ingestion for: {youtube_url}")
+    limits = limits or {}
+    deadline = deadline or Deadline()
 
     tmp_audio = tempfile.NamedTemporaryFile(delete=False)
     tmp_base_path = tmp_audio.name
     tmp_audio.close()
 
-    final_mp3_path = f"{tmp_base_path}.mp3"
-    audio_ready_for_pitch: bool = False
+    downloaded_path = None
+    prepared = None
+    pcm_handed_off = False
+    upload_future = None
+    stages: dict = {}
+    INGESTS_IN_FLIGHT.inc()
 
     try:
-        # ── Phase 1: Check for subtitles ─────────────────────────────────────
-        print(" Phase 1: Checking for subtitles...")
-        subtitle_transcript = fetch_subtitle_segments(youtube_url)
-
-        # ── Phase 2: Always download audio ───────────────────────────────────
-        print(" Phase 2: Downloading audio via yt-dlp...")
-        ydl_opts = {
-            "format": "bestaudio/best",
-            "noplaylist": True,
-            "outtmpl": f"{tmp_base_path}.%(ext)s",
-            "postprocessors": [
-                {
-                    "key": "FFmpegExtractAudio",
-                    "preferredcodec": "mp3",
-                    "preferredquality": "128",
-                }
-            ],
-            "quiet": True,
-            "no_warnings": True,
-            "nocheckcertificate": True,
-        }
+        # Phases 0–2b share the "download" slot (YouTube + local ffmpeg)
+        with _limit(limits, "download"):
+            # ── Phase 0: Metadata — duration guard before any download ───────
+            print(" Phase 0: Fetching video metadata...")
+            deadline.check("metadata")
+            with track_stage(stages, "metadata"):
+                info = fetch_video_info(youtube_url)
+            if info.get("is_live"):
+                raise ValueError("Live streams can't be ingested")
+            section = resolve_clip(info.get("duration"), start, end)
 
-        try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([youtube_url])
-        except Exception as e:
-            print(f"❌ yt-dlp failed: {e}")
-            raise RuntimeError(f"Failed to download video: {str(e)}")
+            # ── Phase 1: Check for subtitles ─────────────────────────────────
+            print(" Phase 1: Checking for subtitles...")
+            deadline.check("subtitles")
+            with track_stage(stages, "subtitles"):
+                subtitle_transcript = fetch_subtitle_segments(
+                    youtube_url, info=info, window=section
+                )
 
-        if not os.path.exists(final_mp3_path):
-            print(
-                f"⚠️  Expected MP3 not found at {final_mp3_path}. Checking for alternatives..."
-            )
-            possible_files = [
-                f"{tmp_base_path}.m4a",
-                f"{tmp_base_path}.webm",
-                f"{tmp_base_path}.wav",
-            ]
-            found = False
-            for pf in possible_files:
-                if os.path.exists(pf):
-                    final_mp3_path = pf
-                    found = True
-                    print(f"✅ Found alternative: {pf}")
-                    break
-            if not found:
-                raise FileNotFoundError(
-                    "Could not find downloaded audio file in any supported format."
+            # ── Phase 2: Download native audio (no re-encode) ────────────────
+            print(" Phase 2: Downloading audio via yt-dlp...")
+            deadline.check("download")
+            with track_stage(stages, "download") as stage:
+                download = download_audio(
+                    youtube_url,
+                    tmp_base_path,
+                    info=info,
+                    section=section,
+                    deadline=deadline,
+                )
+                downloaded_path = download["path"]
+                stage["bytes"] = download["bytes"]
+                stage["acodec"] = download["acodec"]
+
+            # ── Phase 2b: One ffmpeg pass → PCM (pitch/ASR) + compact (storage)
+            print(" Phase 2b: Preparing audio artifacts...")
+            deadline.check("prepare")
+            with track_stage(stages, "prepare") as stage:
+                prepared = prepare_audio(
+                    downloaded_path, tmp_base_path, acodec=download["acodec"]
                 )
+                stage["bytes"] = os.path.getsize(prepared.compact_path)
+                stage["transcoded"] = prepared.transcoded
 
-        audio_ready_for_pitch = True
+        # ── Duration guard (exact — metadata can be missing or wrong) ────────
+        if prepared.duration > MAX_SCENE_DURATION:
+            raise ValueError("Video too long for MVP (max 10 minutes)")
+
+        # ── Phase 5 (started early): Storage upload overlaps ASR + GPT ───────
+        deadline.check("upload")
+        storage_path, upload_future = upload_audio_async(
+            prepared.compact_path, stats=stages, deadline=deadline
+        )
 
         # ── Phase 3: Transcription (skip if subtitles exist) ─────────────────
         if subtitle_transcript:
@@ -125,46 +168,66 @@ def ingest_scene(youtube_url: str) -> ScenePackage:
         else:
             print(" Phase 3: No subtitles — transcribing via Whisper...")
             try:
-                transcript = transcribe(final_mp3_path)
+                with _limit(limits, "asr"), track_stage(
+                    stages, "transcription"
+                ) as stage:
+                    # Checked once the ASR slot is ours — queueing for it may be long
+                    deadline.check("transcription")
+                    # Remote ASR gets the compact artifact — fewest bytes to upload
+                    transcript = transcribe(prepared.compact_path, deadline=deadline)
+                    stage["bytes"] = os.path.getsize(prepared.compact_path)
+            except RequestCancelled:
+                raise
             except Exception as e:
                 print(f"❌ Whisper phase failed: {e}")
                 raise RuntimeError(f"Transcription failed: {str(e)}")
 
-        # ── Duration guard ────────────────────────────────────────────────────
-        if transcript.get("duration", 0) > 600:
+        if transcript.get("duration", 0) > MAX_SCENE_DURATION:
             raise ValueError("Video too long for MVP (max 10 minutes)")
 
         # ── Phase 4: GPT Refinement + Quiz Generation ─────────────────────────
-        print(" Phase 4: Refining script + generating quiz via GPT...")
+        print(" Phase 4: Refining script via GPT...")
         try:
-            gpt_response = refine_script_from_whisper(transcript)
+            with _limit(limits, "gpt"), track_stage(stages, "gpt"):
+                deadline.check("gpt")
+                gpt_response = refine_script_from_whisper(
+                    transcript, deadline=deadline
+                )
+        except RequestCancelled:
+            raise
         except Exception as e:
             print(f"❌ GPT phase failed: {e}")
             raise RuntimeError(f"Script generation failed: {str(e)}")
 
-        # ── Phase 5: Storage Upload ───────────────────────────────────────────
-        print(" Phase 5: Uploading to Supabase...")
+        # Word breakdowns, readings and furigana from the local analyzer
+        # (no-op when GPT already produced them)
+        deadline.check("analysis")
+        with track_stage(stages, "analysis"):
+            gpt_response = complete_script(gpt_response)
+
+        # ── Phase 5: Wait for the background storage upload ──────────────────
+        print(" Phase 5: Waiting for storage upload...")
         try:
-            storage_path = upload_audio(final_mp3_path)
+            with track_stage(stages, "uploadWait"):
+                deadline.check("uploadWait")
+                deadline.wait(upload_future, abort=False)
+        except RequestCancelled:
+            raise
         except Exception as e:
             print(f"❌ Storage phase failed: {e}")
             raise RuntimeError(f"Audio upload failed: {str(e)}")
 
         # ── Phase 6: Assemble ScenePackage ────────────────────────────────────
         print(" Phase 6: Normalizing and assembling package...")
+        # Last chance to stop — past here the scene is saved and pitch starts
+        deadline.check("assemble")
         script = normalize_scene_lines(gpt_response.lines)
 
-        quiz = [
-            QuizQuestion(
-                questionId=f"quiz-{i+1}",
-                type=q.type,
-                question=q.question,
-                expectedAnswer=q.expectedAnswer,
-                targetLanguage=transcript.get("language", "ja"),
-                relatedLineId=q.relatedLineId,
-            )
-            for i, q in enumerate(gpt_response.quiz)
-        ]
+        # ── Phase 6b: Per-line playback clips ─────────────────────────────────
+        if settings.LINE_CLIPS:
+            print(" Phase 6b: Cutting and uploading line clips...")
+            deadline.check("clips")
+            _attach_line_clips(script, prepared, tmp_base_path, stages, deadline)
 
         scene_id = str(uuid.uuid4())
 
@@ -177,50 +240,142 @@ def ingest_scene(youtube_url: str) -> ScenePackage:
                 "type": "youtube",
                 "url": youtube_url,
                 "transcriptSource": transcript.get("source", "unknown"),
+                **({"clip": {"start": section[0], "end": section[1]}} if section else {}),
             },
             audio={
                 "storagePath": storage_path,
-                "duration": transcript.get("duration", 0),
-                "sampleRate": 16000,
+                "duration": prepared.duration or transcript.get("duration", 0),
+                "sampleRate": PCM_SAMPLE_RATE,
             },
             script=script,
-            quiz=quiz,
+            quiz=None,  # generated on first GET /scenes/{id}/quiz
             metadata={
                 "createdAt": datetime.utcnow().isoformat(),
                 "version": "v1",
+                "stages": stages,
+                "pitchEstimator": resolve_estimator(pitch_mode),
             },
         )
 
-        # ── Phase 7: Pitch Extraction (background, non-blocking) ──────────────
-        if audio_ready_for_pitch:
-            print(" Phase 7: Spawning background pitch extraction...")
-            run_pitch_extraction_background(
-                audio_path=final_mp3_path,
-                script=scene.script,
-                scene_id=scene_id,  # ← passed so Redis key matches sceneId
-            )
-        else:
-            print(" Phase 7: Skipping pitch extraction (no local audio).")
+        # Kept so batch evaluation / later requests can look the scene up by ID
+        save_scene(scene)
 
-        print(
-            f" Ingestion complete: {scene.sceneId} | lines: {len(script)} | quiz: {len(quiz)} questions"
+        # ── Phase 7: Pitch Extraction (background, non-blocking) ──────────────
+        print(" Phase 7: Spawning background pitch extraction...")
+        run_pitch_extraction_background(
+            audio_path=prepared.pcm_path,
+            script=scene.script,
+            scene_id=scene_id,  # ← passed so Redis key matches sceneId
+            estimator=pitch_mode,
+            storage_path=storage_path,  # queued workers fetch the audio from here
         )
+        pcm_handed_off = True
+
+        print(f" Ingestion complete: {scene.sceneId} | lines: {len(script)}")
         return scene
 
+    except RequestCancelled as e:
+        print(f"🛑 Ingestion stopped: {e}")
+        raise
     except Exception as e:
         print(f"💥 Pipeline Error: {e}")
         raise e
 
     finally:
-        # final_mp3_path excluded — pitch.py owns its cleanup
-        for path in [
-            tmp_base_path,
-            f"{tmp_base_path}.m4a",
-            f"{tmp_base_path}.webm",
-            f"{tmp_base_path}.wav",
-        ]:
-            if os.path.exists(path):
-                try:
-                    os.unlink(path)
-                except Exception:
-                    pass
+        INGESTS_IN_FLIGHT.dec()
+
+        # The PCM artifact is excluded once handed off — pitch.py owns its cleanup
+        leftovers = [tmp_base_path, downloaded_path]
+        if prepared:
+            if upload_future is not None:
+                # Still being read by the upload — delete once it finishes
+                compact_path = prepared.compact_path
+                upload_future.add_done_callback(lambda _: _remove_quietly(compact_path))
+            else:
+                leftovers.append(prepared.compact_path)
+            if not pcm_handed_off:
+                leftovers.append(prepared.pcm_path)
+        for path in leftovers:
+            _remove_quietly(path)
+
+
+def resolve_clip(
+    duration: Optional[float],
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+) -> Optional[Tuple[float, float]]:
+    """
+    Validate a clip request against the video duration (from metadata).
+    Returns the (start, end) section to fetch, or None for the whole video.
+    Raises ValueError for a too-long video / clip or an empty range.
+    """
+    if start is None and end is None:
+        if duration and duration > MAX_SCENE_DURATION:
+            raise ValueError(
+                "Video too long for MVP (max 10 minutes) — pass start/end to ingest a clip"
+            )
+        return None
+
+    start = start or 0.0
+    if end is None:
+        if not duration:
+            raise ValueError("Clip end is required when the video length is unknown")
+        end = min(duration, start + MAX_SCENE_DURATION)
+    if duration:
+        end = min(end, duration)
+    if start < 0 or start >= end:
+        raise ValueError("Clip start must be before its end and inside the video")
+    if end - start > MAX_SCENE_DURATION:
+        raise ValueError("Clip too long for MVP (max 10 minutes)")
+    return round(start, 3), round(end, 3)
+
+
+def _attach_line_clips(
+    script: List[SceneLine],
+    prepared,
+    base_path: str,
+    stages: dict,
+    deadline: Deadline,
+) -> None:
+    """
+    Cut one clip per line from the compact artifact and upload them, setting
+    audioClipPath / audioClipStart. Not fatal: if it fails the lines keep no
+    clip and replay falls back to the scene audio.
+    """
+    clips: List[Tuple[str, float]] = []
+    try:
+        with track_stage(stages, "clips") as stage:
+            clips = cut_line_clips(
+                prepared.compact_path,
+                [(line.startTime, line.endTime) for line in script],
+                base_path,
+                duration=prepared.duration,
+            )
+            stage["clips"] = len(clips)
+        storage_paths = upload_clips(
+            [path for path, _ in clips], stats=stages, deadline=deadline
+        )
+    except RequestCancelled:
+        raise
+    except Exception as e:
+        print(f"⚠️  Line clips skipped: {e}")
+        return
+    finally:
+        for path, _ in clips:
+            _remove_quietly(path)
+
+    for line, (_, clip_start), storage_path in zip(script, clips, storage_paths):
+        line.audioClipPath = storage_path
+        line.audioClipStart = clip_start
+
+
+def _limit(limits: Dict[str, ContextManager], stage: str) -> ContextManager:
+    return limits.get(stage) or nullcontext()
+
+
+def _remove_quietly(path) -> None:
+    if path and os.path.exists(path):
+        try:
+            os.unlink(path)
+        except Exception:
+            pass
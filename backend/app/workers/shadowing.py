@@ -0,0 +1,379 @@
+"""
+workers/shadowing.py
+─────────────────────────────────────────────────────────────────────────────
+Realtime shadowing: one WebSocket per attempt at a line
+(/ws/evaluate/{sceneId}/{lineId}?format=pcm|webm|ogg).
+
+Client → server
+    binary frames   audio: s16le 16 kHz mono (format=pcm, default) or
+                    MediaRecorder Opus chunks (webm / ogg — decoded by a
+                    streaming ffmpeg process)
+    {"type": "start", "expectedText": ..., "words": [...]}
+                    optional first message; required when the scene is
+                    not in the scene store
+    {"type": "end"} the learner stopped — finish now
+
+Server → client
+    {"type": "ready", "sampleRate": 16000, "backend": "local" | "remote",
+     "partials": true | false}
+    {"type": "vad", "speaking": true | false, "at": seconds}
+    {"type": "partial", "transcript", "scores", "wordScores", "at"}
+                    while speaking, at most every PARTIAL_INTERVAL_SECONDS
+                    of new audio, one ASR request in flight at a time
+                    (none from the remote backend: it is rate limited)
+    {"type": "final", "result": EvaluationResult}
+                    after end-of-utterance (StreamingVAD), {"type": "end"},
+                    or the duration cap; then the socket is closed
+    {"type": "error", "detail", "retryAfter"?}
+                    the final transcript or evaluation failed; the socket
+                    is closed with CLOSE_RATE_LIMITED (retryAfter set) or
+                    CLOSE_UNAVAILABLE
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import asyncio
+import json
+import logging
+from typing import List, Optional
+
+import numpy as np
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from app.models.schema import WordToken
+from app.services.audio import PCM_SAMPLE_RATE
+from app.services.evaluation.normalize import normalize_text
+from app.services.evaluation.similarity import compute_scores
+from app.services.rate_limit import RateLimitExceeded
+from app.services.scene_store import get_scene
+from app.services.stages import track_stage
+from app.services.streaming_asr import create_recognizer
+from app.services.vad import StreamingVAD
+from app.workers.evaluate import evaluate_transcript
+
+logger = logging.getLogger(__name__)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Constants
+# ─────────────────────────────────────────────────────────────────────────────
+
+AUDIO_FORMATS = ("pcm", "webm", "ogg")
+PARTIAL_INTERVAL_SECONDS = 0.8
+START_MESSAGE_TIMEOUT = 5.0  # wait for {"type": "start"} when the scene is unknown
+MAX_UTTERANCE_SECONDS = 30.0
+UTTERANCE_PADDING_SECONDS = 0.3  # kept around the VAD speech region
+
+# WebSocket close codes (4000–4999 are application-defined)
+CLOSE_NOT_FOUND = 4404
+CLOSE_INVALID = 4422
+CLOSE_RATE_LIMITED = 4429
+CLOSE_UNAVAILABLE = 4503
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Public API
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+async def run_shadowing(
+    websocket: WebSocket,
+    scene_id: str,
+    line_id: str,
+    audio_format: str = "pcm",
+    recognizer=None,
+) -> None:
+    """Serve one shadowing attempt: accepts the WebSocket and closes it when done."""
+    await websocket.accept()
+    if audio_format not in AUDIO_FORMATS:
+        await websocket.close(code=CLOSE_INVALID, reason="Unsupported audio format")
+        return
+
+    line = await _resolve_line(websocket, scene_id, line_id)
+    if line is None:
+        return
+    expected_text, words, max_seconds = line
+
+    session = _Session(
+        websocket,
+        scene_id,
+        line_id,
+        expected_text,
+        words,
+        recognizer or create_recognizer(),
+        max_seconds,
+    )
+    await session.run(audio_format)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Internal
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+class _Session:
+    def __init__(
+        self, websocket, scene_id, line_id, expected_text, words, recognizer, max_seconds
+    ):
+        self.websocket = websocket
+        self.scene_id = scene_id
+        self.line_id = line_id
+        self.expected_text = expected_text
+        self.expected_norm = normalize_text(expected_text)
+        self.words = words
+        self.recognizer = recognizer
+        self.partials = getattr(recognizer, "partials", True)
+        self.max_seconds = max_seconds
+        self.vad = StreamingVAD()
+        self.chunks: List[np.ndarray] = []
+        self.samples_seen = 0
+        self.last_partial_at = 0
+        self.partial_task: Optional[asyncio.Task] = None
+        self.done = asyncio.Event()
+        self.stages: dict = {}
+
+    async def run(self, audio_format: str) -> None:
+        await self._send(
+            {
+                "type": "ready",
+                "sampleRate": PCM_SAMPLE_RATE,
+                "backend": getattr(self.recognizer, "name", "custom"),
+                "partials": self.partials,
+            }
+        )
+        decoder = None
+        if audio_format != "pcm":
+            decoder = _FfmpegDecoder(audio_format, self.on_samples)
+            await decoder.start()
+        receiver = asyncio.create_task(self._receive(decoder))
+        try:
+            await self.done.wait()
+        finally:
+            receiver.cancel()
+            if decoder:
+                await decoder.close()
+            if self.partial_task:
+                self.partial_task.cancel()
+
+        if self.websocket.client_state.name != "CONNECTED":
+            return
+        try:
+            await self._finish()
+        except WebSocketDisconnect:
+            pass
+        except Exception as e:
+            logger.warning("Shadowing evaluation failed: %s", e)
+            await self._fail(e)
+
+    async def on_samples(self, samples: np.ndarray) -> None:
+        if self.done.is_set():
+            return
+        self.chunks.append(samples)
+        self.samples_seen += len(samples)
+
+        for event in self.vad.feed(samples):
+            at = self.vad.speech_start if event == "start" else self.vad.speech_end
+            await self._send({"type": "vad", "speaking": event == "start", "at": at})
+            if event == "end":
+                self.done.set()
+                return
+
+        if self.samples_seen >= self.max_seconds * PCM_SAMPLE_RATE:
+            self.done.set()
+        elif self.partials and self.vad.speaking and self._partial_due():
+            self.last_partial_at = self.samples_seen
+            self.partial_task = asyncio.create_task(self._partial(self._utterance()))
+
+    async def _receive(self, decoder) -> None:
+        pending = b""
+        try:
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes"):
+                    if decoder:
+                        await decoder.write(message["bytes"])
+                        continue
+                    data = pending + message["bytes"]
+                    usable = len(data) - len(data) % 2
+                    pending = data[usable:]
+                    pcm = np.frombuffer(data[:usable], dtype="<i2")
+                    await self.on_samples(pcm.astype(np.float32) / 32768.0)
+                elif message.get("text"):
+                    if _parse(message["text"]).get("type") == "end":
+                        break
+        except Exception as e:
+            logger.warning("Shadowing receive failed: %s", e)
+        finally:
+            if decoder:
+                await decoder.flush()
+            self.done.set()
+
+    def _partial_due(self) -> bool:
+        in_flight = self.partial_task is not None and not self.partial_task.done()
+        new_audio = self.samples_seen - self.last_partial_at
+        return not in_flight and new_audio >= PARTIAL_INTERVAL_SECONDS * PCM_SAMPLE_RATE
+
+    async def _partial(self, samples: np.ndarray) -> None:
+        try:
+            with track_stage(self.stages, "partialAsr", pipeline="shadowing"):
+                transcript = await self.recognizer.transcribe(samples, final=False)
+            if self.done.is_set() or not transcript:
+                return
+            scoring = compute_scores(
+                self.expected_norm, normalize_text(transcript), words=self.words
+            )
+            await self._send(
+                {
+                    "type": "partial",
+                    "transcript": transcript,
+                    "scores": {"overall": scoring["overall"]},
+                    "wordScores": scoring["wordScores"],
+                    "at": round(self.samples_seen / PCM_SAMPLE_RATE, 3),
+                }
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Partial transcript failed: %s", e)
+
+    async def _finish(self) -> None:
+        samples = self._utterance()
+        transcript = ""
+        if len(samples):
+            with track_stage(self.stages, "asr", pipeline="shadowing"):
+                transcript = await self.recognizer.transcribe(samples, final=True)
+        result = await evaluate_transcript(
+            self.scene_id,
+            self.line_id,
+            self.expected_text,
+            transcript,
+            self.words,
+            self.stages,
+            pipeline="shadowing",
+        )
+        result.metadata["audioSeconds"] = round(len(samples) / PCM_SAMPLE_RATE, 3)
+        await self._send({"type": "final", "result": result.model_dump()})
+        await self.websocket.close()
+
+    async def _fail(self, error: Exception) -> None:
+        """Report a failed final to the client, then close (not a bare 1011)."""
+        payload = {"type": "error", "detail": str(error)}
+        code = CLOSE_UNAVAILABLE
+        if isinstance(error, RateLimitExceeded):
+            payload["retryAfter"] = error.retry_after
+            code = CLOSE_RATE_LIMITED
+        try:
+            await self._send(payload)
+            await self.websocket.close(code=code, reason="Evaluation failed")
+        except Exception as e:  # the client may be gone already
+            logger.debug("Shadowing error not delivered: %s", e)
+
+    def _utterance(self) -> np.ndarray:
+        """Audio so far, trimmed to the VAD speech region (plus padding)."""
+        if not self.chunks:
+            return np.empty(0, dtype=np.float32)
+        samples = np.concatenate(self.chunks)
+        self.chunks = [samples]
+        if self.vad.speech_start is None:
+            return samples if self.done.is_set() else samples[:0]
+        pad = UTTERANCE_PADDING_SECONDS
+        start = int(max(self.vad.speech_start - pad, 0.0) * PCM_SAMPLE_RATE)
+        end = len(samples)
+        if self.vad.speech_end is not None:
+            end = int((self.vad.speech_end + pad) * PCM_SAMPLE_RATE)
+        return samples[start:end]
+
+    async def _send(self, payload: dict) -> None:
+        await self.websocket.send_text(json.dumps(payload, ensure_ascii=False))
+
+
+class _FfmpegDecoder:
+    """Streaming webm / ogg Opus → 16 kHz float samples via one ffmpeg process."""
+
+    READ_BYTES = 6400  # 0.2 s of s16le
+
+    def __init__(self, audio_format: str, on_samples):
+        self.audio_format = audio_format
+        self.on_samples = on_samples
+        self.process = None
+        self.reader = None
+
+    async def start(self) -> None:
+        self.process = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-f", self.audio_format, "-i", "pipe:0",
+            "-f", "s16le", "-ac", "1", "-ar", str(PCM_SAMPLE_RATE), "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        self.reader = asyncio.create_task(self._read())
+
+    async def write(self, data: bytes) -> None:
+        self.process.stdin.write(data)
+        await self.process.stdin.drain()
+
+    async def flush(self) -> None:
+        """End of input: let ffmpeg emit its last samples."""
+        if self.process and not self.process.stdin.is_closing():
+            self.process.stdin.close()
+            try:
+                await asyncio.wait_for(asyncio.shield(self.reader), timeout=2.0)
+            except Exception:
+                pass
+
+    async def close(self) -> None:
+        if self.process is None:
+            return
+        if self.process.returncode is None:
+            self.process.kill()
+        await self.process.wait()
+        if self.reader:
+            self.reader.cancel()
+
+    async def _read(self) -> None:
+        pending = b""
+        while True:
+            data = await self.process.stdout.read(self.READ_BYTES)
+            if not data:
+                break
+            data = pending + data
+            usable = len(data) - len(data) % 2
+            pending = data[usable:]
+            pcm = np.frombuffer(data[:usable], dtype="<i2")
+            await self.on_samples(pcm.astype(np.float32) / 32768.0)
+
+
+async def _resolve_line(websocket: WebSocket, scene_id: str, line_id: str):
+    """(expected_text, words, max_seconds) from the scene store or a start message."""
+    scene = await asyncio.to_thread(get_scene, scene_id)
+    line = next((l for l in scene.script if l.id == line_id), None) if scene else None
+    if line is not None:
+        max_seconds = min(
+            (line.endTime - line.startTime) * 2 + 3.0, MAX_UTTERANCE_SECONDS
+        )
+        return line.text, line.words, max_seconds
+
+    try:
+        message = await asyncio.wait_for(
+            websocket.receive_text(), timeout=START_MESSAGE_TIMEOUT
+        )
+        start = _parse(message)
+        words = [
+            WordToken(word=w) if isinstance(w, str) else WordToken(**w)
+            for w in start.get("words") or []
+        ]
+        if start.get("type") == "start" and start.get("expectedText"):
+            return start["expectedText"], words or None, MAX_UTTERANCE_SECONDS
+    except Exception:
+        pass
+    await websocket.close(code=CLOSE_NOT_FOUND, reason="Scene line not found")
+    return None
+
+
+def _parse(text: str) -> dict:
+    try:
+        message = json.loads(text)
+        return message if isinstance(message, dict) else {}
+    except ValueError:
+        return {}
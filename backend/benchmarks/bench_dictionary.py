@@ -0,0 +1,93 @@
+"""
+Offline dictionary (services/dictionary.py) build + lookup benchmark.
+
+Builds the SQLite index from a synthetic JMdict-shaped file (or a real
+JMdict_e.gz with --jmdict) and reports build time, index size and lookup
+latency: uncached (SQLite seek through the mmap), hot (LRU) and a
+Zipf-distributed mix like real scene vocabulary.
+
+    python benchmarks/bench_dictionary.py [--entries 200000] [--lookups 50000]
+        [--jmdict JMdict_e.gz]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.config.config import settings  # noqa: E402
+from app.services import dictionary  # noqa: E402
+from app.services.dictionary import build_index, lookup_meaning  # noqa: E402
+from fixtures import write_jmdict  # noqa: E402
+
+
+def _timed_lookups(queries) -> float:
+    t0 = time.perf_counter()
+    for word, reading in queries:
+        lookup_meaning(word, reading)
+    return (time.perf_counter() - t0) / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=200000)
+    parser.add_argument("--lookups", type=int, default=50000)
+    parser.add_argument("--jmdict", help="real JMdict XML instead of the synthetic one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = args.jmdict
+        pairs = None
+        if not source:
+            source = os.path.join(tmp, "JMdict_e")
+            pairs = write_jmdict(source, args.entries)
+        output = os.path.join(tmp, "jmdict.sqlite")
+        stats = build_index(source, output)
+        print(
+            f"Build: {stats['entries']} entries, {stats['forms']} forms,"
+            f" {stats['bytes'] / 1e6:.1f} MB in {stats['seconds']:.2f}s"
+        )
+
+        settings.DICTIONARY_PATH = output
+        if pairs is None:
+            connection = dictionary._connection()
+            pairs = connection.execute(
+                "SELECT form, reading FROM forms ORDER BY rank, entry_id LIMIT ?",
+                (args.lookups,),
+            ).fetchall()
+
+        rng = np.random.default_rng(0)
+        distinct = [pairs[i] for i in rng.permutation(len(pairs))[: args.lookups]]
+        missing = [(f"未登録{i}", None) for i in range(min(args.lookups, 10000))]
+        # Zipf over the (common-first) entries: a few words dominate speech
+        ranks = np.minimum(rng.zipf(1.2, size=args.lookups), len(pairs)) - 1
+        zipf = [pairs[r] for r in ranks]
+
+        lookup_meaning.cache_clear()
+        uncached = _timed_lookups(distinct)
+        miss = _timed_lookups(missing)
+        hot_set = distinct[: settings.DICTIONARY_CACHE_SIZE]
+        _timed_lookups(hot_set)
+        hot = _timed_lookups(hot_set)
+        lookup_meaning.cache_clear()
+        mixed = _timed_lookups(zipf)
+        info = lookup_meaning.cache_info()
+
+        print(f"{'lookup':<22} {'µs/op':>8}")
+        print(f"{'uncached hit':<22} {uncached * 1e6:>8.2f}")
+        print(f"{'uncached miss':<22} {miss * 1e6:>8.2f}")
+        print(f"{'hot (LRU)':<22} {hot * 1e6:>8.2f}")
+        print(
+            f"{'zipf mix':<22} {mixed * 1e6:>8.2f}"
+            f"   LRU hit rate {info.hits / (info.hits + info.misses):.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,416 @@
+"""
+End-to-end pipeline benchmark — fully offline (see benchmarks/standins.py).
+
+Runs the real code paths against local stand-ins for YouTube (a yt-dlp
+fixture extractor serving synthetic Opus audio), OpenAI, WhisperX, Redis
+(fakeredis) and the storage bucket:
+
+    ingest    ingest_scene() at each --concurrency level, then the /pitch
+              flow: time until the background pitch result is ready, and
+              GET /pitch/{id} raw and shaped (first call and cached)
+    evaluate  evaluate_line() on per-line clips at each concurrency level
+
+--pitch-workers N runs pitch through the Redis Streams task queue
+(TASK_QUEUE=redis) with N in-process workers instead of a thread per scene.
+Their threads share this interpreter with the in-process API (TestClient
+requests slow down while they sit in blocking reads), so compare queue
+runs with a queue baseline only.
+
+Reports per-stage wall times (medians from metadata.stages), latency
+p50 / p95 and throughput per level (ingest: scenes with pitch ready per
+second), and peak RSS per phase. Results are
+flattened into named metrics and compared against a JSON baseline:
+
+    python benchmarks/bench_e2e.py [--concurrency 1,2,4,8] [--seconds 30]
+    python benchmarks/bench_e2e.py --save-baseline   # record this machine
+    python benchmarks/bench_e2e.py --check           # exit 1 on regression
+
+A metric regresses when it is worse than the baseline by more than
+--tolerance (and by more than NOISE_FLOOR_SECONDS for timings). Baselines
+are machine-specific — record one per machine / CI runner.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("ALLOWED_ORIGINS", "*")
+os.environ["STORAGE_BACKEND"] = "local"
+os.environ["LOCAL_STORAGE_DIR"] = tempfile.mkdtemp(prefix="bench-storage-")
+os.environ["PITCH_WARMUP"] = "false"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.config.config import settings  # noqa: E402
+from app.services import rate_limit  # noqa: E402
+from app.services.ai_client import close_ai_client  # noqa: E402
+from app.services.pitch import wait_for_pitch_extraction, warm_up_pitch_engine  # noqa: E402
+from app.services.pitch_cache import get_pitch_result  # noqa: E402
+from app.services.task_queue import run_worker  # noqa: E402
+from app.workers.evaluate import evaluate_line  # noqa: E402
+from app.workers.ingest import ingest_scene  # noqa: E402
+from fixtures import synthetic_speech  # noqa: E402
+from standins import (  # noqa: E402
+    FakeOpenAI,
+    FixtureMedia,
+    StubWhisperX,
+    Transcripts,
+    install_fixture_extractor,
+    line_transcript,
+    scene_transcript,
+    serve,
+    use_fakeredis,
+    use_local_bucket,
+    write_wav,
+)
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baselines" / "e2e.json"
+NOISE_FLOOR_SECONDS = 0.02
+PITCH_POLL_SECONDS = 0.01
+SHAPED_PITCH_QUERY = "?points=200&smooth=5&semitones=true"
+
+
+class RssSampler:
+    """Peak resident set size while the block runs (sampled every 10 ms)."""
+
+    def __init__(self):
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self.peak = _rss_bytes()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(0.01):
+            self.peak = max(self.peak, _rss_bytes())
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:  # not Linux — lifetime peak instead
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def _percentiles(values) -> dict:
+    return {
+        "p50_s": round(float(np.percentile(values, 50)), 4),
+        "p95_s": round(float(np.percentile(values, 95)), 4),
+    }
+
+
+def _stage_medians(stage_dicts) -> dict:
+    names = {name for stages in stage_dicts for name in stages}
+    return {
+        name: round(
+            statistics.median(s[name]["wallSeconds"] for s in stage_dicts if name in s), 4
+        )
+        for name in sorted(names)
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Phases
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def bench_ingest(urls, levels, estimator, client, bucket: dict) -> dict:
+    def one(url):
+        start = time.perf_counter()
+        scene = ingest_scene(url, pitch_mode=estimator)
+        ingested = time.perf_counter()
+        while get_pitch_result(scene.sceneId)["status"] != "ready":
+            time.sleep(PITCH_POLL_SECONDS)
+        return scene, ingested - start, time.perf_counter() - ingested
+
+    results, scenes = {}, []
+    for concurrency in levels:
+        jobs = urls[: 2 * concurrency]  # two waves per level
+        use_local_bucket(tempfile.mkdtemp(prefix="bench-bucket-"), **bucket)  # no dedupe hits
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            runs = list(pool.map(one, jobs))
+        wall = time.perf_counter() - start
+        wait_for_pitch_extraction()
+
+        level_scenes = [scene for scene, _, _ in runs]
+        scenes.extend(level_scenes)
+        raw, shaped, cached = [], [], []
+        for scene in level_scenes:
+            for query, timings in (("", raw), (SHAPED_PITCH_QUERY, shaped), (SHAPED_PITCH_QUERY, cached)):
+                t0 = time.perf_counter()
+                response = client.get(f"/pitch/{scene.sceneId}{query}")
+                timings.append(time.perf_counter() - t0)
+                if response.status_code != 200:
+                    raise RuntimeError(f"/pitch returned {response.status_code}")
+
+        results[f"c{concurrency}"] = {
+            "ingest": _percentiles([r[1] for r in runs]),
+            "pitchReady": _percentiles([r[2] for r in runs]),
+            "throughput_per_s": round(len(jobs) / wall, 4),
+            "pitchGet": {
+                "raw": _percentiles(raw),
+                "shaped": _percentiles(shaped),
+                "shapedCached": _percentiles(cached),
+            },
+        }
+    results["stages"] = _stage_medians([s.metadata["stages"] for s in scenes])
+    return results, scenes[0]
+
+
+async def bench_evaluate(scene, clips, levels) -> dict:
+    lines = {line.id: line for line in scene.script}
+    results, stage_dicts = {}, []
+    for concurrency in levels:
+        gate = asyncio.Semaphore(concurrency)
+        jobs = [clips[i % len(clips)] for i in range(max(8, 4 * concurrency))]
+
+        async def one(line_id, path):
+            async with gate:
+                line = lines[line_id]
+                start = time.perf_counter()
+                result = await evaluate_line(scene.sceneId, line_id, line.text, path, line.words)
+                stage_dicts.append(result.metadata["stages"])
+                return time.perf_counter() - start
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(one(line_id, path) for line_id, path in jobs))
+        wall = time.perf_counter() - start
+        results[f"c{concurrency}"] = {
+            "evaluate": _percentiles(latencies),
+            "throughput_per_s": round(len(jobs) / wall, 4),
+        }
+    results["stages"] = _stage_medians(stage_dicts)
+    return results
+
+
+def make_clips(scene, transcripts: Transcripts, root: str) -> list:
+    """One WAV per scene line; the stub ASR hears every third one imperfectly."""
+    clips = []
+    for i, line in enumerate(scene.script):
+        seconds = max(line.endTime - line.startTime, 0.5)
+        samples, _ = synthetic_speech(seconds, seed=100 + i)
+        path = os.path.join(root, f"{line.id}.wav")
+        write_wav(path, samples)
+        said = line.phoneticReading or line.text
+        if i % 3 == 2:
+            said = said[:-1]
+        transcripts.by_stem[line.id] = line_transcript(said, seconds)
+        clips.append((line.id, path))
+    return clips
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Baselines
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def flatten(tree: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in tree.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        else:
+            flat[name] = value
+    return flat
+
+
+def compare(metrics: dict, baseline: dict, tolerance: float) -> list:
+    """(metric, baseline, current, change) for every regression."""
+    regressions = []
+    for name, old in baseline.items():
+        new = metrics.get(name)
+        if new is None or not old:
+            continue
+        change = (new - old) / old
+        if name.endswith("throughput_per_s"):
+            worse = change < -tolerance
+        elif name.endswith("_mb"):
+            worse = change > tolerance
+        else:
+            worse = change > tolerance and new - old > NOISE_FLOOR_SECONDS
+        if worse:
+            regressions.append((name, old, new, change))
+    return regressions
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Main
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", default="1,2,4,8")
+    parser.add_argument("--seconds", type=float, default=30, help="fixture video length")
+    parser.add_argument("--pitch-estimator", default=None, help="default: PITCH_ESTIMATOR")
+    parser.add_argument("--pitch-workers", type=int, default=0, help="0 = thread per scene")
+    parser.add_argument("--openai-base-ms", type=float, default=300)
+    parser.add_argument("--openai-token-ms", type=float, default=10)
+    parser.add_argument("--openai-slots", type=int, default=16)
+    parser.add_argument("--asr-base-ms", type=float, default=300)
+    parser.add_argument("--asr-realtime-factor", type=float, default=0.05)
+    parser.add_argument("--storage-latency-ms", type=float, default=50)
+    parser.add_argument("--storage-mbps", type=float, default=100)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--verbose", action="store_true", help="keep pipeline logs")
+    args = parser.parse_args()
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    tmp = tempfile.mkdtemp(prefix="bench-e2e-")
+    transcripts = Transcripts(default=scene_transcript(args.seconds))
+    fake_openai = FakeOpenAI(
+        args.openai_slots, args.openai_base_ms, args.openai_token_ms, transcripts=transcripts
+    )
+    whisperx = StubWhisperX(args.asr_base_ms, args.asr_realtime_factor, transcripts)
+    media = FixtureMedia(tmp)
+    install_fixture_extractor(media)
+    urls = [
+        media.add_video(f"video{i}", args.seconds, seed=i) for i in range(2 * max(levels))
+    ]
+
+    # Set after the config import so a local .env can't point this at real services
+    os.environ["OPENAI_BASE_URL"] = f"{serve(fake_openai.app)}/v1"
+    settings.OPENAI_API_KEY = "sk-bench"
+    settings.AI_ENABLED = True
+    settings.COLAB_WHISPERX_URL = serve(whisperx.app)
+    settings.COLAB_API_SECRET = "bench"
+    rate_limit.MAX_PER_MINUTE = rate_limit.MAX_DAILY_CALLS = 10**9
+    use_fakeredis()
+    stop_workers = threading.Event()
+    if args.pitch_workers:
+        settings.TASK_QUEUE = "redis"
+        for i in range(args.pitch_workers):
+            threading.Thread(
+                target=run_worker,
+                args=(["pitch"], f"bench-{i}", stop_workers),
+                daemon=True,
+            ).start()
+
+    from app.app import app
+
+    client = TestClient(app)
+    estimator = args.pitch_estimator or settings.PITCH_ESTIMATOR
+    warm_up_pitch_engine()  # the server does this at startup
+
+    print(
+        f"{args.seconds:.0f}s fixture videos, pitch estimator {estimator},"
+        f" OpenAI {args.openai_base_ms:.0f}ms + {args.openai_token_ms}ms/token,"
+        f" WhisperX {args.asr_base_ms:.0f}ms + {args.asr_realtime_factor}×audio,"
+        f" bucket {args.storage_latency_ms:.0f}ms @ {args.storage_mbps:.0f} MB/s,"
+        f" pitch {f'{args.pitch_workers} queue workers' if args.pitch_workers else 'threads'}"
+    )
+    logs = sys.stdout if args.verbose else open(os.devnull, "w")
+    memory = {}
+    with redirect_stdout(logs):
+        with RssSampler() as rss:
+            ingest, scene = bench_ingest(
+                urls,
+                levels,
+                estimator,
+                client,
+                {"latency_ms": args.storage_latency_ms, "bandwidth_mbps": args.storage_mbps},
+            )
+        memory["ingest_peak_mb"] = round(rss.peak / 2**20, 1)
+
+        clips = make_clips(scene, transcripts, tmp)
+        with RssSampler() as rss:
+            evaluate = asyncio.run(bench_evaluate(scene, clips, levels))
+        memory["evaluate_peak_mb"] = round(rss.peak / 2**20, 1)
+    stop_workers.set()
+    close_ai_client()
+
+    print(f"\n{'ingest':<8} {'p50 s':>8} {'p95 s':>8} {'scenes/s':>9}"
+          f" {'pitch p50':>10} {'GET raw':>9} {'shaped':>8} {'cached':>8}")
+    for concurrency in levels:
+        r = ingest[f"c{concurrency}"]
+        get = r["pitchGet"]
+        print(
+            f"c={concurrency:<6} {r['ingest']['p50_s']:>8.3f} {r['ingest']['p95_s']:>8.3f}"
+            f" {r['throughput_per_s']:>9.2f} {r['pitchReady']['p50_s']:>10.3f}"
+            f" {get['raw']['p50_s'] * 1000:>7.1f}ms {get['shaped']['p50_s'] * 1000:>6.1f}ms"
+            f" {get['shapedCached']['p50_s'] * 1000:>6.1f}ms"
+        )
+    print("stages (median s): " + ", ".join(f"{k} {v:.3f}" for k, v in ingest["stages"].items()))
+
+    print(f"\n{'evaluate':<8} {'p50 s':>8} {'p95 s':>8} {'evals/s':>9}")
+    for concurrency in levels:
+        r = evaluate[f"c{concurrency}"]
+        print(
+            f"c={concurrency:<6} {r['evaluate']['p50_s']:>8.3f} {r['evaluate']['p95_s']:>8.3f}"
+            f" {r['throughput_per_s']:>9.2f}"
+        )
+    print("stages (median s): " + ", ".join(f"{k} {v:.3f}" for k, v in evaluate["stages"].items()))
+    print(f"\npeak RSS: ingest {memory['ingest_peak_mb']} MB, evaluate {memory['evaluate_peak_mb']} MB")
+
+    metrics = flatten({"ingest": ingest, "evaluate": evaluate, "memory": memory})
+    params = {k: v for k, v in vars(args).items() if k not in ("baseline", "save_baseline", "check", "verbose")}
+    params["pitch_estimator"] = estimator
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(
+            json.dumps(
+                {
+                    "machine": {
+                        "platform": platform.platform(),
+                        "python": platform.python_version(),
+                        "cpus": os.cpu_count(),
+                    },
+                    "params": params,
+                    "metrics": metrics,
+                },
+                indent=2,
+                sort_keys=True,
+            )
+            + "\n"
+        )
+        print(f"baseline written to {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"no baseline at {args.baseline} (record one with --save-baseline)")
+        return
+    baseline = json.loads(args.baseline.read_text())
+    if baseline.get("params") != params:
+        print("⚠️  baseline was recorded with different parameters — comparison is indicative")
+    regressions = compare(metrics, baseline["metrics"], args.tolerance)
+    if not regressions:
+        print(f"no regressions against {args.baseline.name} (tolerance {args.tolerance:.0%})")
+        return
+    print(f"{len(regressions)} regression(s) against {args.baseline.name}:")
+    for name, old, new, change in regressions:
+        print(f"  {name:<45} {old:>10} → {new:<10} ({change:+.0%})")
+    if args.check:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Feedback micro-batching load test (services/feedback_batcher.py).
+
+Starts the fake OpenAI server (benchmarks/standins.py) on localhost and
+fires a classroom burst of concurrent line-feedback requests at it through
+the real client stack (ai_client → AsyncOpenAI → connection pool), once
+with batching off and once with it on. Reports upstream calls, fallbacks and p50 / p99 latency.
+
+The fake server models the provider's limits: at most --server-slots
+completions are generated at once (the rest queue), each taking --base-ms
+plus --token-ms per output token (60 per attempt), and with --rpm it
+answers 429 past that many requests per minute (the SDK retries with
+backoff, then the request falls back to the default feedback).
+
+    python benchmarks/bench_feedback_batching.py [--requests 200]
+        [--spread-ms 500] [--window-ms 50] [--max-items 8] [--rpm 100]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.config.config import settings  # noqa: E402
+from app.services.ai_client import close_ai_client  # noqa: E402
+from app.services.feedback_batcher import request_feedback  # noqa: E402
+from standins import FakeOpenAI, serve  # noqa: E402
+
+
+async def _burst(requests: int, spread: float):
+    async def one(i: int):
+        await asyncio.sleep(random.uniform(0, spread))
+        t0 = time.perf_counter()
+        feedback = await request_feedback(f"元気ですか{i}", "げんきですか", 87.5)
+        return time.perf_counter() - t0, feedback is None
+
+    results = await asyncio.gather(*(one(i) for i in range(requests)))
+    latencies = np.array([r[0] for r in results])
+    return latencies, sum(r[1] for r in results)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--spread-ms", type=float, default=500)
+    parser.add_argument("--window-ms", type=float, default=50)
+    parser.add_argument("--max-items", type=int, default=8)
+    parser.add_argument("--server-slots", type=int, default=16)
+    parser.add_argument("--base-ms", type=float, default=300)
+    parser.add_argument("--token-ms", type=float, default=10)
+    parser.add_argument("--rpm", type=int, default=0, help="0 = no request limit")
+    args = parser.parse_args()
+
+    fake = FakeOpenAI(args.server_slots, args.base_ms, args.token_ms, args.rpm)
+    # Set after the config import so a local .env can't point this at the real API
+    os.environ["OPENAI_BASE_URL"] = f"{serve(fake.app)}/v1"
+    settings.OPENAI_API_KEY = "sk-bench"
+    settings.AI_ENABLED = True
+    settings.FEEDBACK_BATCH_MAX_ITEMS = args.max_items
+
+    print(
+        f"{args.requests} feedback requests over {args.spread_ms:.0f}ms,"
+        f" fake server: {args.server_slots} slots, {args.base_ms:.0f}ms"
+        f" + {args.token_ms}ms/token" + (f", {args.rpm} rpm" if args.rpm else "")
+    )
+    print(
+        f"{'mode':<22} {'calls':>6} {'429s':>5} {'fallback':>9}"
+        f" {'p50 ms':>8} {'p99 ms':>8}"
+    )
+    for label, window in (("unbatched", 0), (f"batched {args.window_ms:.0f}ms", args.window_ms)):
+        settings.FEEDBACK_BATCH_WINDOW_MS = window
+        fake.reset()
+        random.seed(0)
+        latencies, fallbacks = asyncio.run(_burst(args.requests, args.spread_ms / 1000))
+        print(
+            f"{label:<22} {fake.calls:>6} {fake.rejected:>5} {fallbacks:>9}"
+            f" {np.percentile(latencies, 50) * 1000:>8.0f}"
+            f" {np.percentile(latencies, 99) * 1000:>8.0f}"
+        )
+    close_ai_client()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Local Japanese analysis vs GPT word breakdowns.
+
+Builds a scene from the fixture dialogue and compares the structured output
+GPT has to generate with the full schema (furigana text, phoneticReading,
+per-line words with reading + meaning) against the slim draft schema (plain
+text and a once-per-scene vocabulary list), plus the analyzer's own cost.
+
+Output tokens use tiktoken (o200k_base) when its encoding is available,
+otherwise an estimate (4 ASCII chars or 1 kana/kanji per token). Generation
+time is estimated at --tokens-per-second; --live makes the real GPT calls
+both ways instead (needs AI_ENABLED and a key).
+
+--check verifies compounds the analyzer must keep as one word with the
+compound's own reading (UniDic splits them into short units) and exits 1
+on a regression.
+
+    python benchmarks/bench_local_analysis.py [--lines 40] [--live] [--check]
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.services.gpt import (  # noqa: E402
+    GPTDraftLine,
+    GPTVocabularyEntry,
+    ScriptDraftResponse,
+    complete_script,
+    refine_script_from_whisper,
+)
+from app.services.japanese import analyze_line, analyzer_name  # noqa: E402
+from fixtures import PHRASES  # noqa: E402
+
+DIALOGUE = PHRASES + [
+    "昨日の会議で決まったことを、もう一度説明してもらえますか",
+    "すみません、電車が遅れてしまって",
+    "この資料は来週の月曜日までに準備しておいてください",
+    "彼女は子供のころからずっとピアノを習っているそうです",
+    "雨が降りそうだから、傘を持って行ったほうがいいよ",
+    "新しいプロジェクトについて、何か質問はありますか",
+    "駅前のラーメン屋はいつも行列ができている",
+    "週末は家族と一緒に温泉に行く予定です",
+    "先生に言われた通りに、毎日漢字を練習しています",
+    "その映画は思ったより面白くなかった",
+]
+
+# (line, word that must come out whole, its reading, annotated line)
+COMPOUNDS = [
+    ("お母さんは元気です", "お母さん", "おかあさん", "お母(かあ)さんは元気(げんき)です"),
+    ("喫茶店で会いましょう", "喫茶店", "きっさてん", "喫茶店(きっさてん)で会(あ)いましょう"),
+    (
+        "取り扱い説明書を読んでください",
+        "取り扱い説明書",
+        "とりあつかいせつめいしょ",
+        None,  # furigana placement differs between analyzers
+    ),
+]
+
+# Typical length of what GPT writes for a meaning
+MEANING = "energy / health"
+
+# Particles, auxiliaries etc. — GPT's "meaningful word" lists skip most of them
+FUNCTION_POS = {"助詞", "助動詞", "接頭辞", "接尾辞"}
+
+
+def _token_counter():
+    try:
+        import tiktoken
+
+        encoding = tiktoken.get_encoding("o200k_base")
+        return "tiktoken o200k_base", lambda text: len(encoding.encode(text))
+    except Exception:
+        def estimate(text: str) -> int:
+            ascii_chars = sum(1 for c in text if ord(c) < 128)
+            return round(ascii_chars / 4 + (len(text) - ascii_chars))
+
+        return "estimate", estimate
+
+
+def _draft(lines: int) -> ScriptDraftResponse:
+    draft_lines = [
+        GPTDraftLine(
+            characterName=f"Character {i % 2 + 1}",
+            text=DIALOGUE[i % len(DIALOGUE)] + ("。" if i % 3 else "？"),
+            startTime=i * 2.5,
+            endTime=i * 2.5 + 2.2,
+        )
+        for i in range(lines)
+    ]
+    vocabulary = {}
+    for line in draft_lines:
+        for _, _, base, pos in analyze_line(line.text).words:
+            if pos not in FUNCTION_POS:
+                vocabulary.setdefault(base, GPTVocabularyEntry(word=base, meaning=MEANING))
+    return ScriptDraftResponse(
+        characters=["Character 1", "Character 2"],
+        lines=draft_lines,
+        vocabulary=list(vocabulary.values()),
+    )
+
+
+def _full_schema_output(draft: ScriptDraftResponse) -> dict:
+    """What GPT generated before: content words only, like its word lists."""
+    full = complete_script(draft).model_dump()
+    for line, draft_line in zip(full["lines"], draft.lines):
+        analysis = analyze_line(draft_line.text)
+        content = {w for w, _, _, pos in analysis.words if pos not in FUNCTION_POS}
+        line["words"] = [
+            {"word": w["word"], "reading": w["reading"], "meaning": w["meaning"]}
+            for w in line["words"]
+            if w["word"] in content
+        ]
+    return full
+
+
+def _timed_analysis(lines):
+    analyze_line.cache_clear()
+    t0 = time.perf_counter()
+    for text in lines:
+        analyze_line(text)
+    cold = (time.perf_counter() - t0) / len(lines)
+    t0 = time.perf_counter()
+    for text in lines:
+        analyze_line(text)
+    warm = (time.perf_counter() - t0) / len(lines)
+    return cold, warm
+
+
+def _check_compounds() -> bool:
+    ok = True
+    for text, word, reading, annotated in COMPOUNDS:
+        analysis = analyze_line(text)
+        found = next((w for w in analysis.words if w[0] == word), None)
+        passed = (
+            found is not None
+            and found[1] == reading
+            and (annotated is None or analysis.text == annotated)
+        )
+        ok &= passed
+        words = " ".join(f"{w}({r})" for w, r, _, _ in analysis.words)
+        print(f"  {'✅' if passed else '❌'} {text}: {words} | {analysis.text}")
+    return ok
+
+
+def _live(draft: ScriptDraftResponse) -> None:
+    transcript = {
+        "segments": [
+            {"text": l.text, "start": l.startTime, "end": l.endTime, "speaker": l.characterName}
+            for l in draft.lines
+        ]
+    }
+    for local_analysis in (False, True):
+        t0 = time.perf_counter()
+        response = refine_script_from_whisper(transcript, local_analysis=local_analysis)
+        gpt_seconds = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        complete_script(response)
+        analysis_seconds = time.perf_counter() - t0
+        size = len(response.model_dump_json())
+        label = "slim + local" if local_analysis else "full schema"
+        print(
+            f"  {label:<13} gpt {gpt_seconds:6.2f}s  analysis {analysis_seconds * 1000:6.1f}ms"
+            f"  output {size:>7} chars"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=40)
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--live", action="store_true")
+    parser.add_argument("--check", action="store_true", help="exit 1 on regression")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    if analyzer_name() is None:
+        sys.exit("No Japanese analyzer installed (pip install fugashi unidic-lite)")
+
+    load = time.perf_counter() - t0
+    draft = _draft(args.lines)
+    counter_name, count = _token_counter()
+    full = json.dumps(_full_schema_output(draft), ensure_ascii=False)
+    slim = draft.model_dump_json()
+
+    print(f"Analyzer: {analyzer_name()}   lines: {args.lines}   tokens: {counter_name}")
+    print(f"{'schema':<13} {'chars':>8} {'tokens':>8} {'est. gen s':>11}")
+    for label, output in (("full", full), ("slim", slim)):
+        tokens = count(output)
+        print(
+            f"{label:<13} {len(output):>8} {tokens:>8}"
+            f" {tokens / args.tokens_per_second:>11.2f}"
+        )
+    full_tokens, slim_tokens = count(full), count(slim)
+    print(f"Output tokens saved: {1 - slim_tokens / full_tokens:.0%}")
+
+    cold, warm = _timed_analysis([l.text for l in draft.lines])
+    print(
+        f"Analyzer load {load * 1000:.0f}ms, per line {cold * 1e6:.0f}µs"
+        f" (cached {warm * 1e6:.1f}µs)"
+    )
+
+    if args.live:
+        print("Live GPT calls:")
+        _live(draft)
+
+    print("Compounds:")
+    if not _check_compounds() and args.check:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+F0 estimator benchmark — accuracy vs speed for pyin / yin / acf.
+
+Synthetic fixtures have an exact F0 track (see fixtures.synthetic_speech);
+recorded audio (--audio) has no ground truth, so pyin is the reference.
+
+    GPE    gross pitch error — voiced in both, off by more than 20 %
+    cents  median error of the remaining frames
+    VDE    voicing decision error — voiced/unvoiced disagreement
+    xRT    seconds of audio processed per second of compute
+
+    python benchmarks/bench_pitch_estimators.py [--seconds 60] [--line-seconds 3]
+                                                [--audio clip.m4a]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("ALLOWED_ORIGINS", "http://localhost:3000")
+
+from app.services import pitch  # noqa: E402
+from app.services.audio import decode_to_pcm, load_pcm, pcm_to_float  # noqa: E402
+from fixtures import synthetic_speech  # noqa: E402
+
+
+def contour(y: np.ndarray, estimator: str, line_seconds: float):
+    """Run an estimator line by line (as ingest does); time it."""
+    # Whole hops per line, so line contours tile the fixture's frame grid
+    frames_per_line = int(line_seconds * pitch.SAMPLE_RATE) // pitch.HOP_LENGTH
+    step = frames_per_line * pitch.HOP_LENGTH
+    out = []
+    start = time.perf_counter()
+    for i in range(0, len(y), step):
+        line = pitch.extract_pitch_from_samples(y[i : i + step], estimator=estimator)
+        # Drop the trailing frame so lines tile the timeline exactly
+        out.extend(line[:frames_per_line] if i + step < len(y) else line)
+    return np.asarray(out), time.perf_counter() - start
+
+
+def score(estimate: np.ndarray, truth: np.ndarray) -> dict:
+    n = min(len(estimate), len(truth))
+    est, ref = estimate[:n], truth[:n]
+    both = (est > 0) & (ref > 0)
+    ratio = np.where(both, est / np.where(ref > 0, ref, 1.0), 1.0)
+    gross = both & (np.abs(ratio - 1.0) > 0.2)
+    fine = both & ~gross
+    cents = 1200 * np.abs(np.log2(ratio[fine])) if fine.any() else np.array([0.0])
+    return {
+        "gpe": gross.sum() / max(both.sum(), 1),
+        "cents": float(np.median(cents)),
+        "vde": float(np.mean((est > 0) != (ref > 0))),
+    }
+
+
+def report(title: str, y: np.ndarray, truth, line_seconds: float) -> None:
+    seconds = len(y) / pitch.SAMPLE_RATE
+    results = {}
+    for name in pitch.PITCH_ESTIMATORS:
+        contour(y[: pitch.SAMPLE_RATE], name, line_seconds)  # warm up / JIT
+        results[name] = contour(y, name, line_seconds)
+
+    reference = truth if truth is not None else results["pyin"][0]
+    print("\n" + "=" * 72)
+    print(f"{title} — {seconds:.0f}s audio, {line_seconds}s lines")
+    print("=" * 72)
+    print(f"{'estimator':<10}{'GPE':>8}{'cents':>9}{'VDE':>8}{'time':>10}{'xRT':>9}{'speedup':>10}")
+    pyin_time = results["pyin"][1]
+    for name, (estimate, elapsed) in results.items():
+        s = score(estimate, reference)
+        print(
+            f"{name:<10}{s['gpe']:>7.1%}{s['cents']:>9.1f}{s['vde']:>7.1%}"
+            f"{elapsed:>9.2f}s{seconds / elapsed:>8.0f}x{pyin_time / elapsed:>9.1f}x"
+        )
+    if truth is None:
+        print("(no ground truth — errors are relative to pyin)")
+    print("=" * 72)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--line-seconds", type=float, default=3.0)
+    parser.add_argument("--audio", help="recorded fixture (any ffmpeg-readable file)")
+    args = parser.parse_args()
+
+    y, truth = synthetic_speech(args.seconds, hop=pitch.HOP_LENGTH)
+    report("SYNTHETIC SPEECH", y, truth, args.line_seconds)
+
+    if args.audio:
+        with tempfile.TemporaryDirectory() as tmp:
+            pcm_path = decode_to_pcm(args.audio, os.path.join(tmp, "rec.pcm.wav"))
+            samples = pcm_to_float(load_pcm(pcm_path))
+            report(f"RECORDED {Path(args.audio).name}", samples, None, args.line_seconds)
+            del samples
+    print()
+
+
+if __name__ == "__main__":
+    main()
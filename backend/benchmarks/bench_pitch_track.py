@@ -0,0 +1,129 @@
+"""
+Full-scene F0 track vs per-line extraction.
+
+A synthetic scene (fixtures.synthetic_speech, exact F0 truth) is cut into
+random script lines covering --coverage of it. For each estimator:
+
+    per-line   extraction of every line window (the old pipeline)
+    track      one full-scene track (pitch.extract_pitch_track)
+    re-line    every boundary moved by up to ±0.3 s: per-line has to
+               extract again, the track only slices
+    agree      GPE / VDE of track-sliced contours against per-line ones
+    VDE        voicing error of each against the truth, in line frames
+
+plus the stored track size and the cost of a range query (slice) and of
+decoding a stored track.
+
+    python benchmarks/bench_pitch_track.py [--seconds 300] [--coverage 0.7]
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("ALLOWED_ORIGINS", "http://localhost:3000")
+
+from app.services import pitch  # noqa: E402
+from app.services.audio import pcm_slice  # noqa: E402
+from app.services.pitch_track import PitchTrack  # noqa: E402
+from fixtures import synthetic_speech  # noqa: E402
+
+
+def script_lines(seconds: float, coverage: float, seed: int = 0):
+    """Random 1–4 s lines with gaps sized so lines cover about `coverage`."""
+    rng = np.random.default_rng(seed)
+    mean_gap = 2.5 * (1 - coverage) / coverage
+    lines, t = [], rng.uniform(0.2, 1.0)
+    while t < seconds - 1:
+        length = rng.uniform(1, 4)
+        lines.append((round(t, 3), round(min(t + length, seconds), 3)))
+        t += length + rng.uniform(0.5, 1.5) * mean_gap
+    return lines
+
+
+def per_line(pcm: np.ndarray, lines, estimator: str):
+    return [
+        pitch.extract_pitch_from_samples(
+            pcm_slice(pcm, start, start + max(end - start, 0.1)), estimator=estimator
+        )
+        for start, end in lines
+    ]
+
+
+def errors(estimate, reference) -> tuple:
+    """(GPE, VDE) over the concatenated contours."""
+    est, ref = np.concatenate(estimate), np.concatenate(reference)
+    n = min(len(est), len(ref))
+    est, ref = est[:n], ref[:n]
+    both = (est > 0) & (ref > 0)
+    ratio = np.where(both, est / np.where(ref > 0, ref, 1.0), 1.0)
+    gpe = (both & (np.abs(ratio - 1.0) > 0.2)).sum() / max(both.sum(), 1)
+    return gpe, float(np.mean((est > 0) != (ref > 0)))
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=300)
+    parser.add_argument("--coverage", type=float, default=0.7, help="share of the scene in lines")
+    args = parser.parse_args()
+
+    y, truth = synthetic_speech(args.seconds, hop=pitch.HOP_LENGTH)
+    pcm = np.round(y * 32767).astype(np.int16)
+    lines = script_lines(args.seconds, args.coverage)
+    rng = np.random.default_rng(1)
+    moved = [
+        (max(s + rng.uniform(-0.3, 0.3), 0), e + rng.uniform(-0.3, 0.3)) for s, e in lines
+    ]
+    covered = sum(e - s for s, e in lines) / args.seconds
+
+    print("\n" + "=" * 86)
+    print(
+        f"FULL-SCENE TRACK — {args.seconds:.0f}s scene, {len(lines)} lines "
+        f"covering {covered:.0%}"
+    )
+    print("=" * 86)
+    print(
+        f"{'estimator':<10}{'per-line':>10}{'track':>9}{'re-line':>18}"
+        f"{'agree GPE/VDE':>17}{'VDE line/track':>18}"
+    )
+    for name in pitch.PITCH_ESTIMATORS:
+        pitch.extract_pitch_from_samples(y[: pitch.SAMPLE_RATE], estimator=name)  # JIT
+
+        old, old_s = timed(lambda: per_line(pcm, lines, name))
+        track, track_s = timed(lambda: pitch.extract_pitch_track(pcm, name))
+        _, reline_old_s = timed(lambda: per_line(pcm, moved, name))
+        _, reline_new_s = timed(lambda: [track.line_contour(s, e) for s, e in moved])
+
+        new = [track.line_contour(s, e) for s, e in lines]
+        truths = [truth[slice(*track.line_frames(s, e))] for s, e in lines]
+        agree = errors(new, old)
+        print(
+            f"{name:<10}{old_s:>9.2f}s{track_s:>8.2f}s"
+            f"{reline_old_s:>9.2f}s →{reline_new_s * 1000:>5.1f}ms"
+            f"{agree[0]:>9.1%} /{agree[1]:>5.1%}"
+            f"{errors(old, truths)[1]:>11.1%} /{errors(new, truths)[1]:>5.1%}"
+        )
+
+    payload = track.to_json()
+    _, slice_s = timed(lambda: [track.slice(40.0, 43.5) for _ in range(1000)])
+    _, decode_s = timed(lambda: [PitchTrack.from_json(payload) for _ in range(100)])
+    print(
+        f"\nstored track: {len(payload) / 1024:.1f} KB for {len(track)} frames — "
+        f"range slice {slice_s * 1000:.1f} µs, decode {decode_s * 10:.2f} ms"
+    )
+    print("=" * 86 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Pitch engine warm-up benchmark — first-call vs steady-state latency.
+
+Each scenario runs in a fresh interpreter against a private numba cache
+directory (PITCH_JIT_CACHE_DIR):
+
+    cold cache           — first deploy: librosa imports + full numba JIT
+    warm cache           — restart: compiled kernels loaded from disk
+    warm cache + warm-up — warm_up_pitch_engine() ran at startup, so the
+                           first scene line costs what every later one does
+
+    python benchmarks/bench_pitch_warmup.py [--calls 10] [--line-seconds 2.5]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+CHILD = """
+import json, statistics, sys, time
+import numpy as np
+from app.services import pitch
+
+warmup, calls, seconds = sys.argv[1] == "1", int(sys.argv[2]), float(sys.argv[3])
+warmup_s = pitch.warm_up_pitch_engine() if warmup else 0.0
+
+t = np.arange(int(seconds * pitch.SAMPLE_RATE)) / pitch.SAMPLE_RATE
+y = (0.4 * np.sin(2 * np.pi * (180 * t - 15 * t * t))).astype(np.float32)
+
+timings = []
+for _ in range(calls):
+    start = time.perf_counter()
+    pitch.extract_pitch_from_samples(y)
+    timings.append(time.perf_counter() - start)
+
+print(json.dumps({
+    "warmup": warmup_s,
+    "first": timings[0],
+    "steady": statistics.median(timings[1:]) if calls > 1 else timings[0],
+}))
+"""
+
+
+def run_child(cache_dir: str, warmup: bool, calls: int, seconds: float) -> dict:
+    env = dict(os.environ)
+    env.update(
+        {
+            "PITCH_JIT_CACHE_DIR": cache_dir,
+            "NUMBA_CACHE_DIR": cache_dir,
+            "ALLOWED_ORIGINS": env.get("ALLOWED_ORIGINS", "http://localhost:3000"),
+        }
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD, "1" if warmup else "0", str(calls), str(seconds)],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=10)
+    parser.add_argument("--line-seconds", type=float, default=2.5)
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp(prefix="bench-numba-")
+    try:
+        scenarios = [
+            ("cold cache", False),
+            ("warm cache", False),
+            ("warm cache + warm-up", True),
+        ]
+        rows = [
+            (name, run_child(cache_dir, warmup, args.calls, args.line_seconds))
+            for name, warmup in scenarios
+        ]
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print("\n" + "=" * 68)
+    print(f"PITCH ENGINE — {args.line_seconds}s line, {args.calls} calls per process")
+    print("=" * 68)
+    print(f"{'scenario':<24}{'warm-up':>10}{'first call':>12}{'steady':>10}{'ratio':>10}")
+    for name, r in rows:
+        ratio = r["first"] / r["steady"] if r["steady"] else 0.0
+        print(
+            f"{name:<24}{r['warmup']:>9.2f}s{r['first']:>11.3f}s"
+            f"{r['steady']:>9.3f}s{ratio:>9.1f}x"
+        )
+    print("=" * 68 + "\n")
+
+
+if __name__ == "__main__":
+    main()
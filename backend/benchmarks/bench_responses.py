@@ -0,0 +1,164 @@
+"""
+Response encoding benchmark — the large JSON payloads, before and after.
+
+A 10-minute fixture scene (a line every 2 s, 6–10 words each with reading,
+meaning and word times as GPT emits them; F0 from fixtures.synthetic_speech)
+is encoded as:
+
+    ingest   the ScenePackage /ingest returns (no pitch yet)
+    scene    the same scene with every line's pitchPattern merged in
+    pitch    the GET /pitch body: { lines: [{ lineId, pitchPattern }] }
+
+before = FastAPI's default path (model_dump + jsonable_encoder + json.dumps)
+after  = responses.FastJSONResponse (orjson, floats rounded at encode time),
+then compressed as the middleware would (gzip, and brotli if installed).
+
+    python benchmarks/bench_responses.py [--seconds 600] [--repeat 20]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("ALLOWED_ORIGINS", "http://localhost:3000")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from app.models.schema import ScenePackage, SceneLine, WordToken  # noqa: E402
+from app.services import compression  # noqa: E402
+from app.services.pitch import HOP_LENGTH, SAMPLE_RATE  # noqa: E402
+from app.services.pitch_track import PitchTrack  # noqa: E402
+from app.services.responses import FastJSONResponse  # noqa: E402
+from fixtures import phrase, synthetic_speech  # noqa: E402
+
+
+def fixture_scene(seconds: float, seed: int = 0) -> tuple:
+    """(ScenePackage without pitch, {lineId: pitchPattern})."""
+    rng = np.random.default_rng(seed)
+    _, truth = synthetic_speech(seconds, hop=HOP_LENGTH, seed=seed)
+    track = PitchTrack(truth, SAMPLE_RATE, HOP_LENGTH, "truth")
+
+    script, contours = [], {}
+    for i in range(int(seconds // 2)):
+        start, end = i * 2.0, i * 2.0 + 1.8
+        cuts = np.sort(rng.uniform(start, end, int(rng.integers(12, 21))))
+        words = [
+            WordToken(
+                word=phrase(i + k)[:3],
+                reading="げんき",
+                meaning="energy / health",
+                startTime=float(a),  # unrounded, like GPT output
+                endTime=float(b),
+            )
+            for k, (a, b) in enumerate(zip(cuts[::2], cuts[1::2]))
+        ]
+        line_id = f"line-{i + 1}"
+        script.append(
+            SceneLine(
+                id=line_id,
+                characterName=f"Speaker {i % 2 + 1}",
+                text=phrase(i),
+                phoneticReading=phrase(i),
+                translation="Hello, how are you?",
+                startTime=start,
+                endTime=end,
+                words=words,
+            )
+        )
+        contours[line_id] = track.line_contour(start, end)
+
+    scene = ScenePackage(
+        sceneId="bench-scene",
+        language="ja",
+        sourceLanguage="ja",
+        uniqueCharacters=["Speaker 1", "Speaker 2"],
+        source={"type": "youtube", "url": "https://youtu.be/bench"},
+        audio={"storagePath": "audio/bench.webm", "duration": seconds},
+        script=script,
+        metadata={"version": "v1"},
+    )
+    return scene, contours
+
+
+def before(payload) -> bytes:
+    # What a handler returning model_dump() / a dict went through
+    content = payload.model_dump() if hasattr(payload, "model_dump") else payload
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def after(payload) -> bytes:
+    return FastJSONResponse(payload).body
+
+
+def timed(fn, arg, repeat: int) -> tuple:
+    """(median ms, result)."""
+    times, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(arg)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=600)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    scene, contours = fixture_scene(args.seconds)
+    with_pitch = scene.model_copy(
+        update={
+            "script": [
+                line.model_copy(update={"pitchPattern": contours[line.id]})
+                for line in scene.script
+            ]
+        }
+    )
+    pitch = {
+        "status": "ready",
+        "sceneId": scene.sceneId,
+        "frameSeconds": HOP_LENGTH / SAMPLE_RATE,
+        "lines": [{"lineId": k, "pitchPattern": v} for k, v in contours.items()],
+    }
+    encodings = ["gzip"] + (["br"] if compression.brotli else [])
+
+    print("\n" + "=" * 96)
+    print(
+        f"RESPONSE ENCODING — {args.seconds / 60:.0f}-minute scene, "
+        f"{len(scene.script)} lines, {sum(len(c) for c in contours.values())} pitch frames"
+    )
+    print("=" * 96)
+    header = f"{'payload':<8}{'before ms':>11}{'after ms':>10}{'before KB':>11}{'after KB':>10}"
+    for encoding in encodings:
+        header += f"{encoding + ' KB':>10}{encoding + ' ms':>9}"
+    print(header)
+
+    for name, payload in (("ingest", scene), ("scene", with_pitch), ("pitch", pitch)):
+        before_ms, old = timed(before, payload, args.repeat)
+        after_ms, new = timed(after, payload, args.repeat)
+        row = (
+            f"{name:<8}{before_ms:>11.1f}{after_ms:>10.1f}"
+            f"{len(old) / 1024:>11.1f}{len(new) / 1024:>10.1f}"
+        )
+        for encoding in encodings:
+            compress_ms, packed = timed(
+                lambda body: compression.compress(body, encoding), new, args.repeat
+            )
+            row += f"{len(packed) / 1024:>10.1f}{compress_ms:>9.1f}"
+        print(row)
+
+    if not compression.brotli:
+        print("\n(brotli not installed — gzip only; pip install brotli)")
+    print("=" * 96 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Evaluation scoring micro-benchmark — single core.
+
+Times normalize_text() + compute_scores() for realistic line pairs and
+checks the 1,000 evaluations/second target, for both alignment backends
+(rapidfuzz when installed, NumPy DP otherwise) and the legacy scorer.
+
+    python benchmarks/bench_scoring.py [--evals 1000] [--target 1000]
+"""
+
+import argparse
+import sys
+import time
+from difflib import SequenceMatcher
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.services.evaluation import similarity  # noqa: E402
+from app.services.evaluation.normalize import normalize_text  # noqa: E402
+
+# (expected text with furigana, what the learner said, scene words as the
+# analyzer fills them — (word, reading))
+CASES = [
+    (
+        "こんにちは、元気(げんき)ですか？",
+        "こんにちは元気ですね",
+        [("こんにちは", "コンニチハ"), ("元気", "ゲンキ"), ("です", "デス"), ("か", "カ")],
+    ),
+    (
+        "今日(きょう)は天気(てんき)がいいですね。",
+        "きょうはてんきがいいですね",
+        [
+            ("今日", "キョウ"), ("は", "ハ"), ("天気", "テンキ"), ("が", "ガ"),
+            ("いい", "イイ"), ("です", "デス"), ("ね", "ネ"),
+        ],
+    ),
+    (
+        "駅(えき)の近(ちか)くの喫茶店(きっさてん)で会(あ)いましょう。",
+        "駅の近くのキッサテンであいましょう",
+        [
+            ("駅", "エキ"), ("の", "ノ"), ("近く", "チカク"), ("の", "ノ"),
+            ("喫茶店", "キッサテン"), ("で", "デ"), ("会い", "アイ"), ("ましょう", "マショウ"),
+        ],
+    ),
+    (
+        "すみません、もう一度(いちど)言(い)ってください。",
+        "すいません もう一度いってください",
+        [
+            ("すみません", "スミマセン"), ("もう", "モウ"), ("一度", "イチド"),
+            ("言って", "イッテ"), ("ください", "クダサイ"),
+        ],
+    ),
+]
+CASES = [
+    (expected, actual, [{"word": w, "reading": r} for w, r in words])
+    for expected, actual, words in CASES
+]
+
+
+def legacy_compute_scores(expected: str, actual: str) -> dict:
+    """The scorer this benchmark replaces, kept for comparison."""
+    expected_tokens = expected.split() if " " in expected else list(expected)
+    actual_tokens = actual.split() if " " in actual else list(actual)
+    matched = 0
+    word_scores = []
+    for token in expected_tokens:
+        score = 1.0 if token in actual_tokens else 0.0
+        matched += int(score)
+        word_scores.append({"word": token, "score": score})
+    coverage = matched / max(len(expected_tokens), 1)
+    ratio = SequenceMatcher(None, expected, actual).ratio() if expected and actual else 0.0
+    return {"overall": round(0.7 * coverage + 0.3 * ratio, 3), "wordScores": word_scores}
+
+
+def run(evals: int, score) -> float:
+    t0 = time.perf_counter()
+    for i in range(evals):
+        expected, actual, words = CASES[i % len(CASES)]
+        score(normalize_text(expected), normalize_text(actual), words)
+    return evals / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--evals", type=int, default=1000)
+    parser.add_argument("--target", type=float, default=1000.0)
+    args = parser.parse_args()
+
+    rapidfuzz = similarity._rf_levenshtein
+    backends = [("legacy (membership + SequenceMatcher)", None)]
+    if rapidfuzz is not None:
+        backends.append(("alignment — rapidfuzz", rapidfuzz))
+    backends.append(("alignment — numpy DP", False))
+
+    print(f"\n📊 Scoring micro-benchmark — {args.evals} evaluations, 1 core")
+    print("=" * 60)
+
+    failed = False
+    try:
+        for name, backend in backends:
+            if backend is None:
+                rate = run(args.evals, lambda e, a, w: legacy_compute_scores(e, a))
+            else:
+                similarity._rf_levenshtein = backend or None
+                run(50, similarity.compute_scores)  # warm up
+                rate = run(args.evals, similarity.compute_scores)
+                failed |= rate < args.target
+            mark = "" if backend is None else (" ✅" if rate >= args.target else " ❌")
+            print(f"{name:<40}{rate:>12,.0f} evals/s{mark}")
+    finally:
+        similarity._rf_levenshtein = rapidfuzz
+
+    expected, actual, words = CASES[2]
+    result = similarity.compute_scores(
+        normalize_text(expected), normalize_text(actual), words
+    )
+    print("-" * 60)
+    print(f"sample: {expected} / {actual}")
+    for w in result["wordScores"]:
+        print(f"   {w['word']:<8} {w['score']:.2f} {w['status']}")
+    print(f"   overall {result['overall']} | substitutions {result['substitutions']}")
+    print("=" * 60 + "\n")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
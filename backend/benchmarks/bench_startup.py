@@ -0,0 +1,103 @@
+"""
+Startup benchmark — cold import of app.app in a fresh interpreter.
+
+Each run spawns a new Python process (no warm module cache) with no
+service credentials, so nothing may touch the network at import time.
+Reports the median wall time, the slowest top-level imports from
+-X importtime, and fails if the median exceeds the target.
+
+    python benchmarks/bench_startup.py [--runs 5] [--target 1.0]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Heavy SDKs that must stay out of the import path
+DEFERRED_MODULES = ["openai", "supabase", "yt_dlp", "librosa", "httpx"]
+
+PROBE = (
+    "import sys, app.app; "
+    f"print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+)
+
+
+def child_env() -> dict:
+    env = dict(os.environ)
+    for key in (
+        "SUPABASE_URL",
+        "SUPABASE_SERVICE_ROLE_KEY",
+        "OPENAI_API_KEY",
+        "COLAB_WHISPERX_URL",
+        "REDIS_URL",
+    ):
+        env[key] = ""
+    env.setdefault("ALLOWED_ORIGINS", "http://localhost:3000")
+    return env
+
+
+def cold_import(extra_args=()) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *extra_args, "-c", PROBE],
+        cwd=BACKEND_DIR,
+        env=child_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def slowest_imports(stderr: str, top: int = 8) -> list:
+    """Modules imported directly by app.app, by cumulative import time (ms)."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if cumulative.strip().isdigit() and depth == 1:
+            rows.append((int(cumulative) / 1000, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--target", type=float, default=1.0, help="seconds")
+    args = parser.parse_args()
+
+    cold_import()  # populate __pycache__ so runs measure imports, not compiling
+
+    times = []
+    loaded = ""
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        loaded = cold_import().stdout.strip()
+        times.append(time.perf_counter() - start)
+
+    median = statistics.median(times)
+    ok = median <= args.target and not loaded
+
+    print("\n" + "=" * 60)
+    print(f"COLD IMPORT app.app — {args.runs} runs")
+    print("=" * 60)
+    print(f"median {median:.3f}s | min {min(times):.3f}s | max {max(times):.3f}s")
+    print(f"target {args.target:.3f}s {'✅' if median <= args.target else '❌'}")
+    print(f"deferred SDKs loaded at import: {loaded or 'none'} {'❌' if loaded else '✅'}")
+    print("-" * 60)
+    print("slowest imports under app.app:")
+    for ms, name in slowest_imports(cold_import(["-X", "importtime"]).stderr):
+        print(f"   {ms:>8.1f} ms  {name}")
+    print("=" * 60 + "\n")
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Storage upload benchmark — offline, against LocalStorageBackend.
+
+Simulates a stream of ingests where some audio repeats (re-ingested videos)
+and compares:
+    legacy  — synchronous upload under a random name, every time
+    new     — content-hash keys + existence check + background upload pool
+
+    python benchmarks/bench_storage.py [--files 40] [--repeat-ratio 0.3]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("ALLOWED_ORIGINS", "*")
+os.environ.setdefault("STORAGE_BACKEND", "local")
+os.environ.setdefault("LOCAL_STORAGE_DIR", tempfile.mkdtemp(prefix="bench-storage-"))
+
+from app.services import storage  # noqa: E402
+
+
+def make_files(tmp_dir: str, count: int, size_mb: float) -> list:
+    paths = []
+    for i in range(count):
+        path = os.path.join(tmp_dir, f"src-{i}.m4a")
+        with open(path, "wb") as f:
+            f.write(os.urandom(int(size_mb * 1024 * 1024)))
+        paths.append(path)
+    return paths
+
+
+def workload(paths: list, total: int, repeat_ratio: float, seed: int = 7) -> list:
+    """Sequence of files to ingest; repeat_ratio of them were seen before."""
+    rng = random.Random(seed)
+    fresh = iter(paths)
+    seen: list = []
+    jobs = []
+    for _ in range(total):
+        if seen and rng.random() < repeat_ratio:
+            jobs.append(rng.choice(seen))
+        else:
+            path = next(fresh, None) or rng.choice(seen)
+            seen.append(path)
+            jobs.append(path)
+    return jobs
+
+
+def run_legacy(backend, jobs: list, pipeline_seconds: float) -> float:
+    t0 = time.perf_counter()
+    for path in jobs:
+        backend.upload(f"audio/{uuid.uuid4()}.m4a", path, "audio/mp4")
+        time.sleep(pipeline_seconds)  # ASR + GPT, strictly after the upload
+    return time.perf_counter() - t0
+
+
+def run_new(jobs: list, pipeline_seconds: float) -> tuple:
+    t0 = time.perf_counter()
+    stats_list = []
+    for path in jobs:
+        stats: dict = {}
+        _, future = storage.upload_audio_async(path, stats=stats)
+        time.sleep(pipeline_seconds)  # ASR + GPT overlap the upload
+        future.result()
+        stats_list.append(stats)
+    return time.perf_counter() - t0, stats_list
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=40, help="ingests to simulate")
+    parser.add_argument("--repeat-ratio", type=float, default=0.3)
+    parser.add_argument("--size-mb", type=float, default=4.0)
+    parser.add_argument("--bandwidth-mbps", type=float, default=80.0)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--pipeline-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    bandwidth = args.bandwidth_mbps * 1_000_000 / 8
+    latency = args.latency_ms / 1000
+    pipeline = args.pipeline_ms / 1000
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        unique = int(args.files * (1 - args.repeat_ratio)) + 1
+        src_dir = os.path.join(tmp_dir, "src")
+        os.makedirs(src_dir)
+        paths = make_files(src_dir, unique, args.size_mb)
+        jobs = workload(paths, args.files, args.repeat_ratio)
+        total_mb = len(jobs) * args.size_mb
+
+        legacy_backend = storage.LocalStorageBackend(
+            os.path.join(tmp_dir, "legacy"), latency, bandwidth
+        )
+        legacy_s = run_legacy(legacy_backend, jobs, pipeline)
+
+        storage.set_backend(
+            storage.LocalStorageBackend(os.path.join(tmp_dir, "new"), latency, bandwidth)
+        )
+        new_s, stats_list = run_new(jobs, pipeline)
+
+    skipped = sum(1 for s in stats_list if s["upload"]["skipped"])
+    uploaded_mb = sum(s["upload"]["bytes"] for s in stats_list) / 1024 / 1024
+
+    print(f"\n📊 Storage upload benchmark — {len(jobs)} ingests x {args.size_mb} MB")
+    print(
+        f"   link {args.bandwidth_mbps} Mbit/s, {args.latency_ms} ms latency, "
+        f"{args.pipeline_ms} ms of ASR/GPT per ingest"
+    )
+    print("=" * 60)
+    print(f"{'':<24}{'legacy':>16}{'new':>16}")
+    print(f"{'wall seconds':<24}{legacy_s:>16.2f}{new_s:>16.2f}")
+    print(f"{'ingests / second':<24}{len(jobs) / legacy_s:>16.2f}{len(jobs) / new_s:>16.2f}")
+    print(f"{'MB transferred':<24}{total_mb:>16.1f}{uploaded_mb:>16.1f}")
+    print(
+        f"{'effective MB/s':<24}{total_mb / legacy_s:>16.1f}{total_mb / new_s:>16.1f}"
+    )
+    print(f"{'dedup hit rate':<24}{'0%':>16}{skipped / len(jobs):>16.0%}")
+    print("=" * 60 + "\n")
+
+
+if __name__ == "__main__":
+    main()
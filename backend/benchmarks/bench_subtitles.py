@@ -0,0 +1,122 @@
+"""
+Subtitle parser benchmark.
+
+Generates large caption fixtures (manual SRT, rolling auto SRT / VTT, json3)
+and reports parse time plus segment / character reduction against the
+previous read-everything, regex-per-block SRT parser.
+
+    python benchmarks/bench_subtitles.py [--cues 20000]
+"""
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.services.subtitles import parse_subtitle_file  # noqa: E402
+from fixtures import (  # noqa: E402
+    write_json3,
+    write_manual_srt,
+    write_rolling_srt,
+    write_rolling_vtt,
+)
+
+
+def legacy_parse_srt(file_path: str) -> list:
+    """The parser this benchmark replaces, kept verbatim for comparison."""
+    segments = []
+    with open(file_path, "r", encoding="utf-8-sig") as f:
+        content = f.read()
+    for block in re.split(r"\n\n+", content.strip()):
+        lines = block.strip().splitlines()
+        if len(lines) < 3:
+            continue
+        match = re.match(
+            r"(\d{2}):(\d{2}):(\d{2})[,.](\d{3})\s*-->\s*(\d{2}):(\d{2}):(\d{2})[,.](\d{3})",
+            lines[1].strip(),
+        )
+        if not match:
+            continue
+        h1, m1, s1, ms1, h2, m2, s2, ms2 = match.groups()
+        clean_text = re.sub(r"<[^>]+>", "", " ".join(lines[2:])).strip()
+        if not clean_text:
+            continue
+        segments.append(
+            {
+                "speaker": "SPEAKER_00",
+                "text": clean_text,
+                "start": int(h1) * 3600 + int(m1) * 60 + int(s1) + int(ms1) / 1000,
+                "end": int(h2) * 3600 + int(m2) * 60 + int(s2) + int(ms2) / 1000,
+                "words": [],
+            }
+        )
+    return segments
+
+
+def _time(fn, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cues", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    fixtures = [
+        ("manual.srt", write_manual_srt, False),
+        ("auto.srt", write_rolling_srt, True),
+        ("auto.vtt", write_rolling_vtt, True),
+        ("auto.json3", write_json3, True),
+    ]
+
+    print(f"\n📊 Subtitle parser benchmark — {args.cues} cues per fixture")
+    print("=" * 96)
+    print(
+        f"{'fixture':<12}{'size':>9}{'legacy ms':>11}{'new ms':>9}"
+        f"{'legacy segs':>13}{'new segs':>10}{'legacy chars':>14}{'new chars':>11}{'words':>8}"
+    )
+    print("-" * 96)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, writer, auto in fixtures:
+            path = os.path.join(tmp_dir, name)
+            writer(path, args.cues)
+            size_kb = os.path.getsize(path) / 1024
+
+            if name.endswith(".srt"):
+                legacy_s, legacy = _time(lambda: legacy_parse_srt(path), args.repeat)
+                legacy_ms = f"{legacy_s * 1000:.1f}"
+                legacy_segs = str(len(legacy))
+                legacy_chars = str(sum(len(s["text"]) for s in legacy))
+            else:
+                # The old pipeline only looked for .srt files
+                legacy_ms = legacy_segs = legacy_chars = "n/a"
+
+            new_s, segments = _time(
+                lambda: parse_subtitle_file(path, merge_rolling=auto), args.repeat
+            )
+            chars = sum(len(s["text"]) for s in segments)
+            words = sum(len(s["words"]) for s in segments)
+
+            print(
+                f"{name:<12}{size_kb:>8.0f}K{legacy_ms:>11}{new_s * 1000:>9.1f}"
+                f"{legacy_segs:>13}{len(segments):>10}{legacy_chars:>14}{chars:>11}{words:>8}"
+            )
+
+    print("=" * 96 + "\n")
+
+
+if __name__ == "__main__":
+    main()
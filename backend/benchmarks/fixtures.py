@@ -0,0 +1,194 @@
+"""
+benchmarks/fixtures.py
+─────────────────────────────────────────────────────────────────────────────
+Synthetic fixture generators shared by the benchmark scripts.
+
+Everything is generated on the fly into a temp directory so the repo does
+not carry multi-megabyte caption / audio files.
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import json
+
+import numpy as np
+
+PHRASES = [
+    "こんにちは",
+    "元気ですか",
+    "はい元気です",
+    "今日は天気がいいですね",
+    "どこに行きますか",
+    "駅の近くの喫茶店です",
+    "一緒に行きましょう",
+    "ありがとうございます",
+    "また明日",
+    "お疲れ様でした",
+]
+
+
+def phrase(i: int) -> str:
+    return f"{PHRASES[i % len(PHRASES)]}{i // len(PHRASES)}"
+
+
+def _srt_ts(t: float) -> str:
+    ms = int(round(t * 1000))
+    h, ms = divmod(ms, 3_600_000)
+    m, ms = divmod(ms, 60_000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
+
+
+def _vtt_ts(t: float) -> str:
+    return _srt_ts(t).replace(",", ".")
+
+
+def write_manual_srt(path: str, cues: int) -> None:
+    """One clean phrase per cue — what a human subtitler produces."""
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(cues):
+            start = i * 2.0
+            f.write(f"{i + 1}\n{_srt_ts(start)} --> {_srt_ts(start + 1.8)}\n")
+            f.write(f"<i>{phrase(i)}</i>\n\n")
+
+
+def write_rolling_srt(path: str, cues: int) -> None:
+    """
+    YouTube auto captions converted to SRT: a two-line window that scrolls,
+    so every phrase appears in two consecutive cues with overlapping times.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(cues):
+            start = i * 2.0
+            lines = [phrase(i - 1), phrase(i)] if i else [phrase(i)]
+            f.write(f"{i + 1}\n{_srt_ts(start)} --> {_srt_ts(start + 4.0)}\n")
+            f.write("\n".join(lines) + "\n\n")
+
+
+def write_rolling_vtt(path: str, cues: int) -> None:
+    """
+    YouTube auto-caption VTT: a word-timed cue per phrase, followed by a
+    10ms snapshot cue repeating the window without tags.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("WEBVTT\nKind: captions\nLanguage: ja\n\n")
+        for i in range(cues):
+            start = i * 2.0
+            top = phrase(i - 1) if i else " "
+            text = phrase(i)
+            half = len(text) // 2
+            tagged = (
+                f"{text[:half]}<{_vtt_ts(start + 0.8)}><c>{text[half:]}</c>"
+            )
+            f.write(
+                f"{_vtt_ts(start)} --> {_vtt_ts(start + 1.99)} align:start position:0%\n"
+                f"{top}\n{tagged}\n\n"
+            )
+            f.write(
+                f"{_vtt_ts(start + 1.99)} --> {_vtt_ts(start + 2.0)} align:start position:0%\n"
+                f"{text}\n \n\n"
+            )
+
+
+def write_json3(path: str, cues: int) -> None:
+    """YouTube json3 auto captions: one seg per word plus '\\n' append events."""
+    events = [{"tStartMs": 0, "dDurationMs": cues * 2000, "id": 1, "wpWinPosId": 1}]
+    for i in range(cues):
+        start_ms = i * 2000
+        text = phrase(i)
+        half = len(text) // 2
+        events.append(
+            {
+                "tStartMs": start_ms,
+                "dDurationMs": 4000,
+                "wWinId": 1,
+                "segs": [
+                    {"utf8": text[:half], "acAsrConf": 0},
+                    {"utf8": text[half:], "tOffsetMs": 800, "acAsrConf": 0},
+                ],
+            }
+        )
+        events.append(
+            {
+                "tStartMs": start_ms + 1990,
+                "dDurationMs": 2010,
+                "wWinId": 1,
+                "aAppend": 1,
+                "segs": [{"utf8": "\n"}],
+            }
+        )
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"wireMagic": "pb3", "events": events}, f, ensure_ascii=False)
+
+
+def synthetic_speech(
+    seconds: float, sr: int = 16000, hop: int = 512, seed: int = 0
+):
+    """
+    Voice-like test signal with a known F0 track.
+
+    Phrases of harmonic-rich "vowels" (sawtooth-ish spectrum, 1/k rolloff)
+    follow a Japanese-style contour — declination plus pitch-accent rises —
+    separated by pauses, with background noise at about -40 dB.
+
+    Returns (samples float32, truth) where truth is the F0 in Hz at every
+    centered hop-sized frame (0.0 = unvoiced), matching the pitch framing.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sr)
+    t = np.arange(n) / sr
+
+    base = rng.uniform(110, 220)
+    f0 = base * (1.0 - 0.15 * t / seconds)  # declination
+    for centre in rng.uniform(0, seconds, size=max(int(seconds), 1)):
+        f0 *= 1.0 + 0.25 * np.exp(-(((t - centre) / 0.12) ** 2))  # accent peaks
+
+    voiced = np.ones(n, dtype=bool)
+    cursor = rng.uniform(0.8, 1.6)
+    while cursor < seconds:
+        gap = rng.uniform(0.15, 0.4)
+        voiced[int(cursor * sr) : int((cursor + gap) * sr)] = False
+        cursor += gap + rng.uniform(0.8, 1.6)
+
+    phase = 2 * np.pi * np.cumsum(f0) / sr
+    y = sum(np.sin(k * phase) / k for k in range(1, 9))
+    y = 0.3 * y / np.max(np.abs(y)) * voiced
+    y += 0.003 * rng.standard_normal(n)
+
+    centres = np.minimum(np.arange(1 + n // hop) * hop, n - 1)
+    truth = np.where(voiced[centres], f0[centres], 0.0)
+    return y.astype(np.float32), truth
+
+
+def write_jmdict(path: str, entries: int, seed: int = 0) -> list:
+    """
+    JMdict-shaped XML (DTD entities, k_ele / r_ele / sense, priority tags)
+    with random kanji spellings and kana readings. Returns the
+    (spelling, reading) pairs written, most common first.
+    """
+    rng = np.random.default_rng(seed)
+    kanji = [chr(c) for c in range(0x4E00, 0x4E00 + 2000)]
+    kana = [chr(c) for c in range(0x3042, 0x3093)]
+    pairs = []
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE JMdict [\n'
+            '<!ENTITY n "noun (common) (futsuumeishi)">\n'
+            '<!ENTITY v5r "Godan verb with \'ru\' ending">\n]>\n<JMdict>\n'
+        )
+        for i in range(entries):
+            keb = "".join(rng.choice(kanji, size=rng.integers(1, 4)))
+            reb = "".join(rng.choice(kana, size=rng.integers(2, 6)))
+            pri = "<ke_pri>news1</ke_pri>" if i < entries // 10 else ""
+            rpri = "<re_pri>news1</re_pri>" if i < entries // 10 else ""
+            pos = "&n;" if i % 3 else "&v5r;"
+            f.write(
+                f"<entry><ent_seq>{1000000 + i}</ent_seq>"
+                f"<k_ele><keb>{keb}</keb>{pri}</k_ele>"
+                f"<r_ele><reb>{reb}</reb>{rpri}</r_ele>"
+                f"<sense><pos>{pos}</pos><gloss>meaning {i}</gloss>"
+                f"<gloss>gloss {i}</gloss></sense>"
+                f'<sense><gloss xml:lang="ger">Bedeutung {i}</gloss></sense></entry>\n'
+            )
+            pairs.append((keb, reb))
+        f.write("</JMdict>\n")
+    return pairs
@@ -0,0 +1,427 @@
+"""
+benchmarks/standins.py
+─────────────────────────────────────────────────────────────────────────────
+Local stand-ins for every external dependency, so benchmarks run the real
+pipeline code offline:
+
+    FakeOpenAI         chat completions (structured or plain) and Whisper
+                       transcriptions, with provider-like slots, per-token
+                       latency and an optional requests-per-minute cap
+    StubWhisperX       the Colab WhisperX service (/health, /transcribe)
+    FixtureMedia       fixture videos (Opus audio + optional SRT) served
+                       over HTTP and a yt-dlp extractor that resolves
+                       https://fixture.invalid/watch?v=<id> to them
+    use_fakeredis()    in-memory Redis (scene store, pitch cache, pub/sub)
+    use_local_bucket() storage.LocalStorageBackend with latency / bandwidth
+
+Transcripts are looked up by the uploaded file's stem (line-3.wav →
+"line-3"); anything else gets the default (the whole scene).
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import threading
+import time
+import wave
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import FileResponse, JSONResponse, Response
+from starlette.routing import Route
+
+from fixtures import phrase, synthetic_speech, write_manual_srt
+
+FIXTURE_HOST = "fixture.invalid"
+FEEDBACK_TOKENS_PER_ATTEMPT = 60  # gpt.FEEDBACK_MAX_TOKENS
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Servers
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def serve(app) -> str:
+    """Run an ASGI app on a free localhost port in a daemon thread; base URL."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+class Transcripts:
+    """File stem → Whisper-shaped transcript, plus a default."""
+
+    def __init__(self, default: Optional[dict] = None):
+        self.default = default
+        self.by_stem: Dict[str, dict] = {}
+
+    def lookup(self, filename: str) -> dict:
+        stem = os.path.splitext(os.path.basename(filename or ""))[0]
+        return self.by_stem.get(stem) or self.default or scene_transcript(0)
+
+
+class FakeOpenAI:
+    """
+    OpenAI-compatible /v1/chat/completions and /v1/audio/transcriptions.
+    At most `slots` requests are served at once (the rest queue); each
+    takes base_ms + token_ms per output token. With rpm, requests past
+    that many per minute get a 429.
+    """
+
+    def __init__(
+        self,
+        slots: int = 16,
+        base_ms: float = 300,
+        token_ms: float = 10,
+        rpm: int = 0,
+        transcripts: Optional[Transcripts] = None,
+    ):
+        self.slots = slots
+        self.base = base_ms / 1000
+        self.per_token = token_ms / 1000
+        self.rpm = rpm
+        self.transcripts = transcripts or Transcripts()
+        self.calls = 0
+        self.rejected = 0
+        self.accepted = deque()  # timestamps in the last minute
+        self.semaphore = None
+        self.app = Starlette(
+            routes=[
+                Route("/v1/chat/completions", self.chat, methods=["POST"]),
+                Route("/v1/audio/transcriptions", self.transcription, methods=["POST"]),
+            ]
+        )
+
+    def reset(self):
+        self.calls = self.rejected = 0
+        self.accepted.clear()
+
+    async def chat(self, request: Request):
+        body = await request.json()
+        limited = self._admit()
+        if limited:
+            return limited
+
+        schema = (body.get("response_format") or {}).get("json_schema", {}).get("name")
+        payload = body["messages"][-1]["content"]
+        content, tokens = _completion(schema, payload)
+        await self._generate(tokens)
+        return JSONResponse(
+            {
+                "id": "chatcmpl-bench",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": content},
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": 0,
+                    "completion_tokens": tokens,
+                    "total_tokens": tokens,
+                },
+            }
+        )
+
+    async def transcription(self, request: Request):
+        form = await request.form()
+        limited = self._admit()
+        if limited:
+            return limited
+        transcript = self.transcripts.lookup(form["file"].filename)
+        await self._generate(len(transcript["text"]) // 2)
+        return JSONResponse({**transcript, "task": "transcribe"})
+
+    def _admit(self) -> Optional[Response]:
+        self.calls += 1
+        now = time.monotonic()
+        while self.accepted and now - self.accepted[0] > 60:
+            self.accepted.popleft()
+        if self.rpm and len(self.accepted) >= self.rpm:
+            self.rejected += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "requests"}},
+                status_code=429,
+            )
+        self.accepted.append(now)
+        return None
+
+    async def _generate(self, tokens: int):
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.slots)
+        async with self.semaphore:
+            await asyncio.sleep(self.base + self.per_token * tokens)
+
+
+class StubWhisperX:
+    """
+    The Colab WhisperX service: takes base_ms + realtime_factor × audio
+    seconds per request, any number at once (it's a GPU box).
+    """
+
+    def __init__(
+        self,
+        base_ms: float = 300,
+        realtime_factor: float = 0.05,
+        transcripts: Optional[Transcripts] = None,
+    ):
+        self.base = base_ms / 1000
+        self.realtime_factor = realtime_factor
+        self.transcripts = transcripts or Transcripts()
+        self.calls = 0
+        self.app = Starlette(
+            routes=[
+                Route("/health", self.health),
+                Route("/transcribe", self.transcribe, methods=["POST"]),
+            ]
+        )
+
+    async def health(self, request: Request):
+        return JSONResponse({"status": "ok", "device": "stub", "gpu": None, "model": "stub"})
+
+    async def transcribe(self, request: Request):
+        form = await request.form()
+        self.calls += 1
+        transcript = self.transcripts.lookup(form["audio"].filename)
+        seconds = self.base + self.realtime_factor * transcript["duration"]
+        await asyncio.sleep(seconds)
+        return JSONResponse({**transcript, "processing_time_seconds": round(seconds, 3)})
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Fixture videos (yt-dlp)
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+class FixtureMedia:
+    """
+    Fixture videos written to `root` and served over HTTP. Call
+    install_fixture_extractor() once so yt-dlp resolves their URLs.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.videos: Dict[str, dict] = {}
+        self.base_url = serve(
+            Starlette(routes=[Route("/media/{name}", self.media)])
+        )
+
+    async def media(self, request: Request):
+        path = os.path.join(self.root, os.path.basename(request.path_params["name"]))
+        if not os.path.exists(path):
+            return Response(status_code=404)
+        return FileResponse(path)
+
+    def add_video(self, video_id: str, seconds: float, subtitles: bool = False, seed: int = 0) -> str:
+        """Synthetic speech encoded as Opus/WebM (like YouTube itag 251); URL."""
+        samples, _ = synthetic_speech(seconds, seed=seed)
+        wav = os.path.join(self.root, f"{video_id}.wav")
+        write_wav(wav, samples)
+        webm = os.path.join(self.root, f"{video_id}.webm")
+        subprocess.run(
+            ["ffmpeg", "-v", "error", "-y", "-i", wav, "-c:a", "libopus", "-b:a", "64k", webm],
+            check=True,
+        )
+        os.unlink(wav)
+
+        info = {
+            "id": video_id,
+            "title": f"Fixture {video_id}",
+            "duration": seconds,
+            "is_live": False,
+            "formats": [
+                {
+                    "format_id": "251",
+                    "url": f"{self.base_url}/media/{video_id}.webm",
+                    "ext": "webm",
+                    "acodec": "opus",
+                    "vcodec": "none",
+                    "abr": 64,
+                    "asr": 48000,
+                    "filesize": os.path.getsize(webm),
+                }
+            ],
+        }
+        if subtitles:
+            write_manual_srt(os.path.join(self.root, f"{video_id}.ja.srt"), int(seconds // 2))
+            info["subtitles"] = {
+                "ja": [{"ext": "srt", "url": f"{self.base_url}/media/{video_id}.ja.srt"}]
+            }
+        self.videos[video_id] = info
+        return f"https://{FIXTURE_HOST}/watch?v={video_id}"
+
+
+def install_fixture_extractor(media: FixtureMedia) -> None:
+    """Every YoutubeDL instance tries the fixture extractor first."""
+    import yt_dlp
+    from yt_dlp.extractor.common import InfoExtractor
+
+    class FixtureIE(InfoExtractor):
+        IE_NAME = "sutorii:fixture"
+        _VALID_URL = rf"https?://{FIXTURE_HOST.replace('.', r'[.]')}/watch\?v=(?P<id>[\w-]+)"
+
+        def _real_extract(self, url):
+            return dict(media.videos[self._match_id(url)])
+
+    default_extractors = yt_dlp.YoutubeDL.add_default_info_extractors
+
+    def add_default_info_extractors(ydl):
+        ydl.add_info_extractor(FixtureIE())
+        default_extractors(ydl)
+
+    yt_dlp.YoutubeDL.add_default_info_extractors = add_default_info_extractors
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Redis / storage
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def use_fakeredis():
+    import fakeredis
+
+    from app.services import redis_client
+
+    redis_client._client = fakeredis.FakeRedis(decode_responses=True)
+    return redis_client._client
+
+
+def use_local_bucket(root: str, latency_ms: float = 0, bandwidth_mbps: Optional[float] = None):
+    from app.services import storage
+
+    backend = storage.LocalStorageBackend(
+        root,
+        latency_seconds=latency_ms / 1000,
+        bandwidth_bytes_per_second=bandwidth_mbps * 125_000 if bandwidth_mbps else None,
+    )
+    storage.set_backend(backend)
+    return backend
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Transcripts / audio
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def scene_transcript(seconds: float, speakers: int = 2) -> dict:
+    """What WhisperX returns for a fixture video: a phrase every 2 s."""
+    segments = [
+        {
+            "id": i,
+            "start": i * 2.0,
+            "end": i * 2.0 + 1.8,
+            "text": phrase(i),
+            "speaker": f"SPEAKER_{i % speakers:02d}",
+            "words": [],
+        }
+        for i in range(int(seconds // 2))
+    ]
+    return {
+        "text": " ".join(s["text"] for s in segments),
+        "segments": segments,
+        "language": "ja",
+        "duration": seconds,
+    }
+
+
+def line_transcript(text: str, seconds: float) -> dict:
+    return {
+        "text": text,
+        "segments": [{"id": 0, "start": 0.0, "end": seconds, "text": text, "words": []}],
+        "language": "ja",
+        "duration": seconds,
+    }
+
+
+def write_wav(path: str, samples: np.ndarray, sr: int = 16000) -> None:
+    pcm = (np.clip(samples, -1, 1) * 32767).astype("<i2")
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sr)
+        w.writeframes(pcm.tobytes())
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Internal
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _completion(schema: Optional[str], payload: str):
+    """(content, output tokens) for the schema the pipeline asked for."""
+    if schema is None:  # plain line feedback
+        return "Nice try! Stretch the long vowels a little more.", FEEDBACK_TOKENS_PER_ATTEMPT
+
+    items = json.loads(payload)
+    if schema == "FeedbackBatchResponse":
+        content = {
+            "attempts": [
+                {"id": a["id"], "feedback": f"Nice try on {a['expected']}!"} for a in items
+            ]
+        }
+        return _dump(content), FEEDBACK_TOKENS_PER_ATTEMPT * len(items)
+
+    if schema in ("ScriptDraftResponse", "ScriptResponse"):
+        speakers = sorted({s.get("speaker", "SPEAKER_00") for s in items})
+        lines = [
+            {
+                "characterName": f"Character {speakers.index(s.get('speaker', 'SPEAKER_00')) + 1}",
+                "text": s["text"],
+                "startTime": s["start"],
+                "endTime": s["end"],
+            }
+            for s in items
+        ]
+        content = {"characters": [f"Character {i + 1}" for i in range(len(speakers))]}
+        if schema == "ScriptDraftResponse":
+            content.update(lines=lines, vocabulary=[])
+        else:
+            content["lines"] = [
+                {**line, "phoneticReading": line["text"], "words": []} for line in lines
+            ]
+    elif schema == "QuizResponse":
+        content = {
+            "quiz": [
+                {
+                    "type": "comprehension",
+                    "question": f"What does {line['text']} mean?",
+                    "expectedAnswer": "A greeting.",
+                    "relatedLineId": line.get("id"),
+                }
+                for line in items[:3]
+            ]
+        }
+    elif schema == "TranslationResponse":
+        content = {
+            "lines": [
+                {"lineId": line["id"], "translation": f"Translation of {line['text']}"}
+                for line in items
+            ]
+        }
+    else:
+        raise ValueError(f"FakeOpenAI has no response for schema {schema}")
+
+    text = _dump(content)
+    return text, len(text) // 2
+
+
+def _dump(content: dict) -> str:
+    return json.dumps(content, ensure_ascii=False)
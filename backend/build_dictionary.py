@@ -0,0 +1,49 @@
+"""
+build_dictionary.py
+─────────────────────────────────────────────────────────────────────────────
+Build the offline word-meaning index (services/dictionary.py) from JMdict.
+
+    curl -LO http://ftp.edrdg.org/pub/Nihongo/JMdict_e.gz
+    python build_dictionary.py JMdict_e.gz [--output data/jmdict.sqlite]
+        [--check 元気 はい 食べる]
+
+The default output is settings.DICTIONARY_PATH, so a running server picks
+the new index up on its next start. The file is written next to the
+target and swapped in atomically.
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add the project root to sys.path
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from app.config.config import settings
+from app.services.dictionary import build_index, lookup_meaning
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the JMdict meaning index.")
+    parser.add_argument("source", help="JMdict XML (JMdict_e or JMdict_e.gz)")
+    parser.add_argument("--output", default=settings.DICTIONARY_PATH)
+    parser.add_argument(
+        "--check", nargs="*", default=[], help="words to look up after the build"
+    )
+    args = parser.parse_args()
+
+    print(f"📖 Building {args.output} from {args.source}...")
+    stats = build_index(args.source, args.output)
+    print(
+        f"✅ {stats['entries']} entries, {stats['forms']} forms,"
+        f" {stats['bytes'] / 1e6:.1f} MB in {stats['seconds']:.1f}s"
+    )
+
+    settings.DICTIONARY_PATH = args.output
+    for word in args.check:
+        print(f"   {word}: {lookup_meaning(word) or '—'}")
+
+
+if __name__ == "__main__":
+    main()
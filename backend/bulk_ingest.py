@@ -0,0 +1,413 @@
+"""
+bulk_ingest.py
+─────────────────────────────────────────────────────────────────────────────
+Pre-build a lesson library from playlists, channels or a file of URLs.
+
+    python bulk_ingest.py <playlist | channel | video URL | urls.txt> ...
+        [--manifest bulk_manifest.json] [--download 3] [--asr 2] [--gpt 3]
+        [--workers N] [--pitch-mode acf] [--max-attempts 2] [--limit N]
+
+1. Sources are expanded with one flat yt-dlp extraction each (no per-video
+   metadata requests); plain video URLs in a URL file need none.
+2. Entries run through ingest_scene() concurrently. Separate semaphores cap
+   the download (subtitles + download + ffmpeg), ASR and GPT stages, so a
+   slow stage never starves the others or overloads its service.
+3. Progress lives in an on-disk JSON manifest, rewritten atomically after
+   every change. Re-running the same command resumes: done / skipped
+   entries are kept, interrupted ones run again, failed ones are retried
+   until --max-attempts.
+4. At the end: scenes/hour and per-stage utilization (busy time over
+   wall time × slots) plus the time ingests spent queued for each stage.
+
+The server's AI rate limit (services/rate_limit.py) also applies here;
+raise it for the run with --ai-per-minute / --ai-per-day.
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+# Add the project root to sys.path
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from app.services import rate_limit
+from app.services.metrics import external_call
+from app.services.pitch import resolve_estimator, wait_for_pitch_extraction
+from app.workers.ingest import MAX_SCENE_DURATION, ingest_scene
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Constants
+# ─────────────────────────────────────────────────────────────────────────────
+
+MANIFEST_VERSION = 1
+STAGES = ("download", "asr", "gpt")
+
+# Status of a manifest entry
+PENDING, RUNNING, DONE, FAILED, SKIPPED = "pending", "running", "done", "failed", "skipped"
+
+VIDEO_URL = re.compile(
+    r"(?:youtube\.com/(?:watch\?(?:.*&)?v=|shorts/)|youtu\.be/)([\w-]{11})(?![\w-])"
+)
+# Channel root without a tab: /@handle, /channel/ID, /c/name, /user/name
+CHANNEL_ROOT = re.compile(
+    r"^(https?://(?:www\.|m\.)?youtube\.com/(?:@[^/?#]+|(?:channel|c|user)/[^/?#]+))/?$"
+)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Source expansion
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def expand_sources(sources: Iterable[str]) -> List[dict]:
+    """
+    Entries ({id, url, title, duration}) of every source, deduplicated by
+    video ID. A source is a URL or a text file of URLs (# comments allowed).
+    """
+    entries: Dict[str, dict] = {}
+    for source in sources:
+        for entry in _expand(source):
+            entries.setdefault(entry["id"], entry)
+    return list(entries.values())
+
+
+def _expand(source: str) -> Iterable[dict]:
+    if os.path.isfile(source):
+        with open(source, encoding="utf-8") as f:
+            for raw in f:
+                url = raw.split("#", 1)[0].strip()
+                if url:
+                    yield from _expand(url)
+        return
+
+    match = VIDEO_URL.search(source)
+    if match and "list=" not in source:
+        # A single video — known without asking YouTube
+        yield {"id": match.group(1), "url": source, "title": None, "duration": None}
+        return
+
+    channel = CHANNEL_ROOT.match(source)
+    if channel:
+        # The root lists tabs (Videos, Shorts, Live): go straight to uploads
+        source = channel.group(1) + "/videos"
+
+    yield from _flatten(_extract_flat(source))
+
+
+def _extract_flat(url: str) -> Optional[dict]:
+    import yt_dlp
+
+    ydl_opts = {
+        "extract_flat": "in_playlist",
+        "skip_download": True,
+        "ignoreerrors": True,
+        "quiet": True,
+        "no_warnings": True,
+    }
+    print(f"🔎 Expanding {url} ...")
+    with external_call("youtube", "yt-dlp"), yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        return ydl.extract_info(url, download=False)
+
+
+def _flatten(info: Optional[dict]) -> Iterable[dict]:
+    if not info:
+        return
+    if info.get("entries") is None:
+        yield _entry(info)
+        return
+    for item in info["entries"]:
+        if not item:  # unavailable / private video
+            continue
+        if item.get("entries") is not None:
+            yield from _flatten(item)
+        elif item.get("ie_key") == "YoutubeTab" or item.get("_type") == "playlist":
+            # Nested tab or playlist — needs its own flat extraction
+            yield from _flatten(_extract_flat(item["url"]))
+        elif item.get("id"):
+            yield _entry(item)
+
+
+def _entry(info: dict) -> dict:
+    video_id = info["id"]
+    url = info.get("webpage_url") or info.get("url")
+    if not url or not url.startswith("http"):
+        url = f"https://www.youtube.com/watch?v={video_id}"
+    return {
+        "id": video_id,
+        "url": url,
+        "title": info.get("title"),
+        "duration": info.get("duration"),
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Manifest
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+class Manifest:
+    """
+    JSON progress file. Every update rewrites it through a temp file +
+    os.replace(), so a crash leaves either the old or the new version.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.data = json.load(f)
+            if self.data.get("version") != MANIFEST_VERSION:
+                raise RuntimeError(f"Unsupported manifest version in {path}")
+        else:
+            self.data = {
+                "version": MANIFEST_VERSION,
+                "createdAt": datetime.utcnow().isoformat(),
+                "sources": [],
+                "items": {},
+            }
+
+    @property
+    def items(self) -> Dict[str, dict]:
+        return self.data["items"]
+
+    def add_source(self, source: str, entries: List[dict]) -> int:
+        """Record an expanded source; returns how many entries were new."""
+        added = 0
+        with self._lock:
+            for entry in entries:
+                if entry["id"] in self.items:
+                    continue
+                too_long = (entry.get("duration") or 0) > MAX_SCENE_DURATION
+                self.items[entry["id"]] = {
+                    **entry,
+                    "status": SKIPPED if too_long else PENDING,
+                    "error": "Video too long for MVP (max 10 minutes)" if too_long else None,
+                    "attempts": 0,
+                    "sceneId": None,
+                }
+                added += 1
+            if source not in self.data["sources"]:
+                self.data["sources"].append(source)
+            self._save()
+        return added
+
+    def runnable(self, max_attempts: int) -> List[str]:
+        """IDs to (re)run. Entries left 'running' by a crash count as pending."""
+        ids = []
+        for video_id, item in self.items.items():
+            if item["status"] in (PENDING, RUNNING) or (
+                item["status"] == FAILED and item["attempts"] < max_attempts
+            ):
+                ids.append(video_id)
+        return ids
+
+    def update(self, video_id: str, **fields) -> None:
+        with self._lock:
+            self.items[video_id].update(fields)
+            self._save()
+
+    def counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for item in self.items.values():
+            counts[item["status"]] = counts.get(item["status"], 0) + 1
+        return counts
+
+    def _save(self) -> None:
+        self.data["updatedAt"] = datetime.utcnow().isoformat()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Stage limits
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+class StageGate:
+    """
+    Semaphore for one pipeline stage that also accounts how long its slots
+    were held (busy) and how long ingests queued for one (wait).
+    """
+
+    def __init__(self, name: str, slots: int):
+        self.name = name
+        self.slots = slots
+        self.busy = 0.0
+        self.wait = 0.0
+        self._semaphore = threading.BoundedSemaphore(slots)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def __enter__(self):
+        queued = time.perf_counter()
+        self._semaphore.acquire()
+        self._local.start = time.perf_counter()
+        with self._lock:
+            self.wait += self._local.start - queued
+        return self
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.busy += time.perf_counter() - self._local.start
+        self._semaphore.release()
+        return False
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Runner
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def run(
+    manifest: Manifest,
+    gates: Dict[str, StageGate],
+    workers: int,
+    pitch_mode: Optional[str],
+    max_attempts: int,
+    limit: Optional[int] = None,
+) -> dict:
+    """Ingest every runnable manifest entry. Returns this run's totals."""
+    ids = manifest.runnable(max_attempts)
+    if limit is not None:
+        ids = ids[:limit]
+    totals = {"done": 0, "failed": 0}
+    totals_lock = threading.Lock()
+
+    def ingest_one(video_id: str) -> None:
+        item = manifest.items[video_id]
+        manifest.update(
+            video_id,
+            status=RUNNING,
+            attempts=item["attempts"] + 1,
+            startedAt=datetime.utcnow().isoformat(),
+        )
+        start = time.perf_counter()
+        try:
+            scene = ingest_scene(item["url"], pitch_mode=pitch_mode, limits=gates)
+        except Exception as e:
+            outcome = {"status": FAILED, "error": str(e)}
+        else:
+            outcome = {
+                "status": DONE,
+                "error": None,
+                "sceneId": scene.sceneId,
+                "lines": len(scene.script),
+                "stages": {
+                    name: stage.get("wallSeconds")
+                    for name, stage in scene.metadata.get("stages", {}).items()
+                },
+            }
+        outcome["seconds"] = round(time.perf_counter() - start, 3)
+        outcome["finishedAt"] = datetime.utcnow().isoformat()
+        manifest.update(video_id, **outcome)
+        with totals_lock:
+            totals["done" if outcome["status"] == DONE else "failed"] += 1
+        print(f"📦 [{outcome['status'].upper()}] {item['url']} ({outcome['seconds']}s)")
+
+    print(f"🚀 Bulk ingest: {len(ids)} entries, {workers} concurrent ingests")
+    wall_start = time.perf_counter()
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bulk-ingest")
+    try:
+        list(pool.map(ingest_one, ids))
+    except KeyboardInterrupt:
+        print("\n⚠️  Interrupted — finishing running ingests, the rest resume next run...")
+        pool.shutdown(wait=True, cancel_futures=True)
+        raise
+    finally:
+        pool.shutdown(wait=True)
+        totals["wallSeconds"] = time.perf_counter() - wall_start
+
+    # Pitch threads are daemons — let them store their results before exit
+    print("🎵 Waiting for background pitch extraction...")
+    wait_for_pitch_extraction()
+    return totals
+
+
+def print_report(manifest: Manifest, gates: Dict[str, StageGate], totals: dict) -> None:
+    wall = totals.get("wallSeconds") or 0.0
+    rate = totals["done"] / (wall / 3600) if wall else 0.0
+    counts = manifest.counts()
+
+    print("\n" + "=" * 60)
+    print("BULK INGEST")
+    print("=" * 60)
+    print(f"This run:  {totals['done']} done, {totals['failed']} failed in {wall:.1f}s")
+    print(f"Throughput: {rate:.1f} scenes/hour")
+    print("Manifest:  " + ", ".join(f"{n} {s}" for s, n in sorted(counts.items())))
+    print("-" * 60)
+    print(f"{'stage':<10}{'slots':>6}{'busy':>11}{'queued':>11}{'utilization':>14}")
+    for gate in gates.values():
+        utilization = gate.busy / (wall * gate.slots) if wall else 0.0
+        print(
+            f"{gate.name:<10}{gate.slots:>6}{gate.busy:>10.1f}s"
+            f"{gate.wait:>10.1f}s{utilization:>13.0%}"
+        )
+    print("=" * 60 + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-ingest YouTube videos.")
+    parser.add_argument(
+        "sources", nargs="*", help="playlist / channel / video URL or a file of URLs"
+    )
+    parser.add_argument("--manifest", default="bulk_manifest.json")
+    parser.add_argument("--download", type=int, default=3, help="concurrent downloads")
+    parser.add_argument("--asr", type=int, default=2, help="concurrent transcriptions")
+    parser.add_argument("--gpt", type=int, default=3, help="concurrent GPT calls")
+    parser.add_argument(
+        "--workers", type=int, help="concurrent ingests (default: sum of stage slots)"
+    )
+    parser.add_argument("--pitch-mode", help="pyin | yin | acf")
+    parser.add_argument("--max-attempts", type=int, default=2)
+    parser.add_argument("--limit", type=int, help="ingest at most N entries this run")
+    parser.add_argument("--ai-per-minute", type=int, help="override the AI rate limit")
+    parser.add_argument("--ai-per-day", type=int, help="override the AI rate limit")
+    args = parser.parse_args()
+
+    try:
+        pitch_mode = resolve_estimator(args.pitch_mode) if args.pitch_mode else None
+    except ValueError as e:
+        parser.error(str(e))
+    if args.ai_per_minute is not None:
+        rate_limit.MAX_PER_MINUTE = args.ai_per_minute
+    if args.ai_per_day is not None:
+        rate_limit.MAX_DAILY_CALLS = args.ai_per_day
+
+    manifest = Manifest(args.manifest)
+    # Sources already in the manifest were expanded by an earlier run
+    for source in args.sources:
+        if source in manifest.data["sources"]:
+            continue
+        added = manifest.add_source(source, expand_sources([source]))
+        print(f"📋 {source}: {added} new entries")
+    if not manifest.items:
+        parser.error("nothing to ingest — give a playlist, channel or URL file")
+
+    slots = {"download": args.download, "asr": args.asr, "gpt": args.gpt}
+    gates = {name: StageGate(name, max(1, slots[name])) for name in STAGES}
+    workers = args.workers or sum(gate.slots for gate in gates.values())
+
+    try:
+        totals = run(manifest, gates, workers, pitch_mode, args.max_attempts, args.limit)
+    except KeyboardInterrupt:
+        print(f"Progress saved to {args.manifest}")
+        sys.exit(130)
+    print_report(manifest, gates, totals)
+
+
+if __name__ == "__main__":
+    main()
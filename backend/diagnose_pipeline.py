@@ -7,6 +7,7 @@ sys.path.append(str(Path(__file__).resolve().parent))
 
 from app.workers.ingest import ingest_scene
 from app.config.config import settings
+from app.services.ai_client import ai_available, ai_call_sync
 
 
 def check_services():
@@ -27,10 +28,10 @@ def check_services():
 
     # 2. OpenAI
     print("\n[2/3] Checking OpenAI...")
-    if settings.openai_client:
+    if ai_available():
         try:
             # Simple list models call to verify API key
-            settings.openai_client.models.list()
+            ai_call_sync("models", lambda client: client.models.list())
             print("✅ OpenAI API key is valid and service is reachable.")
         except Exception as e:
             print(f"❌ OpenAI authentication/connection failed: {e}")
@@ -63,7 +64,7 @@ def test_pipeline():
         print(f"Scene ID: {scene.sceneId}")
         print(f"Lines Generated: {len(scene.script)}")
         for line in scene.script[:2]:
-            print(f" - [{line.startTime}-{line.endTime}] {line.speaker}: {line.text}")
+            print(f" - [{line.startTime}-{line.endTime}] {line.characterName}: {line.text}")
 
     except Exception as e:
         print(f"\n❌ PIPELINE FAILED: {e}")
@@ -0,0 +1,59 @@
+"""
+task_worker.py
+─────────────────────────────────────────────────────────────────────────────
+Dedicated worker for queued background tasks (services/task_queue.py).
+
+With TASK_QUEUE=redis the API publishes pitch extraction to the Redis
+Stream tasks:pitch instead of running it in its own process. Start workers
+on any node that shares REDIS_URL and the storage backend — one per core,
+since a task is CPU-bound:
+
+    python task_worker.py [--kinds pitch] [--consumer NAME]
+    python task_worker.py --status
+
+Tasks a crashed worker left behind are reclaimed by the others after
+TASK_CLAIM_IDLE_SECONDS. SIGTERM / Ctrl-C finishes the current task, then
+exits.
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import argparse
+import json
+import logging
+import signal
+import sys
+import threading
+from pathlib import Path
+
+# Add the project root to sys.path
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from app.services import pitch  # noqa: F401 — registers the "pitch" task
+from app.services.pitch import warm_up_pitch_engine
+from app.services.task_queue import queue_status, run_worker
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[3])
+    parser.add_argument("--kinds", default="pitch", help="comma-separated task kinds")
+    parser.add_argument("--consumer", help="consumer name (default: host-pid)")
+    parser.add_argument("--status", action="store_true", help="print queue state and exit")
+    args = parser.parse_args()
+    kinds = [kind.strip() for kind in args.kinds.split(",") if kind.strip()]
+
+    if args.status:
+        print(json.dumps({kind: queue_status(kind) for kind in kinds}, indent=2))
+        return
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if "pitch" in kinds:
+        warm_up_pitch_engine()
+
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+    run_worker(kinds, consumer=args.consumer, stop=stop)
+
+
+if __name__ == "__main__":
+    main()